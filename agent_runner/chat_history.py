@@ -0,0 +1,306 @@
+"""
+Chat history on the chat_sessions / chat_messages tables of the wowbits DB.
+
+Writes never wait on the database: `append()` queues the message and a
+background writer inserts whatever has queued up as one batch per
+transaction (up to BATCH_SIZE rows, at most FLUSH_INTERVAL seconds after
+the first). Reads load a window instead of the whole history: the session's
+stored `summary` plus its last HISTORY_WINDOW messages, served by an index
+on (session_id, created_at). Messages still in the queue are included, so
+a session always reads its own writes.
+
+On SQLite the database is switched to WAL with synchronous=NORMAL so the
+writer does not block readers (the agent runtime loading its config) and a
+commit does not wait for an fsync.
+
+Timestamps are naive UTC, like the DateTime columns of the schema. The
+runtime records served chats here with `wowbits_runtime.py web --chat_history`
+(see ChatHistorySessionService there).
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Index, bindparam, event, select, update
+from db.schema import ChatMessage, ChatSession
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+BATCH_SIZE = int(os.environ.get("CHAT_HISTORY_BATCH_SIZE", "500"))
+FLUSH_INTERVAL = float(os.environ.get("CHAT_HISTORY_FLUSH_INTERVAL", "0.2"))
+HISTORY_WINDOW = int(os.environ.get("CHAT_HISTORY_WINDOW", "50"))
+# A failed batch is retried this many times before it is dropped (and logged).
+WRITE_RETRIES = 3
+
+MESSAGES = ChatMessage.__table__
+SESSIONS = ChatSession.__table__
+INDEXES = (
+    Index("ix_chat_messages_session_created", MESSAGES.c.session_id, MESSAGES.c.created_at),
+    Index("ix_chat_sessions_user_agent_updated", SESSIONS.c.user_id, SESSIONS.c.agent_id, SESSIONS.c.updated_at),
+)
+MESSAGE_FIELDS = ("id", "session_id", "agent_id", "skill_id", "tool_id", "user_id", "content", "created_at")
+
+
+def _uuid(value) -> Optional[uuid.UUID]:
+    if value is None or isinstance(value, uuid.UUID):
+        return value
+    return uuid.UUID(str(value))
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+def prepare_engine(engine):
+    """Create the chat indexes if missing and, on SQLite, switch to WAL."""
+    if engine.dialect.name == "sqlite":
+        if not event.contains(engine, "connect", _set_sqlite_pragmas):
+            event.listen(engine, "connect", _set_sqlite_pragmas)
+        with engine.connect() as conn:
+            # journal_mode is stored in the database file; synchronous is per connection.
+            conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+            conn.exec_driver_sql("PRAGMA synchronous=NORMAL")
+    for index in INDEXES:
+        index.create(bind=engine, checkfirst=True)
+
+
+class ChatHistoryStore:
+    """Batched writer and windowed reader for chat sessions and their messages."""
+
+    def __init__(self, engine, batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL,
+                 window: int = HISTORY_WINDOW):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.window = window
+        prepare_engine(engine)
+        self._queue = []
+        # Queued or in-flight messages per session, for read-your-writes.
+        self._pending = {}
+        self._cond = threading.Condition()
+        self._last_created = datetime.min
+        self._closed = False
+        self.stats = {"messages": 0, "batches": 0, "failed_batches": 0, "dropped": 0}
+        self._writer = threading.Thread(target=self._run, name="chat-history-writer", daemon=True)
+        self._writer.start()
+
+    def create_session(self, agent_id, user_id, title: str = None, session_id=None) -> uuid.UUID:
+        """Insert a chat session right away (sessions are rare; messages are batched)."""
+        session_id = _uuid(session_id) or uuid.uuid4()
+        now = _utcnow()
+        with self.engine.begin() as conn:
+            conn.execute(SESSIONS.insert(), {
+                "id": session_id, "agent_id": _uuid(agent_id), "user_id": _uuid(user_id),
+                "title": title, "created_at": now, "updated_at": now,
+            })
+        return session_id
+
+    def ensure_session(self, session_id, agent_id, user_id, title: str = None) -> uuid.UUID:
+        """Create the session unless a row with this id already exists."""
+        session_id = _uuid(session_id)
+        with self.engine.connect() as conn:
+            exists = conn.execute(select(SESSIONS.c.id).where(SESSIONS.c.id == session_id)).first()
+        if exists is None:
+            self.create_session(agent_id, user_id, title, session_id)
+        return session_id
+
+    def set_summary(self, session_id, summary: str):
+        """Store the running summary of everything before the loaded window."""
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(SESSIONS).where(SESSIONS.c.id == _uuid(session_id))
+                .values(summary=summary, updated_at=_utcnow())
+            )
+
+    def append(self, session_id, content: str, agent_id=None, skill_id=None, tool_id=None, user_id=None) -> uuid.UUID:
+        """Queue a message for the background writer and return its id."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("ChatHistoryStore is closed")
+            # created_at orders the history; keep it strictly increasing within the process.
+            created = max(_utcnow(), self._last_created + timedelta(microseconds=1))
+            self._last_created = created
+            row = {
+                "id": uuid.uuid4(), "session_id": _uuid(session_id), "agent_id": _uuid(agent_id),
+                "skill_id": _uuid(skill_id), "tool_id": _uuid(tool_id), "user_id": _uuid(user_id),
+                "content": content, "created_at": created, "updated_at": created,
+            }
+            self._queue.append(row)
+            self._pending.setdefault(row["session_id"], {})[row["id"]] = row
+            self._cond.notify()
+        return row["id"]
+
+    def load(self, session_id, last_n: int = None, before: datetime = None) -> Dict[str, Any]:
+        """
+        The session's summary and its last `last_n` messages, oldest first.
+
+        Args:
+            session_id: Chat session id
+            last_n (int): Window size, HISTORY_WINDOW by default
+            before (datetime): Only messages created before this, to page further back (naive
+                values are UTC)
+
+        Returns:
+            dict: {"session_id", "title", "summary", "messages": [dict], "has_more": bool}
+        """
+        session_id = _uuid(session_id)
+        before = _naive_utc(before)
+        last_n = self.window if last_n is None else last_n
+        with self._cond:
+            pending = [
+                r for r in self._pending.get(session_id, {}).values() if before is None or r["created_at"] < before
+            ]
+        with self.engine.connect() as conn:
+            session = conn.execute(
+                select(SESSIONS.c.title, SESSIONS.c.summary).where(SESSIONS.c.id == session_id)
+            ).first()
+            query = (
+                select(*(MESSAGES.c[name] for name in MESSAGE_FIELDS))
+                .where(MESSAGES.c.session_id == session_id)
+                .order_by(MESSAGES.c.created_at.desc())
+                .limit(last_n + 1)
+            )
+            if before is not None:
+                query = query.where(MESSAGES.c.created_at < before)
+            stored = [dict(row._mapping) for row in conn.execute(query)]
+        # A message the writer committed between the two reads is in both.
+        seen = {row["id"] for row in stored}
+        newest_first = sorted(
+            stored + [{k: r[k] for k in MESSAGE_FIELDS} for r in pending if r["id"] not in seen],
+            key=lambda r: r["created_at"], reverse=True,
+        )
+        return {
+            "session_id": session_id,
+            "title": session.title if session else None,
+            "summary": session.summary if session else None,
+            "messages": newest_first[:last_n][::-1],
+            "has_more": len(newest_first) > last_n,
+        }
+
+    def list_sessions(self, user_id, agent_id=None, limit: int = 20) -> List[Dict[str, Any]]:
+        """A user's most recently updated sessions, optionally for one agent."""
+        query = (
+            select(SESSIONS.c.id, SESSIONS.c.agent_id, SESSIONS.c.title, SESSIONS.c.updated_at)
+            .where(SESSIONS.c.user_id == _uuid(user_id))
+            .order_by(SESSIONS.c.updated_at.desc())
+            .limit(limit)
+        )
+        if agent_id is not None:
+            query = query.where(SESSIONS.c.agent_id == _uuid(agent_id))
+        with self.engine.connect() as conn:
+            return [dict(row._mapping) for row in conn.execute(query)]
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait until every queued message is written; False if `timeout` ran out first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify_all()
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 10.0):
+        """Write what is queued and stop the writer."""
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join(timeout)
+
+    def _next_batch(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            while not self._queue and not self._closed:
+                self._cond.wait()
+            if self._queue and len(self._queue) < self.batch_size and not self._closed:
+                # Give a burst a moment to fill the batch.
+                self._cond.wait(self.flush_interval)
+            batch = self._queue[:self.batch_size]
+            del self._queue[:self.batch_size]
+            return batch
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        last_message = {}
+        for row in batch:
+            last_message[row["session_id"]] = row["created_at"]
+        with self.engine.begin() as conn:
+            conn.execute(MESSAGES.insert(), batch)
+            conn.execute(
+                update(SESSIONS).where(SESSIONS.c.id == bindparam("sid")).values(updated_at=bindparam("at")),
+                [{"sid": sid, "at": at} for sid, at in last_message.items()],
+            )
+
+    def _done(self, batch: List[Dict[str, Any]]):
+        with self._cond:
+            for row in batch:
+                rows = self._pending.get(row["session_id"])
+                if rows is not None:
+                    rows.pop(row["id"], None)
+                    if not rows:
+                        del self._pending[row["session_id"]]
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            for attempt in range(WRITE_RETRIES + 1):
+                try:
+                    self._write(batch)
+                    self.stats["messages"] += len(batch)
+                    self.stats["batches"] += 1
+                    break
+                except Exception:
+                    self.stats["failed_batches"] += 1
+                    if attempt == WRITE_RETRIES:
+                        self.stats["dropped"] += len(batch)
+                        logger.exception(f"Dropping {len(batch)} chat messages after {attempt + 1} failed writes")
+                    else:
+                        time.sleep(0.1 * 2 ** attempt)
+            self._done(batch)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> ChatHistoryStore:
+    """Return the process-wide store on the wowbits database engine."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                from pylibs.database_manager import get_db_manager
+
+                _store = ChatHistoryStore(get_db_manager().engine)
+                atexit.register(_store.close)
+    return _store
+
+
+def set_store(store: Optional[ChatHistoryStore]):
+    """Replace the process-wide store (e.g. with one on another engine)."""
+    global _store
+    with _store_lock:
+        _store = store
@@ -0,0 +1,18 @@
+"""
+Serves the stock_fundamentals agent through wowbits_runtime.
+
+Written by `python agent_runner/wowbits_runtime.py link stock_fundamentals`. ADK
+imports this package before agent.py, which the wowbits CLI regenerates.
+"""
+import os
+import sys
+
+AGENT_RUNNER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if AGENT_RUNNER_DIR not in sys.path:
+    sys.path.insert(0, AGENT_RUNNER_DIR)
+
+from wowbits_runtime import registry
+
+agent_id = "746a18de-acc7-421b-b51d-40fd97310ad9"
+
+root_agent = registry.load_agent_by_id(agent_id)
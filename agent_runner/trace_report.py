@@ -0,0 +1,190 @@
+"""
+Per-skill latency breakdown of a traced agent run (see functions/helpers/tracing.py).
+
+Reads the spans the jsonl exporter wrote and prints, for one trace:
+
+    skills   per agent/skill: wall time, self time (not covered by its model
+             calls, tools or sub-skills), time in model calls with their
+             token counts, and time in tools
+    tools    per tool: calls, time, the HTTP / Firecrawl / inner run_llm time
+             inside it, result size before and after trimming, errors
+
+Usage:
+    python agent_runner/trace_report.py                 # last trace
+    python agent_runner/trace_report.py --list 20       # recent traces
+    python agent_runner/trace_report.py --trace 3f2a    # trace id (prefix)
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, List
+
+TRACE_PATH = os.environ.get(
+    "TRACE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "traces.jsonl")
+)
+
+
+def load_spans(path: str) -> List[Dict[str, Any]]:
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                spans.append(json.loads(line))
+    return spans
+
+
+def group_traces(spans: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    traces = {}
+    for span in spans:
+        traces.setdefault(span["trace_id"], []).append(span)
+    return traces
+
+
+def _roots(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    ids = {s["span_id"] for s in spans}
+    return [s for s in spans if s["parent_id"] not in ids]
+
+
+def _covered_ms(spans: List[Dict[str, Any]]) -> float:
+    """Wall time covered by a set of spans, counting overlapping (parallel) ones once."""
+    total = 0.0
+    end = None
+    for span in sorted(spans, key=lambda s: s["start"]):
+        start, stop = span["start"], span["end"]
+        if end is None or start > end:
+            total += stop - start
+            end = stop
+        elif stop > end:
+            total += stop - end
+            end = stop
+    return total * 1000
+
+
+def skill_breakdown(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One row per agent/skill name, summed over its runs in the trace."""
+    children = {}
+    for span in spans:
+        children.setdefault(span["parent_id"], []).append(span)
+    rows = {}
+    for span in spans:
+        if span["kind"] != "agent":
+            continue
+        kids = children.get(span["span_id"], [])
+        models = [k for k in kids if k["kind"] == "model"]
+        tools = [k for k in kids if k["kind"] == "tool"]
+        row = rows.setdefault(span["name"], {
+            "skill": span["name"], "runs": 0, "total_ms": 0.0, "self_ms": 0.0, "model_ms": 0.0,
+            "model_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "tool_ms": 0.0, "tool_calls": 0,
+            "start": span["start"],
+        })
+        row["runs"] += 1
+        row["total_ms"] += span["duration_ms"]
+        row["self_ms"] += max(span["duration_ms"] - _covered_ms(kids), 0.0)
+        row["model_ms"] += _covered_ms(models)
+        row["model_calls"] += len(models)
+        row["prompt_tokens"] += sum(m["attributes"].get("llm.prompt_tokens") or 0 for m in models)
+        row["completion_tokens"] += sum(m["attributes"].get("llm.completion_tokens") or 0 for m in models)
+        row["tool_ms"] += _covered_ms(tools)
+        row["tool_calls"] += len(tools)
+        row["start"] = min(row["start"], span["start"])
+    return sorted(rows.values(), key=lambda r: r["start"])
+
+
+def tool_breakdown(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One row per tool name."""
+    rows = {}
+    for span in spans:
+        if span["kind"] != "tool":
+            continue
+        attrs = span["attributes"]
+        row = rows.setdefault(span["name"], {
+            "tool": span["name"], "calls": 0, "total_ms": 0.0, "http_ms": 0.0, "http_requests": 0,
+            "firecrawl_ms": 0.0, "run_llm_ms": 0.0, "run_llm_tokens": 0, "result_chars": 0,
+            "result_chars_trimmed": 0, "errors": 0,
+        })
+        row["calls"] += 1
+        row["total_ms"] += span["duration_ms"]
+        row["http_ms"] += attrs.get("http.ms", 0.0)
+        row["http_requests"] += attrs.get("http.requests", 0)
+        row["firecrawl_ms"] += attrs.get("firecrawl.ms", 0.0)
+        row["run_llm_ms"] += attrs.get("run_llm.ms", 0.0)
+        row["run_llm_tokens"] += attrs.get("run_llm.prompt_tokens", 0) + attrs.get("run_llm.completion_tokens", 0)
+        row["result_chars"] += attrs.get("tool.result_chars", 0)
+        row["result_chars_trimmed"] += attrs.get("tool.result_chars_trimmed", attrs.get("tool.result_chars", 0))
+        row["errors"] += 1 if span["error"] else 0
+    return sorted(rows.values(), key=lambda r: -r["total_ms"])
+
+
+def print_list(traces: Dict[str, List[Dict[str, Any]]], limit: int):
+    rows = []
+    for trace_id, spans in traces.items():
+        root = min(_roots(spans), key=lambda s: s["start"])
+        wall = (max(s["end"] for s in spans) - min(s["start"] for s in spans)) * 1000
+        errors = sum(1 for s in spans if s["error"])
+        rows.append((root["start"], trace_id, root["name"], wall, len(spans), errors))
+    print(f"{'started':<20} {'trace':<34} {'root':<28} {'ms':>9} {'spans':>6} {'errors':>6}")
+    for start, trace_id, name, wall, count, errors in sorted(rows)[-limit:]:
+        started = datetime.fromtimestamp(start).strftime("%Y-%m-%d %H:%M:%S")
+        print(f"{started:<20} {trace_id:<34} {name:<28} {wall:>9.0f} {count:>6} {errors:>6}")
+
+
+def print_report(trace_id: str, spans: List[Dict[str, Any]]):
+    root = min(_roots(spans), key=lambda s: s["start"])
+    wall = (max(s["end"] for s in spans) - min(s["start"] for s in spans)) * 1000
+    started = datetime.fromtimestamp(root["start"]).strftime("%Y-%m-%d %H:%M:%S")
+    print(f"trace {trace_id}  {root['name']}  {wall:.0f} ms  ({started}, {len(spans)} spans)\n")
+
+    print(f"{'skill':<32} {'runs':>4} {'total ms':>9} {'self ms':>8} {'model ms':>9} {'calls':>5} "
+          f"{'tokens in':>9} {'out':>6} {'tools ms':>9} {'calls':>5}")
+    for row in skill_breakdown(spans):
+        print(f"{row['skill']:<32} {row['runs']:>4} {row['total_ms']:>9.0f} {row['self_ms']:>8.0f} "
+              f"{row['model_ms']:>9.0f} {row['model_calls']:>5} {row['prompt_tokens']:>9} "
+              f"{row['completion_tokens']:>6} {row['tool_ms']:>9.0f} {row['tool_calls']:>5}")
+
+    tools = tool_breakdown(spans)
+    if tools:
+        print(f"\n{'tool':<28} {'calls':>5} {'total ms':>9} {'http ms':>8} {'reqs':>5} {'firecrawl':>9} "
+              f"{'run_llm ms':>10} {'tokens':>7} {'chars':>8} {'trimmed':>8} {'errors':>6}")
+        for row in tools:
+            print(f"{row['tool']:<28} {row['calls']:>5} {row['total_ms']:>9.0f} {row['http_ms']:>8.0f} "
+                  f"{row['http_requests']:>5} {row['firecrawl_ms']:>9.0f} {row['run_llm_ms']:>10.0f} "
+                  f"{row['run_llm_tokens']:>7} {row['result_chars']:>8} {row['result_chars_trimmed']:>8} "
+                  f"{row['errors']:>6}")
+
+    errors = [s for s in spans if s["error"]]
+    if errors:
+        print("\nerrors:")
+        for span in sorted(errors, key=lambda s: s["start"]):
+            print(f"  {span['kind']} {span['name']} ({span['attributes'].get('skill', '')}): {span['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-skill latency breakdown of a traced agent run")
+    parser.add_argument("--path", default=TRACE_PATH, help="JSONL file written by TRACE_EXPORTER=jsonl")
+    parser.add_argument("--trace", help="trace id or a prefix of it; the most recent trace by default")
+    parser.add_argument("--list", type=int, metavar="N", help="list the N most recent traces instead")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        sys.exit(f"No trace file at {args.path}; run the agents with TRACE_EXPORTER=jsonl first")
+    traces = group_traces(load_spans(args.path))
+    if not traces:
+        sys.exit(f"No spans in {args.path}")
+    if args.list:
+        print_list(traces, args.list)
+        return
+    if args.trace:
+        matches = [t for t in traces if t.startswith(args.trace)]
+        if len(matches) != 1:
+            sys.exit(f"{len(matches)} traces match {args.trace!r}")
+        trace_id = matches[0]
+    else:
+        trace_id = max(traces, key=lambda t: max(s["end"] for s in traces[t]))
+    print_report(trace_id, traces[trace_id])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,546 @@
+"""
+Watchlist monitor: keeps an agent (stock_news_monitor by default) watching a
+large watchlist without anyone typing into the web chat.
+
+Prices, news and the X feed are polled on their own intervals. Due tickers
+are coalesced into batched calls (one quote request per 50 tickers, one
+stock_news request per 50 tickers, one X search per 20), and every request first takes a token
+from its provider's bucket so FMP, X, Firecrawl and the LLM are kept under
+their rate limits. Tickers that changed recently are polled more often and
+ahead of quiet ones. The agent only runs for a ticker when something changed:
+a price move past a threshold, new articles or new posts. News resumes from
+the cursors stored when the agent last handled a ticker's articles, so
+articles published while the monitor was stopped are not skipped.
+
+    python agent_runner/watchlist_monitor.py --watchlist watchlist.txt
+
+The scheduler itself (`WatchlistMonitor`) only talks to a clock, token
+buckets, sources and a change handler, so it runs unchanged against fake
+providers and a simulated clock (benchmarks/sim_watchlist_monitor.py).
+
+Tunables (environment variables):
+    MONITOR_RATE_<PROVIDER>   requests/seconds per provider, e.g. MONITOR_RATE_FMP=300/60
+    MONITOR_<SOURCE>_INTERVAL seconds between polls of a ticker (PRICE, NEWS, X)
+    MONITOR_PRICE_THRESHOLD   relative price move that counts as a change (default 0.01)
+"""
+import asyncio
+import heapq
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+FUNCTIONS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "functions"))
+if FUNCTIONS_DIR not in sys.path:
+    sys.path.insert(0, FUNCTIONS_DIR)
+
+from helpers import http_client, news_cursors, stock_news
+
+# (requests, per seconds): FMP starter plan, X recent search app limit,
+# Firecrawl hobby plan and a conservative LLM budget for agent runs.
+DEFAULT_RATES = {
+    "fmp": (300, 60),
+    "x": (450, 15 * 60),
+    "firecrawl": (100, 60),
+    "llm": (60, 60),
+}
+PRICE_INTERVAL = float(os.environ.get("MONITOR_PRICE_INTERVAL", "60"))
+NEWS_INTERVAL = float(os.environ.get("MONITOR_NEWS_INTERVAL", "300"))
+X_INTERVAL = float(os.environ.get("MONITOR_X_INTERVAL", "900"))
+PRICE_THRESHOLD = float(os.environ.get("MONITOR_PRICE_THRESHOLD", "0.01"))
+# A ticker that changed in the last ACTIVE_WINDOW seconds is polled
+# ACTIVE_SPEEDUP times as often and before quiet tickers.
+ACTIVE_WINDOW = 30 * 60
+ACTIVE_SPEEDUP = 4
+# A partly filled batch is topped up with tickers due within this fraction of
+# the source's interval, so polls stay batched instead of drifting apart.
+COALESCE_AHEAD = 0.25
+AGENT_CONCURRENCY = 4
+X_BATCH_SIZE = 20
+# News cursor before any article: everything is past it.
+NO_CURSOR = ("", [])
+
+
+class MonotonicClock:
+    """Wall clock for the live monitor."""
+
+    def now(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+
+class SimulatedClock:
+    """Clock whose sleep() just moves time forward, for replaying hours in seconds."""
+
+    def __init__(self, start: float = 0.0):
+        self._now = start
+
+    def now(self) -> float:
+        return self._now
+
+    def sleep(self, seconds: float):
+        self._now += max(0.0, seconds)
+
+
+class TokenBucket:
+    """
+    `rate` requests per `per` seconds, with bursts of up to `capacity`.
+
+    `charge()` may take the bucket below zero (e.g. an agent run that scrapes
+    several pages); later callers then wait until the debt is repaid.
+    """
+
+    def __init__(self, rate: float, per: float, clock, capacity: float = None):
+        self.fill_rate = rate / per
+        self.capacity = capacity if capacity is not None else rate
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock.now()
+        self.spent = 0
+
+    def _refill(self):
+        now = self.clock.now()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+        self.updated = now
+
+    def try_acquire(self, n: float = 1) -> bool:
+        self._refill()
+        if self.tokens < n:
+            return False
+        self.tokens -= n
+        self.spent += n
+        return True
+
+    def charge(self, n: float):
+        self._refill()
+        self.tokens -= n
+        self.spent += n
+
+    def tokens_available(self) -> float:
+        self._refill()
+        return self.tokens
+
+    def wait_time(self, n: float = 1) -> float:
+        """Seconds until `n` tokens are available."""
+        self._refill()
+        return max(0.0, (min(n, self.capacity) - self.tokens) / self.fill_rate)
+
+
+def rate_limits(clock) -> Dict[str, TokenBucket]:
+    """
+    Token buckets per provider from DEFAULT_RATES and MONITOR_RATE_<PROVIDER>.
+
+    A tenth of each limit is kept as burst capacity and the rest refills
+    evenly, so no window of `per` seconds ever sees more than `rate` requests.
+    """
+    buckets = {}
+    for provider, (rate, per) in DEFAULT_RATES.items():
+        override = os.environ.get(f"MONITOR_RATE_{provider.upper()}")
+        if override:
+            rate, _, per = override.partition("/")
+            rate, per = float(rate), float(per or 1)
+        burst = max(1, rate // 10)
+        buckets[provider] = TokenBucket(rate - burst, per, clock, capacity=burst)
+    return buckets
+
+
+class Source:
+    """
+    One kind of observation polled for every ticker.
+
+    Args:
+        name (str): e.g. "price", "news", "x"
+        provider (str): Rate limit bucket its requests draw from
+        interval (float): Seconds between polls of a quiet ticker
+        batch_size (int): Tickers per request
+        fetch (callable): (tickers, states) -> {ticker: observation}; tickers left out
+            had nothing. `states` is ticker -> the detector's current state, so a
+            fetch can poll from where the monitor is (news cursors).
+        detect (callable): (state, observation) -> (change or None, new state). `state`
+            is None the first time; that observation is then a baseline, unless the
+            detector can resume from stored state (news_change).
+    """
+
+    def __init__(self, name: str, provider: str, interval: float, batch_size: int,
+                 fetch: Callable[[List[str], Dict[str, Any]], Dict[str, Any]],
+                 detect: Callable[[Any, Any], Tuple[Optional[Dict[str, Any]], Any]]):
+        self.name = name
+        self.provider = provider
+        self.interval = interval
+        self.batch_size = batch_size
+        self.fetch = fetch
+        self.detect = detect
+
+
+class WatchlistMonitor:
+    """
+    Polls `sources` for `tickers` within the provider rate limits and hands
+    tickers with changes to `on_change(ticker, changes)`.
+
+    `on_change` returns False when it cannot take more work right now (e.g.
+    all agent slots busy); the changes are then kept and merged with later
+    ones. Each accepted hand-off costs one "llm" token plus one "firecrawl"
+    token per new article the agent may scrape.
+    """
+
+    def __init__(self, tickers: Iterable[str], sources: List[Source], buckets: Dict[str, TokenBucket],
+                 on_change: Callable[[str, List[Dict[str, Any]]], bool], clock):
+        self.tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+        self.sources = sources
+        self.buckets = buckets
+        self.on_change = on_change
+        self.clock = clock
+        now = clock.now()
+        # Per source: the due time of each ticker, plus heaps of (due time,
+        # ticker) for recently active and for quiet tickers. Rescheduling
+        # pushes a new entry; entries whose time no longer matches are skipped.
+        self._due = {s.name: {t: now for t in self.tickers} for s in sources}
+        self._heaps = {s.name: ([], sorted((now, t) for t in self.tickers)) for s in sources}
+        self._state = {s.name: {} for s in sources}
+        self._last_change = {}
+        self.pending = OrderedDict()
+        self.stats = {
+            "requests": {s.name: 0 for s in sources},
+            "polls": {s.name: 0 for s in sources},
+            "errors": {s.name: 0 for s in sources},
+            "changes": {s.name: 0 for s in sources},
+            "dispatched": 0,
+            "deferred": 0,
+        }
+
+    def _active(self, ticker: str, now: float) -> bool:
+        changed = self._last_change.get(ticker)
+        return changed is not None and now - changed < ACTIVE_WINDOW
+
+    def _interval(self, source: Source, ticker: str, now: float) -> float:
+        return source.interval / ACTIVE_SPEEDUP if self._active(ticker, now) else source.interval
+
+    def _schedule(self, source: Source, ticker: str, due: float, now: float):
+        self._due[source.name][ticker] = due
+        active, quiet = self._heaps[source.name]
+        heapq.heappush(active if self._active(ticker, now) else quiet, (due, ticker))
+
+    def _pop_due(self, source: Source, until: float, taken: List[str], limit: int, batch_fill: bool = False):
+        due_at = self._due[source.name]
+        for heap in self._heaps[source.name]:
+            while heap and heap[0][0] <= until and len(taken) < limit:
+                if batch_fill and len(taken) % source.batch_size == 0:
+                    return
+                when, ticker = heapq.heappop(heap)
+                if due_at.get(ticker) == when:
+                    taken.append(ticker)
+
+    def _due_tickers(self, source: Source, now: float, limit: int) -> List[str]:
+        """
+        Pop up to `limit` tickers due for `source`: recently active ones
+        first, then the longest overdue. A partly filled last batch is topped
+        up with tickers due soon.
+        """
+        taken = []
+        self._pop_due(source, now, taken, limit)
+        if taken and len(taken) % source.batch_size:
+            self._pop_due(source, now + source.interval * COALESCE_AHEAD, taken, limit, batch_fill=True)
+        return taken
+
+    def _poll(self, source: Source, now: float):
+        bucket = self.buckets[source.provider]
+        # Only take as many tickers as there is budget for; the rest stay queued.
+        budget = int(max(0.0, bucket.tokens_available()))
+        due = self._due_tickers(source, now, budget * source.batch_size)
+        for start in range(0, len(due), source.batch_size):
+            batch = due[start:start + source.batch_size]
+            if not bucket.try_acquire(1):
+                for ticker in due[start:]:
+                    self._schedule(source, ticker, self._due[source.name][ticker], now)
+                return
+            states = self._state[source.name]
+            with http_client.count_requests() as sent:
+                try:
+                    observations = source.fetch(batch, {t: states.get(t) for t in batch})
+                except Exception as e:
+                    self.stats["errors"][source.name] += 1
+                    logger.warning(f"{source.name} poll of {len(batch)} tickers failed: {e}")
+                    observations = None
+            # One token was taken up front; further pages and retries are charged as sent.
+            if sent.sent > 1:
+                bucket.charge(sent.sent - 1)
+            self.stats["requests"][source.name] += max(1, sent.sent)
+            for ticker in batch:
+                self._schedule(source, ticker, now + self._interval(source, ticker, now), now)
+            if observations is None:
+                continue
+            self.stats["polls"][source.name] += len(batch)
+            for ticker in batch:
+                if ticker not in observations:
+                    continue
+                change, states[ticker] = source.detect(states.get(ticker), observations[ticker])
+                if change:
+                    self.stats["changes"][source.name] += 1
+                    self._last_change[ticker] = now
+                    self.pending.setdefault(ticker, []).append(dict(change, source=source.name, at=now))
+                    # Poll the other sources of an active ticker soon, ahead of quiet ones.
+                    for other in self.sources:
+                        sooner = now + self._interval(other, ticker, now)
+                        if other is not source and self._due[other.name].get(ticker, sooner) > sooner:
+                            self._schedule(other, ticker, sooner, now)
+
+    def _dispatch(self):
+        llm = self.buckets.get("llm")
+        firecrawl = self.buckets.get("firecrawl")
+        for ticker in list(self.pending):
+            changes = self.pending[ticker]
+            scrapes = sum(c.get("scrapes", 0) for c in changes)
+            if llm and llm.wait_time(1) > 0:
+                return
+            if not self.on_change(ticker, changes):
+                self.stats["deferred"] += 1
+                return
+            if llm:
+                llm.charge(1)
+            if firecrawl and scrapes:
+                firecrawl.charge(scrapes)
+            del self.pending[ticker]
+            self.stats["dispatched"] += 1
+
+    def step(self) -> float:
+        """Poll what is due, hand off changes, and return seconds until there is more to do."""
+        now = self.clock.now()
+        for source in self.sources:
+            self._poll(source, now)
+        self._dispatch()
+
+        now = self.clock.now()
+        waits = []
+        for source in self.sources:
+            heads = [heap[0][0] for heap in self._heaps[source.name] if heap]
+            if heads:
+                wait = min(heads) - now
+                if wait <= 0:
+                    wait = self.buckets[source.provider].wait_time(1)
+                waits.append(wait)
+        if self.pending and "llm" in self.buckets:
+            waits.append(max(self.buckets["llm"].wait_time(1), 0.5))
+        return max(0.05, min(waits)) if waits else 1.0
+
+    def run(self, duration: float = None, stop: threading.Event = None):
+        """Run until `duration` seconds have passed on the monitor's clock or `stop` is set."""
+        end = None if duration is None else self.clock.now() + duration
+        while not (stop and stop.is_set()):
+            wait = self.step()
+            if end is not None:
+                if self.clock.now() >= end:
+                    break
+                wait = min(wait, end - self.clock.now())
+            self.clock.sleep(wait)
+
+
+def price_change(state, price):
+    """Change when the price moved PRICE_THRESHOLD or more since the last reported price."""
+    if state is None:
+        return None, price
+    move = (price - state) / state if state else 0.0
+    if abs(move) < PRICE_THRESHOLD:
+        return None, state
+    return {"kind": "price", "price": price, "previous": state, "move": round(move, 4)}, price
+
+
+def news_change(state, observation):
+    """
+    Articles past the ticker's cursor are a change.
+
+    The stored cursors only move once the agent has handled the articles
+    (AgentInvoker commits the change's cursor), so `state` holds the cursor
+    of what this process has already handed off and a poll in between does
+    not report the same articles twice.
+
+    The first observation of a ticker starts from its stored cursor, so
+    articles published while the monitor was down are reported. Only a
+    ticker the agent has never handled news for takes its first articles as
+    the baseline.
+    """
+    cursor = observation["cursor"]
+    if state is None:
+        state = observation.get("stored")
+        if state is None:
+            return None, news_cursors.merge(NO_CURSOR, cursor)
+    articles = [a for a in observation["articles"] if news_cursors.is_new(state, a)]
+    if not articles:
+        return None, state
+    return {
+        "kind": "news",
+        "articles": [{"title": a.get("title"), "url": a.get("url")} for a in articles],
+        "scrapes": len(articles),
+        "cursor": cursor,
+    }, news_cursors.merge(state, cursor)
+
+
+def x_change(state, tweets):
+    """New posts are those with a larger id than the newest seen so far."""
+    newest = max((int(t["id"]) for t in tweets if str(t.get("id", "")).isdigit()), default=None)
+    if newest is None:
+        return None, state
+    if state is None:
+        return None, newest
+    new = [t for t in tweets if str(t.get("id", "")).isdigit() and int(t["id"]) > state]
+    if not new:
+        return None, state
+    return {"kind": "x", "posts": [t.get("text") for t in new[:5]], "count": len(new)}, max(newest, state)
+
+
+def default_sources() -> List[Source]:
+    """Sources backed by the functions/ tools: batched quotes, incremental news, packed X search."""
+    from get_stock_price import QUOTE_BATCH_SIZE, get_stock_prices
+    from get_stock_twitter_feeds import get_stock_twitter_feeds
+
+    def fetch_prices(tickers, states):
+        return get_stock_prices(tickers)["prices"]
+
+    def fetch_news(tickers, states):
+        stored = news_cursors.get_store().get(tickers)
+        # Tickers already observed poll from the monitor's cursor: it is ahead of
+        # the stored one until the agent has handled the articles.
+        known = {t: state for t, state in states.items() if state and state[0]}
+        fresh, cursors = stock_news.poll(tickers, commit=False, known=known)
+        return {t: {"articles": fresh.get(t, []), "cursor": cursors.get(t), "stored": stored.get(t)}
+                for t in tickers}
+
+    def fetch_x(tickers, states):
+        # One page per query keeps each poll at exactly one request for the
+        # bucket; since_last means that page only holds new posts.
+        result = get_stock_twitter_feeds(tickers, since_last=True, max_pages=1)
+        if "feeds" not in result:
+            raise Exception(result.get("message", "X feed unavailable"))
+        return {t: feed["tweets"] for t, feed in result["feeds"].items() if t not in result["errors"]}
+
+    return [
+        Source("price", "fmp", PRICE_INTERVAL, QUOTE_BATCH_SIZE, fetch_prices, price_change),
+        Source("news", "fmp", NEWS_INTERVAL, stock_news.NEWS_BATCH_SIZE,
+               fetch_news, news_change),
+        # 20 cashtag pairs of up to five letters fit in one 512-character query.
+        Source("x", "x", X_INTERVAL, X_BATCH_SIZE, fetch_x, x_change),
+    ]
+
+
+def describe(ticker: str, changes: List[Dict[str, Any]]) -> str:
+    """The message the agent gets for a ticker's accumulated changes."""
+    lines = [f"New activity for {ticker}:"]
+    for change in changes:
+        if change["kind"] == "price":
+            lines.append(f"- Price moved {change['move']:+.2%} from {change['previous']} to {change['price']}.")
+        elif change["kind"] == "news":
+            lines.append(f"- {len(change['articles'])} new article(s):")
+            lines.extend(f"  - {a['title']} ({a['url']})" for a in change["articles"])
+        elif change["kind"] == "x":
+            lines.append(f"- {change['count']} new post(s) on X, e.g.:")
+            lines.extend(f"  - {text}" for text in change["posts"])
+    lines.append("Summarize only this new information and analyze its impact on the stock price.")
+    return "\n".join(lines)
+
+
+class AgentInvoker:
+    """
+    Runs an agent from the registry for each accepted change, at most
+    `concurrency` at a time, on a background event loop. Returns False from
+    __call__ while all slots are busy so the monitor keeps the changes.
+    """
+
+    def __init__(self, agent_name: str, concurrency: int = AGENT_CONCURRENCY):
+        self.agent_name = agent_name
+        self.concurrency = concurrency
+        self.running = 0
+        self._lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="monitor-agents", daemon=True).start()
+        self._runner = None
+
+    def _get_runner(self):
+        if self._runner is None:
+            from google.adk.runners import InMemoryRunner
+            from wowbits_runtime import registry
+
+            self._runner = InMemoryRunner(registry.load_agent(self.agent_name), app_name=self.agent_name)
+        return self._runner
+
+    @staticmethod
+    def _commit(ticker: str, changes: List[Dict[str, Any]]):
+        """Mark the articles of handled news changes as seen, so a restart does not report them again."""
+        cursor = None
+        for change in changes:
+            cursor = news_cursors.merge(cursor, change.get("cursor"))
+        if cursor is not None:
+            news_cursors.get_store().commit({ticker: cursor})
+
+    async def _run(self, ticker: str, changes: List[Dict[str, Any]]):
+        from google.genai import types
+
+        session = None
+        try:
+            runner = self._get_runner()
+            session = await runner.session_service.create_session(
+                app_name=self.agent_name, user_id="watchlist_monitor"
+            )
+            content = types.Content(role="user", parts=[types.Part(text=describe(ticker, changes))])
+            async for event in runner.run_async(
+                user_id="watchlist_monitor", session_id=session.id, new_message=content
+            ):
+                if event.is_final_response() and event.content and event.content.parts:
+                    text = "".join(p.text or "" for p in event.content.parts)
+                    logger.info(f"{self.agent_name} on {ticker}:\n{text}")
+            self._commit(ticker, changes)
+        except Exception:
+            logger.exception(f"{self.agent_name} failed on {ticker}")
+        finally:
+            # Each run gets a fresh session; drop it so a long-running monitor does not accumulate them.
+            if session is not None:
+                try:
+                    await self._runner.session_service.delete_session(
+                        app_name=self.agent_name, user_id="watchlist_monitor", session_id=session.id
+                    )
+                except Exception:
+                    logger.exception(f"Could not delete the session of {self.agent_name} on {ticker}")
+            with self._lock:
+                self.running -= 1
+
+    def __call__(self, ticker: str, changes: List[Dict[str, Any]]) -> bool:
+        with self._lock:
+            if self.running >= self.concurrency:
+                return False
+            self.running += 1
+        asyncio.run_coroutine_threadsafe(self._run(ticker, changes), self._loop)
+        return True
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run an agent on watchlist tickers whose price, news or X feed changed")
+    parser.add_argument("--watchlist", required=True, help="file with one ticker per line")
+    parser.add_argument("--agent", default="stock_news_monitor")
+    parser.add_argument("--concurrency", type=int, default=AGENT_CONCURRENCY, help="agent runs at a time")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    with open(args.watchlist) as f:
+        tickers = [line.split("#")[0].strip() for line in f]
+    clock = MonotonicClock()
+    monitor = WatchlistMonitor(
+        tickers, default_sources(), rate_limits(clock), AgentInvoker(args.agent, args.concurrency), clock
+    )
+    logger.info(f"Monitoring {len(monitor.tickers)} tickers with agent {args.agent}")
+    try:
+        monitor.run()
+    except KeyboardInterrupt:
+        pass
+    logger.info(f"Monitor stats: {monitor.stats}")
+
+
+if __name__ == "__main__":
+    main()
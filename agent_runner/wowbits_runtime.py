@@ -0,0 +1,1496 @@
+"""
+Shared runtime for the ADK agents defined in the wowbits database.
+
+Builds agent trees from the agents/skills/tools tables and serves every active
+agent from one process through `AgentRegistry`. Compiled tool code, MCP
+toolsets and model clients are cached process-wide, keyed by id, so agents that
+use the same tools share them.
+"""
+import asyncio
+import gzip
+import hashlib
+import inspect
+import json
+import marshal
+import os
+import pathlib
+import re
+import sqlite3
+import sys
+import time
+from types import SimpleNamespace
+from uuid import UUID, uuid4, uuid5
+import logging
+import threading
+import tracemalloc
+from typing import Any, AsyncGenerator, Callable, Dict, Optional
+from sqlalchemy import select, union, union_all
+from sqlalchemy.engine import make_url
+from google.adk.agents import BaseAgent, LlmAgent, SequentialAgent, ParallelAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.sessions import BaseSessionService
+from google.adk.tools import FunctionTool
+from google.adk.tools.tool_context import ToolContext
+from google.adk.models.base_llm import BaseLlm
+from pydantic import PrivateAttr
+from pylibs.database_manager import get_db_manager
+from db.schema import (
+    Agent, AgentStatus, AgentSkill, Skill, SkillSkill, SkillTool, Tool, 
+    PythonFunction, MCPConfig, ToolType, ExecMode,
+    SequentialAgentExecOrder, SequentialSkillExecOrder
+)
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Tool code stored in python_functions imports shared helpers (e.g.
+# `from helpers import http_client`) from the workspace functions/helpers package.
+FUNCTIONS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "functions"))
+if FUNCTIONS_DIR not in sys.path:
+    sys.path.insert(0, FUNCTIONS_DIR)
+
+from helpers import tool_payload, tracing
+
+# Compiled python_functions, keyed by a hash of their source. Marshalled
+# bytecode is also persisted next to wowbits.db so a cold start skips parsing;
+# set WOWBITS_BYTECODE_CACHE=0 to keep the cache in memory only.
+CODE_CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "code_cache"))
+PERSIST_BYTECODE = os.environ.get("WOWBITS_BYTECODE_CACHE", "1") != "0"
+_code_cache = {}
+_namespace_cache = {}
+
+# Process-wide objects shared by every agent built here: MCP toolsets keyed by
+# tool id (plus their connection settings) and LiteLlm clients keyed by model.
+_toolset_cache = {}
+_model_cache = {}
+_shared_lock = threading.Lock()
+
+
+def _shared_mcp_toolset(tool_ob, cfg, transport_mode):
+    """Return the MCPToolset for a tool row, creating it once per process."""
+    key = (tool_ob.id, transport_mode, cfg.url)
+    with _shared_lock:
+        toolset = _toolset_cache.get(key)
+        if toolset is None:
+            # The MCP client transports are only imported by agents that have an MCP tool.
+            from google.adk.tools.mcp_tool.mcp_toolset import (
+                MCPToolset, SseConnectionParams, StreamableHTTPConnectionParams,
+            )
+            if transport_mode == "http":
+                toolset = MCPToolset(connection_params=StreamableHTTPConnectionParams(url=cfg.url))
+            else:
+                toolset = MCPToolset(connection_params=SseConnectionParams(url=cfg.url))
+            _toolset_cache[key] = toolset
+        return toolset
+
+
+class LazyLiteLlm(BaseLlm):
+    """
+    LiteLlm that is created on the first model call.
+
+    Importing litellm takes seconds, which agents built at startup would pay
+    before serving anything (and skills in tool exec mode never need).
+    """
+
+    _client: Any = PrivateAttr(default=None)
+
+    def _lite_llm(self):
+        if self._client is None:
+            from google.adk.models.lite_llm import LiteLlm
+            with _shared_lock:
+                if self._client is None:
+                    self._client = LiteLlm(model=self.model)
+        return self._client
+
+    async def generate_content_async(self, llm_request, stream=False):
+        async for response in self._lite_llm().generate_content_async(llm_request, stream=stream):
+            yield response
+
+    def connect(self, llm_request):
+        return self._lite_llm().connect(llm_request)
+
+
+def _shared_model(model_name):
+    """Return the LiteLlm client for a model name, creating it once per process."""
+    with _shared_lock:
+        model = _model_cache.get(model_name)
+        if model is None:
+            model = LazyLiteLlm(model=model_name)
+            _model_cache[model_name] = model
+        return model
+
+
+def _compile_cached(name, code):
+    """Compile tool source once per process, reusing persisted bytecode when present."""
+    code_hash = hashlib.sha256(code.encode("utf-8")).hexdigest()
+    compiled = _code_cache.get(code_hash)
+    if compiled is not None:
+        return code_hash, compiled
+
+    path = os.path.join(CODE_CACHE_DIR, f"{code_hash}.{sys.implementation.cache_tag}.bin")
+    if PERSIST_BYTECODE and os.path.exists(path):
+        try:
+            with open(path, "rb") as f:
+                compiled = marshal.load(f)
+        except Exception:
+            logger.warning(f"Ignoring unreadable bytecode cache for tool {name}: {path}")
+            compiled = None
+
+    if compiled is None:
+        compiled = compile(code, f"<python_function:{name}>", "exec")
+        if PERSIST_BYTECODE:
+            try:
+                os.makedirs(CODE_CACHE_DIR, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    marshal.dump(compiled, f)
+                os.replace(tmp_path, path)
+            except OSError:
+                logger.warning(f"Could not persist bytecode for tool {name} to {CODE_CACHE_DIR}")
+
+    _code_cache[code_hash] = compiled
+    return code_hash, compiled
+
+
+def _exec_cached(name, code):
+    """Execute tool source once per distinct content and share the namespace across skills."""
+    code_hash, compiled = _compile_cached(name, code)
+    ns = _namespace_cache.get(code_hash)
+    if ns is None:
+        ns = {}
+        exec(compiled, ns)
+        _namespace_cache[code_hash] = ns
+    return ns
+
+
+def load_python_function(pf):
+    """Load and execute Python function code from its python_functions row."""
+    try:
+        ns = _exec_cached(pf.name, pf.code)
+    except SyntaxError as e:
+        logger.exception(f"Syntax error in tool {pf.name} at line {e.lineno}: {e.text}")
+        raise
+    fn = ns.get(pf.name)
+    # Prefer an `async def <name>_async` variant so ADK can await the tool
+    # instead of blocking the event loop; expose it under the tool's name and docs.
+    async_fn = ns.get(f"{pf.name}_async")
+    if async_fn and inspect.iscoroutinefunction(async_fn):
+        async_fn.__name__ = pf.name
+        if fn is not None and fn.__doc__:
+            async_fn.__doc__ = fn.__doc__
+        logger.info(f"Using async variant for tool {pf.name}")
+        return async_fn
+    return fn
+
+
+def _traced_tool(fn):
+    """Wrap a tool with tracing when it is on; streaming tools keep their own span from the callbacks."""
+    if not tracing.enabled() or inspect.isasyncgenfunction(fn):
+        return fn
+    return tracing.wrap_tool(fn)
+
+
+def load_tools_for_skill(graph, skill_id):
+    """Load all tools (Python functions and MCP servers) for a skill."""
+    tools = []
+    for tool_ob, pf, cfg in graph.skill_tools.get(skill_id, []):
+        if tool_ob.type == ToolType.PYTHON_FUNCTION:
+            try:
+                if not pf:
+                    logger.warning(f"Python function {tool_ob.python_function_id} not found")
+                    continue
+                fn = load_python_function(pf)
+                if fn:
+                    tools.append(_traced_tool(fn))
+            except Exception:
+                logger.exception(f"Failed loading python function tool for skill {skill_id}")
+        elif tool_ob.type == ToolType.MCP_SERVER:
+            try:
+                if not cfg:
+                    continue
+                c = cfg.config or {}
+                transport_mode = c.get("transport_mode")
+                if not transport_mode:
+                    continue
+                if transport_mode in ("http", "sse"):
+                    tools.append(_shared_mcp_toolset(tool_ob, cfg, transport_mode))
+                else:
+                    logger.warning(f"Unknown transport mode: {transport_mode}")
+                    continue
+            except Exception:
+                logger.exception(f"Failed loading MCP tool for skill {skill_id}")
+    return tools
+
+
+class AgentGraph:
+    """
+    In-memory index of everything needed to build one agent's ADK tree.
+
+    Attributes:
+        agent: The Agent row
+        skills: {skill_id: Skill} for every skill reachable from the agent
+        agent_skill_ids: Skill ids linked through agent_skills
+        agent_sequence: Skill ids from sequential_agent_exec_order, in order
+        skill_children: {parent_skill_id: [child ids]} from skill_skills
+        skill_sequence: {parent_skill_id: [child ids]} from sequential_skill_exec_order, in order
+        skill_tools: {skill_id: [(Tool, PythonFunction | None, MCPConfig | None)]}
+    """
+
+    def __init__(self, agent):
+        self.agent = agent
+        self.skills = {}
+        self.agent_skill_ids = []
+        self.agent_sequence = []
+        self.skill_children = {}
+        self.skill_sequence = {}
+        self.skill_tools = {}
+        self.signatures = {}
+
+
+def load_agent_graph(session, agent_uuid):
+    """
+    Fetch the agent, its whole skill tree and all tools in a fixed number of queries.
+
+    Reachable skills are resolved with a recursive CTE over skill_skills and
+    sequential_skill_exec_order, so the query count does not grow with the
+    depth or width of the tree.
+    """
+    agent = session.get(Agent, agent_uuid)
+    if not agent:
+        return None
+    graph = AgentGraph(agent)
+
+    graph.agent_skill_ids = [
+        skill_id for (skill_id,) in
+        session.query(AgentSkill.skill_id).filter(AgentSkill.agent_id == agent.id).all()
+    ]
+    graph.agent_sequence = [
+        skill_id for (skill_id,) in
+        session.query(SequentialAgentExecOrder.skill_id)
+        .filter(SequentialAgentExecOrder.agent_id == agent.id)
+        .order_by(SequentialAgentExecOrder.sequence_num)
+        .all()
+    ]
+
+    roots = union(
+        select(AgentSkill.skill_id.label("skill_id")).where(AgentSkill.agent_id == agent.id),
+        select(SequentialAgentExecOrder.skill_id).where(SequentialAgentExecOrder.agent_id == agent.id),
+    ).subquery()
+    edges = union_all(
+        select(SkillSkill.parent_skill_id.label("parent_id"), SkillSkill.child_skill_id.label("child_id")),
+        select(SequentialSkillExecOrder.parent_skill_id, SequentialSkillExecOrder.child_skill_id),
+    ).subquery()
+    tree = select(roots.c.skill_id).cte("skill_tree", recursive=True)
+    tree = tree.union(select(edges.c.child_id).join(tree, edges.c.parent_id == tree.c.skill_id))
+    skill_ids = select(tree.c.skill_id)
+
+    for skill in session.query(Skill).filter(Skill.id.in_(skill_ids)).all():
+        graph.skills[skill.id] = skill
+
+    for relation in session.query(SkillSkill).filter(SkillSkill.parent_skill_id.in_(skill_ids)).all():
+        graph.skill_children.setdefault(relation.parent_skill_id, []).append(relation.child_skill_id)
+
+    orders = (
+        session.query(SequentialSkillExecOrder)
+        .filter(SequentialSkillExecOrder.parent_skill_id.in_(skill_ids))
+        .order_by(SequentialSkillExecOrder.parent_skill_id, SequentialSkillExecOrder.sequence_num)
+        .all()
+    )
+    for order in orders:
+        graph.skill_sequence.setdefault(order.parent_skill_id, []).append(order.child_skill_id)
+
+    tool_rows = (
+        session.query(SkillTool.skill_id, Tool, PythonFunction, MCPConfig)
+        .join(Tool, Tool.id == SkillTool.tool_id)
+        .outerjoin(PythonFunction, PythonFunction.id == Tool.python_function_id)
+        .outerjoin(MCPConfig, MCPConfig.id == Tool.mcp_config_id)
+        .filter(SkillTool.skill_id.in_(skill_ids))
+        .all()
+    )
+    for skill_id, tool_ob, pf, cfg in tool_rows:
+        graph.skill_tools.setdefault(skill_id, []).append((tool_ob, pf, cfg))
+
+    return graph
+
+
+# Resolved agent graphs are snapshotted next to wowbits.db so a worker restart
+# can build the ADK tree without opening a DB session. Set
+# WOWBITS_AGENT_SNAPSHOT=0 to always build from the DB.
+SNAPSHOT_VERSION = 1
+SNAPSHOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "agent_snapshots"))
+USE_SNAPSHOT = os.environ.get("WOWBITS_AGENT_SNAPSHOT", "1") != "0"
+# Without a local SQLite file to fingerprint, snapshots are trusted for this long.
+SNAPSHOT_MAX_AGE = float(os.environ.get("WOWBITS_SNAPSHOT_MAX_AGE", "3600"))
+
+_AGENT_FIELDS = (
+    "id", "name", "description", "instructions", "default_model", "default_model_config",
+    "temperature", "max_output_tokens", "safety_settings", "exec_mode", "output_key",
+)
+
+
+def _snapshot_path(agent_uuid):
+    return os.path.join(SNAPSHOT_DIR, f"{agent_uuid}.json.gz")
+
+
+# Tables the agent graph is built from. Chat history and the other tables
+# written while serving are left out, so writing them keeps snapshots valid.
+_CONFIG_TABLES = (
+    "agents", "agent_skills", "skills", "skill_skills", "skill_tools", "tools",
+    "python_functions", "mcp_configs", "sequential_skill_exec_order", "sequential_agent_exec_order",
+)
+
+
+def _db_fingerprint():
+    """
+    Identify the agent configuration in the DB without loading the graph.
+
+    The config tables carry no updated_at columns, so for a SQLite database
+    their rows are hashed over a plain read-only sqlite3 connection, about a
+    millisecond with all tool source included. Returns None for other
+    backends.
+    """
+    url = os.environ.get("WOWBITS_DB_CONNECTION_STRING")
+    if not url:
+        return None
+    try:
+        parsed = make_url(url)
+    except Exception:
+        return None
+    if parsed.get_backend_name() != "sqlite" or not parsed.database or parsed.database == ":memory:":
+        return None
+    path = os.path.abspath(parsed.database)
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    try:
+        conn = sqlite3.connect(f"{pathlib.Path(path).as_uri()}?mode=ro", uri=True, timeout=10)
+        try:
+            for table in _CONFIG_TABLES:
+                digest.update(table.encode("utf-8"))
+                for row in conn.execute(f"SELECT * FROM {table} ORDER BY rowid"):
+                    digest.update(repr(row).encode("utf-8"))
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+    return f"sqlite:{path}:{digest.hexdigest()}"
+
+
+def _record_to_json(obj, fields):
+    out = {}
+    for field in fields:
+        value = getattr(obj, field, None)
+        if isinstance(value, UUID):
+            value = str(value)
+        elif isinstance(value, (ExecMode, ToolType)):
+            value = value.value
+        out[field] = value
+    return out
+
+
+def graph_to_snapshot(graph, db_fingerprint=None):
+    """
+    Serialize an AgentGraph into a JSON-compatible, versioned snapshot dict.
+
+    Tool source is stored once per code hash. Pass the DB fingerprint taken
+    before the graph was loaded so a concurrent edit marks the snapshot stale.
+    """
+    code = {}
+    tools = {}
+    for skill_id, entries in graph.skill_tools.items():
+        tools[str(skill_id)] = []
+        for tool_ob, pf, cfg in entries:
+            entry = _record_to_json(tool_ob, ("id", "name", "type", "python_function_id", "mcp_config_id"))
+            if pf is not None:
+                code_hash = hashlib.sha256((pf.code or "").encode("utf-8")).hexdigest()
+                code[code_hash] = pf.code
+                entry["python_function"] = {"id": str(pf.id), "name": pf.name, "code_hash": code_hash}
+            if cfg is not None:
+                entry["mcp_config"] = {"id": str(cfg.id), "url": cfg.url, "config": cfg.config}
+            tools[str(skill_id)].append(entry)
+
+    body = {
+        "agent": _record_to_json(graph.agent, _AGENT_FIELDS),
+        "skills": [_record_to_json(skill, _AGENT_FIELDS) for skill in graph.skills.values()],
+        "agent_skill_ids": [str(i) for i in graph.agent_skill_ids],
+        "agent_sequence": [str(i) for i in graph.agent_sequence],
+        "skill_children": {str(k): [str(i) for i in v] for k, v in graph.skill_children.items()},
+        "skill_sequence": {str(k): [str(i) for i in v] for k, v in graph.skill_sequence.items()},
+        "skill_tools": tools,
+        "code": code,
+    }
+    graph_hash = hashlib.sha256(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest()
+    return {
+        "version": SNAPSHOT_VERSION,
+        "created_at": time.time(),
+        "db_fingerprint": db_fingerprint,
+        "graph_hash": graph_hash,
+        "graph": body,
+    }
+
+
+def snapshot_to_graph(snapshot):
+    """Rebuild an AgentGraph from a snapshot dict; rows become SimpleNamespace records."""
+    body = snapshot["graph"]
+
+    def record(data):
+        data = dict(data)
+        data["id"] = UUID(data["id"])
+        data["exec_mode"] = ExecMode(data["exec_mode"]) if data.get("exec_mode") else ExecMode.LLM
+        return SimpleNamespace(**data)
+
+    graph = AgentGraph(record(body["agent"]))
+    for skill_data in body["skills"]:
+        skill = record(skill_data)
+        graph.skills[skill.id] = skill
+    graph.agent_skill_ids = [UUID(i) for i in body["agent_skill_ids"]]
+    graph.agent_sequence = [UUID(i) for i in body["agent_sequence"]]
+    graph.skill_children = {UUID(k): [UUID(i) for i in v] for k, v in body["skill_children"].items()}
+    graph.skill_sequence = {UUID(k): [UUID(i) for i in v] for k, v in body["skill_sequence"].items()}
+    for skill_id, entries in body["skill_tools"].items():
+        rows = []
+        for entry in entries:
+            tool_ob = SimpleNamespace(
+                id=UUID(entry["id"]), name=entry["name"], type=ToolType(entry["type"]),
+                python_function_id=entry["python_function_id"], mcp_config_id=entry["mcp_config_id"],
+            )
+            pf = None
+            if "python_function" in entry:
+                pf_data = entry["python_function"]
+                pf = SimpleNamespace(id=UUID(pf_data["id"]), name=pf_data["name"],
+                                     code=body["code"][pf_data["code_hash"]])
+            cfg = SimpleNamespace(**entry["mcp_config"]) if "mcp_config" in entry else None
+            rows.append((tool_ob, pf, cfg))
+        graph.skill_tools[UUID(skill_id)] = rows
+    return graph
+
+
+def export_snapshot(graph, path=None, db_fingerprint=None):
+    """Write the snapshot for an AgentGraph atomically and return its path."""
+    path = path or _snapshot_path(graph.agent.id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(graph_to_snapshot(graph, db_fingerprint), f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_snapshot(agent_uuid, path=None):
+    """
+    Return the AgentGraph stored in the agent's snapshot, or None when the
+    snapshot is missing, of another version, or stale.
+    """
+    path = path or _snapshot_path(agent_uuid)
+    if not os.path.exists(path):
+        return None
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except Exception:
+        logger.warning(f"Ignoring unreadable agent snapshot: {path}")
+        return None
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        logger.info(f"Agent snapshot version {snapshot.get('version')} != {SNAPSHOT_VERSION}, rebuilding from DB")
+        return None
+    fingerprint = _db_fingerprint()
+    if fingerprint is not None:
+        if snapshot.get("db_fingerprint") != fingerprint:
+            logger.info("Agent snapshot is stale (database changed), rebuilding from DB")
+            return None
+    elif time.time() - snapshot.get("created_at", 0) > SNAPSHOT_MAX_AGE:
+        logger.info("Agent snapshot is older than WOWBITS_SNAPSHOT_MAX_AGE, rebuilding from DB")
+        return None
+    return snapshot_to_graph(snapshot)
+
+
+def _skill_signature(graph, skill_id, _visiting=None):
+    """
+    Content hash of a skill's whole subtree: its own row, its tools (including
+    tool source) and, recursively, its children. Unchanged signature means the
+    previously built ADK agent for that skill can be reused as is.
+    """
+    if skill_id in graph.signatures:
+        return graph.signatures[skill_id]
+    _visiting = _visiting or set()
+    if skill_id in _visiting:
+        return "cycle"
+    _visiting.add(skill_id)
+    skill = graph.skills.get(skill_id)
+    if skill is None:
+        return "missing"
+    tools = []
+    for tool_ob, pf, cfg in graph.skill_tools.get(skill_id, []):
+        tools.append([
+            _record_to_json(tool_ob, ("id", "name", "type")),
+            hashlib.sha256((pf.code or "").encode("utf-8")).hexdigest() if pf is not None else None,
+            [cfg.url, cfg.config] if cfg is not None else None,
+        ])
+    if skill.exec_mode == ExecMode.SEQUENTIAL:
+        child_ids = graph.skill_sequence.get(skill_id, [])
+    else:
+        child_ids = graph.skill_children.get(skill_id, [])
+    payload = {
+        "skill": _record_to_json(skill, _AGENT_FIELDS),
+        "tools": sorted(tools, key=lambda t: str(t[0]["id"])),
+        "children": [_skill_signature(graph, child_id, _visiting) for child_id in child_ids],
+    }
+    _visiting.discard(skill_id)
+    signature = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    graph.signatures[skill_id] = signature
+    return signature
+
+
+def _build_safety_settings(raw):
+    """Convert stored JSON into google.genai.types.SafetySetting objects."""
+    if not raw:
+        return []
+    out = []
+    for item in raw:
+        try:
+            cat = item.get("category")
+            thr = item.get("threshold")
+            category_enum = (
+                getattr(types.HarmCategory, cat)
+                if isinstance(cat, str) and hasattr(types.HarmCategory, cat)
+                else None
+            )
+            threshold_enum = (
+                getattr(types.HarmBlockThreshold, thr)
+                if isinstance(thr, str) and hasattr(types.HarmBlockThreshold, thr)
+                else None
+            )
+            if category_enum and threshold_enum:
+                out.append(
+                    types.SafetySetting(category=category_enum, threshold=threshold_enum)
+                )
+        except Exception:
+            continue
+    return out
+
+
+def _build_generate_content_config(obj):
+    """Build GenerateContentConfig from agent/skill configuration."""
+    conf_json = (
+        (obj.default_model_config or {}) if hasattr(obj, "default_model_config") else {}
+    )
+    temp = (
+        obj.temperature
+        if getattr(obj, "temperature", None) is not None
+        else conf_json.get("temperature", 0.2)
+    )
+    max_tokens = (
+        obj.max_output_tokens
+        if getattr(obj, "max_output_tokens", None)
+        else conf_json.get("max_output_tokens", 32000)
+    )
+    raw_safety = (
+        obj.safety_settings
+        if getattr(obj, "safety_settings", None)
+        else conf_json.get("safety_settings", [])
+    )
+    safety_objects = _build_safety_settings(raw_safety)
+    return types.GenerateContentConfig(
+        temperature=temp,
+        max_output_tokens=max_tokens,
+        safety_settings=safety_objects
+    )
+
+
+def _tool_payload_callback(obj):
+    """
+    after_tool_callback trimming every tool result with tool_payload before the
+    model sees it; `tool_payloads` in the skill's config overrides the limits per tool.
+    """
+    conf_json = (
+        (obj.default_model_config or {}) if hasattr(obj, "default_model_config") else {}
+    )
+    overrides = conf_json.get("tool_payloads")
+
+    def after_tool(tool, args, tool_context, tool_response):
+        shaped = tool_payload.shape(tool.name, tool_response, overrides)
+        # None keeps ADK's response as is.
+        return shaped if shaped is not tool_response else None
+
+    return after_tool
+
+
+def _tracing_callbacks(llm=True):
+    """
+    Callbacks recording agent, model and tool spans (see tracing.py) for an
+    agent's kwargs; empty when TRACE_EXPORTER is off.
+    """
+    if not tracing.enabled():
+        return {}
+    tracer = tracing.get_tracer()
+    callbacks = {
+        "before_agent_callback": tracer.before_agent,
+        "after_agent_callback": tracer.after_agent,
+    }
+    if llm:
+        callbacks.update({
+            "before_model_callback": tracer.before_model,
+            "after_model_callback": tracer.after_model,
+            "before_tool_callback": tracer.before_tool,
+            "after_tool_callback": tracer.after_tool,
+        })
+    return callbacks
+
+
+def _after_tool_callback(obj):
+    """Trim tool results (_tool_payload_callback) and, when tracing, record their size before and after."""
+    trim = _tool_payload_callback(obj)
+    if not tracing.enabled():
+        return trim
+    tracer = tracing.get_tracer()
+
+    def after_tool(tool, args, tool_context, tool_response):
+        shaped = trim(tool, args, tool_context, tool_response)
+        tracer.after_tool(tool, args, tool_context, tool_response, shaped)
+        return shaped
+
+    return after_tool
+
+
+# Skills with `exec_mode: tool` in their config (default_model_config) call
+# their tool directly; see ToolSkillAgent.
+TOOL_EXEC_MODE = "tool"
+_TICKER = re.compile(r"(?<![\w$/&])\$?([A-Z]{1,5}(?:\.[A-Z]{1,2})?)(?![\w/&]|\.\w)")
+# Upper-case words in a request that are not tickers.
+_NOT_TICKERS = {
+    "A", "I", "AN", "AND", "ARE", "AT", "BE", "BY", "FOR", "IF", "IN", "IS", "IT", "OF", "ON", "OR", "THE",
+    "TO", "VS", "WHAT", "AI", "API", "CEO", "CFO", "EPS", "ETF", "EU", "FMP", "GDP", "IPO", "NYSE", "OK",
+    "PE", "Q1", "Q2", "Q3", "Q4", "SEC", "TTM", "UK", "US", "USA", "USD", "YOY",
+}
+
+
+def extract_tickers(text):
+    """
+    Stock symbols mentioned in a request: $-prefixed ones if there are any,
+    else upper-case words of up to five letters that are not common acronyms.
+    """
+    found = []
+    for match in _TICKER.finditer(text or ""):
+        symbol = match.group(1)
+        if match.group(0).startswith("$") or symbol not in _NOT_TICKERS:
+            found.append((match.group(0).startswith("$"), symbol))
+    if any(dollar for dollar, _ in found):
+        found = [item for item in found if item[0]]
+    return list(dict.fromkeys(symbol for _, symbol in found))
+
+
+def _latest_user_text(ctx):
+    for event in reversed(ctx.session.events):
+        if event.author == "user" and event.content and event.content.parts:
+            text = "".join(part.text or "" for part in event.content.parts)
+            if text:
+                return text
+    return ""
+
+
+def _tool_arguments(tool, text, fixed):
+    """
+    Arguments for a direct tool call: `fixed` from the skill config, the
+    symbols mentioned in `text` for symbol/ticker parameters, defaults for
+    the rest. None when a required argument cannot be filled.
+    """
+    args = dict(fixed or {})
+    tickers = None
+    for name, param in inspect.signature(tool.func).parameters.items():
+        if name in args or name == "tool_context":
+            continue
+        if name in ("symbol", "ticker", "symbols", "tickers"):
+            tickers = extract_tickers(text) if tickers is None else tickers
+            if tickers:
+                args[name] = tickers[0] if name in ("symbol", "ticker") else tickers
+                continue
+        if param.default is inspect.Parameter.empty:
+            return None
+    return args
+
+
+class ToolSkillAgent(BaseAgent):
+    """
+    A skill that calls its one tool directly instead of asking a model to.
+
+    Skills whose only instruction is "call tool X with the symbol" cost a model
+    round-trip to decide the call and another to phrase the result. This agent
+    fills the tool's arguments from the request (symbols mentioned in the
+    latest user message plus `tool_args` from the skill config), runs the
+    tool with the same before/after tool callbacks an LlmAgent would and
+    answers with the result as JSON. When the arguments cannot be filled it
+    hands the turn to `sub_agents[0]`, the skill built as an LlmAgent.
+    """
+
+    tool: Any
+    tool_args: Dict[str, Any] = {}
+    output_key: Optional[str] = None
+    before_tool_callback: Optional[Callable] = None
+    after_tool_callback: Optional[Callable] = None
+
+    async def _call(self, callback, **kwargs):
+        if callback is None:
+            return None
+        result = callback(**kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    async def _run_tool(self, args, tool_context):
+        response = await self._call(self.before_tool_callback, tool=self.tool, args=args, tool_context=tool_context)
+        if response is None:
+            response = await self.tool.run_async(args=args, tool_context=tool_context)
+        altered = await self._call(self.after_tool_callback, tool=self.tool, args=args,
+                                   tool_context=tool_context, tool_response=response)
+        return response if altered is None else altered
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        args = _tool_arguments(self.tool, _latest_user_text(ctx), self.tool_args)
+        if args is None:
+            logger.info(f"Skill {self.name}: no arguments for {self.tool.name} in the request, using the model")
+            async for event in self.sub_agents[0].run_async(ctx):
+                yield event
+            return
+
+        tool_context = ToolContext(ctx, function_call_id=f"direct-{uuid4().hex}")
+        # In a task of its own, as ADK runs function calls, so context set by the callbacks stays there.
+        response = await asyncio.create_task(self._run_tool(args, tool_context))
+        text = response if isinstance(response, str) else json.dumps(response, default=str)
+        actions = tool_context.actions or EventActions()
+        if self.output_key:
+            actions.state_delta[self.output_key] = text
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=text)]),
+            actions=actions,
+        )
+
+    async def _run_live_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        async for event in self._run_async_impl(ctx):
+            yield event
+
+
+def _direct_tool(skill, tools):
+    """The FunctionTool a skill with `exec_mode: tool` calls, or None to build it as an LlmAgent."""
+    conf_json = (skill.default_model_config or {}) if hasattr(skill, "default_model_config") else {}
+    if conf_json.get("exec_mode") != TOOL_EXEC_MODE:
+        return None
+    functions = [t for t in tools if callable(t)]
+    name = conf_json.get("tool")
+    if name:
+        functions = [t for t in functions if t.__name__ == name]
+    if len(functions) != 1 or (not name and len(tools) != 1):
+        logger.warning(f"Skill {skill.name} has exec_mode tool but no single Python tool"
+                       f"{f' named {name}' if name else ''}; building it as an LLM skill")
+        return None
+    return FunctionTool(functions[0])
+
+
+def build_skill_agent(graph, skill, skill_cache, visiting_set, reuse=None):
+    """
+    Recursively build a skill agent based on its exec_mode.
+    Returns an LlmAgent, SequentialAgent, or ParallelAgent.
+
+    `reuse` maps skill id -> (subtree signature, agent) from a previous build;
+    skills whose subtree is unchanged are cloned from it instead of rebuilt,
+    and every skill built here is recorded in it.
+    """
+    if skill.id in skill_cache:
+        logger.info(f"Reusing cached skill: {skill.name}")
+        return skill_cache[skill.id]
+
+    if reuse is not None:
+        signature = _skill_signature(graph, skill.id)
+        previous = reuse.get(skill.id)
+        if previous and previous[0] == signature:
+            # ADK allows a single parent, and the previous tree may still be
+            # serving in-flight invocations. clone() copies the agent objects
+            # (sub-agents included) and shares their tools, model and config,
+            # so nothing is exec'd again and the previous tree is untouched.
+            agent = previous[1].clone()
+            skill_cache[skill.id] = agent
+            logger.info(f"Reusing unchanged skill from previous build: {skill.name}")
+            return agent
+    
+    if skill.id in visiting_set:
+        cycle_path = " -> ".join([str(sid) for sid in visiting_set]) + f" -> {skill.id}"
+        error_msg = f"Cycle detected in skill hierarchy: {cycle_path}"
+        logger.error(error_msg)
+        raise RuntimeError(error_msg)
+    
+    visiting_set.add(skill.id)
+    logger.info(f"Building skill: {skill.name} (exec_mode={skill.exec_mode.value})")
+    
+    try:
+        tools = load_tools_for_skill(graph, skill.id)
+        child_skills = []
+        
+        if skill.exec_mode == ExecMode.SEQUENTIAL:
+            child_ids = graph.skill_sequence.get(skill.id, [])
+        else:
+            child_ids = graph.skill_children.get(skill.id, [])
+        for child_id in child_ids:
+            child_skill = graph.skills.get(child_id)
+            if child_skill:
+                child_agent = build_skill_agent(graph, child_skill, skill_cache, visiting_set, reuse)
+                child_skills.append(child_agent)
+        
+        if skill.exec_mode == ExecMode.SEQUENTIAL and child_skills:
+            agent = SequentialAgent(
+                name=skill.name,
+                sub_agents=child_skills,
+                description=skill.description or "",
+                **_tracing_callbacks(llm=False),
+            )
+        elif skill.exec_mode == ExecMode.PARALLEL and child_skills:
+            agent = ParallelAgent(
+                name=skill.name,
+                sub_agents=child_skills,
+                description=skill.description or "",
+                **_tracing_callbacks(llm=False),
+            )
+        else:
+            llm_kwargs = {
+                "name": skill.name,
+                "model": _shared_model(skill.default_model),
+                "description": skill.description or "",
+                "instruction": skill.instructions or "",
+                "tools": tools,
+                "generate_content_config": _build_generate_content_config(skill),
+                **_tracing_callbacks(),
+                "after_tool_callback": _after_tool_callback(skill),
+            }
+            if child_skills:
+                llm_kwargs["sub_agents"] = child_skills
+            if skill.output_key:
+                llm_kwargs["output_key"] = skill.output_key
+            direct_tool = None if child_skills else _direct_tool(skill, tools)
+            if direct_tool is not None:
+                conf_json = skill.default_model_config or {}
+                agent = ToolSkillAgent(
+                    name=skill.name,
+                    description=skill.description or "",
+                    tool=direct_tool,
+                    tool_args=conf_json.get("tool_args") or {},
+                    output_key=skill.output_key,
+                    before_tool_callback=llm_kwargs.get("before_tool_callback"),
+                    after_tool_callback=llm_kwargs["after_tool_callback"],
+                    sub_agents=[LlmAgent(**dict(llm_kwargs, name=f"{skill.name}_llm"))],
+                    **_tracing_callbacks(llm=False),
+                )
+            else:
+                agent = LlmAgent(**llm_kwargs)
+        
+        skill_cache[skill.id] = agent
+        if reuse is not None:
+            reuse[skill.id] = (_skill_signature(graph, skill.id), agent)
+        logger.info(f"Built skill agent: {skill.name} (type={type(agent).__name__})")
+        return agent
+    
+    finally:
+        visiting_set.discard(skill.id)
+
+
+def build_agent_from_graph(graph, reuse=None):
+    """
+    Build the hierarchical ADK agent for an AgentGraph loaded from the DB or a snapshot.
+
+    See build_skill_agent for `reuse`.
+    """
+    agent = graph.agent
+    logger.info(f"Creating agent: {agent.name} (exec_mode={agent.exec_mode.value})")
+    
+    skill_cache = {}
+    visiting_set = set()
+    child_agents = []
+    
+    if agent.exec_mode == ExecMode.SEQUENTIAL:
+        skill_ids = graph.agent_sequence
+    else:
+        skill_ids = graph.agent_skill_ids
+    for skill_id in skill_ids:
+        skill = graph.skills.get(skill_id)
+        if skill:
+            skill_agent = build_skill_agent(graph, skill, skill_cache, visiting_set, reuse)
+            child_agents.append(skill_agent)
+
+    if agent.exec_mode == ExecMode.SEQUENTIAL:
+        root = SequentialAgent(
+            name=agent.name,
+            sub_agents=child_agents,
+            description=agent.description or "",
+            **_tracing_callbacks(llm=False),
+        )
+    elif agent.exec_mode == ExecMode.PARALLEL:
+        root = ParallelAgent(
+            name=agent.name,
+            sub_agents=child_agents,
+            description=agent.description or "",
+            **_tracing_callbacks(llm=False),
+        )
+    else:
+        llm_kwargs = {
+            "name": agent.name,
+            "model": _shared_model(agent.default_model),
+            "description": agent.description or "",
+            "instruction": agent.instructions or "",
+            "generate_content_config": _build_generate_content_config(agent),
+            **_tracing_callbacks(),
+        }
+        if child_agents:
+            llm_kwargs["sub_agents"] = child_agents
+        if agent.output_key:
+            llm_kwargs["output_key"] = agent.output_key
+        root = LlmAgent(**llm_kwargs)
+    
+    logger.info(f"Successfully created root agent: {agent.name} (type={type(root).__name__})")
+    logger.info(f"Total unique skills in hierarchy: {len(skill_cache)}")
+    return root
+
+
+def _load_graph_from_db(agent_uuid):
+    fingerprint = _db_fingerprint()
+    session = get_db_manager().get_session()
+    try:
+        graph = load_agent_graph(session, agent_uuid)
+    finally:
+        session.close()
+    if not graph:
+        raise RuntimeError(f"Agent not found: {agent_uuid}")
+    if USE_SNAPSHOT:
+        try:
+            path = export_snapshot(graph, db_fingerprint=fingerprint)
+            logger.info(f"Wrote agent snapshot: {path}")
+        except OSError:
+            logger.warning(f"Could not write agent snapshot to {SNAPSHOT_DIR}")
+    return graph
+
+
+def _resolve_graph(agent_uuid):
+    """Return (graph, source): the fresh snapshot if there is one, else the database."""
+    graph = load_snapshot(agent_uuid) if USE_SNAPSHOT else None
+    if graph is not None:
+        return graph, "snapshot"
+    return _load_graph_from_db(agent_uuid), "database"
+
+
+def create_agent(agent_uuid, reuse=None):
+    """
+    Create hierarchical agent with support for sequential/parallel execution.
+
+    Starts from the agent-graph snapshot when it is fresh; otherwise loads the
+    graph from the database and refreshes the snapshot.
+    """
+    start = time.perf_counter()
+    try:
+        graph, source = _resolve_graph(agent_uuid)
+        root = build_agent_from_graph(graph, reuse)
+        logger.info(f"Agent build time ({source}): {time.perf_counter() - start:.3f}s")
+        return root
+    
+    except RuntimeError as e:
+        logger.error(f"Failed to create agent due to cycle: {e}")
+        raise
+    except Exception as e:
+        logger.exception(f"Error creating agent: {e}")
+        raise
+
+
+class HotSwapAgent(BaseAgent):
+    """
+    Stable root handed to ADK that delegates each invocation to the current
+    agent tree. `swap` replaces the tree atomically: invocations already
+    running keep the tree they started on, new ones get the new tree.
+
+    ADK only resumes a session at a sub-agent when all of its ancestors are
+    LlmAgents, so with this wrapper every user turn enters at the root.
+    """
+
+    def swap(self, new_root):
+        old_root = self.sub_agents[0] if self.sub_agents else None
+        new_root.parent_agent = self
+        # A single list assignment is atomic; readers see the old or the new tree.
+        self.sub_agents = [new_root]
+        if old_root is not None and old_root is not new_root:
+            # Detach so in-flight invocations resolve agent names in their own tree.
+            old_root.parent_agent = None
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        current = self.sub_agents[0]
+        async for event in current.run_async(ctx):
+            yield event
+
+    async def _run_live_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        current = self.sub_agents[0]
+        async for event in current.run_live(ctx):
+            yield event
+
+
+class AgentReloader:
+    """
+    Polls the database for changes to the agent graph (agents, skills,
+    skill_tools, tools, python_functions) and hot swaps a rebuilt tree into a
+    HotSwapAgent. Only skills whose subtree changed are rebuilt.
+
+    The config tables carry no updated_at columns, so changes are detected by
+    hashing the bulk-loaded graph; for SQLite the config table fingerprint
+    lets an idle poll skip loading the graph entirely.
+    """
+
+    def __init__(self, agent_uuid, interval):
+        self.agent_uuid = agent_uuid
+        self.interval = interval
+        self.built_skills = {}
+        self.fingerprint = _db_fingerprint()
+        graph, source = _resolve_graph(agent_uuid)
+        self.graph_hash = graph_to_snapshot(graph)["graph_hash"]
+        self.graph = graph
+        start = time.perf_counter()
+        root = build_agent_from_graph(graph, self.built_skills)
+        logger.info(f"Agent build time ({source}): {time.perf_counter() - start:.3f}s")
+        self.root = HotSwapAgent(name=root.name, description=root.description, sub_agents=[root])
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self):
+        """Rebuild and swap if the agent graph changed. Returns True when a swap happened."""
+        fingerprint = _db_fingerprint()
+        if fingerprint is not None and fingerprint == self.fingerprint:
+            return False
+        session = get_db_manager().get_session()
+        try:
+            graph = load_agent_graph(session, self.agent_uuid)
+        finally:
+            session.close()
+        if not graph:
+            logger.warning(f"Agent {self.agent_uuid} no longer exists, keeping current tree")
+            return False
+        self.fingerprint = fingerprint
+        graph_hash = graph_to_snapshot(graph)["graph_hash"]
+        if graph_hash == self.graph_hash:
+            return False
+
+        changed = [
+            skill.name for skill_id, skill in graph.skills.items()
+            if _skill_signature(graph, skill_id) != _skill_signature(self.graph, skill_id)
+        ]
+        start = time.perf_counter()
+        for stale_id in set(self.built_skills) - set(graph.skills):
+            del self.built_skills[stale_id]
+        new_root = build_agent_from_graph(graph, self.built_skills)
+        self.root.swap(new_root)
+        self.graph, self.graph_hash = graph, graph_hash
+        logger.info(
+            f"Hot reloaded agent {new_root.name} in {time.perf_counter() - start:.3f}s; "
+            f"changed skills: {', '.join(changed) or 'agent only'}"
+        )
+        if USE_SNAPSHOT:
+            try:
+                export_snapshot(graph, db_fingerprint=fingerprint)
+            except OSError:
+                logger.warning(f"Could not write agent snapshot to {SNAPSHOT_DIR}")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Hot reload check failed, keeping current agent tree")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="agent-reloader", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+# Poll for agent definition changes every N seconds and hot swap the tree.
+# Disabled (0) by default; agents are then plain agent trees.
+HOT_RELOAD_INTERVAL = float(os.environ.get("WOWBITS_HOT_RELOAD_INTERVAL", "0"))
+# Trace allocations while an agent is built for an exact per-agent footprint.
+# Off by default: tracemalloc slows the build several times over; the RSS
+# delta is always reported.
+TRACK_AGENT_MEMORY = os.environ.get("WOWBITS_TRACK_AGENT_MEMORY", "0") == "1"
+
+
+def _process_rss_bytes():
+    """Current resident set size of this process, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _count_agents(node):
+    return 1 + sum(_count_agents(child) for child in node.sub_agents)
+
+
+class AgentRegistry:
+    """
+    Serves every active agent in the agents table from one process.
+
+    Implements ADK's agent loader interface (list_agents / load_agent)
+    without importing google.adk.cli, which is slow to import.
+
+    Agents are built on first request and then cached. They share the
+    process-wide caches for tool code, MCP toolsets and model clients. An ADK
+    agent can have only one parent, so a skill used by several agents is built
+    once and every later agent gets a clone of it (see build_skill_agent): the
+    agent objects are per tree, their tools, model and config are shared. With
+    WOWBITS_HOT_RELOAD_INTERVAL set, each agent gets its own AgentReloader.
+    """
+
+    def __init__(self, hot_reload_interval=HOT_RELOAD_INTERVAL, track_memory=TRACK_AGENT_MEMORY):
+        self.hot_reload_interval = hot_reload_interval
+        self.track_memory = track_memory
+        self._roots = {}
+        self._reloaders = {}
+        self._stats = {}
+        self._names = {}
+        self._build_locks = {}
+        self._built_skills = {}
+        self._lock = threading.Lock()
+
+    def _active_agents(self):
+        """Return {name: id} for the agents that should be served."""
+        session = get_db_manager().get_session()
+        try:
+            rows = session.execute(
+                select(Agent.name, Agent.id).where(
+                    (Agent.status == AgentStatus.ACTIVE) | Agent.status.is_(None)
+                )
+            ).all()
+        finally:
+            session.close()
+        names = {name: agent_uuid for name, agent_uuid in rows}
+        with self._lock:
+            self._names = names
+        return names
+
+    def list_agents(self):
+        """Names of all active agents, sorted alphabetically."""
+        return sorted(self._active_agents())
+
+    def agent_id(self, agent_name):
+        """The id of the active agent named `agent_name`, or None."""
+        return self._names.get(agent_name) or self._active_agents().get(agent_name)
+
+    def load_agent(self, agent_name):
+        """Return the root agent for `agent_name`, building it on first use."""
+        agent_uuid = self.agent_id(agent_name)
+        if agent_uuid is None:
+            raise ValueError(f"No active agent named {agent_name!r}")
+        return self.load_agent_by_id(agent_uuid)
+
+    def load_agent_by_id(self, agent_id):
+        """Return the root agent for an agent id (str or UUID), building it on first use."""
+        agent_uuid = agent_id if isinstance(agent_id, UUID) else UUID(str(agent_id))
+        root = self._roots.get(agent_uuid)
+        if root is not None:
+            return root
+        with self._lock:
+            build_lock = self._build_locks.setdefault(agent_uuid, threading.Lock())
+        with build_lock:
+            root = self._roots.get(agent_uuid)
+            if root is None:
+                root = self._build(agent_uuid)
+                self._roots[agent_uuid] = root
+        return root
+
+    def _build(self, agent_uuid):
+        start_tracing = self.track_memory and not tracemalloc.is_tracing()
+        if start_tracing:
+            tracemalloc.start()
+        traced_before = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        rss_before = _process_rss_bytes()
+        shared_before = (len(_namespace_cache), len(_toolset_cache), len(_model_cache))
+        start = time.perf_counter()
+        try:
+            if self.hot_reload_interval > 0:
+                reloader = AgentReloader(agent_uuid, self.hot_reload_interval).start()
+                self._reloaders[agent_uuid] = reloader
+                root = reloader.root
+            else:
+                root = create_agent(agent_uuid, self._built_skills)
+            elapsed = time.perf_counter() - start
+            retained = (
+                tracemalloc.get_traced_memory()[0] - traced_before
+                if traced_before is not None else None
+            )
+        finally:
+            if start_tracing:
+                tracemalloc.stop()
+
+        rss_after = _process_rss_bytes()
+        shared_after = (len(_namespace_cache), len(_toolset_cache), len(_model_cache))
+        self._stats[agent_uuid] = {
+            "name": root.name,
+            "build_seconds": round(elapsed, 4),
+            "rss_delta_bytes": rss_after - rss_before if rss_before is not None else None,
+            "retained_bytes": retained,
+            "agents_in_tree": _count_agents(root),
+            "new_tool_modules": shared_after[0] - shared_before[0],
+            "new_mcp_toolsets": shared_after[1] - shared_before[1],
+            "new_models": shared_after[2] - shared_before[2],
+        }
+        memory_text = ""
+        if retained is not None:
+            memory_text = f", retained {retained / 1024:.1f} KiB"
+        elif rss_before is not None:
+            memory_text = f", RSS +{(rss_after - rss_before) / 1024:.1f} KiB"
+        logger.info(f"Loaded agent {root.name} in {elapsed:.3f}s{memory_text}")
+        return root
+
+    def memory_report(self):
+        """
+        Per-agent build statistics plus process-wide totals.
+
+        `rss_delta_bytes` is how much the process grew while the agent was
+        built. `retained_bytes` (WOWBITS_TRACK_AGENT_MEMORY=1) is what the build
+        left allocated, per tracemalloc. Neither counts objects already shared
+        with an agent built earlier. Both include allocations from other threads
+        during the build, so treat them as estimates.
+        """
+        return {
+            "process_rss_bytes": _process_rss_bytes(),
+            "shared": {
+                "tool_modules": len(_namespace_cache),
+                "mcp_toolsets": len(_toolset_cache),
+                "models": len(_model_cache),
+            },
+            "agents": {stats["name"]: dict(stats) for stats in self._stats.values()},
+        }
+
+    def stop(self):
+        """Stop the hot reload threads of all loaded agents."""
+        for reloader in self._reloaders.values():
+            reloader.stop()
+
+
+# Process-wide registry; agent_runner/<agent>/__init__.py packages load from
+# it so several agents served by one `adk web` process share its caches.
+registry = AgentRegistry()
+
+# agent_runner/<agent>/__init__.py written by `link`. `wowbits run agent`
+# rewrites agent.py from the CLI template on every run, but ADK's loader
+# imports the package first and takes root_agent from it.
+PACKAGE_INIT_TEMPLATE = '''"""
+Serves the {agent_name} agent through wowbits_runtime.
+
+Written by `python agent_runner/wowbits_runtime.py link {agent_name}`. ADK
+imports this package before agent.py, which the wowbits CLI regenerates.
+"""
+import os
+import sys
+
+AGENT_RUNNER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if AGENT_RUNNER_DIR not in sys.path:
+    sys.path.insert(0, AGENT_RUNNER_DIR)
+
+from wowbits_runtime import registry
+
+agent_id = "{agent_id}"
+
+root_agent = registry.load_agent_by_id(agent_id)
+'''
+
+
+def agent_folder_name(agent_name):
+    """Folder the wowbits CLI uses for an agent under agent_runner/."""
+    safe = re.sub(r"[^\w\s-]", "", agent_name)
+    safe = re.sub(r"[-\s]+", "_", safe).lower().strip("_")
+    return safe or "unnamed_agent"
+
+
+def link_agent(agent_name, agent_runner_dir=None):
+    """
+    Write agent_runner/<agent>/__init__.py so `wowbits run agent` and
+    `adk web` serve the agent through the registry.
+
+    Returns:
+        str: Path of the written __init__.py
+    """
+    agent_uuid = registry._active_agents().get(agent_name)
+    if agent_uuid is None:
+        raise ValueError(f"No active agent named {agent_name!r}")
+    folder = os.path.join(agent_runner_dir or os.path.dirname(os.path.abspath(__file__)),
+                          agent_folder_name(agent_name))
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, "__init__.py")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(PACKAGE_INIT_TEMPLATE.format(agent_name=agent_name, agent_id=agent_uuid))
+    return path
+
+
+class ChatHistorySessionService(BaseSessionService):
+    """
+    ADK session service that hands everything to `inner` and also records the
+    user messages and final agent responses in the chat_sessions /
+    chat_messages tables through a chat_history.ChatHistoryStore.
+
+    ADK's session service still gives the model its context; the tables are
+    the persistent record of the chats. chat_sessions.user_id references the
+    users table, so only sessions whose ADK user id is a wowbits user id (a
+    UUID) are recorded. Session ids that are not UUIDs are mapped to one with
+    uuid5.
+    """
+
+    def __init__(self, inner, store, agent_ids):
+        self.inner = inner
+        self.store = store
+        self.agent_ids = agent_ids
+        self._sessions = {}
+
+    @staticmethod
+    def _user_id(user_id):
+        try:
+            return UUID(str(user_id))
+        except ValueError:
+            return None
+
+    def _chat_session(self, session):
+        """The chat_sessions id for an ADK session, creating the row on first use; None if not recorded."""
+        key = (session.app_name, session.user_id, session.id)
+        if key in self._sessions:
+            return self._sessions[key]
+        chat_id = None
+        user_id = self._user_id(session.user_id)
+        agent_id = self.agent_ids(session.app_name) if user_id is not None else None
+        if agent_id is not None:
+            try:
+                chat_id = UUID(session.id)
+            except ValueError:
+                chat_id = uuid5(agent_id, session.id)
+            self.store.ensure_session(chat_id, agent_id, user_id)
+        self._sessions[key] = chat_id
+        return chat_id
+
+    def _record(self, session, event):
+        if event.partial or not event.content or not event.content.parts:
+            return
+        is_user = event.author == "user"
+        if not is_user and not event.is_final_response():
+            return
+        text = "".join(part.text or "" for part in event.content.parts if not part.thought)
+        if not text:
+            return
+        chat_id = self._chat_session(session)
+        if chat_id is None:
+            return
+        if is_user:
+            self.store.append(chat_id, text, user_id=self._user_id(session.user_id))
+        else:
+            self.store.append(chat_id, text, agent_id=self.agent_ids(session.app_name))
+
+    async def create_session(self, *, app_name, user_id, state=None, session_id=None):
+        return await self.inner.create_session(app_name=app_name, user_id=user_id, state=state,
+                                               session_id=session_id)
+
+    async def get_session(self, *, app_name, user_id, session_id, config=None):
+        return await self.inner.get_session(app_name=app_name, user_id=user_id, session_id=session_id,
+                                            config=config)
+
+    async def list_sessions(self, *, app_name, user_id):
+        return await self.inner.list_sessions(app_name=app_name, user_id=user_id)
+
+    async def delete_session(self, *, app_name, user_id, session_id):
+        self._sessions.pop((app_name, user_id, session_id), None)
+        await self.inner.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def append_event(self, session, event):
+        event = await self.inner.append_event(session, event)
+        try:
+            self._record(session, event)
+        except Exception:
+            logger.exception(f"Could not record chat message of session {session.id}")
+        return event
+
+
+def serve(mode="web", host="127.0.0.1", port=8000, session_service_uri=None, chat_history=False):
+    """
+    Serve every active agent from one process, with the registry as ADK's
+    agent loader: the same endpoints (and web UI) as `adk web` / `adk
+    api_server`, but agents are listed from the agents table and built lazily.
+
+    With `chat_history`, user messages and agent responses are also written
+    to the chat tables of the wowbits database (ChatHistorySessionService).
+    """
+    from pathlib import Path
+
+    import uvicorn
+    from google.adk.artifacts import InMemoryArtifactService
+    from google.adk.auth.credential_service.in_memory_credential_service import InMemoryCredentialService
+    from google.adk.cli import fast_api
+    from google.adk.cli.adk_web_server import AdkWebServer
+    from google.adk.evaluation.local_eval_set_results_manager import LocalEvalSetResultsManager
+    from google.adk.evaluation.local_eval_sets_manager import LocalEvalSetsManager
+    from google.adk.memory import InMemoryMemoryService
+    from google.adk.sessions import DatabaseSessionService, InMemorySessionService
+
+    agents_dir = os.path.dirname(os.path.abspath(__file__))
+    if session_service_uri:
+        session_service = DatabaseSessionService(db_url=session_service_uri)
+    else:
+        session_service = InMemorySessionService()
+    if chat_history:
+        import chat_history as chat_history_store
+
+        session_service = ChatHistorySessionService(session_service, chat_history_store.get_store(), registry.agent_id)
+    web_server = AdkWebServer(
+        agent_loader=registry,
+        session_service=session_service,
+        artifact_service=InMemoryArtifactService(),
+        memory_service=InMemoryMemoryService(),
+        credential_service=InMemoryCredentialService(),
+        eval_sets_manager=LocalEvalSetsManager(agents_dir=agents_dir),
+        eval_set_results_manager=LocalEvalSetResultsManager(agents_dir=agents_dir),
+        agents_dir=agents_dir,
+    )
+    web_assets_dir = Path(fast_api.__file__).parent / "browser" if mode == "web" else None
+    app = web_server.get_fast_api_app(web_assets_dir=web_assets_dir)
+    uvicorn.run(app, host=host, port=port)
+
+
+def main():
+    """
+    Serve every active agent from one process:
+
+        python agent_runner/wowbits_runtime.py web --port 5151
+
+    or make `wowbits run agent <name>` build the agent here instead of from
+    the CLI's agent.py template:
+
+        python agent_runner/wowbits_runtime.py link <name>
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve wowbits agents through the shared runtime")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for mode, help_text in (("web", "serve all active agents with the web UI"),
+                            ("api", "serve all active agents, API only")):
+        command = commands.add_parser(mode, help=help_text)
+        command.add_argument("--host", default="127.0.0.1")
+        command.add_argument("--port", type=int, default=8000)
+        command.add_argument("--session_service_uri", default=None)
+        command.add_argument("--chat_history", action="store_true",
+                             help="also record chats in the chat_sessions / chat_messages tables")
+    link = commands.add_parser("link", help="write agent_runner/<agent>/__init__.py for `wowbits run agent`")
+    link.add_argument("agent_name")
+    args = parser.parse_args()
+
+    if args.command == "link":
+        print(f"Wrote {link_agent(args.agent_name)}")
+    else:
+        serve(args.command, args.host, args.port, args.session_service_uri, args.chat_history)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark create_agent() build time with and without the compile-once code cache.
+
+    naive        exec the raw source for every tool load (previous behaviour)
+    cold disk    fresh process state, bytecode read from data/code_cache
+    warm         compiled code and namespaces already cached in-process
+
+Usage:
+    python benchmarks/bench_agent_build.py [--runs 20]
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from runner_env import use_scratch_db
+
+
+def naive_exec(name, code):
+    ns = {}
+    exec(code, ns)
+    return ns
+
+
+def timed_builds(runtime, agent_uuid, runs, before_each=None):
+    total = 0.0
+    for _ in range(runs):
+        if before_each:
+            before_each()
+        start = time.perf_counter()
+        runtime.create_agent(agent_uuid)
+        total += time.perf_counter() - start
+    return total / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    use_scratch_db()
+    os.environ["WOWBITS_AGENT_SNAPSHOT"] = "0"
+    logging.disable(logging.INFO)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import wowbits_runtime as runtime
+        from stock_fundamentals import agent_id
+    agent_uuid = uuid.UUID(agent_id)
+
+    def clear_memory_caches():
+        runtime._code_cache.clear()
+        runtime._namespace_cache.clear()
+
+    cached_exec = runtime._exec_cached
+    runtime._exec_cached = naive_exec
+    naive = timed_builds(runtime, agent_uuid, args.runs)
+    runtime._exec_cached = cached_exec
+
+    cold = timed_builds(runtime, agent_uuid, args.runs, before_each=clear_memory_caches)
+    warm = timed_builds(runtime, agent_uuid, args.runs)
+
+    print(f"{'mode':<10} {'build (ms)':>11}")
+    print(f"{'naive':<10} {naive * 1000:>11.2f}")
+    print(f"{'cold disk':<10} {cold * 1000:>11.2f}")
+    print(f"{'warm':<10} {warm * 1000:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
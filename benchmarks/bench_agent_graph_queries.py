@@ -0,0 +1,80 @@
+"""
+Count SQL statements issued by create_agent() against a scratch copy of the
+bundled SQLite DB, as the skill tree under the agent grows deeper.
+
+The graph is loaded in a fixed number of bulk queries (recursive CTE over the
+skill edges), so the count should not depend on the number of skills or
+tools; tests/test_agent_graph_queries.py checks that.
+
+Usage:
+    python benchmarks/bench_agent_graph_queries.py [--depths 0 5 20 50]
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import sys
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from runner_env import use_scratch_db
+
+
+def add_skill_chain(session, schema, agent_uuid, depth):
+    """Hang a chain of `depth` nested skills, each with one tool, under the agent."""
+    tool = session.query(schema.Tool).filter(schema.Tool.name == "get_stock_price").one()
+    parent = None
+    for i in range(depth):
+        skill = schema.Skill(
+            id=uuid.uuid4(), name=f"bench_chain_{depth}_{i}", instructions="bench",
+            default_model="openai/gpt-4.1", exec_mode=schema.ExecMode.LLM,
+        )
+        session.add(skill)
+        session.add(schema.SkillTool(skill_id=skill.id, tool_id=tool.id))
+        if parent is None:
+            session.add(schema.AgentSkill(agent_id=agent_uuid, skill_id=skill.id))
+        else:
+            session.add(schema.SkillSkill(parent_skill_id=parent.id, child_skill_id=skill.id))
+        parent = skill
+    session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--depths", type=int, nargs="+", default=[0, 5, 20, 50])
+    args = parser.parse_args()
+
+    use_scratch_db()
+    os.environ["WOWBITS_AGENT_SNAPSHOT"] = "0"
+    logging.disable(logging.INFO)
+    with contextlib.redirect_stdout(io.StringIO()):
+        from sqlalchemy import event
+        from db import schema
+        from pylibs.database_manager import get_db_manager
+        import wowbits_runtime as runtime
+        from stock_fundamentals import agent_id
+
+    engine = get_db_manager().engine
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    agent_uuid = uuid.UUID(agent_id)
+
+    print(f"{'extra depth':>11} {'skills':>7} {'queries':>8}")
+    for depth in args.depths:
+        session = get_db_manager().get_session()
+        add_skill_chain(session, schema, agent_uuid, depth)
+        session.close()
+
+        statements.clear()
+        root = runtime.create_agent(agent_uuid)
+        count = len(statements)
+
+        def count_skills(node):
+            return 1 + sum(count_skills(child) for child in node.sub_agents)
+
+        print(f"{depth:>11} {count_skills(root) - 1:>7} {count:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Measure runner startup (importing the stock_fundamentals package, which builds
+root_agent) from the database vs from the agent-graph snapshot, each in a
+fresh process.
+
+ADK/litellm imports are done before the clock starts so the numbers isolate
+the DB session + graph load + tree build.
+
+Usage:
+    python benchmarks/bench_agent_startup.py [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from runner_env import REPO_ROOT, use_scratch_db
+
+CHILD = """
+import contextlib, io, logging, sys, time
+logging.disable(logging.INFO)
+sys.path.insert(0, {agent_runner!r})
+import google.adk.agents, google.adk.models.lite_llm, google.adk.tools.mcp_tool.mcp_toolset
+with contextlib.redirect_stdout(io.StringIO()):
+    start = time.perf_counter()
+    import stock_fundamentals
+    elapsed = time.perf_counter() - start
+print(elapsed)
+"""
+
+
+def startup_time(env):
+    code = CHILD.format(agent_runner=os.path.join(REPO_ROOT, "agent_runner"))
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    use_scratch_db()
+    env = dict(os.environ)
+
+    db_env = dict(env, WOWBITS_AGENT_SNAPSHOT="0")
+    db_times = [startup_time(db_env) for _ in range(args.runs)]
+
+    startup_time(env)  # writes the snapshot
+    snapshot_times = [startup_time(env) for _ in range(args.runs)]
+
+    print(f"{'source':<10} {'median (ms)':>12} {'min (ms)':>9}")
+    for name, times in (("database", db_times), ("snapshot", snapshot_times)):
+        print(f"{name:<10} {statistics.median(times) * 1000:>12.1f} {min(times) * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
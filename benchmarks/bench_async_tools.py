@@ -0,0 +1,70 @@
+"""
+Benchmark: N tool calls issued concurrently through ADK's FunctionTool, as a
+ParallelAgent's branches would, with the sync tools vs their async variants.
+
+ADK calls a sync tool directly on the event loop, so concurrent branches run
+one after another (~sum of latencies). The async variants await the shared
+httpx client and overlap (~max latency).
+
+Usage:
+    python benchmarks/bench_async_tools.py [--latency 0.2] [--parallel 1 5 10]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "functions"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Every call must reach the stub server.
+os.environ["TOOL_CACHE_BACKEND"] = "off"
+
+from google.adk.tools.function_tool import FunctionTool
+
+from stub_server import start_stub_server
+from helpers import http_client
+from get_stock_price import get_stock_price, get_stock_price_async
+from get_stock_fundamentals import get_stock_fundamentals, get_stock_fundamentals_async
+from get_stock_news import get_stock_news, get_stock_news_async
+
+
+async def run_concurrently(funcs, n):
+    tools = [FunctionTool(funcs[i % len(funcs)]) for i in range(n)]
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        tool.run_async(args={"symbol": f"SYM{i}"}, tool_context=None)
+        for i, tool in enumerate(tools)
+    ))
+    elapsed = time.perf_counter() - start
+    await http_client.close_async_client()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--parallel", type=int, nargs="+", default=[1, 5, 10, 20])
+    args = parser.parse_args()
+
+    server = start_stub_server(latency=args.latency)
+    os.environ["FMP_BASE_URL"] = server.base_url
+
+    sync_funcs = [get_stock_price, get_stock_fundamentals, get_stock_news]
+    async_funcs = [get_stock_price_async, get_stock_fundamentals_async, get_stock_news_async]
+
+    print(f"stub latency {args.latency:.3f}s per call")
+    print(f"{'parallel':>8} {'sync (s)':>9} {'async (s)':>10} {'sum(lat)':>9} {'max(lat)':>9}")
+    for n in args.parallel:
+        with contextlib.redirect_stdout(io.StringIO()):
+            sync_time = asyncio.run(run_concurrently(sync_funcs, n))
+            async_time = asyncio.run(run_concurrently(async_funcs, n))
+        print(f"{n:>8} {sync_time:>9.3f} {async_time:>10.3f} {n * args.latency:>9.3f} {args.latency:>9.3f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
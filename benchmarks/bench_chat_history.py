@@ -0,0 +1,141 @@
+"""
+Load test for agent_runner/chat_history.py on a scratch copy of wowbits.db.
+
+    write         a large synthetic history (sessions x messages) through the
+                  batched background writer vs one synchronous insert per
+                  message on the stock database (rollback journal, no index)
+    load          the last HISTORY_WINDOW messages plus summary of one session,
+                  vs loading its whole history, and vs the same window query
+                  without the (session_id, created_at) index
+    concurrent    load latency while the writer is busy inserting
+
+Read-your-writes, the window, paging and the recording session service are
+checked in tests/test_chat_history.py.
+
+Usage:
+    python benchmarks/bench_chat_history.py [--sessions 200] [--messages 1000]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from runner_env import use_scratch_db
+
+db_path = use_scratch_db()
+
+from sqlalchemy import create_engine, select
+
+import chat_history
+
+AGENT_ID = uuid.UUID("746a18de-acc7-421b-b51d-40fd97310ad9")
+USER_ID = uuid.UUID("5f0c2a8e-9d1b-4c3e-a7f6-b2e4d8c1a9f0")
+
+
+def _timed(fn, repeat=20):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, statistics.median(times)
+
+
+def _content(session, i):
+    return f"message {i} of session {session}: " + "lorem ipsum dolor sit amet " * 8
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=1000)
+    args = parser.parse_args()
+    total = args.sessions * args.messages
+
+    # Baseline on an untouched copy: rollback journal, default synchronous, one transaction per message.
+    baseline_path = db_path + ".baseline"
+    shutil.copy(db_path, baseline_path)
+    baseline = create_engine(f"sqlite:///{baseline_path}")
+    sample = 500
+    session_id = uuid.uuid4()
+    start = time.perf_counter()
+    with baseline.begin() as conn:
+        conn.execute(chat_history.SESSIONS.insert(), {"id": session_id, "agent_id": AGENT_ID, "user_id": USER_ID})
+    for i in range(sample):
+        with baseline.begin() as conn:
+            conn.execute(chat_history.MESSAGES.insert(), {
+                "id": uuid.uuid4(), "session_id": session_id, "content": _content(0, i),
+                "created_at": datetime.now(timezone.utc).replace(tzinfo=None),
+            })
+    per_message = (time.perf_counter() - start) / sample
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    store = chat_history.ChatHistoryStore(engine)
+    sessions = [store.create_session(AGENT_ID, USER_ID, title=f"session {s}") for s in range(args.sessions)]
+    start = time.perf_counter()
+    for i in range(args.messages):
+        for s, sid in enumerate(sessions):
+            store.append(sid, _content(s, i), user_id=USER_ID if i % 2 == 0 else None,
+                         agent_id=None if i % 2 == 0 else AGENT_ID)
+    queued = time.perf_counter() - start
+    store.flush()
+    written = time.perf_counter() - start
+    journal = engine.connect().exec_driver_sql("PRAGMA journal_mode").scalar()
+    print(f"write:      {total} messages queued in {queued:.2f} s, written in {written:.2f} s "
+          f"({total / written:,.0f}/s, {store.stats['batches']} batches, journal_mode={journal})")
+    print(f"            vs {per_message * 1000:.2f} ms per synchronous insert "
+          f"({1 / per_message:,.0f}/s, {total * per_message:.0f} s for the same history)\n")
+
+    sid = sessions[len(sessions) // 2]
+    store.set_summary(sid, "Earlier: the user asked about AAPL fundamentals.")
+    _, windowed = _timed(lambda: store.load(sid))
+
+    def full_history():
+        with engine.connect() as conn:
+            return conn.execute(
+                select(chat_history.MESSAGES).where(chat_history.MESSAGES.c.session_id == sid)
+                .order_by(chat_history.MESSAGES.c.created_at)
+            ).all()
+
+    _, full = _timed(full_history)
+    print(f"load:       last {store.window} + summary {windowed * 1000:.2f} ms, "
+          f"whole history ({args.messages}) {full * 1000:.2f} ms")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX ix_chat_messages_session_created")
+    _, unindexed = _timed(lambda: store.load(sid), repeat=5)
+    chat_history.prepare_engine(engine)
+    print(f"            same window without the index {unindexed * 1000:.2f} ms "
+          f"({unindexed / windowed:.0f}x slower)\n")
+
+    latencies = []
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            start = time.perf_counter()
+            store.load(sessions[0])
+            latencies.append(time.perf_counter() - start)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    start = time.perf_counter()
+    for i in range(50_000):
+        store.append(sessions[i % len(sessions)], _content(i % len(sessions), args.messages + i))
+    store.flush()
+    stop.set()
+    thread.join()
+    latencies.sort()
+    print(f"concurrent: 50000 more messages in {time.perf_counter() - start:.2f} s while reading; "
+          f"load p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, p95 {latencies[int(len(latencies) * 0.95)] * 1000:.2f} ms")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
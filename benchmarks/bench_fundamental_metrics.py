@@ -0,0 +1,105 @@
+"""
+Benchmark the precomputed fundamentals metrics (functions/helpers/fundamental_metrics.py).
+
+    build         ratios plus sector/industry percentiles and medians for the
+                  whole universe, vectorized, vs a per-ticker Python pass over
+                  its peers (results are checked against each other)
+    lookup        one ticker's summary from the built snapshot
+    tool          get_fundamental_metrics against the stub: requests for a
+                  cold and a warm call, and the payload size vs the raw
+                  get_stock_fundamentals output
+
+Usage:
+    python benchmarks/bench_fundamental_metrics.py [--universe 5000]
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "functions"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("HISTORY", "off")
+
+from helpers import fundamental_metrics as fm
+from stub_server import _profile, _ratios_ttm, start_stub_server
+
+
+def _naive_percentile(symbol_row, column, peers):
+    """Percentile of one value among its peers with a plain loop, as a reference."""
+    value = symbol_row[column]
+    values = [p[column] for p in peers if not math.isnan(p[column])]
+    below = sum(v < value for v in values)
+    ties = sum(v == value for v in values)
+    return (below + 0.5 * ties) / len(values) * 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--universe", type=int, default=5000)
+    args = parser.parse_args()
+
+    universe = fm.MetricsUniverse()
+    symbols = [f"U{i}" for i in range(args.universe)]
+    for symbol in symbols:
+        ratios = _ratios_ttm(symbol)
+        if random.Random(symbol).random() < 0.05:
+            ratios["peRatioTTM"] = -12.0  # loss-making: no P/E, negative earnings yield
+        universe.add(symbol, _profile(symbol), ratios)
+
+    start = time.perf_counter()
+    snapshot = universe.build()
+    build = time.perf_counter() - start
+
+    # Reference: every ticker compared with its sector peers one by one.
+    sample = symbols[:200]
+    rows = {s: snapshot.values[snapshot.index[s]] for s in symbols}
+    by_sector = {}
+    for s in symbols:
+        by_sector.setdefault(snapshot.info[snapshot.index[s]]["sector"], []).append(rows[s])
+    start = time.perf_counter()
+    naive = {}
+    for s in sample:
+        peers = by_sector[snapshot.info[snapshot.index[s]]["sector"]]
+        naive[s] = [
+            _naive_percentile(rows[s], j, peers) if not math.isnan(rows[s][j]) else math.nan
+            for j in range(len(fm.METRICS))
+        ]
+    loop = (time.perf_counter() - start) * len(symbols) / len(sample)
+    for s in sample:
+        got = snapshot.sector_pct[snapshot.index[s]]
+        assert all((math.isnan(a) and math.isnan(b)) or abs(a - b) < 1e-9 for a, b in zip(got, naive[s])), s
+    assert universe.build() is snapshot, "an unchanged universe must reuse its snapshot"
+    print(f"build:   {args.universe} tickers x {len(fm.METRICS)} metrics in {build * 1000:.1f} ms "
+          f"(per-ticker loop, extrapolated: {loop:.1f} s)")
+
+    start = time.perf_counter()
+    for s in symbols:
+        snapshot.lookup(s)
+    lookup = (time.perf_counter() - start) / len(symbols)
+    print(f"lookup:  {lookup * 1e6:.1f} us per ticker\n")
+
+    server = start_stub_server(latency=0.02)
+    os.environ["FMP_BASE_URL"] = server.base_url
+    from get_fundamental_metrics import get_fundamental_metrics
+    from get_stock_fundamentals import get_stock_fundamentals
+
+    peers = [f"P{i}" for i in range(200)]
+    for label in ("cold", "warm"):
+        server.request_count = 0
+        start = time.perf_counter()
+        result = get_fundamental_metrics(["AAPL"], universe=peers)
+        print(f"tool {label}: {server.request_count} requests, {(time.perf_counter() - start) * 1000:.0f} ms, "
+              f"universe {result['universe_size']}")
+    assert server.request_count == 0
+    compact = len(json.dumps(result["metrics"]["AAPL"]))
+    raw = len(json.dumps(get_stock_fundamentals("AAPL")))
+    print(f"payload: {compact} chars with peer comparisons vs {raw} chars of raw profile without")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
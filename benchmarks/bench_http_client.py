@@ -0,0 +1,78 @@
+"""
+Count TCP connections opened by the tools against a local stub server.
+
+With the shared pooled client every tool call after the first reuses a
+keep-alive connection, so connections stay near the pool size instead of
+growing with the number of calls. The reuse and retry checks are in
+tests/test_http_client.py.
+
+Usage:
+    python benchmarks/bench_http_client.py [--calls 50]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "functions"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Measure the transport, not the tool cache.
+os.environ.setdefault("TOOL_CACHE_BACKEND", "off")
+
+from stub_server import start_stub_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=50, help="Calls per tool")
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = start_stub_server(latency=args.latency)
+    os.environ["FMP_BASE_URL"] = server.base_url
+    os.environ["X_API_BASE_URL"] = server.base_url
+    os.environ["X_BEARER_TOKEN"] = "stub"
+    os.environ["HTTP_BACKOFF_FACTOR"] = "0.01"
+
+    from helpers import http_client
+    from get_stock_price import get_stock_price
+    from get_stock_fundamentals import get_stock_fundamentals
+    from get_stock_news import get_stock_news
+    from get_stock_twitter_feed import get_stock_twitter_feed
+
+    tools = [
+        ("get_stock_price", lambda i: get_stock_price(f"SYM{i}")),
+        ("get_stock_fundamentals", lambda i: get_stock_fundamentals(f"SYM{i}")),
+        ("get_stock_news", lambda i: get_stock_news(f"SYM{i}")),
+        ("get_stock_twitter_feed", lambda i: get_stock_twitter_feed(f"SYM{i}")),
+    ]
+
+    print(f"{'tool':<24} {'calls':>6} {'connections':>12} {'time (s)':>9}")
+    for name, call in tools:
+        server.request_count = server.connection_count = 0
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(args.calls):
+                call(i)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<24} {server.request_count:>6} {server.connection_count:>12} {elapsed:>9.3f}")
+
+    async def async_calls():
+        url = f"{server.base_url}/api/v3/quote/AAPL"
+        await asyncio.gather(*(http_client.aget(url) for _ in range(args.calls)))
+        await http_client.close_async_client()
+
+    server.request_count = server.connection_count = 0
+    start = time.perf_counter()
+    asyncio.run(async_calls())
+    print(f"async aget: {server.request_count} requests over {server.connection_count} connections "
+          f"(pool size {http_client.POOL_MAXSIZE}) in {time.perf_counter() - start:.3f} s")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
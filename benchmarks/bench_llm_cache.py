@@ -0,0 +1,103 @@
+"""
+Benchmark the run_llm response cache and request coalescing against the stub
+LLM endpoint.
+
+    repeat      the same prompts asked several times in a row
+    burst       identical prompts issued concurrently (threads and asyncio);
+                coalescing should leave one upstream call per distinct prompt
+    opt-out     use_cache=False always goes upstream
+
+Usage:
+    python benchmarks/bench_llm_cache.py [--latency 0.2] [--prompts 5] [--repeat 4]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "functions"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_server import start_stub_server
+from helpers import tool_cache
+
+MODEL = "openai/stub-model"
+
+
+def reset(server, cache_on):
+    tool_cache.set_cache(tool_cache.TTLCache(tool_cache.MemoryBackend()) if cache_on else None)
+    os.environ["TOOL_CACHE_BACKEND"] = "memory" if cache_on else "off"
+    server.completion_count = 0
+
+
+def report(label, elapsed, server):
+    stats = tool_cache.cache_stats("llm")
+    print(
+        f"{label:<22} {elapsed:>9.3f} {server.completion_count:>9}"
+        f" {stats.get('coalesced', 0):>10} {stats.get('hit_rate', 0.0):>9.0%}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--prompts", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=4)
+    args = parser.parse_args()
+
+    server = start_stub_server(latency=args.latency)
+    os.environ["OPENAI_API_BASE"] = f"{server.base_url}/v1"
+    os.environ["OPENAI_API_KEY"] = "bench"
+    with contextlib.redirect_stdout(io.StringIO()):
+        from run_llm import run_llm, run_llm_async
+
+    prompts = [f"Summarize article {i} about AAPL." for i in range(args.prompts)]
+    calls = [p for _ in range(args.repeat) for p in prompts]
+
+    def quiet(fn, *a, **kw):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fn(*a, **kw)
+
+    print(f"{'scenario':<22} {'time (s)':>9} {'upstream':>9} {'coalesced':>10} {'hit rate':>9}")
+    for cache_on in (False, True):
+        reset(server, cache_on)
+        start = time.perf_counter()
+        for prompt in calls:
+            answer = quiet(run_llm, MODEL, prompt)
+            assert answer.startswith("Stub answer"), answer
+        report(f"repeat cache={'on' if cache_on else 'off'}", time.perf_counter() - start, server)
+
+    reset(server, True)
+    start = time.perf_counter()
+    # redirect once: per-thread redirect_stdout calls would clobber each other
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=len(calls)) as executor:
+        list(executor.map(lambda p: run_llm(MODEL, p), calls))
+    report("burst threads", time.perf_counter() - start, server)
+    assert server.completion_count == len(prompts), "concurrent identical prompts must coalesce"
+
+    async def burst_async():
+        return await asyncio.gather(*(run_llm_async(MODEL, p) for p in calls))
+
+    reset(server, True)
+    start = time.perf_counter()
+    # Not asyncio.run: cancelling litellm's logging worker at loop teardown can hang.
+    asyncio.new_event_loop().run_until_complete(burst_async())
+    report("burst asyncio", time.perf_counter() - start, server)
+    assert server.completion_count == len(prompts), "concurrent identical prompts must coalesce"
+
+    reset(server, True)
+    start = time.perf_counter()
+    for prompt in calls:
+        quiet(run_llm, MODEL, prompt, use_cache=False)
+    report("opt-out use_cache=False", time.perf_counter() - start, server)
+    assert server.completion_count == len(calls)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Serve several agents from one process through the shared AgentRegistry and
+report what each one costs.
+
+Clones of the bundled stock_fundamentals agent (same skills and tools) are
+added to a scratch DB. Each clone is built lazily on first load; tool code and
+model clients are shared, so every agent after the first should add only its
+own ADK agent objects.
+
+Usage:
+    python benchmarks/bench_multi_agent.py [--agents 4] [--track-memory]
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import sys
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from runner_env import use_scratch_db
+
+
+def clone_agent(session, schema, source_name, name):
+    """Copy an agent row and its agent_skills links under a new name."""
+    source = session.query(schema.Agent).filter(schema.Agent.name == source_name).one()
+    clone = schema.Agent(
+        id=uuid.uuid4(), name=name, description=source.description,
+        instructions=source.instructions, status=source.status,
+        default_model=source.default_model, default_model_config=source.default_model_config,
+        temperature=source.temperature, max_output_tokens=source.max_output_tokens,
+        safety_settings=source.safety_settings, exec_mode=source.exec_mode,
+        output_key=source.output_key,
+    )
+    session.add(clone)
+    for link in session.query(schema.AgentSkill).filter(schema.AgentSkill.agent_id == source.id):
+        session.add(schema.AgentSkill(agent_id=clone.id, skill_id=link.skill_id))
+    session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--agents", type=int, default=4, help="total agents, including the original")
+    parser.add_argument("--track-memory", action="store_true", help="tracemalloc each build")
+    args = parser.parse_args()
+
+    use_scratch_db()
+    os.environ["WOWBITS_AGENT_SNAPSHOT"] = "0"
+    if args.track_memory:
+        os.environ["WOWBITS_TRACK_AGENT_MEMORY"] = "1"
+    logging.disable(logging.INFO)
+    with contextlib.redirect_stdout(io.StringIO()):
+        from db import schema
+        from pylibs.database_manager import get_db_manager
+        import wowbits_runtime as runtime
+
+    session = get_db_manager().get_session()
+    for i in range(1, args.agents):
+        clone_agent(session, schema, "stock_fundamentals", f"stock_fundamentals_{i}")
+    session.close()
+
+    registry = runtime.registry
+    names = registry.list_agents()
+    assert not registry.memory_report()["agents"], "agents must not be built before first load"
+    for name in names:
+        assert registry.load_agent(name) is registry.load_agent(name)
+
+    report = registry.memory_report()
+    print(f"{'agent':<24} {'build (ms)':>10} {'RSS +KiB':>9} {'retained KiB':>13} {'new modules':>12} {'new models':>11}")
+    for name in names:
+        stats = report["agents"][name]
+        rss = stats["rss_delta_bytes"]
+        retained = stats["retained_bytes"]
+        print(
+            f"{name:<24} {stats['build_seconds'] * 1000:>10.1f}"
+            f" {rss / 1024 if rss is not None else float('nan'):>9.1f}"
+            f" {retained / 1024 if retained is not None else float('nan'):>13.1f}"
+            f" {stats['new_tool_modules']:>12} {stats['new_models']:>11}"
+        )
+    print(f"shared: {report['shared']}, process RSS {report['process_rss_bytes'] / 2 ** 20:.1f} MiB")
+
+    later = [report["agents"][name] for name in names if name != "stock_fundamentals"]
+    assert all(s["new_tool_modules"] == 0 and s["new_models"] == 0 for s in later), \
+        "agents with the same tools and models must reuse the shared ones"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark the summarize_stock_news pipeline against stubbed FMP, Firecrawl and
+LLM backends.
+
+    serial      scrape then summarize each article in turn (what the agent's
+                one-tool-call-at-a-time loop does today)
+    pipeline    summarize_stock_news with bounded per-stage concurrency
+    partial     one slow and one broken article among healthy ones, with a
+                short scrape timeout: the rest are still summarized
+    status      a summary starting with "Error" counts as a summary; a failed
+                model call marks the article failed
+
+Usage:
+    python benchmarks/bench_news_pipeline.py [--latency 0.2] [--articles 10]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "functions"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_server import start_stub_server
+
+
+def articles_for(ticker, count, url_of=None):
+    return [
+        {
+            "title": f"Headline {i} for {ticker}",
+            "text": "Article lead. " * 20,
+            "published_date": "2024-01-15 10:00:00",
+            "source": "example.com",
+            "url": url_of(i) if url_of else f"https://example.com/{ticker}/{i}",
+        }
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--articles", type=int, default=10)
+    args = parser.parse_args()
+
+    server = start_stub_server(latency=args.latency)
+    os.environ.update({
+        "FMP_BASE_URL": server.base_url,
+        "FIRECRAWL_API_URL": server.base_url,
+        "FIRECRAWL_API_KEY": "fc-bench",
+        "OPENAI_API_BASE": f"{server.base_url}/v1",
+        "OPENAI_API_KEY": "bench",
+        "TOOL_CACHE_BACKEND": "off",
+        "SCRAPE_CACHE": "off",
+    })
+    with contextlib.redirect_stdout(io.StringIO()):
+        import summarize_stock_news as pipeline
+        from run_llm import run_llm
+        from scrape_web_page import scrape_webpage
+
+    articles = articles_for("AAPL", args.articles)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for article in articles:
+            page = scrape_webpage(article["url"])
+            run_llm(pipeline.SUMMARY_MODEL, pipeline.SUMMARY_PROMPT.format(
+                ticker="AAPL", title=article["title"], content=pipeline._page_text(page)))
+    serial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = pipeline.summarize_stock_news("AAPL", articles)
+    concurrent = time.perf_counter() - start
+    assert result["stats"]["summarized"] == len(articles), result["stats"]
+    assert [a["url"] for a in result["articles"]] == [a["url"] for a in articles], "order must be kept"
+
+    print(f"{'mode':<10} {'articles':>8} {'time (s)':>9}")
+    print(f"{'serial':<10} {len(articles):>8} {serial:>9.3f}")
+    print(f"{'pipeline':<10} {len(articles):>8} {concurrent:>9.3f}")
+
+    def url_of(i):
+        return {1: "https://example.com/slow/1", 2: "https://example.com/broken/2"}.get(
+            i, f"https://example.com/AAPL/{i}")
+
+    pipeline.SCRAPE_TIMEOUT = args.latency * 3
+    start = time.perf_counter()
+    result = pipeline.summarize_stock_news("AAPL", articles_for("AAPL", args.articles, url_of))
+    elapsed = time.perf_counter() - start
+    print(f"\npartial results in {elapsed:.3f}s (scrape timeout {pipeline.SCRAPE_TIMEOUT:g}s):")
+    for article in result["articles"][:4]:
+        print(f"  {article['url']:<32} {article['status']:<7} {article['content_source'] or '-':<8} "
+              f"{'; '.join(article['errors'])[:60]}")
+    assert result["stats"]["summarized"] == len(articles), "slow/broken pages fall back to the snippet"
+    assert elapsed < server.slow_latency, "a slow page must not hold up the call"
+
+    # A summary that happens to start with "Error" is still a summary; only a failed call fails.
+    from helpers.llm import LLMError
+
+    async def answer(model, prompt):
+        return "Errors in the guidance weighed on the stock."
+
+    async def fail(model, prompt):
+        raise LLMError(f"Error running model {model}: provider unavailable")
+
+    complete_async = pipeline.llm.complete_async
+    statuses = {}
+    for name, stub in (("answer", answer), ("failure", fail)):
+        pipeline.llm.complete_async = stub
+        result = pipeline.summarize_stock_news("AAPL", articles_for("AAPL", 2))
+        statuses[name] = {a["status"] for a in result["articles"]}
+    pipeline.llm.complete_async = complete_async
+    print(f"summary starting with 'Error': {statuses['answer']}, failed model call: {statuses['failure']}")
+    assert statuses == {"answer": {"ok"}, "failure": {"failed"}}, statuses
+
+    from google.adk.tools import FunctionTool
+    declaration = FunctionTool(pipeline.summarize_stock_news)._get_declaration()
+    print(f"\nADK tool declaration: {declaration.name}({', '.join(declaration.parameters.properties)})")
+
+    server.shutdown()
+    sys.stdout.flush()
+    # litellm's logging worker can crash the interpreter while it is torn down.
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark incremental news polling over a watchlist against the stub FMP API.
+
+Each tick publishes a few new articles for some tickers, then polls:
+
+    full          get_stock_news for every ticker (latest 10 each), what a
+                  monitor loop does today
+    incremental   get_new_stock_news for the whole watchlist: one request,
+                  only articles not returned before
+
+Checks that the incremental poll returns every new article exactly once,
+including articles sharing a timestamp, polls racing from two threads and
+polls that run out of pages, and that articles fetched without committing
+their cursors are returned again.
+
+Usage:
+    python benchmarks/bench_news_polling.py [--tickers 20] [--ticks 10] [--latency 0.05]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "functions"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_server import start_stub_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=20)
+    parser.add_argument("--ticks", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = start_stub_server(latency=args.latency)
+    directory = tempfile.mkdtemp(prefix="news_cursors_")
+    os.environ.update({
+        "FMP_BASE_URL": server.base_url,
+        "TOOL_CACHE_BACKEND": "off",
+        "NEWS_CURSOR_PATH": os.path.join(directory, "news_cursors.db"),
+    })
+    from get_stock_news import get_stock_news
+    from get_new_stock_news import get_new_stock_news
+
+    rng = random.Random(7)
+    watchlist = [f"T{i:03d}" for i in range(args.tickers)]
+    server.news_published = {t: 100 for t in watchlist}
+    seen = set()
+
+    def poll_incremental():
+        fresh = get_new_stock_news(watchlist)
+        urls = [a["url"] for articles in fresh.values() for a in articles]
+        assert not seen.intersection(urls), "an article was returned twice"
+        assert len(urls) == len(set(urls))
+        seen.update(urls)
+        return len(urls)
+
+    print(f"{'tick':>4} {'new':>4} | {'full: req':>9} {'articles':>9} {'time (s)':>9} | "
+          f"{'incr: req':>9} {'articles':>9} {'time (s)':>9}")
+    totals = {"full": [0, 0, 0.0], "incr": [0, 0, 0.0]}
+    for tick in range(args.ticks):
+        published = 0
+        if tick:
+            for ticker in rng.sample(watchlist, max(1, args.tickers // 5)):
+                count = rng.randint(1, 3)
+                server.news_published[ticker] += count
+                published += count
+
+        requests, start = server.news_count, time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            full = sum(len(get_stock_news(t)) for t in watchlist)
+        full_row = (server.news_count - requests, full, time.perf_counter() - start)
+
+        requests, start = server.news_count, time.perf_counter()
+        incremental = poll_incremental()
+        incr_row = (server.news_count - requests, incremental, time.perf_counter() - start)
+        if tick:
+            assert incremental == published, (incremental, published)
+
+        for name, row in (("full", full_row), ("incr", incr_row)):
+            totals[name] = [a + b for a, b in zip(totals[name], row)]
+        print(f"{tick:>4} {published:>4} | {full_row[0]:>9} {full_row[1]:>9} {full_row[2]:>9.3f} | "
+              f"{incr_row[0]:>9} {incr_row[1]:>9} {incr_row[2]:>9.3f}")
+
+    print(f"{'all':>9} | {totals['full'][0]:>9} {totals['full'][1]:>9} {totals['full'][2]:>9.3f} | "
+          f"{totals['incr'][0]:>9} {totals['incr'][1]:>9} {totals['incr'][2]:>9.3f}")
+
+    # A burst bigger than one page is paged through; racing polls split it without repeats.
+    for ticker in watchlist[:3]:
+        server.news_published[ticker] += 40
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        counts = list(pool.map(lambda _: poll_incremental(), range(2)))
+    print(f"\nburst of 120 articles, two racing polls returned {counts}")
+    assert sum(counts) == 120
+
+    # A poll that runs out of pages leaves the cursor below the articles it
+    # did not reach; later polls pick them up instead of skipping them.
+    from helpers import news_cursors
+    from helpers import stock_news as news
+
+    max_pages, news.MAX_PAGES = news.MAX_PAGES, 1
+    server.news_published[watchlist[0]] += 3 * news.PAGE_SIZE
+    counts = []
+    while not counts or counts[-1]:
+        counts.append(poll_incremental())
+    news.MAX_PAGES = max_pages
+    print(f"burst of {3 * news.PAGE_SIZE} articles with one page per poll: {counts[:-1]}")
+    assert sum(counts) == 3 * news.PAGE_SIZE
+
+    # Articles fetched without committing their cursors come back on the next poll.
+    server.news_published[watchlist[1]] += 3
+    first, moved = news.poll(watchlist, commit=False)
+    again, _ = news.poll(watchlist, commit=False)
+    assert len(first[watchlist[1]]) == 3 and first == again
+    news_cursors.get_store().commit(moved)
+    assert not any(news.poll(watchlist, commit=False)[0].values())
+    print("uncommitted articles were returned again, committed ones were not")
+
+    server.shutdown()
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
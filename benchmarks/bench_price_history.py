@@ -0,0 +1,142 @@
+"""
+Benchmark the columnar price history (functions/helpers/price_history.py).
+
+    append        record a trading week of one-minute quotes for many symbols
+    size          bytes per record on disk vs the same quotes as JSON
+    range query   one day of one symbol: binary search on the memmapped file
+                  vs scanning a list of dicts
+    volatility    returns and annualized volatility, vectorized vs a Python loop
+    prices at     price at 1,000 article times in one searchsorted call
+    concurrent    several processes appending to one series stay in
+                  timestamp order
+    repeat reads  a second worker (own tool cache) asking for the same quotes
+                  within the quote TTL is served from history, not FMP
+
+Usage:
+    python benchmarks/bench_price_history.py [--symbols 50] [--days 5]
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "functions"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ["HISTORY"] = "on"
+
+import numpy as np
+
+from helpers import price_history, tool_cache
+from stub_server import start_stub_server
+
+START = 1705314600.0  # 2024-01-15 10:30 UTC
+MINUTES_PER_DAY = 390
+
+
+def _timed(fn, repeat=20):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def _python_volatility(rows, step):
+    prices = [r["price"] for r in rows]
+    returns = [math.log(b / a) for a, b in zip(prices, prices[1:])]
+    return statistics.stdev(returns) * math.sqrt(price_history.SECONDS_PER_YEAR / step)
+
+
+def _append_now(directory, count):
+    """Worker process: append `count` quotes stamped with the current time to one series."""
+    series = price_history.HistoryStore(directory).quotes("SHARED")
+    for i in range(count):
+        series.append((time.time(), float(i)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--days", type=int, default=5)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="price_history_")
+    store = price_history.HistoryStore(directory)
+    price_history.set_store(store)
+    rng = random.Random(3)
+    symbols = [f"SYM{i}" for i in range(args.symbols)]
+    times = [START + day * 86400 + minute * 60 for day in range(args.days) for minute in range(MINUTES_PER_DAY)]
+    prices = {s: 100.0 for s in symbols}
+    rows = []
+
+    start = time.perf_counter()
+    for ts in times:
+        for symbol in symbols:
+            prices[symbol] *= math.exp(rng.gauss(0, 0.001))
+        store.record_quotes(prices, ts=ts)
+        rows.append({"symbol": symbols[0], "ts": ts, "price": prices[symbols[0]]})
+    elapsed = time.perf_counter() - start
+    count = len(times) * len(symbols)
+    print(f"append:       {count} quotes in {elapsed:.2f} s ({count / elapsed:,.0f}/s)")
+
+    on_disk = sum(os.path.getsize(os.path.join(directory, "quotes", f)) for f in os.listdir(os.path.join(directory, "quotes")))
+    as_json = len(json.dumps(rows)) * len(symbols)
+    print(f"size:         {on_disk / count:.0f} bytes/quote on disk vs {as_json / count:.0f} as JSON\n")
+
+    series = store.quotes(symbols[0])
+    day_start, day_end = START + 2 * 86400, START + 2 * 86400 + MINUTES_PER_DAY * 60
+    columnar, fast = _timed(lambda: series.range(day_start, day_end))
+    scanned, slow = _timed(lambda: [r for r in rows if day_start <= r["ts"] <= day_end])
+    assert len(columnar) == len(scanned) == MINUTES_PER_DAY
+    print(f"range query:  {fast * 1e6:8.1f} us columnar vs {slow * 1e6:8.1f} us scan ({slow / fast:.0f}x)")
+
+    all_records = series.read()
+    vol, fast = _timed(lambda: price_history.volatility(all_records["price"], 60))
+    expected, slow = _timed(lambda: _python_volatility(rows, 60))
+    assert abs(vol - expected) < 1e-9
+    print(f"volatility:   {fast * 1e6:8.1f} us vectorized vs {slow * 1e6:8.1f} us loop ({slow / fast:.0f}x), "
+          f"{vol:.1%} annualized")
+
+    at = np.sort(np.random.default_rng(1).uniform(times[0], times[-1], 1000))
+    looked_up, fast = _timed(lambda: store.prices_at(symbols[0], at))
+    assert not np.isnan(looked_up).any()
+    print(f"prices at:    {fast * 1e6:8.1f} us for {len(at)} article times")
+
+    workers = [multiprocessing.Process(target=_append_now, args=(directory, 2000)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    shared = store.quotes("SHARED").read()
+    assert np.all(np.diff(shared["ts"]) >= 0), "appends from several processes must stay in timestamp order"
+    print(f"concurrent:   {len(workers)} processes appended {len(shared)} of {len(workers) * 2000} quotes, "
+          f"in order (older ones dropped)\n")
+
+    server = start_stub_server(latency=0.02)
+    os.environ["FMP_BASE_URL"] = server.base_url
+    from get_stock_price import get_stock_prices
+
+    live = [f"LIVE{i}" for i in range(100)]
+    for worker in ("first", "second"):
+        # Each worker process has its own in-memory tool cache but shares the history directory.
+        tool_cache.set_cache(tool_cache.TTLCache(tool_cache.MemoryBackend()))
+        server.request_count = 0
+        start = time.perf_counter()
+        result = get_stock_prices(live)
+        elapsed = time.perf_counter() - start
+        assert len(result["prices"]) == len(live)
+        print(f"repeat reads: {worker:<6} worker {server.request_count} FMP requests, {elapsed * 1000:6.1f} ms")
+        if worker == "second":
+            assert server.request_count == 0
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
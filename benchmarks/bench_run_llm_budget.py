@@ -0,0 +1,95 @@
+"""
+Benchmark the run_llm prompt token budget against the stub LLM.
+
+    prompt budget   tokens sent for an oversized scraped page, with and
+                    without RUN_LLM_MAX_PROMPT_TOKENS enforcement
+    cache hit       time to answer the same oversized page again from the
+                    "llm" cache, which must not tokenize it
+
+Usage:
+    python benchmarks/bench_run_llm_budget.py [--latency 0.2] [--paragraphs 400]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "functions"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_server import start_stub_server
+
+MODEL = "openai/gpt-4.1"
+
+
+def scraped_page(paragraphs):
+    """Markdown shaped like a Firecrawl scrape: images, nav links and long paragraphs."""
+    nav = " ".join(f"[Section {i}](https://example.com/section/{i})" for i in range(40))
+    body = "\n\n\n".join(
+        f"![chart {i}](https://example.com/img/{i}.png)\n"
+        f"Paragraph {i}: revenue    grew and   margins held; see [the filing](https://example.com/f/{i}). " * 4
+        for i in range(paragraphs)
+    )
+    return f"Summarize this article about AAPL.\n\n{nav}\n\n{body}"
+
+
+async def measure(run_llm, llm, tool_cache, args):
+    page = scraped_page(args.paragraphs)
+    print(f"{'budget':<10} {'page tokens':>12} {'sent tokens':>12} {'compress+cut (ms)':>18}")
+    for budget in (10 ** 9, 4000, 1000):
+        start = time.perf_counter()
+        _, sent, _ = llm.fit_prompt(MODEL, page, budget)
+        elapsed = time.perf_counter() - start
+        original = llm._count_tokens(MODEL, page)
+        label = "none" if budget == 10 ** 9 else str(budget)
+        print(f"{label:<10} {original:>12} {sent:>12} {elapsed * 1000:>18.1f}")
+        assert sent <= budget
+
+    await run_llm.run_llm_async(MODEL, page, use_cache=False)
+    metrics = llm.llm_metrics()
+    print(f"\nrecorded calls: {metrics['calls']}, truncated: {metrics['truncated_calls']}, "
+          f"prompt tokens sent: {metrics['prompt_tokens']}")
+
+    tool_cache.set_cache(tool_cache.TTLCache(tool_cache.MemoryBackend()))
+    counted = []
+    count_tokens = llm._count_tokens
+    llm._count_tokens = lambda model, text: counted.append(len(text)) or count_tokens(model, text)
+    timings = []
+    for _ in range(2):
+        counted.clear()
+        start = time.perf_counter()
+        await run_llm.run_llm_async(MODEL, page)
+        timings.append((time.perf_counter() - start, len(counted)))
+    llm._count_tokens = count_tokens
+    (miss, miss_counts), (hit, hit_counts) = timings
+    print(f"\n{'cache':<10} {'time (ms)':>10} {'tokenizer calls':>16}")
+    print(f"{'miss':<10} {miss * 1000:>10.1f} {miss_counts:>16}")
+    print(f"{'hit':<10} {hit * 1000:>10.1f} {hit_counts:>16}")
+    assert hit_counts == 0, "a cache hit must not tokenize the prompt"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.2, help="stub delay before the first byte")
+    parser.add_argument("--paragraphs", type=int, default=400)
+    args = parser.parse_args()
+
+    server = start_stub_server(latency=args.latency)
+    os.environ["OPENAI_API_BASE"] = f"{server.base_url}/v1"
+    os.environ["OPENAI_API_KEY"] = "bench"
+    os.environ["RUN_LLM_MAX_PROMPT_TOKENS"] = "4000"
+    import run_llm
+    from helpers import llm, tool_cache
+
+    # Not asyncio.run: cancelling litellm's logging worker at loop teardown can hang.
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(measure(run_llm, llm, tool_cache, args))
+    server.shutdown()
+    sys.stdout.flush()
+    # ...and letting the interpreter garbage-collect it at exit can crash.
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
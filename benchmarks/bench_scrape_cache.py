@@ -0,0 +1,162 @@
+"""
+Benchmark the scrape store in front of Firecrawl against the stub server.
+
+    first run     a monitor pass over N article links (some differing only in
+                  tracking parameters, several in flight at once)
+    re-run        the same pass with a fresh process-wide store on the same
+                  directory, as after a restart: no Firecrawl scrapes
+    revalidate    entries past their TTL are checked with a conditional HEAD;
+                  only the page whose ETag changed is scraped again
+    burst         one URL requested concurrently from asyncio: one scrape
+    byte LRU      a store capped at a few pages keeps its blobs under the cap;
+                  shrinking the cap of a large store evicts in one pass
+    no revalidate with SCRAPE_REVALIDATE=off a scrape sends no HEAD
+
+Usage:
+    python benchmarks/bench_scrape_cache.py [--latency 0.05] [--articles 20]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "functions"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_server import start_stub_server
+from helpers import scrape_store, tool_cache
+
+
+def use_store(directory, ttl=scrape_store.TTL_SECONDS, stale=scrape_store.STALE_SECONDS,
+              max_bytes=scrape_store.MAX_BYTES):
+    backend = scrape_store.ScrapeStoreBackend(directory, max_bytes=max_bytes)
+    scrape_store.set_store(tool_cache.TTLCache(backend, ttls={"scrape": ttl}, stale={"scrape": stale}))
+    return backend
+
+
+def monitor_pass(scrape, urls, workers=8):
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(scrape, urls))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--articles", type=int, default=20)
+    args = parser.parse_args()
+
+    server = start_stub_server(latency=args.latency)
+    os.environ.update({
+        "FIRECRAWL_API_URL": server.base_url,
+        "FIRECRAWL_API_KEY": "fc-bench",
+    })
+    import scrape_web_page
+    from helpers import scraper
+
+    directory = tempfile.mkdtemp(prefix="scrape_cache_")
+    pages = [f"{server.base_url}/articles/AAPL/{i}" for i in range(args.articles)]
+    # Feeds link the same story with different tracking parameters.
+    urls = pages + [f"{url}/?utm_source=feed&utm_medium=rss" for url in pages[::2]]
+
+    print(f"{'pass':<12} {'urls':>5} {'time (s)':>9} {'scrapes':>8} {'HEADs':>6}")
+
+    def run(label, scrape, workers=8):
+        scrapes, heads = server.scrape_count, server.head_count
+        start = time.perf_counter()
+        results = monitor_pass(scrape, urls, workers)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<12} {len(urls):>5} {elapsed:>9.3f} {server.scrape_count - scrapes:>8} "
+              f"{server.head_count - heads:>6}")
+        return results, server.scrape_count - scrapes
+
+    os.environ["SCRAPE_CACHE"] = "off"
+    scrape_store.set_store(None)
+    _, uncached = run("uncached", scrape_web_page.scrape_webpage)
+    assert uncached == len(urls)
+
+    backend = use_store(directory)
+    first, scraped = run("first run", scrape_web_page.scrape_webpage)
+    assert scraped == len(pages), "tracking-parameter variants and in-flight duplicates share a scrape"
+
+    use_store(directory)
+    again, scraped = run("re-run", scrape_web_page.scrape_webpage)
+    assert scraped == 0, "a re-run must not scrape again"
+    assert [p["markdown"] for p in again] == [p["markdown"] for p in first]
+
+    use_store(directory, ttl=0, stale=0)
+    server.page_versions["/articles/AAPL/3"] = 2
+    revalidated, scraped = run("revalidate", scrape_web_page.scrape_webpage)
+    assert scraped == 1, "only the changed page is scraped again"
+    assert "(v2)" in revalidated[3]["markdown"]
+
+    raw = sum(len(p["markdown"]) for p in first[:len(pages)])
+    print(f"\nstore: {backend.total_bytes() / 1024:.1f} KiB compressed for {raw / 1024:.1f} KiB "
+          f"of markdown across {len(pages)} pages")
+
+    burst_dir = tempfile.mkdtemp(prefix="scrape_cache_")
+    use_store(burst_dir)
+
+    async def burst():
+        return await asyncio.gather(*(scrape_web_page.scrape_webpage_async(pages[0]) for _ in range(10)))
+
+    scrapes = server.scrape_count
+    asyncio.run(burst())
+    print(f"async burst: 10 concurrent calls, {server.scrape_count - scrapes} scrape")
+    assert server.scrape_count - scrapes == 1
+
+    lru_dir = tempfile.mkdtemp(prefix="scrape_cache_")
+    page_bytes = backend.total_bytes() // len(pages)
+    lru = use_store(lru_dir, max_bytes=page_bytes * 5)
+    monitor_pass(scrape_web_page.scrape_webpage, pages, workers=1)
+    stats = scraper.scrape_stats()
+    print(f"byte LRU: cap {page_bytes * 5} B, holding {lru.total_bytes()} B, "
+          f"{stats['cache']['evictions']} evictions")
+    assert lru.total_bytes() <= page_bytes * 5
+
+    big_dir = tempfile.mkdtemp(prefix="scrape_cache_")
+    big = scrape_store.ScrapeStoreBackend(big_dir)
+    for i in range(2000):
+        big.set(f"page:{i}", {"body": f"article {i} " * 20, "etag": None}, time.time() + i)
+    kept = big.total_bytes() // 10
+    start = time.perf_counter()
+    evicted = scrape_store.ScrapeStoreBackend(big_dir, max_bytes=kept).set("page:new", {"body": "x"}, time.time() + 3000)
+    elapsed = time.perf_counter() - start
+    (blobs,) = big._conn().execute("SELECT COUNT(*) FROM blobs").fetchone()
+    (keys,) = big._conn().execute("SELECT COUNT(*) FROM pages").fetchone()
+    print(f"bulk evict: {evicted} of 2001 keys in {elapsed * 1000:.0f} ms, {keys} keys and {blobs} blobs left")
+    assert big.total_bytes() <= kept and blobs == keys and evicted > 1500
+
+    conn = big._conn()
+    hit_keys = [key for (key,) in conn.execute("SELECT key FROM pages LIMIT 100")]
+    changes = conn.total_changes
+    start = time.perf_counter()
+    for key in hit_keys:
+        big.get(key)
+    elapsed = time.perf_counter() - start
+    hit_writes = conn.total_changes - changes
+    big.flush()
+    print(f"hits: {len(hit_keys)} in {elapsed * 1000:.0f} ms, {hit_writes} index writes, "
+          f"{conn.total_changes - changes - hit_writes} rows touched by one flush")
+    assert hit_writes == 0 and conn.total_changes - changes == len(hit_keys)
+
+    scrape_store.REVALIDATE = False
+    no_reval_dir = tempfile.mkdtemp(prefix="scrape_cache_")
+    use_store(no_reval_dir)
+    heads = server.head_count
+    monitor_pass(scrape_web_page.scrape_webpage, pages[:5], workers=1)
+    print(f"SCRAPE_REVALIDATE=off: 5 scrapes, {server.head_count - heads} HEADs")
+    assert server.head_count == heads
+    scrape_store.REVALIDATE = True
+
+    print(f"\nscrape_stats: { {k: v for k, v in stats.items() if k != 'cache'} }")
+    server.shutdown()
+    for path in (directory, burst_dir, lru_dir, big_dir, no_reval_dir):
+        shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
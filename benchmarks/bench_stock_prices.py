@@ -0,0 +1,60 @@
+"""
+Benchmark: per-symbol get_stock_price calls vs batched get_stock_prices.
+
+Usage:
+    python benchmarks/bench_stock_prices.py [--latency 0.02]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "functions"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Measure the transport, not the tool cache.
+os.environ.setdefault("TOOL_CACHE_BACKEND", "off")
+
+from stub_server import start_stub_server
+from get_stock_price import _parse_quote_chunk, get_stock_price, get_stock_prices
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.02, help="Stub latency per request in seconds")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50, 100, 500])
+    args = parser.parse_args()
+
+    server = start_stub_server(latency=args.latency)
+    os.environ["FMP_BASE_URL"] = server.base_url
+
+    print(f"{'symbols':>8} {'single (s)':>12} {'requests':>9} {'batch (s)':>10} {'requests':>9} {'speedup':>8}")
+    for size in args.sizes:
+        symbols = [f"SYM{i}" for i in range(size)]
+
+        server.request_count = 0
+        start = time.perf_counter()
+        for symbol in symbols:
+            get_stock_price(symbol)
+        single_time = time.perf_counter() - start
+        single_requests = server.request_count
+
+        server.request_count = 0
+        start = time.perf_counter()
+        result = get_stock_prices(symbols)
+        batch_time = time.perf_counter() - start
+        batch_requests = server.request_count
+        assert len(result["prices"]) == size and not result["errors"]
+
+        print(f"{size:>8} {single_time:>12.3f} {single_requests:>9} {batch_time:>10.3f} "
+              f"{batch_requests:>9} {single_time / batch_time:>7.1f}x")
+
+    # FMP reports a bad key or plan limit as a dict with status 200: every symbol gets the message.
+    failed = _parse_quote_chunk(["AAPL", "MSFT"], {"Error Message": "Invalid API KEY."})
+    assert not failed["prices"] and set(failed["errors"]) == {"AAPL", "MSFT"}
+    assert all("Invalid API KEY." in message for message in failed["errors"].values())
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
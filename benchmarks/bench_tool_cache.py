@@ -0,0 +1,119 @@
+"""
+Benchmark the tool cache: repeated quote/profile lookups with and without it,
+stale-while-revalidate latency, SQLite hit latency (hits do not write), and the
+SQLite backend shared across processes. Also checks that the memory backend
+hands out copies and that spellings of one call share a cache entry.
+
+Usage:
+    python benchmarks/bench_tool_cache.py [--latency 0.05]
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "functions"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_server import start_stub_server
+from helpers import tool_cache
+from get_stock_price import get_stock_price
+from get_stock_fundamentals import get_stock_fundamentals
+
+
+def timed_calls(fn, symbols, rounds):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(rounds):
+            for symbol in symbols:
+                fn(symbol)
+    return time.perf_counter() - start
+
+
+def worker_lookup(base_url, path, symbols):
+    os.environ["FMP_BASE_URL"] = base_url
+    tool_cache.set_cache(tool_cache.TTLCache(tool_cache.SQLiteBackend(path)))
+    for symbol in symbols:
+        get_stock_price(symbol)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    server = start_stub_server(latency=args.latency)
+    os.environ["FMP_BASE_URL"] = server.base_url
+    symbols = ["AAPL", "MSFT", "NVDA", "GOOGL"]
+
+    print(f"{'tool':<24} {'cache':>7} {'time (s)':>9} {'requests':>9}")
+    for name, fn in [("get_stock_price", get_stock_price), ("get_stock_fundamentals", get_stock_fundamentals)]:
+        for label, cache in [("off", None), ("memory", tool_cache.TTLCache(tool_cache.MemoryBackend()))]:
+            tool_cache.set_cache(cache)
+            os.environ["TOOL_CACHE_BACKEND"] = "off" if cache is None else "memory"
+            server.request_count = 0
+            elapsed = timed_calls(fn, symbols, args.rounds)
+            print(f"{name:<24} {label:>7} {elapsed:>9.3f} {server.request_count:>9}")
+
+    # Stale entries are served immediately and refreshed off the caller's path.
+    cache = tool_cache.TTLCache(tool_cache.MemoryBackend(), ttls={"quote": 0.2})
+    tool_cache.set_cache(cache)
+    get_stock_price("AAPL")
+    time.sleep(0.3)
+    start = time.perf_counter()
+    get_stock_price("AAPL")
+    stale_latency = time.perf_counter() - start
+    time.sleep(args.latency * 3)
+    print(f"stale read latency: {stale_latency * 1000:.2f} ms (stub latency {args.latency * 1000:.0f} ms)")
+    print(f"memory stats: {cache.stats}")
+
+    # A caller editing a cached value does not change what the next caller gets.
+    cache = tool_cache.TTLCache(tool_cache.MemoryBackend())
+    cache.store("quote", "AAPL", {"price": 1.0})
+    cache.lookup("quote", "AAPL")[0]["price"] = 2.0
+    assert cache.lookup("quote", "AAPL")[0] == {"price": 1.0}, "memory backend must hand out copies"
+
+    # "aapl", " AAPL" and symbol="AAPL" are one call, so one upstream request.
+    tool_cache.set_cache(tool_cache.TTLCache(tool_cache.MemoryBackend()))
+    server.request_count = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for call in (lambda: get_stock_fundamentals("aapl"), lambda: get_stock_fundamentals(" AAPL"),
+                     lambda: get_stock_fundamentals(symbol="AAPL")):
+            call()
+    print(f"fundamentals for aapl, ' AAPL', symbol='AAPL': {server.request_count} upstream request")
+    assert server.request_count == 1, "spellings of one call must share a cache entry"
+
+    # Hits on the SQLite backend only record the access in memory.
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = tool_cache.SQLiteBackend(os.path.join(tmp, "tool_cache.db"))
+        cache = tool_cache.TTLCache(backend)
+        cache.store("quote", "AAPL", {"price": 1.0})
+        changes = backend._conn().total_changes
+        start = time.perf_counter()
+        for _ in range(2000):
+            cache.lookup("quote", "AAPL")
+        elapsed = time.perf_counter() - start
+        writes = backend._conn().total_changes - changes
+        print(f"sqlite hits: {elapsed / 2000 * 1e6:.0f} us each, {writes} row writes for 2000 hits")
+        assert writes <= 2000 // tool_cache.TOUCH_FLUSH_ENTRIES
+
+    # Two worker processes share one on-disk cache: the second sees no misses.
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tool_cache.db")
+        server.request_count = 0
+        for _ in range(2):
+            proc = multiprocessing.Process(target=worker_lookup, args=(server.base_url, path, symbols))
+            proc.start()
+            proc.join()
+        print(f"sqlite backend, 2 processes x {len(symbols)} symbols: {server.request_count} upstream requests")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
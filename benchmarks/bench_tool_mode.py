@@ -0,0 +1,111 @@
+"""
+Benchmark `exec_mode: tool` skills (ToolSkillAgent) against the same skills
+built as LlmAgents, on the stock_fundamentals agent of a scratch DB.
+
+The root and every LLM skill use a scripted stand-in for LiteLlm with a fixed
+latency (a gpt-4.1 round-trip); tools reach the stub server. Each request is
+routed by the root to one skill:
+
+    llm     root -> skill model (decides the tool call) -> tool -> skill
+            model (phrases the result)
+    tool    root -> tool; the skill fills the symbol from the request
+
+A request without a recognizable symbol shows the fallback to the model.
+
+Usage:
+    python benchmarks/bench_tool_mode.py [--runs 10] [--model-latency 0.5]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from runner_env import prepare_db, use_scratch_db
+
+use_scratch_db()
+os.environ.update({
+    "WOWBITS_AGENT_SNAPSHOT": "0", "WOWBITS_BYTECODE_CACHE": "0", "TOOL_CACHE_BACKEND": "off", "HISTORY": "off",
+})
+
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from scripted_llm import ScriptedLlm
+from stub_server import start_stub_server
+
+REQUESTS = [
+    ("get_stock_price", "What is the price of AAPL right now?"),
+    ("get_stock_fundamentals", "Get me the fundamentals of $MSFT"),
+]
+TOOL_SKILLS = ("get_stock_price", "get_stock_fundamentals")
+
+
+async def ask(runner, text):
+    session = await runner.session_service.create_session(app_name="bench", user_id="bench")
+    answer = None
+    async for event in runner.run_async(user_id="bench", session_id=session.id,
+                                        new_message=types.Content(role="user", parts=[types.Part(text=text)])):
+        if event.content and event.content.parts and event.content.parts[0].text:
+            answer = (event.author, event.content.parts[0].text)
+    return answer
+
+
+async def measure(root, llm, runs):
+    runner = InMemoryRunner(agent=root, app_name="bench")
+    results = {}
+    for skill, text in REQUESTS + [("get_stock_price", "What is Apple's stock price?")]:
+        llm.route = skill
+        await ask(runner, text)  # warm up
+        llm.calls = 0
+        start = time.perf_counter()
+        for _ in range(runs):
+            answer = await ask(runner, text)
+        results[text] = ((time.perf_counter() - start) / runs, llm.calls / runs, answer)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--model-latency", type=float, default=0.5, help="seconds per model call")
+    parser.add_argument("--latency", type=float, default=0.02, help="stub FMP latency in seconds")
+    args = parser.parse_args()
+
+    server = start_stub_server(latency=args.latency)
+    os.environ["FMP_BASE_URL"] = server.base_url
+    logging.disable(logging.INFO)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import wowbits_runtime as runtime
+
+    llm = ScriptedLlm(latency=args.model_latency)
+    runtime._shared_model = lambda name: llm
+    measured = {}
+    for mode in ("llm", "tool"):
+        root = runtime.create_agent(prepare_db(TOOL_SKILLS, tool_mode=mode == "tool"))
+        kinds = {agent.name: type(agent).__name__ for agent in root.sub_agents}
+        assert (kinds["get_stock_price"] == "ToolSkillAgent") == (mode == "tool"), kinds
+        measured[mode] = asyncio.run(measure(root, llm, args.runs))
+
+    print(f"model latency {args.model_latency:.2f} s, FMP stub latency {args.latency:.3f} s, {args.runs} runs\n")
+    print(f"{'request':<40} {'llm ms':>8} {'calls':>6} {'tool ms':>8} {'calls':>6}")
+    for text, (llm_time, llm_calls, _) in measured["llm"].items():
+        tool_time, tool_calls, _ = measured["tool"][text]
+        print(f"{text:<40} {llm_time * 1000:>8.0f} {llm_calls:>6.1f} {tool_time * 1000:>8.0f} {tool_calls:>6.1f}")
+    price_answer = measured["tool"][REQUESTS[0][1]][2]
+    assert price_answer[0] == "get_stock_price" and float(price_answer[1]) > 0, price_answer
+    fundamentals_answer = measured["tool"][REQUESTS[1][1]][2]
+    assert "MSFT Inc." in fundamentals_answer[1] and "truncated" in fundamentals_answer[1], "trimmed like an LLM skill"
+    fallback = measured["tool"]["What is Apple's stock price?"]
+    assert fallback[1] > 1 and fallback[2][0] == "get_stock_price_llm", "no symbol: the skill's model answers"
+    print(f"\ntool mode answer: {price_answer[0]}: {price_answer[1]}; {fundamentals_answer[1][:80]}...")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
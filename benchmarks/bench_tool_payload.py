@@ -0,0 +1,89 @@
+"""
+Benchmark tool result trimming (functions/helpers/tool_payload.py).
+
+Calls the data tools against the stub and passes each result through the
+after_tool_callback the runtime installs on every skill, reporting the
+estimated tokens the model would get with and without it:
+
+    default     DEFAULT_LIMITS (description and article text capped,
+                image_url and scrape metadata dropped)
+    skill       a skill config asking get_stock_news for title/url/date only
+    caller      the tool's own `fields` argument
+
+Usage:
+    python benchmarks/bench_tool_payload.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from runner_env import use_scratch_db
+
+use_scratch_db()
+os.environ.update({
+    "TOOL_CACHE_BACKEND": "off", "SCRAPE_CACHE": "off", "HISTORY": "off",
+    "NEWS_CURSOR_PATH": os.path.join(tempfile.mkdtemp(prefix="news_cursors_"), "news_cursors.db"),
+})
+
+from stub_server import start_stub_server
+
+
+def main():
+    server = start_stub_server()
+    os.environ.update({
+        "FMP_BASE_URL": server.base_url, "FIRECRAWL_API_URL": server.base_url, "FIRECRAWL_API_KEY": "bench",
+    })
+    from helpers import tool_payload
+    import wowbits_runtime
+    from get_new_stock_news import get_new_stock_news
+    from get_stock_fundamentals import get_stock_fundamentals
+    from get_stock_news import get_stock_news
+    from scrape_web_page import scrape_web_page
+
+    default = wowbits_runtime._tool_payload_callback(SimpleNamespace(default_model_config={}))
+    skill = wowbits_runtime._tool_payload_callback(SimpleNamespace(default_model_config={
+        "tool_payloads": {"get_stock_news": {"fields": ["title", "url", "published_date"]}},
+    }))
+    results = {
+        "get_stock_fundamentals": get_stock_fundamentals("AAPL"),
+        "get_stock_news": get_stock_news("AAPL"),
+        "get_new_stock_news": get_new_stock_news(["AAPL", "MSFT"]),
+        "scrape_web_page": scrape_web_page(f"{server.base_url}/articles/AAPL/0"),
+    }
+
+    print(f"{'tool':<24} {'raw':>7} {'default':>8} {'skill':>7}   (estimated tokens)")
+    total_raw = total_default = 0
+    for name, result in results.items():
+        tool = SimpleNamespace(name=name)
+        start = time.perf_counter()
+        trimmed = default(tool, {}, None, result) or result
+        elapsed = time.perf_counter() - start
+        by_skill = skill(tool, {}, None, result) or result
+        raw_tokens = tool_payload.estimate_tokens(result)
+        total_raw += raw_tokens
+        total_default += tool_payload.estimate_tokens(trimmed)
+        print(f"{name:<24} {raw_tokens:>7} {tool_payload.estimate_tokens(trimmed):>8} "
+              f"{tool_payload.estimate_tokens(by_skill):>7}   ({elapsed * 1000:.2f} ms)")
+    print(f"{'total':<24} {total_raw:>7} {total_default:>8}  -{1 - total_default / total_raw:.0%}\n")
+
+    news = results["get_stock_news"]
+    assert all("image_url" not in a for a in default(SimpleNamespace(name="get_stock_news"), {}, None, news))
+    caller = get_stock_news("AAPL", fields=["title", "url"])
+    assert set(caller[0]) == {"title", "url"}
+    print(f"caller fields=['title', 'url']: {tool_payload.estimate_tokens(caller)} tokens")
+    fundamentals = asyncio.run(wowbits_runtime.load_python_function(
+        SimpleNamespace(name="get_stock_fundamentals",
+                        code=open(os.path.join(wowbits_runtime.FUNCTIONS_DIR, "get_stock_fundamentals.py")).read())
+    )("AAPL", fields=["marketCap", "sector"]))
+    assert set(fundamentals) == {"marketCap", "sector"}, "async variant loaded by the runtime takes fields too"
+    print(f"payload stats: {tool_payload.payload_stats()}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark tracing (functions/helpers/tracing.py) on a real ADK run of stock_fundamentals.
+
+The scratch DB's agent runs its three skills in parallel, with the tool code
+from functions/ and a scripted model that calls every tool of a skill once and
+then answers. Tools reach the stub server (FMP and the run_llm completion).
+
+    overhead   time per run with TRACE_EXPORTER off vs jsonl, and the cost of
+               the tool wrapper on a call that does nothing
+    report     the trace_report breakdown of one traced run
+
+Usage:
+    python benchmarks/bench_tracing.py [--runs 50] [--latency 0.02]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from runner_env import prepare_db, use_scratch_db
+
+use_scratch_db()
+os.environ.update({
+    "WOWBITS_AGENT_SNAPSHOT": "0", "WOWBITS_BYTECODE_CACHE": "0",
+    "TOOL_CACHE_BACKEND": "off", "HISTORY": "off", "TRACE_EXPORTER": "off",
+})
+
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from scripted_llm import ScriptedLlm
+from stub_server import start_stub_server
+
+
+async def run(root, runs):
+    runner = InMemoryRunner(agent=root, app_name="bench")
+    start = time.perf_counter()
+    for _ in range(runs):
+        session = await runner.session_service.create_session(app_name="bench", user_id="bench")
+        async for _ in runner.run_async(user_id="bench", session_id=session.id,
+                                        new_message=types.Content(role="user", parts=[types.Part(text="AAPL")])):
+            pass
+    return (time.perf_counter() - start) / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.02, help="stub and model latency in seconds")
+    args = parser.parse_args()
+
+    server = start_stub_server(latency=args.latency)
+    os.environ.update({"FMP_BASE_URL": server.base_url, "OPENAI_API_BASE": f"{server.base_url}/v1"})
+    logging.disable(logging.INFO)
+    # ADK's own OpenTelemetry spans log "Failed to detach context" for ParallelAgent branches, traced or not.
+    logging.getLogger("opentelemetry.context").setLevel(logging.CRITICAL)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import trace_report
+        from helpers import tracing
+        import wowbits_runtime as runtime
+
+    agent_id = prepare_db(agent_exec_mode="PARALLEL")
+    runtime._shared_model = lambda name: ScriptedLlm(latency=args.latency)
+
+    root = runtime.create_agent(agent_id)
+    asyncio.run(run(root, 3))  # warm up imports, clients and connections
+    untraced = asyncio.run(run(root, args.runs))
+    trace_path = os.path.join(tempfile.mkdtemp(prefix="traces_"), "traces.jsonl")
+    tracing.set_exporter(tracing.JsonlExporter(trace_path))
+    traced = asyncio.run(run(runtime.create_agent(agent_id), args.runs))
+    tracing.flush()
+    traces = trace_report.group_traces(trace_report.load_spans(trace_path))
+    assert len(traces) == args.runs, f"one trace per run, got {len(traces)}"
+    print(f"run:        {untraced * 1000:.1f} ms untraced, {traced * 1000:.1f} ms traced "
+          f"({(traced - untraced) * 1000:+.2f} ms, {len(next(iter(traces.values())))} spans per run)")
+
+    def noop(symbol: str) -> dict:
+        return {"symbol": symbol}
+
+    wrapped = tracing.wrap_tool(noop)
+    calls = 20000
+    timings = []
+    for fn in (noop, wrapped):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn("AAPL")
+        timings.append((time.perf_counter() - start) / calls * 1e6)
+    tracing.set_exporter(None)
+    print(f"wrapper:    {timings[0]:.2f} us per bare call, {timings[1]:.2f} us wrapped "
+          f"(standalone span per call, exporter queue included)\n")
+
+    trace_id = max(traces, key=lambda t: max(s["end"] for s in traces[t]))
+    spans = traces[trace_id]
+    skills = {row["skill"] for row in trace_report.skill_breakdown(spans)}
+    assert skills == {"stock_fundamentals", "get_stock_fundamentals", "analyze_stock_fundamentals",
+                      "get_stock_price"}, skills
+    tools = {row["tool"]: row for row in trace_report.tool_breakdown(spans)}
+    assert tools["get_stock_fundamentals"]["http_requests"] >= 1, "FMP requests are counted on the tool"
+    assert tools["run_llm"]["run_llm_tokens"] > 0, "inner run_llm tokens are counted on the tool"
+    trace_report.print_report(trace_id, spans)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
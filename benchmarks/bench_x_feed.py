@@ -0,0 +1,98 @@
+"""
+Benchmark the multi-ticker X feed against the stub search endpoint.
+
+    per ticker    get_stock_twitter_feed once per ticker
+    packed        get_stock_twitter_feeds: cashtags OR-ed into <=512 char
+                  queries, tweets demultiplexed per ticker
+    since_last    repeat poll after a few new posts: one page per query, only
+                  the new tweets, also when the tickers are packed differently
+    rate limit    a window that resets in a second is waited out; a long one
+                  stops the poll at once with "rate_limited_until", and a 429
+                  is not retried by the HTTP client
+
+Usage:
+    python benchmarks/bench_x_feed.py [--tickers 200] [--latency 0.05]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "functions"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_server import publish_posts, start_stub_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = start_stub_server(latency=args.latency)
+    os.environ.update({"X_API_BASE_URL": server.base_url, "X_BEARER_TOKEN": "bench"})
+    from get_stock_twitter_feed import get_stock_twitter_feed
+    import get_stock_twitter_feeds as feeds
+
+    tickers = [f"S{i:03d}" for i in range(args.tickers)]
+    print(f"{'mode':<12} {'requests':>9} {'tweets':>7} {'time (s)':>9}")
+
+    def run(label, fn):
+        before = server.x_search_count
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        return result, server.x_search_count - before, elapsed
+
+    result, requests, elapsed = run("per ticker", lambda: [get_stock_twitter_feed(t) for t in tickers])
+    print(f"{'per ticker':<12} {requests:>9} {sum(r['tweet_count'] for r in result):>7} {elapsed:>9.3f}")
+
+    result, requests, elapsed = run("packed", lambda: feeds.get_stock_twitter_feeds(tickers, since_last=True))
+    total = sum(f["tweet_count"] for f in result["feeds"].values())
+    print(f"{'packed':<12} {requests:>9} {total:>7} {elapsed:>9.3f}   "
+          f"({len(feeds._pack_queries(tickers))} queries, {len(result['truncated'])} tickers truncated)")
+    assert max(len(q) for q in server.x_queries) <= feeds.QUERY_MAX_CHARS
+    for ticker, feed in result["feeds"].items():
+        assert all(f"${ticker}" in t["text"] for t in feed["tweets"]), "tweets must be demultiplexed"
+
+    fresh = {t: 3 for t in tickers[::40]}
+    for ticker, count in fresh.items():
+        publish_posts(server, ticker, count)
+    result, requests, elapsed = run("since_last", lambda: feeds.get_stock_twitter_feeds(tickers, since_last=True))
+    got = {t: f["tweet_count"] for t, f in result["feeds"].items() if f["tweet_count"]}
+    print(f"{'since_last':<12} {requests:>9} {sum(got.values()):>7} {elapsed:>9.3f}")
+    assert got == fresh, got
+
+    # Packed differently, a query starts at the oldest since_id of its tickers;
+    # tweets a ticker already got must not come back.
+    publish_posts(server, tickers[1], 2)
+    alone = feeds.get_stock_twitter_feeds(tickers[1:2], since_last=True)["feeds"][tickers[1]]["tweet_count"]
+    publish_posts(server, tickers[0], 1)
+    result = feeds.get_stock_twitter_feeds(tickers[:2], since_last=True)
+    repacked = {t: f["tweet_count"] for t, f in result["feeds"].items()}
+    print(f"{'repacked':<12} {alone} new alone, then {repacked} polled together")
+    assert alone == 2 and repacked == {tickers[0]: 1, tickers[1]: 0}, repacked
+
+    server.x_rate_limit, server.x_window, server.x_window_reset = 2, 1.0, 0.0
+    result, requests, elapsed = run("short limit", lambda: feeds.get_stock_twitter_feeds(tickers[:100]))
+    print(f"\n1s window, 2 requests: {requests} requests in {elapsed:.2f}s, errors: {len(result['errors'])}")
+    assert not result["errors"]
+
+    server.x_rate_limit, server.x_window, server.x_window_reset = 1, 60.0, 0.0
+    result, requests, elapsed = run("long limit", lambda: feeds.get_stock_twitter_feeds(tickers))
+    print(f"60s window, 1 request: {requests} requests in {elapsed:.2f}s, "
+          f"{len(result['errors'])} tickers deferred until {result['rate_limited_until']}")
+    assert result["rate_limited_until"] and elapsed < 5
+
+    # A 429 is answered from x-rate-limit-reset alone, not retried by the HTTP client as well.
+    feeds._rate_limited_until = 0.0
+    server.x_rate_limit, server.x_window, server.x_window_reset = 0, 60.0, 0.0
+    result, requests, elapsed = run("429", lambda: feeds.get_stock_twitter_feeds(tickers[:1]))
+    print(f"429 response: {requests} request(s) in {elapsed:.2f}s")
+    assert requests == 1 and result["rate_limited_until"], requests
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""
+Offline load harness: drives the tools and create_agent() end to end against
+the stub server replaying recorded FMP / X / Firecrawl / LLM responses
+(benchmarks/fixtures/), with configurable latency and error injection.
+
+Scenarios (--scenario, repeatable; all by default):
+
+    tool.price          get_stock_price_async
+    tool.fundamentals   get_stock_fundamentals_async
+    tool.news           get_new_stock_news_async (news polling)
+    tool.x_feed         get_stock_twitter_feeds_async
+    tool.scrape         scrape_webpage_async
+    tool.run_llm        run_llm_async
+    tool.news_summary   summarize_stock_news_async (FMP + Firecrawl + LLM)
+    agent.build         create_agent() of stock_fundamentals from the scratch DB
+    agent.price         a user turn routed by the root model to get_stock_price
+    agent.fundamentals  ... to get_stock_fundamentals
+    agent.analysis      ... to analyze_stock_fundamentals (run_llm inside)
+
+Agent turns run through ADK's InMemoryRunner with the real LiteLlm client
+pointed at the stub (OPENAI_API_BASE), so every model round-trip is an HTTP
+call; the stub model transfers to the scenario's skill and calls every tool
+it is offered. Skills use the exec_mode of the shipped YAML (tool for
+get_stock_price / get_stock_fundamentals) unless --exec-mode llm.
+
+Per scenario it reports p50/p95 latency, throughput, upstream calls per
+request by provider, failed requests, the peak Python allocation of a pass of
+--concurrency requests (tracemalloc) and the RSS growth over the timed pass.
+--save writes the results as JSON; --compare checks them against a saved run
+and exits 1 when p50/p95 or calls per request regress past --tolerance.
+
+Usage:
+    python benchmarks/harness.py [--requests 50] [--concurrency 5]
+        [--scenario tool.price ...] [--latency 0.02] [--provider-latency llm=0.3]
+        [--error-rate fmp=0.05] [--save out.json] [--compare baseline.json]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from runner_env import prepare_db, use_scratch_db
+
+use_scratch_db()
+_workspace = tempfile.mkdtemp(prefix="wowbits-harness-")
+os.environ.update({
+    "WOWBITS_AGENT_SNAPSHOT": "0", "WOWBITS_BYTECODE_CACHE": "0", "HISTORY": "off", "TRACE_EXPORTER": "off",
+    "SCRAPE_CACHE": "off", "NEWS_CURSOR_PATH": os.path.join(_workspace, "news_cursors.db"),
+    "FMP_API_KEY": "bench", "X_BEARER_TOKEN": "bench", "FIRECRAWL_API_KEY": "fc-bench", "OPENAI_API_KEY": "bench",
+    "NEWS_SUMMARY_MODEL": "openai/gpt-4.1",
+})
+
+from stub_server import FIXTURES_DIR, start_stub_server
+
+PROVIDERS = ("fmp", "x", "firecrawl", "llm", "pages")
+AGENT_TURNS = {
+    "agent.price": ("get_stock_price", "What is the price of {ticker} right now?"),
+    "agent.fundamentals": ("get_stock_fundamentals", "Get me the fundamentals of ${ticker}"),
+    "agent.analysis": ("analyze_stock_fundamentals", "Analyze the fundamentals of {ticker}"),
+}
+TOOL_SKILLS = ("get_stock_price", "get_stock_fundamentals")
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def by_provider(option):
+    """Parse repeated "provider=value" options; a bare value applies to every provider."""
+    values = {}
+    for item in option or []:
+        provider, _, value = item.rpartition("=")
+        for name in ([provider] if provider else PROVIDERS):
+            if name not in PROVIDERS:
+                sys.exit(f"Unknown provider {name!r}; one of {', '.join(PROVIDERS)}")
+            values[name] = float(value)
+    return values
+
+
+def tool_scenarios(tickers):
+    """Scenario name -> coroutine function running request i."""
+    from get_new_stock_news import get_new_stock_news_async
+    from get_stock_fundamentals import get_stock_fundamentals_async
+    from get_stock_price import get_stock_price_async
+    from get_stock_twitter_feeds import get_stock_twitter_feeds_async
+    from run_llm import run_llm_async
+    from scrape_web_page import scrape_webpage_async
+    from summarize_stock_news import summarize_stock_news_async
+
+    def ticker(i):
+        return tickers[i % len(tickers)]
+
+    return {
+        "tool.price": lambda i: get_stock_price_async(ticker(i)),
+        "tool.fundamentals": lambda i: get_stock_fundamentals_async(ticker(i)),
+        "tool.news": lambda i: get_new_stock_news_async([ticker(i)]),
+        "tool.x_feed": lambda i: get_stock_twitter_feeds_async([ticker(i)]),
+        "tool.scrape": lambda i: scrape_webpage_async(f"https://news.example.com/{ticker(i)}/{i}"),
+        "tool.run_llm": lambda i: run_llm_async("openai/gpt-4.1", f"Summarize the fundamentals of {ticker(i)}"),
+        "tool.news_summary": lambda i: summarize_stock_news_async(ticker(i)),
+    }
+
+
+def agent_scenarios(tickers, agent_id, server):
+    from google.adk.runners import InMemoryRunner
+    from google.genai import types
+
+    import wowbits_runtime as runtime
+
+    runner = InMemoryRunner(agent=runtime.create_agent(agent_id), app_name="harness")
+
+    def turn(route, text):
+        async def run(i):
+            server.llm_route = route
+            session = await runner.session_service.create_session(app_name="harness", user_id="harness")
+            answer = None
+            message = types.Content(role="user", parts=[types.Part(text=text.format(ticker=tickers[i % len(tickers)]))])
+            async for event in runner.run_async(user_id="harness", session_id=session.id, new_message=message):
+                if event.error_code:
+                    raise RuntimeError(f"{event.author}: {event.error_code} {event.error_message}")
+                if event.content and event.content.parts and event.content.parts[0].text:
+                    answer = event.content.parts[0].text
+            if not answer:
+                raise RuntimeError("the turn ended without an answer")
+            return answer
+        return run
+
+    async def build(i):
+        return runtime.create_agent(agent_id)
+
+    scenarios = {"agent.build": build}
+    scenarios.update({name: turn(route, text) for name, (route, text) in AGENT_TURNS.items()})
+    return scenarios
+
+
+def failed(result):
+    """Tools report most failures in their result instead of raising."""
+    return isinstance(result, dict) and bool(result.get("error"))
+
+
+async def run_requests(fn, start, count, concurrency):
+    """Run requests start..start+count-1 with at most `concurrency` in flight; returns (latencies, failures)."""
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = []
+
+    async def one(i):
+        async with slots:
+            began = time.perf_counter()
+            try:
+                if failed(await fn(i)):
+                    failures.append(i)
+            except Exception as e:
+                failures.append(f"{type(e).__name__}: {e}")
+            latencies.append(time.perf_counter() - began)
+
+    await asyncio.gather(*(one(i) for i in range(start, start + count)))
+    return latencies, failures
+
+
+async def measure(name, fn, server, requests, concurrency):
+    if name == "agent.build":
+        concurrency = 1  # synchronous: requests would only queue behind each other
+    await run_requests(fn, 0, min(concurrency, 3), concurrency)  # warm up imports, clients and connections
+
+    calls = server.calls.copy()
+    errors = server.errors.copy()
+    rss = rss_mb()
+    began = time.perf_counter()
+    latencies, failures = await run_requests(fn, 1000, requests, concurrency)
+    wall = time.perf_counter() - began
+    rss_growth = rss_mb() - rss
+    calls = server.calls - calls
+    errors = server.errors - errors
+
+    tracemalloc.start()
+    await run_requests(fn, 2000, concurrency, concurrency)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "throughput_rps": requests / wall,
+        "calls_per_request": {p: n / requests for p, n in sorted(calls.items())},
+        "injected_errors": dict(errors),
+        "failed": len(failures),
+        "first_failure": str(failures[0]) if failures else None,
+        "peak_kib": peak / 1024,
+        "rss_growth_mb": rss_growth,
+    }
+
+
+def print_results(results):
+    print(f"{'scenario':<20} {'reqs':>5} {'conc':>4} {'p50 ms':>8} {'p95 ms':>8} {'req/s':>7} {'failed':>6} "
+          f"{'peak KiB':>9} {'rss +MB':>7}  calls per request")
+    for name, r in results.items():
+        calls = " ".join(f"{p} {n:g}" for p, n in r["calls_per_request"].items()) or "-"
+        injected = sum(r["injected_errors"].values())
+        if injected:
+            calls += f" ({injected} injected errors)"
+        print(f"{name:<20} {r['requests']:>5} {r['concurrency']:>4} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['throughput_rps']:>7.1f} {r['failed']:>6} {r['peak_kib']:>9.0f} {r['rss_growth_mb']:>7.1f}  {calls}")
+    for name, r in results.items():
+        if r["first_failure"]:
+            print(f"  {name}: first failure: {r['first_failure']}")
+
+
+def compare(results, baseline, tolerance):
+    """Print the change against a saved run; returns the regressions past `tolerance` (a fraction)."""
+    regressions = []
+    print(f"\n{'scenario':<20} {'p50':>8} {'p95':>8} {'calls':>8}   vs baseline")
+    for name, r in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        base_calls = sum(base["calls_per_request"].values())
+        calls = sum(r["calls_per_request"].values())
+        changes = {
+            "p50": r["p50_ms"] / base["p50_ms"] - 1 if base["p50_ms"] else 0.0,
+            "p95": r["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0,
+            "calls": calls / base_calls - 1 if base_calls else float(calls > 0),
+        }
+        worse = [k for k, v in changes.items() if v > tolerance]
+        regressions += [f"{name} {k} {changes[k]:+.0%}" for k in worse]
+        print(f"{name:<20} {changes['p50']:>+8.0%} {changes['p95']:>+8.0%} {changes['calls']:>+8.0%}   "
+              f"{'REGRESSION ' + ', '.join(worse) if worse else 'ok'}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", help="scenario name, or a prefix such as tool.")
+    parser.add_argument("--requests", type=int, default=50, help="timed requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.02, help="stub latency in seconds for every provider")
+    parser.add_argument("--provider-latency", action="append", metavar="PROVIDER=SECONDS",
+                        help=f"override the latency of one provider ({', '.join(PROVIDERS)})")
+    parser.add_argument("--error-rate", action="append", metavar="[PROVIDER=]RATE",
+                        help="fraction of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the injected errors")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="directory of recorded responses")
+    parser.add_argument("--exec-mode", choices=("tool", "llm"), default="tool",
+                        help="exec_mode of get_stock_price / get_stock_fundamentals (the YAML ships tool)")
+    parser.add_argument("--cache", action="store_true", help="keep the in-memory tool cache on")
+    parser.add_argument("--save", metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="compare with results written by --save")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression with --compare")
+    args = parser.parse_args()
+
+    os.environ["TOOL_CACHE_BACKEND"] = "memory" if args.cache else "off"
+    server = start_stub_server(latency=args.latency, fixtures=args.fixtures, seed=args.seed)
+    server.latencies.update(by_provider(args.provider_latency))
+    server.error_rates.update(by_provider(args.error_rate))
+    server.error_status = args.error_status
+    os.environ.update({
+        "FMP_BASE_URL": server.base_url, "X_API_BASE_URL": server.base_url, "FIRECRAWL_API_URL": server.base_url,
+        "OPENAI_API_BASE": f"{server.base_url}/v1",
+    })
+    logging.disable(logging.WARNING)
+    # ADK's own OpenTelemetry spans log "Failed to detach context" for ParallelAgent branches.
+    logging.getLogger("opentelemetry.context").setLevel(logging.CRITICAL)
+
+    tickers = sorted(server.fixtures["quote"])
+    with contextlib.redirect_stdout(io.StringIO()):
+        scenarios = tool_scenarios(tickers)
+        agent_id = prepare_db(TOOL_SKILLS, tool_mode=args.exec_mode == "tool")
+        scenarios.update(agent_scenarios(tickers, agent_id, server))
+
+    selected = [name for name in scenarios
+                if not args.scenario or any(name == s or (s.endswith(".") and name.startswith(s))
+                                            for s in args.scenario)]
+    if not selected:
+        sys.exit(f"No scenario matches {args.scenario}; one of {', '.join(scenarios)}")
+
+    async def run_all():
+        results = {}
+        for name in selected:
+            with contextlib.redirect_stdout(io.StringIO()):
+                results[name] = await measure(name, scenarios[name], server, args.requests, args.concurrency)
+        return results
+
+    # Not asyncio.run: cancelling litellm's logging worker at loop shutdown can hang.
+    results = asyncio.new_event_loop().run_until_complete(run_all())
+    latencies = ", ".join(f"{p} {s * 1000:g} ms" for p, s in sorted(server.latencies.items()))
+    rates = ", ".join(f"{p} {r:.0%}" for p, r in sorted(server.error_rates.items()))
+    print(f"stub latency {args.latency * 1000:g} ms{' (' + latencies + ')' if latencies else ''}, "
+          f"error rate {rates or 'none'}, tool cache {'memory' if args.cache else 'off'}, "
+          f"exec_mode {args.exec_mode}\n")
+    print_results(results)
+    server.shutdown()
+
+    status = 0
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"settings": vars(args), "scenarios": results}, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["scenarios"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) past {args.tolerance:.0%}: {'; '.join(regressions)}")
+            status = 1
+    sys.stdout.flush()
+    # litellm's logging worker can crash the interpreter while it is torn down.
+    os._exit(status)
+
+
+if __name__ == "__main__":
+    main()
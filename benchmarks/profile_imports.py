@@ -0,0 +1,121 @@
+"""
+Import-time profile of the runner and the heavier tools, from
+`python -X importtime` in a fresh process per run.
+
+    runtime   import wowbits_runtime
+    agent     import stock_fundamentals (builds root_agent from a
+              scratch DB holding the tool code from functions/)
+    run_llm   import run_llm
+    scrape    import scrape_web_page
+
+For each target it prints the wall time of the import statement, the total
+import time reported by -X importtime, the number of modules imported and
+which of the deferrable imports (litellm, firecrawl, ADK's MCP toolset,
+dotenv) were loaded, then the packages taking the most import time (self time
+summed over their modules). Numbers are the median of --runs processes.
+
+Usage:
+    python benchmarks/profile_imports.py [--runs 5] [--top 8] [--target agent ...]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from runner_env import REPO_ROOT, prepare_db, use_scratch_db
+
+TARGETS = {
+    "runtime": "import wowbits_runtime",
+    "agent": "import stock_fundamentals",
+    "run_llm": "import run_llm",
+    "scrape": "import scrape_web_page",
+}
+# The mcp package itself comes with google.genai; ADK's toolset adds the client transports.
+HEAVY = ("litellm", "firecrawl", "google.adk.tools.mcp_tool", "dotenv")
+
+CHILD = """
+import contextlib, io, logging, time
+logging.disable(logging.INFO)
+with contextlib.redirect_stdout(io.StringIO()):
+    start = time.perf_counter()
+    {statement}
+    elapsed = time.perf_counter() - start
+print(elapsed)
+"""
+
+
+def parse_importtime(stderr):
+    """(module, self us, cumulative us, depth) per line of -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def profile(statement, env):
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD.format(statement=statement)],
+                         env=env, capture_output=True, text=True, cwd=REPO_ROOT)
+    if out.returncode:
+        sys.exit(f"{statement!r} failed:\n{out.stderr[-2000:]}")
+    rows = parse_importtime(out.stderr)
+    packages = {}
+    for name, self_us, _, _ in rows:
+        root = name.split(".")[0]
+        packages[root] = packages.get(root, 0) + self_us
+    return {
+        "wall_ms": float(out.stdout.strip().splitlines()[-1]) * 1000,
+        # Top-level entries of the statement; the interpreter's own startup imports come first.
+        "import_ms": sum(cumulative for name, _, cumulative, depth in rows if depth == 1) / 1000,
+        "modules": len(rows),
+        "heavy": [h for h in HEAVY if any(name == h or name.startswith(h + ".") for name, _, _, _ in rows)],
+        "packages": packages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="packages to list per target")
+    parser.add_argument("--target", action="append", choices=list(TARGETS))
+    args = parser.parse_args()
+
+    use_scratch_db()
+    # The agent target runs the tool code stored in the DB; make it this tree's.
+    prepare_db()
+    env = dict(os.environ, WOWBITS_AGENT_SNAPSHOT="0", WOWBITS_BYTECODE_CACHE="0", TRACE_EXPORTER="off",
+               HISTORY="off", TOOL_CACHE_BACKEND="off",
+               PYTHONPATH=os.pathsep.join([os.path.join(REPO_ROOT, "agent_runner"),
+                                           os.path.join(REPO_ROOT, "functions")]))
+    targets = args.target or list(TARGETS)
+    profile(TARGETS[targets[0]], env)  # write .pyc files before measuring
+
+    results = {}
+    for target in targets:
+        runs = [profile(TARGETS[target], env) for _ in range(args.runs)]
+        results[target] = {
+            "wall_ms": statistics.median(r["wall_ms"] for r in runs),
+            "import_ms": statistics.median(r["import_ms"] for r in runs),
+            "modules": runs[-1]["modules"],
+            "heavy": runs[-1]["heavy"],
+            "packages": {p: statistics.median(r["packages"].get(p, 0) for r in runs) / 1000
+                         for p in runs[-1]["packages"]},
+        }
+
+    print(f"median of {args.runs} runs\n")
+    print(f"{'target':<10} {'wall ms':>8} {'import ms':>10} {'modules':>8}  heavy imports loaded")
+    for target, r in results.items():
+        print(f"{target:<10} {r['wall_ms']:>8.0f} {r['import_ms']:>10.0f} {r['modules']:>8}  "
+              f"{', '.join(r['heavy']) or '-'}")
+    for target, r in results.items():
+        top = sorted(r["packages"].items(), key=lambda p: -p[1])[:args.top]
+        print(f"\n{target}: " + ", ".join(f"{name} {ms:.0f} ms" for name, ms in top))
+
+
+if __name__ == "__main__":
+    main()
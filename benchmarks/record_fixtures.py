@@ -0,0 +1,124 @@
+"""
+Refresh benchmarks/fixtures/ from the live providers, for the stub server's
+replay mode (see stub_server.load_fixtures).
+
+Needs FMP_API_KEY, X_BEARER_TOKEN, FIRECRAWL_API_KEY and OPENAI_API_KEY; a
+provider whose key is missing keeps its current fixture. Responses are written
+as the providers return them, except that the Firecrawl page title/URL and the
+chat completion content/tool calls become placeholders the stub fills in per
+request. openai_answers.json is written by hand and left alone.
+
+Usage:
+    python benchmarks/record_fixtures.py [--tickers AAPL MSFT NVDA TSLA GOOGL]
+"""
+import argparse
+import json
+import os
+
+import requests
+from dotenv import load_dotenv
+
+from stub_server import FIXTURES_DIR
+
+FMP = "https://financialmodelingprep.com/api/v3"
+
+
+def write(name, data):
+    with open(os.path.join(FIXTURES_DIR, f"{name}.json"), "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+    print(f"wrote {name}.json")
+
+
+def fmp(path, **params):
+    response = requests.get(f"{FMP}/{path}", params=dict(params, apikey=os.environ["FMP_API_KEY"]), timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+
+def record_fmp(tickers):
+    symbols = ",".join(tickers)
+    write("fmp_quote", fmp(f"quote/{symbols}"))
+    write("fmp_profile", fmp(f"profile/{symbols}"))
+    write("fmp_ratios_ttm", {t: fmp(f"ratios-ttm/{t}") for t in tickers})
+    news = [a for t in tickers for a in fmp("stock_news", tickers=t, limit=4)]
+    write("fmp_stock_news", news)
+    return news
+
+
+def record_x(tickers):
+    posts, users = {}, {}
+    for ticker in tickers:
+        response = requests.get(
+            "https://api.twitter.com/2/tweets/search/recent",
+            headers={"Authorization": f"Bearer {os.environ['X_BEARER_TOKEN']}"},
+            params={"query": f"${ticker} -is:retweet lang:en", "max_results": 12,
+                    "tweet.fields": "created_at,public_metrics,author_id", "expansions": "author_id"},
+            timeout=30,
+        )
+        response.raise_for_status()
+        body = response.json()
+        posts[ticker] = body.get("data", [])
+        users.update({u["id"]: u for u in body.get("includes", {}).get("users", [])})
+    write("x_search_recent", {"posts": posts, "users": list(users.values())})
+
+
+def record_firecrawl(url):
+    response = requests.post(
+        "https://api.firecrawl.dev/v2/scrape",
+        headers={"Authorization": f"Bearer {os.environ['FIRECRAWL_API_KEY']}"},
+        json={"url": url, "formats": ["markdown"]},
+        timeout=60,
+    )
+    response.raise_for_status()
+    scraped = response.json()
+    metadata = scraped["data"].get("metadata", {})
+    title = metadata.get("title") or ""
+    if title:
+        scraped["data"]["markdown"] = scraped["data"]["markdown"].replace(title, "{title}")
+    metadata.update({key: "{url}" for key in ("sourceURL", "url") if key in metadata}, title="{title}")
+    write("firecrawl_scrape", scraped)
+
+
+def record_openai(ticker):
+    def complete(**extra):
+        response = requests.post(
+            "https://api.openai.com/v1/chat/completions",
+            headers={"Authorization": f"Bearer {os.environ['OPENAI_API_KEY']}"},
+            json=dict(model="gpt-4.1", messages=[{"role": "user", "content": f"What is the price of {ticker}?"}],
+                      **extra),
+            timeout=60,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    completion = complete()
+    completion["choices"][0]["message"]["content"] = "{content}"
+    write("openai_chat_completion", completion)
+    tool = {"type": "function", "function": {
+        "name": "get_stock_price", "description": "Get the latest price of a stock",
+        "parameters": {"type": "object", "properties": {"symbol": {"type": "string"}}, "required": ["symbol"]},
+    }}
+    tool_calls = complete(tools=[tool], tool_choice="required")
+    tool_calls["choices"][0]["message"]["tool_calls"] = []
+    write("openai_tool_calls", tool_calls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", nargs="+", default=["AAPL", "MSFT", "NVDA", "TSLA", "GOOGL"])
+    args = parser.parse_args()
+    load_dotenv()
+
+    news = []
+    if os.environ.get("FMP_API_KEY"):
+        news = record_fmp(args.tickers)
+    if os.environ.get("X_BEARER_TOKEN"):
+        record_x(args.tickers)
+    if os.environ.get("FIRECRAWL_API_KEY") and news:
+        record_firecrawl(news[0]["url"])
+    if os.environ.get("OPENAI_API_KEY"):
+        record_openai(args.tickers[0])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Point the agent runner at a scratch copy of data/wowbits.db so benchmarks
+never touch the real database, and make agent_runner/ importable.
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def use_scratch_db():
+    """
+    Copy the bundled DB to a temp dir and export the env vars the runner reads.
+
+    Returns:
+        str: Path of the scratch database file
+    """
+    workspace = tempfile.mkdtemp(prefix="wowbits-bench-")
+    db_path = os.path.join(workspace, "wowbits.db")
+    shutil.copy(os.path.join(REPO_ROOT, "data", "wowbits.db"), db_path)
+    os.environ["WOWBITS_ROOT_DIR"] = workspace
+    os.environ["WOWBITS_DB_CONNECTION_STRING"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    for path in (os.path.join(REPO_ROOT, "agent_runner"), os.path.join(REPO_ROOT, "functions")):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    return db_path
+
+
+def prepare_db(tool_skills=(), tool_mode=False, agent_exec_mode=None):
+    """
+    Store the tool code from functions/ in the scratch DB, so agents run this
+    tree's code, and set the exec modes a benchmark compares.
+
+    Args:
+        tool_skills (tuple): Skills whose exec_mode is cleared, or set to "tool" with `tool_mode`
+        tool_mode (bool): Run `tool_skills` as plain tools instead of sub-agents
+        agent_exec_mode (str): schema.ExecMode name for the stock_fundamentals agent, e.g. "PARALLEL"
+
+    Returns:
+        The stock_fundamentals agent id
+    """
+    from db import schema
+    from pylibs.database_manager import get_db_manager
+
+    session = get_db_manager().get_session()
+    for pf in session.query(schema.PythonFunction):
+        with open(os.path.join(REPO_ROOT, "functions", f"{pf.name}.py")) as f:
+            pf.code = f.read()
+    for skill in session.query(schema.Skill).filter(schema.Skill.name.in_(tool_skills)):
+        config = dict(skill.default_model_config or {})
+        config.pop("exec_mode", None)
+        if tool_mode:
+            config["exec_mode"] = "tool"
+        skill.default_model_config = config
+    agent = session.query(schema.Agent).filter(schema.Agent.name == "stock_fundamentals").one()
+    if agent_exec_mode:
+        agent.exec_mode = schema.ExecMode[agent_exec_mode]
+    session.commit()
+    return agent.id
@@ -0,0 +1,53 @@
+"""
+A stand-in for the LiteLlm model of an agent: no network, fixed latency,
+tool calls decided by a script instead of a model.
+
+On a request it transfers to `route` if it is the only thing the agent can
+do (a root with sub-agents), otherwise calls every tool it is offered once
+with arguments taken from ARGS by parameter name, and answers once the tool
+results are in. Every request is counted in `calls`.
+"""
+import asyncio
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+ARGS = {"symbol": "AAPL", "model": "openai/stub", "message": "Summarize the fundamentals of AAPL"}
+
+
+class ScriptedLlm(BaseLlm):
+    """Calls every tool it is offered once (or transfers to `route`), then answers."""
+
+    model: str = "scripted"
+    latency: float = 0.02
+    route: str = None
+    calls: int = 0
+
+    def _response(self, llm_request):
+        last = llm_request.contents[-1] if llm_request.contents else None
+        answered = any(part.function_response for part in (last.parts if last and last.parts else []))
+        declarations = [d for tool in (llm_request.config.tools or []) for d in (tool.function_declarations or [])]
+        tools = [d for d in declarations if d.name != "transfer_to_agent"]
+        if answered:
+            return [types.Part(text="AAPL looks fairly valued.")]
+        if tools:
+            return [types.Part(function_call=types.FunctionCall(
+                name=d.name, args={k: v for k, v in ARGS.items() if k in (d.parameters.properties or {})},
+            )) for d in tools]
+        if self.route and len(declarations) > len(tools):
+            return [types.Part(function_call=types.FunctionCall(
+                name="transfer_to_agent", args={"agent_name": self.route},
+            ))]
+        return [types.Part(text="AAPL looks fairly valued.")]
+
+    async def generate_content_async(self, llm_request, stream=False):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        yield LlmResponse(
+            content=types.Content(role="model", parts=self._response(llm_request)),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=sum(len(str(c)) for c in llm_request.contents) // 4,
+                candidates_token_count=12,
+            ),
+        )
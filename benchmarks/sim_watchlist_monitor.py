@@ -0,0 +1,182 @@
+"""
+Simulated-clock harness for agent_runner/watchlist_monitor.py.
+
+Runs the real scheduler against fake price, news and X providers on a
+SimulatedClock. The default is a 1,000-ticker watchlist for two hours. A few
+"hot" tickers move and publish a lot; the rest are mostly quiet. The run
+takes seconds and reports the requests per provider against its rate limit,
+the agent runs and how long articles take to reach the agent, hot vs quiet,
+compared with polling every ticker and running the agent on every news tick.
+tests/test_watchlist_monitor.py runs a smaller simulation and checks the
+rate limits, the agent concurrency and that no article is lost.
+
+Usage:
+    python benchmarks/sim_watchlist_monitor.py [--tickers 1000] [--hours 2] [--hot 20]
+"""
+import argparse
+import bisect
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "agent_runner"))
+
+import watchlist_monitor as wm
+
+
+class FakeMarket:
+    """Prices, articles and posts generated lazily as the simulated clock advances."""
+
+    def __init__(self, tickers, hot, clock, seed=7):
+        self.clock = clock
+        self.rng = random.Random(seed)
+        self.hot = set(hot)
+        self.prices = {t: (0.0, 100.0) for t in tickers}
+        self.next_article = {t: self._gap(t, 0.0) for t in tickers}
+        self.unseen = {t: [] for t in tickers}
+        self.published = {}
+        self.posts = {t: [] for t in tickers}
+        self.next_post = {t: self._gap(t, 0.0, post=True) for t in tickers}
+        self.post_id = 1000
+        self.calls = {"fmp": [], "x": []}
+
+    def _gap(self, ticker, now, post=False):
+        # Hot tickers: an article every ~10 minutes; quiet ones: every ~6 hours.
+        mean = (600 if ticker in self.hot else 6 * 3600) / (5 if post else 1)
+        return now + self.rng.expovariate(1 / mean)
+
+    def _advance(self, ticker):
+        now = self.clock.now()
+        last, price = self.prices[ticker]
+        minutes = int((now - last) // 60)
+        if minutes:
+            sigma = 0.006 if ticker in self.hot else 0.0008
+            price *= math.exp(self.rng.gauss(0, sigma) * math.sqrt(minutes))
+            self.prices[ticker] = (last + minutes * 60, price)
+        while self.next_article[ticker] <= now:
+            url = f"https://news.example.com/{ticker}/{len(self.published)}"
+            self.published[url] = self.next_article[ticker]
+            self.unseen[ticker].append({"title": f"{ticker} news", "url": url})
+            self.next_article[ticker] = self._gap(ticker, self.next_article[ticker])
+        while self.next_post[ticker] <= now:
+            self.post_id += 1
+            self.posts[ticker] = ([{"id": str(self.post_id), "text": f"${ticker} post"}] + self.posts[ticker])[:10]
+            self.next_post[ticker] = self._gap(ticker, self.next_post[ticker], post=True)
+
+    def quotes(self, tickers, states=None):
+        self.calls["fmp"].append(self.clock.now())
+        result = {}
+        for ticker in tickers:
+            self._advance(ticker)
+            result[ticker] = self.prices[ticker][1]
+        return result
+
+    def new_articles(self, tickers, states=None):
+        self.calls["fmp"].append(self.clock.now())
+        result = {}
+        for ticker in tickers:
+            self._advance(ticker)
+            result[ticker] = {"articles": self.unseen[ticker], "cursor": None}
+            self.unseen[ticker] = []
+        return result
+
+    def x_feed(self, tickers, states=None):
+        self.calls["x"].append(self.clock.now())
+        for ticker in tickers:
+            self._advance(ticker)
+        return {t: list(self.posts[t]) for t in tickers}
+
+
+class FakeAgent:
+    """Accepts a ticker while fewer than `concurrency` runs of `run_seconds` are in progress."""
+
+    def __init__(self, clock, concurrency=wm.AGENT_CONCURRENCY, run_seconds=10.0):
+        self.clock = clock
+        self.concurrency = concurrency
+        self.run_seconds = run_seconds
+        self.finishes = []
+        self.runs = []
+        self.max_running = 0
+
+    def __call__(self, ticker, changes):
+        now = self.clock.now()
+        self.finishes = [f for f in self.finishes if f > now]
+        if len(self.finishes) >= self.concurrency:
+            return False
+        self.finishes.append(now + self.run_seconds)
+        self.max_running = max(self.max_running, len(self.finishes))
+        self.runs.append((now, ticker, changes))
+        return True
+
+
+def max_in_window(times, window):
+    """Most calls in any half-open window (t - window, t]."""
+    times = sorted(times)
+    return max((i + 1 - bisect.bisect_right(times, t - window) for i, t in enumerate(times)), default=0)
+
+
+def simulate(n_tickers, hours, n_hot):
+    """Run the monitor over a fake market; returns (monitor, market, agent, hot tickers)."""
+    clock = wm.SimulatedClock()
+    tickers = [f"T{i:04d}" for i in range(n_tickers)]
+    hot = tickers[::max(1, n_tickers // n_hot)][:n_hot]
+    market = FakeMarket(tickers, hot, clock)
+    agent = FakeAgent(clock)
+    sources = [
+        wm.Source("price", "fmp", wm.PRICE_INTERVAL, 50, market.quotes, wm.price_change),
+        wm.Source("news", "fmp", wm.NEWS_INTERVAL, 50, market.new_articles, wm.news_change),
+        wm.Source("x", "x", wm.X_INTERVAL, wm.X_BATCH_SIZE, market.x_feed, wm.x_change),
+    ]
+    monitor = wm.WatchlistMonitor(tickers, sources, wm.rate_limits(clock), agent, clock)
+    monitor.run(duration=hours * 3600)
+    return monitor, market, agent, hot
+
+
+def article_latency(agent, market, hot):
+    """Seconds from publication to the agent run that got each article, by "hot" / "quiet"."""
+    latency = {"hot": [], "quiet": []}
+    for at, ticker, run_changes in agent.runs:
+        for change in run_changes:
+            for article in change.get("articles", []):
+                latency["hot" if ticker in hot else "quiet"].append(at - market.published[article["url"]])
+    return latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=1000)
+    parser.add_argument("--hours", type=float, default=2.0)
+    parser.add_argument("--hot", type=int, default=20)
+    args = parser.parse_args()
+
+    duration = args.hours * 3600
+    started = time.perf_counter()
+    monitor, market, agent, hot = simulate(args.tickers, args.hours, args.hot)
+    elapsed = time.perf_counter() - started
+
+    print(f"simulated {args.hours:g} h of {args.tickers} tickers ({args.hot} hot) in {elapsed:.2f} s\n")
+    print(f"{'provider':<10} {'requests':>9} {'max/window':>11} {'limit':>7}")
+    for provider, calls in market.calls.items():
+        rate, per = wm.DEFAULT_RATES[provider]
+        worst = max_in_window(calls, per)
+        print(f"{provider:<10} {len(calls):>9} {worst:>11} {rate:>7} per {per:g}s")
+
+    changes = sum(monitor.stats["changes"].values())
+    print(f"\nchanges detected: {monitor.stats['changes']}")
+    print(f"agent runs: {len(agent.runs)} for {changes} changes (max {agent.max_running} at once, "
+          f"{len(monitor.pending)} tickers still pending)")
+
+    for group, values in article_latency(agent, market, hot).items():
+        if values:
+            print(f"{group:<6} articles: {len(values):>4}, mean time to agent {sum(values) / len(values):>6.0f} s")
+
+    naive_fmp = args.tickers * duration / wm.PRICE_INTERVAL + args.tickers * duration / wm.NEWS_INTERVAL
+    naive_agent = args.tickers * duration / wm.NEWS_INTERVAL
+    print(f"\nvs one call per ticker per interval: {naive_fmp:.0f} FMP requests "
+          f"({len(market.calls['fmp'])} batched), {naive_agent:.0f} agent runs ({len(agent.runs)})")
+
+
+if __name__ == "__main__":
+    main()
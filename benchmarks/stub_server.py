@@ -0,0 +1,592 @@
+"""
+Local stub of the market data providers, Firecrawl and the LLM API used by
+the tools in functions/.
+
+Start it with `start_stub_server()` and point the tools at it via the
+FMP_BASE_URL / X_API_BASE_URL / FIRECRAWL_API_URL environment variables; `run_llm` reaches it with
+an "openai/..." model and OPENAI_API_BASE=<base_url>/v1. Every request sleeps
+for `latency` seconds to stand in for network round-trip time.
+
+With `fixtures=True` (or a directory) the stub replays recorded provider
+responses from benchmarks/fixtures/ for the symbols they cover and generates
+the rest as before; see load_fixtures().
+
+Counters on the server object:
+    request_count     requests answered
+    calls             provider ("fmp", "x", "firecrawl", "llm", "pages") -> requests
+    errors            provider -> requests answered with an injected error
+    latencies         provider -> seconds, overriding `latency` for that provider
+    error_rates       provider -> probability of answering with `error_status`
+                      (seeded by `seed`, so a run injects the same errors)
+    connection_count  TCP connections accepted (keep-alive reuse keeps this low)
+    fail_next         answer this many upcoming requests with 503 (retry testing)
+    retry_after       Retry-After header sent with injected errors (None: no header)
+    completion_count  chat completion requests answered
+    chunk_latency     seconds between streamed completion chunks ("stream": true)
+    scrape_count      Firecrawl scrapes answered; URLs containing "slow" take
+                      `slow_latency` extra seconds, URLs containing "broken" fail
+    head_count        HEAD requests answered (page revalidation)
+    page_versions     path -> version of a stub page; bump one to change its
+                      ETag and scraped content
+    profiles          /api/v3/profile/<SYMBOLS> (comma separated) and
+                      /api/v3/ratios-ttm/<SYMBOL> answer stable fundamentals
+                      generated from the symbol, spread over a few sectors
+    news_count        stock_news requests answered
+    news_published    ticker -> articles published so far (default 100); raise
+                      it to publish new articles, newest has the latest date
+    x_search_count    X recent search requests answered (x_queries: their queries)
+    x_posts           ticker -> posts, 30 on first search; add more with publish_posts()
+    x_rate_limit      searches allowed per x_window seconds (None: unlimited);
+                      past it the stub answers 429 with x-rate-limit-* headers
+    llm_route         agent a chat completion offered only transfer_to_agent
+                      transfers to (None: it answers in text)
+
+Chat completions that offer tools are answered the way an agent's model would
+use them: the first call asks for every tool except transfer_to_agent, with
+arguments filled by parameter name (the ticker from the user message, see
+TOOL_ARGS), and once the tool results are in the model answers in text.
+"""
+import json
+import os
+import random
+import re
+import socket
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Tool arguments the stub model fills in by parameter name; "{ticker}" is the
+# first ticker of the user message.
+TOOL_ARGS = {
+    "symbol": "{ticker}", "ticker": "{ticker}", "symbols": ["{ticker}"], "tickers": ["{ticker}"],
+    "model": "openai/stub", "message": "Summarize the fundamentals of {ticker}",
+}
+
+
+def load_fixtures(directory=FIXTURES_DIR):
+    """
+    Load recorded provider responses, indexed the way the stub looks them up.
+
+    The files hold responses in each provider's own format: FMP quote,
+    profile, ratios-ttm and stock_news, X recent search posts and users, a
+    Firecrawl scrape ({title} and {url} are filled in per request) and OpenAI
+    chat completion envelopes with the answers the model gives by topic.
+
+    Args:
+        directory (str): Directory with the fixture JSON files
+
+    Returns:
+        dict: Fixture name -> data
+    """
+    def read(name):
+        with open(os.path.join(directory, f"{name}.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    news = {}
+    for article in read("fmp_stock_news"):
+        news.setdefault(article["symbol"], []).append(article)
+    x = read("x_search_recent")
+    return {
+        "quote": {q["symbol"]: q for q in read("fmp_quote")},
+        "profile": {p["symbol"]: p for p in read("fmp_profile")},
+        "ratios_ttm": read("fmp_ratios_ttm"),
+        "news": news,
+        "x_posts": x["posts"],
+        "x_users": x["users"],
+        "scrape": read("firecrawl_scrape"),
+        "completion": read("openai_chat_completion"),
+        "tool_calls": read("openai_tool_calls"),
+        "answers": read("openai_answers"),
+    }
+
+
+def _provider(method, path):
+    if method == "HEAD":
+        return "pages"
+    if path.startswith("/api/"):
+        return "fmp"
+    if path.startswith("/2/"):
+        return "x"
+    if path.endswith("/scrape"):
+        return "firecrawl"
+    if path.endswith("/chat/completions"):
+        return "llm"
+    return "other"
+
+
+def _fill(value, ticker):
+    if isinstance(value, str):
+        return value.replace("{ticker}", ticker)
+    if isinstance(value, list):
+        return [_fill(v, ticker) for v in value]
+    return value
+
+
+def _text(content):
+    """Text of an OpenAI message content, plain or a list of parts."""
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def _news_feed(ticker, published):
+    """Articles 0..published-1 of a ticker, one a minute; every ticker publishes at the same times."""
+    start = datetime(2024, 1, 15, 9, 0)
+    return [
+        {
+            "symbol": ticker,
+            "title": f"Headline {i} for {ticker}",
+            "text": "Article body. " * 40,
+            "publishedDate": (start + timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S"),
+            "site": "example.com",
+            "url": f"https://example.com/{ticker}/{i}",
+            "image": f"https://example.com/{i}.jpg",
+        }
+        for i in range(published)
+    ]
+
+
+SECTORS = {
+    "Technology": ["Software", "Semiconductors", "Consumer Electronics"],
+    "Financial Services": ["Banks", "Asset Management"],
+    "Healthcare": ["Biotechnology", "Medical Devices"],
+    "Energy": ["Oil & Gas"],
+}
+
+
+def _seed(symbol):
+    """A stable per-symbol number in [0, 1) so generated fundamentals repeat across runs."""
+    return zlib.crc32(symbol.encode("utf-8")) / 2 ** 32
+
+
+def _profile(symbol):
+    seed = _seed(symbol)
+    sector = list(SECTORS)[int(seed * 97) % len(SECTORS)]
+    industries = SECTORS[sector]
+    return {
+        "symbol": symbol,
+        "mktCap": int(1_000_000_000 * (1 + 999 * seed)),
+        "price": 100.0,
+        "beta": round(0.5 + 1.5 * seed, 3),
+        "volAvg": int(1_000_000 * (1 + 9 * seed)),
+        "lastDiv": round(4 * seed, 2),
+        "range": f"{80 + 10 * seed:.2f}-{120 + 10 * seed:.2f}",
+        "changes": round(4 * seed - 2, 2),
+        "companyName": f"{symbol} Inc.",
+        "currency": "USD",
+        "sector": sector,
+        "industry": industries[int(seed * 1009) % len(industries)],
+        "website": f"https://{symbol.lower()}.example.com",
+        "description": f"{symbol} makes software. " * 50,
+        "ceo": "Jane Doe",
+        "country": "US",
+    }
+
+
+def _ratios_ttm(symbol):
+    seed = _seed(symbol)
+    spread = (seed * 7919) % 1
+    return {
+        "symbol": symbol,
+        "peRatioTTM": round(8 + 60 * spread, 2),
+        "priceToBookRatioTTM": round(1 + 20 * seed, 2),
+        "priceToSalesRatioTTM": round(0.5 + 15 * spread, 2),
+        "grossProfitMarginTTM": round(0.2 + 0.6 * seed, 4),
+        "operatingProfitMarginTTM": round(0.05 + 0.4 * spread, 4),
+        "netProfitMarginTTM": round(0.02 + 0.3 * spread, 4),
+        "returnOnEquityTTM": round(0.05 + 0.5 * seed, 4),
+        "debtEquityRatioTTM": round(3 * spread, 3),
+        "currentRatioTTM": round(0.6 + 2.5 * seed, 3),
+    }
+
+
+def publish_posts(server, ticker, count):
+    """Publish `count` new X posts mentioning `ticker`; ids grow with time across all tickers."""
+    with server.lock:
+        posts = server.x_posts.setdefault(ticker.upper(), [])
+        for _ in range(count):
+            server.x_next_id += 1
+            posts.append({"id": str(server.x_next_id), "text": f"${ticker.upper()} post {len(posts)}",
+                          "author_id": "1", "created_at": "2024-01-15T10:00:00Z", "public_metrics": {}})
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves canned FMP responses; behaviour is configured on the server object."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.lock:
+            self.server.connection_count += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _begin(self):
+        """Count the request and sleep; returns False if it was answered with an error."""
+        server = self.server
+        provider = _provider(self.command, urlparse(self.path).path)
+        with server.lock:
+            server.request_count += 1
+            server.calls[provider] += 1
+            fail = server.fail_next > 0
+            status = 503
+            if fail:
+                server.fail_next -= 1
+            elif server.random.random() < server.error_rates.get(provider, 0.0):
+                fail = True
+                status = server.error_status
+                server.errors[provider] += 1
+        time.sleep(server.latencies.get(provider, server.latency))
+        if fail:
+            headers = {} if server.retry_after is None else {"Retry-After": str(server.retry_after)}
+            if self.command == "HEAD":
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            else:
+                self._send_json(status, {"error": "Service unavailable"}, headers)
+        return not fail
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not self._begin():
+            return
+        path = urlparse(self.path).path
+        if path == "/v2/scrape":
+            url = json.loads(body or b"{}").get("url", "")
+            with self.server.lock:
+                self.server.scrape_count += 1
+            if "slow" in url:
+                time.sleep(self.server.slow_latency)
+            if "broken" in url:
+                self._send_json(500, {"success": False, "error": f"Failed to scrape {url}"})
+                return
+            version = self.server.page_versions.get(urlparse(url).path, 1)
+            if self.server.fixtures:
+                title = f"Article at {url} (v{version})"
+                scraped = json.loads(json.dumps(self.server.fixtures["scrape"])
+                                     .replace("{title}", title).replace("{url}", url))
+                self._send_json(200, scraped)
+                return
+            self._send_json(200, {"success": True, "data": {
+                "markdown": f"# Article at {url} (v{version})\n\n" + "Revenue grew and margins held. " * 200,
+                "metadata": {"url": url, "statusCode": 200},
+            }})
+        elif path.endswith("/chat/completions"):
+            request = json.loads(body or b"{}")
+            with self.server.lock:
+                self.server.completion_count += 1
+            messages = request.get("messages") or [{}]
+            prompt = _text(messages[-1].get("content"))
+            tool_calls = self._tool_calls(request)
+            if tool_calls:
+                self._send_completion(request, prompt, None, tool_calls)
+                return
+            text = self._answer(request, prompt)
+            if request.get("stream"):
+                self._stream_completion(request, prompt, text)
+                return
+            self._send_completion(request, prompt, text)
+        else:
+            self._send_json(404, {"error": f"Unknown path: {path}"})
+
+    def _tool_calls(self, request):
+        """The tool calls the stub model makes for a request, None to answer in text."""
+        messages = request.get("messages") or []
+        if not request.get("tools") or (messages and messages[-1].get("role") == "tool"):
+            return None
+        names = [t["function"]["name"] for t in request["tools"] if t.get("type") == "function"]
+        user_text = " ".join(_text(m.get("content")) for m in messages if m.get("role") == "user")
+        found = re.findall(r"\$?\b([A-Z]{2,5})\b", user_text)
+        ticker = found[0] if found else "AAPL"
+        calls = []
+        for tool in request["tools"]:
+            name = tool["function"]["name"]
+            if name == "transfer_to_agent":
+                continue
+            properties = (tool["function"].get("parameters") or {}).get("properties") or {}
+            args = {k: _fill(v, ticker) for k, v in TOOL_ARGS.items() if k in properties}
+            calls.append((name, args))
+        if not calls and self.server.llm_route and "transfer_to_agent" in names:
+            calls = [("transfer_to_agent", {"agent_name": self.server.llm_route})]
+        return [
+            {"id": f"call_{zlib.crc32(f'{name}{i}{time.time()}'.encode()):08x}", "type": "function",
+             "function": {"name": name, "arguments": json.dumps(args)}}
+            for i, (name, args) in enumerate(calls)
+        ] or None
+
+    def _answer(self, request, prompt):
+        """Text answer: the recorded answer for the topic with fixtures, an echo of the prompt without."""
+        if not self.server.fixtures:
+            return f"Stub answer to: {prompt[:80]}"
+        answers = self.server.fixtures["answers"]
+        asked = " ".join(_text(m.get("content")) for m in request.get("messages") or []).lower()
+        if "summar" in asked and "article" in asked:
+            return answers["summary"]
+        if "fundamental" in asked or "valuation" in asked:
+            return answers["analysis"]
+        return answers["answer"]
+
+    def _send_completion(self, request, prompt, text, tool_calls=None):
+        prompt_tokens = sum(len(_text(m.get("content")).split()) for m in request.get("messages") or [])
+        completion_tokens = len(text.split()) if text else 16 * len(tool_calls)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        if self.server.fixtures:
+            envelope = json.loads(json.dumps(self.server.fixtures["tool_calls" if tool_calls else "completion"]))
+            envelope.update(id=f"{envelope['id']}-{self.server.completion_count}", created=int(time.time()),
+                            model=request.get("model", envelope["model"]), usage=usage)
+            message = envelope["choices"][0]["message"]
+            if tool_calls:
+                message["tool_calls"] = tool_calls
+            else:
+                message["content"] = text
+            self._send_json(200, envelope)
+            return
+        message = {"role": "assistant", "content": text}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        self._send_json(200, {
+            "id": f"chatcmpl-{self.server.completion_count}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if tool_calls else "stop",
+            }],
+            "usage": usage,
+        })
+
+    def _stream_completion(self, request, prompt, text):
+        """Answer as OpenAI-style server-sent events, one word per chunk."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send_event(payload):
+            data = f"data: {payload}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        base = {"id": "chatcmpl-stream", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": request.get("model", "stub")}
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.server.chunk_latency)
+            piece = word if i == 0 else f" {word}"
+            send_event(json.dumps(dict(base, choices=[
+                {"index": 0, "delta": {"role": "assistant", "content": piece}, "finish_reason": None}
+            ])))
+        send_event(json.dumps(dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])))
+        if request.get("stream_options", {}).get("include_usage"):
+            send_event(json.dumps(dict(base, choices=[], usage={
+                "prompt_tokens": len(prompt.split()),
+                "completion_tokens": len(words),
+                "total_tokens": len(prompt.split()) + len(words),
+            })))
+        send_event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_HEAD(self):
+        """Stub article pages: an ETag per page version and 304 for a matching If-None-Match."""
+        if not self._begin():
+            return
+        path = urlparse(self.path).path
+        with self.server.lock:
+            self.server.head_count += 1
+        etag = f'"v{self.server.page_versions.get(path, 1)}"'
+        status = 304 if self.headers.get("If-None-Match") == etag else 200
+        self.send_response(status)
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", "Mon, 15 Jan 2024 10:00:00 GMT")
+        if status == 200:
+            self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        if not self._begin():
+            return
+
+        parsed = urlparse(self.path)
+        path = parsed.path
+        query = parse_qs(parsed.query)
+        fixtures = self.server.fixtures or {}
+        if path.startswith("/api/v3/quote/"):
+            symbols = path[len("/api/v3/quote/"):].split(",")
+            recorded = fixtures.get("quote", {})
+            self._send_json(200, [
+                recorded.get(s.upper()) or {"symbol": s.upper(), "price": 100.0 + i}
+                for i, s in enumerate(symbols) if s
+            ])
+        elif path.startswith("/api/v3/profile/"):
+            symbols = [x for x in path[len("/api/v3/profile/"):].upper().split(",") if x]
+            recorded = fixtures.get("profile", {})
+            self._send_json(200, [recorded.get(symbol) or _profile(symbol) for symbol in symbols])
+        elif path.startswith("/api/v3/ratios-ttm/"):
+            symbol = path[len("/api/v3/ratios-ttm/"):].upper()
+            self._send_json(200, fixtures.get("ratios_ttm", {}).get(symbol) or [_ratios_ttm(symbol)])
+        elif path == "/api/v3/stock_news":
+            tickers = [t for t in query.get("tickers", [""])[0].split(",") if t]
+            limit = int(query.get("limit", ["10"])[0])
+            page = int(query.get("page", ["0"])[0])
+            since = query.get("from", [""])[0]
+            with self.server.lock:
+                self.server.news_count += 1
+            recorded = fixtures.get("news", {})
+            feed = sorted(
+                (a for t in tickers
+                 for a in recorded.get(t.upper()) or _news_feed(t, self.server.news_published.get(t, 100))
+                 if a["publishedDate"] >= since),
+                key=lambda a: a["publishedDate"], reverse=True,
+            )
+            self._send_json(200, feed[page * limit:(page + 1) * limit])
+        elif path == "/2/tweets/search/recent":
+            self._search_tweets(query)
+        else:
+            self._send_json(404, {"error": f"Unknown path: {path}"})
+
+
+    def _search_tweets(self, query):
+        """X recent search: cashtags OR-ed in the query, since_id, next_token paging and rate limits."""
+        server = self.server
+        tickers = re.findall(r"\$([A-Za-z0-9.]+)", query.get("query", [""])[0])
+        page_size = int(query.get("max_results", ["10"])[0])
+        since_id = int(query.get("since_id", ["0"])[0])
+        offset = int(query.get("next_token", ["0"])[0])
+        now = time.time()
+        with server.lock:
+            server.x_search_count += 1
+            server.x_queries.append(query.get("query", [""])[0])
+            if now >= server.x_window_reset:
+                server.x_window_reset = now + server.x_window
+                server.x_window_used = 0
+            server.x_window_used += 1
+            limited = server.x_rate_limit is not None and server.x_window_used > server.x_rate_limit
+            remaining = None if server.x_rate_limit is None else max(0, server.x_rate_limit - server.x_window_used)
+            reset = int(server.x_window_reset + 0.999)
+        recorded = (server.fixtures or {}).get("x_posts", {})
+        for ticker in tickers:
+            if ticker.upper() in recorded:
+                with server.lock:
+                    server.x_posts.setdefault(ticker.upper(), list(recorded[ticker.upper()]))
+                    server.x_next_id = max(server.x_next_id, *(int(t["id"]) for t in recorded[ticker.upper()]))
+            elif ticker.upper() not in server.x_posts:
+                publish_posts(server, ticker, 30)
+        with server.lock:
+            tweets = sorted(
+                (t for ticker in tickers for t in server.x_posts[ticker.upper()] if int(t["id"]) > since_id),
+                key=lambda t: int(t["id"]), reverse=True,
+            )
+        page = tweets[offset:offset + page_size]
+        body = {
+            "data": page,
+            "includes": {"users": (server.fixtures or {}).get("x_users")
+                         or [{"id": "1", "username": "trader", "name": "Trader"}]},
+            "meta": {"result_count": len(page)},
+        }
+        if offset + page_size < len(tweets):
+            body["meta"]["next_token"] = str(offset + page_size)
+        if not page:
+            body = {"meta": {"result_count": 0}}
+        if limited:
+            body = {"title": "Too Many Requests", "status": 429}
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(429 if limited else 200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        if remaining is not None:
+            self.send_header("x-rate-limit-limit", str(server.x_rate_limit))
+            self.send_header("x-rate-limit-remaining", str(remaining))
+            self.send_header("x-rate-limit-reset", str(reset))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Concurrency benchmarks open many connections at once.
+    request_queue_size = 256
+
+    def handle_error(self, request, client_address):
+        # Clients that time out hang up mid-response; that is expected here.
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+def start_stub_server(latency=0.0, port=0, fixtures=None, seed=0):
+    """
+    Start the stub server on a background thread.
+
+    Args:
+        latency (float): Seconds to sleep before answering each request
+        port (int): Port to bind, 0 picks a free one
+        fixtures (bool | str): Replay recorded responses; True for
+            benchmarks/fixtures/, or a directory with the same files
+        seed (int): Seed for injected errors (`error_rates`)
+
+    Returns:
+        StubServer: The running server; `server.base_url` is its URL
+    """
+    server = StubServer(("127.0.0.1", port), StubHandler)
+    server.latency = latency
+    server.latencies = {}
+    server.error_rates = {}
+    server.error_status = 503
+    server.random = random.Random(seed)
+    server.fixtures = load_fixtures(FIXTURES_DIR if fixtures is True else fixtures) if fixtures else None
+    server.request_count = 0
+    server.calls = Counter()
+    server.errors = Counter()
+    server.connection_count = 0
+    server.fail_next = 0
+    server.retry_after = None
+    server.completion_count = 0
+    server.chunk_latency = 0.02
+    server.scrape_count = 0
+    server.slow_latency = 5.0
+    server.head_count = 0
+    server.page_versions = {}
+    server.news_count = 0
+    server.news_published = {}
+    server.x_search_count = 0
+    server.x_queries = []
+    server.x_posts = {}
+    server.x_next_id = 10 ** 15
+    server.x_rate_limit = None
+    server.x_window = 900.0
+    server.x_window_reset = 0.0
+    server.x_window_used = 0
+    server.llm_route = None
+    server.lock = threading.Lock()
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
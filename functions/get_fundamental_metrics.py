@@ -0,0 +1,226 @@
+import asyncio
+import os
+import requests
+from helpers import fmp_profile, fundamental_metrics, http_client, price_history, tool_cache
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+# FMP's profile endpoint accepts comma separated symbols; ratios-ttm takes one.
+PROFILE_BATCH_SIZE = 50
+MAX_WORKERS = 8
+# Peers a stock is ranked against when the caller gives no universe: the
+# FUNDAMENTALS_UNIVERSE list (comma separated) if set, else the S&P 100.
+DEFAULT_UNIVERSE = (
+    "AAPL", "ABBV", "ABT", "ACN", "ADBE", "AIG", "AMD", "AMGN", "AMT", "AMZN", "AVGO", "AXP", "BA", "BAC",
+    "BK", "BKNG", "BLK", "BMY", "BRK-B", "C", "CAT", "CHTR", "CL", "CMCSA", "COF", "COP", "COST", "CRM",
+    "CSCO", "CVS", "CVX", "DE", "DHR", "DIS", "DUK", "EMR", "F", "FDX", "GD", "GE", "GILD", "GM", "GOOGL",
+    "GS", "HD", "HON", "IBM", "INTC", "INTU", "ISRG", "JNJ", "JPM", "KO", "LIN", "LLY", "LMT", "LOW", "MA",
+    "MCD", "MDLZ", "MDT", "MET", "META", "MMM", "MO", "MRK", "MS", "MSFT", "NEE", "NFLX", "NKE", "NOW",
+    "NVDA", "ORCL", "PEP", "PFE", "PG", "PLTR", "PM", "PYPL", "QCOM", "RTX", "SBUX", "SCHW", "SO", "SPG",
+    "T", "TGT", "TMO", "TMUS", "TSLA", "TXN", "UBER", "UNH", "UNP", "UPS", "USB", "V", "VZ", "WFC", "WMT",
+    "XOM",
+)
+UNIVERSE = [s.strip() for s in os.environ.get("FUNDAMENTALS_UNIVERSE", "").upper().split(",") if s.strip()] \
+    or list(DEFAULT_UNIVERSE)
+
+
+def _base_url() -> str:
+    return os.environ.get("FMP_BASE_URL", "https://financialmodelingprep.com")
+
+
+def _params() -> Dict[str, Any]:
+    return {"apikey": os.environ.get("FMP_API_KEY")}
+
+
+def _chunks(symbols: List[str]) -> List[List[str]]:
+    return [symbols[i:i + PROFILE_BATCH_SIZE] for i in range(0, len(symbols), PROFILE_BATCH_SIZE)]
+
+
+def _profiles_by_symbol(data) -> Dict[str, Dict[str, Any]]:
+    return {str(p.get("symbol", "")).upper(): p for p in data or []}
+
+
+def _first(data) -> Dict[str, Any]:
+    return data[0] if isinstance(data, list) and data else {}
+
+
+def _fetch_inputs(symbols: List[str]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+    """Profiles in batches and TTM ratios per symbol, concurrently; returns (inputs, errors)."""
+    def profiles(chunk):
+        response = http_client.get(f"{_base_url()}/api/v3/profile/{','.join(chunk)}", params=_params())
+        response.raise_for_status()
+        return _profiles_by_symbol(response.json())
+
+    def ratios(symbol):
+        response = http_client.get(f"{_base_url()}/api/v3/ratios-ttm/{symbol}", params=_params())
+        response.raise_for_status()
+        return _first(response.json())
+
+    def attempt(fn, arg):
+        try:
+            return fn(arg)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        profile_results = list(executor.map(lambda c: attempt(profiles, c), _chunks(symbols)))
+        ratio_results = list(executor.map(lambda s: attempt(ratios, s), symbols))
+    return _combine(symbols, profile_results, ratio_results)
+
+
+async def _fetch_inputs_async(symbols: List[str]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+    """Async variant of _fetch_inputs using the shared httpx client."""
+    import httpx
+
+    async def profiles(chunk):
+        response = await http_client.aget(f"{_base_url()}/api/v3/profile/{','.join(chunk)}", params=_params())
+        response.raise_for_status()
+        return _profiles_by_symbol(response.json())
+
+    async def ratios(symbol):
+        response = await http_client.aget(f"{_base_url()}/api/v3/ratios-ttm/{symbol}", params=_params())
+        response.raise_for_status()
+        return _first(response.json())
+
+    async def attempt(coro):
+        try:
+            return await coro
+        except (httpx.HTTPError, ValueError) as e:
+            return e
+
+    chunks = _chunks(symbols)
+    results = await asyncio.gather(
+        *(attempt(profiles(c)) for c in chunks), *(attempt(ratios(s)) for s in symbols)
+    )
+    return _combine(symbols, results[:len(chunks)], results[len(chunks):])
+
+
+def _combine(symbols, profile_results, ratio_results) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+    found = {}
+    errors = {}
+    for chunk, result in zip(_chunks(symbols), profile_results):
+        for symbol in chunk:
+            if isinstance(result, Exception):
+                errors[symbol] = f"Error fetching stock fundamentals: {str(result)}"
+            elif symbol in result:
+                found[symbol] = result[symbol]
+            else:
+                errors[symbol] = f"No fundamental data found for symbol: {symbol}"
+    inputs = {}
+    for symbol, ratios in zip(symbols, ratio_results):
+        if symbol in found:
+            # Missing ratios only leave those metrics out; the profile ones still count.
+            inputs[symbol] = {"profile": found[symbol], "ratios": {} if isinstance(ratios, Exception) else ratios}
+    return inputs, errors
+
+
+def _split_cached(cache, universe, symbols: List[str]) -> Tuple[List[str], List[str]]:
+    """Add cached inputs to the universe; return (symbols that need fetching, stale symbols)."""
+    missing = []
+    stale = []
+    for symbol in symbols:
+        if cache is None:
+            if symbol not in universe:
+                missing.append(symbol)
+            continue
+        value, state = cache.lookup("profile", f"fundamental_inputs:{symbol}")
+        if state == tool_cache.MISS:
+            missing.append(symbol)
+            continue
+        universe.add(symbol, value["profile"], value["ratios"])
+        if state == tool_cache.STALE:
+            stale.append(symbol)
+    return missing, stale
+
+
+def _refresh(cache, universe, stale: List[str]):
+    """Refetch stale inputs in the background; this call ranks with the stale ones."""
+    if stale:
+        cache.refresh_in_background(
+            f"fundamental_inputs:{','.join(stale)}", lambda: _add(cache, universe, _fetch_inputs(stale)[0])
+        )
+
+
+def _add(cache, universe, inputs: Dict[str, Dict[str, Any]]):
+    history = price_history.get_store()
+    for symbol, value in inputs.items():
+        universe.add(symbol, value["profile"], value["ratios"])
+        if cache is not None:
+            cache.store("profile", f"fundamental_inputs:{symbol}", value)
+        if history is not None:
+            history.record_profile(symbol, fmp_profile.extract_fundamentals([value["profile"]]))
+
+
+def _normalize(symbols: Optional[List[str]]) -> List[str]:
+    return list(dict.fromkeys(s.strip().upper() for s in symbols or [] if s and s.strip()))
+
+
+def _peers(symbols: List[str], universe: Optional[List[str]]) -> List[str]:
+    """The requested symbols plus the universe they are ranked against."""
+    return _normalize(symbols + (_normalize(universe) or UNIVERSE))
+
+
+def _result(symbols: List[str], peers: List[str], universe, errors: Dict[str, str]) -> Dict[str, Any]:
+    snapshot = universe.build(peers)
+    metrics = {}
+    for symbol in symbols:
+        summary = snapshot.lookup(symbol)
+        if summary is not None:
+            metrics[symbol] = summary
+        elif symbol not in errors:
+            errors[symbol] = f"No fundamental data found for symbol: {symbol}"
+    return {"metrics": metrics, "errors": {s: errors[s] for s in symbols if s in errors},
+            "universe_size": len(snapshot.symbols)}
+
+
+def get_fundamental_metrics(symbols: List[str], universe: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Get standard valuation and profitability ratios for stocks, ranked against their sector and industry.
+
+    Computes market cap, beta, dividend yield, position in the 52-week range,
+    P/E, earnings yield, price/book, price/sales, gross/operating/net margin,
+    return on equity, debt/equity and current ratio. Each metric comes with its
+    percentile (0-100) and the median within the stock's sector and industry.
+    Peers are the requested stocks plus `universe`, by default the
+    FUNDAMENTALS_UNIVERSE list or the S&P 100; "peers" gives the group sizes.
+    A percentile is null when fewer than 5 peers in the group have the metric.
+
+    Args:
+        symbols (list[str]): Stock symbols to report, e.g. ["AAPL", "MSFT"]
+        universe (list[str]): Optional symbols to rank against instead of the default (not reported)
+
+    Returns:
+        dict: {"metrics": {symbol: {"sector", "industry", "peers", "columns": ["value", "sector_pct",
+            "sector_median", "industry_pct", "industry_median"], "metrics": {name: [one value per column]}}},
+            "errors": {symbol: message}, "universe_size": int}
+    """
+    symbols = _normalize(symbols)
+    peers = _peers(symbols, universe)
+    cache = tool_cache.get_cache()
+    metrics_universe = fundamental_metrics.get_universe()
+    missing, stale = _split_cached(cache, metrics_universe, peers)
+    _refresh(cache, metrics_universe, stale)
+    errors = {}
+    if missing:
+        inputs, errors = _fetch_inputs(missing)
+        _add(cache, metrics_universe, inputs)
+    return _result(symbols, peers, metrics_universe, errors)
+
+
+async def get_fundamental_metrics_async(symbols: List[str], universe: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Async variant of get_fundamental_metrics; the agent loader registers it in its place."""
+    symbols = _normalize(symbols)
+    peers = _peers(symbols, universe)
+    cache = tool_cache.get_cache()
+    metrics_universe = fundamental_metrics.get_universe()
+    missing, stale = _split_cached(cache, metrics_universe, peers)
+    _refresh(cache, metrics_universe, stale)
+    errors = {}
+    if missing:
+        inputs, errors = await _fetch_inputs_async(missing)
+        _add(cache, metrics_universe, inputs)
+    return _result(symbols, peers, metrics_universe, errors)
+
+
+if __name__ == "__main__":
+    print(get_fundamental_metrics(["AAPL", "MSFT"]))
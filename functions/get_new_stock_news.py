@@ -0,0 +1,32 @@
+from helpers import stock_news
+from typing import Any, Dict, List
+
+
+def get_new_stock_news(symbols: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Get only the news articles published since the last poll, for many tickers at once.
+
+    Each ticker keeps a high-water mark (latest published date and the URLs
+    at that date) in a local SQLite table, so repeated polls of a watchlist
+    return each article once. A ticker polled for the first time returns its
+    latest 10 articles. All tickers are fetched with one FMP stock_news
+    request (paging only while a ticker may still have unseen articles).
+
+    Args:
+        symbols (list[str]): Stock ticker symbols, e.g. ["AAPL", "MSFT"]
+
+    Returns:
+        dict: ticker -> list of new articles (title, text, published_date, source, url, image_url), newest first
+    """
+    # The marks move as soon as the articles are returned, since the model
+    # reading the result is the consumer.
+    return stock_news.poll(symbols, commit=True)[0]
+
+
+async def get_new_stock_news_async(symbols: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Async variant of get_new_stock_news; the agent loader registers it in its place."""
+    return (await stock_news.poll_async(symbols, commit=True))[0]
+
+
+if __name__ == "__main__":
+    print (get_new_stock_news(["AAPL", "MSFT"]))
@@ -0,0 +1,86 @@
+import math
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from helpers import price_history
+
+
+def _epoch(value: str) -> float:
+    """ISO 8601 date or time to epoch seconds; times without an offset are UTC."""
+    parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+def _finite(value):
+    return None if value is None or (isinstance(value, float) and math.isnan(value)) else value
+
+
+def _summary(records) -> Dict[str, Any]:
+    summary = price_history.summarize(records)
+    for key in ("start", "end"):
+        if key in summary:
+            summary[key] = _iso(summary[key])
+    return {key: _finite(value) for key, value in summary.items()}
+
+
+def _latest_profile(history: price_history.HistoryStore, symbol: str, end: Optional[float]) -> Optional[Dict[str, Any]]:
+    snapshots = history.profiles(symbol).range(end=end)
+    if not len(snapshots):
+        return None
+    last = snapshots[-1]
+    profile = {name: _finite(float(last[name])) for name in price_history.PROFILE_FIELDS}
+    profile["recorded_at"] = _iso(float(last["ts"]))
+    return profile
+
+
+def get_price_history(symbol: str, start: Optional[str] = None, end: Optional[str] = None,
+                      at: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Get the locally recorded price history of a stock without calling the market data API.
+
+    With HISTORY=on every price and fundamentals lookup is recorded, so this answers questions
+    like "what was the price when this article was published?" and "how much
+    has it moved since?" from history. Only prices seen by earlier lookups
+    are known; a time before the first one has no price.
+
+    Args:
+        symbol (str): The stock symbol (e.g. 'AAPL')
+        start (str): Optional ISO date/time to start the range at, e.g. '2024-01-15' or '2024-01-15T14:30:00Z'
+        end (str): Optional ISO date/time to end the range at
+        at (list[str]): Optional ISO times (e.g. article publication times) to get the price at
+
+    Returns:
+        dict: {"symbol", "summary": {"count", "start", "end", "first", "last", "high", "low",
+            "return", "volatility" (annualized), "bar_seconds"}, "prices_at": {time: price},
+            "profile": latest recorded fundamentals snapshot in the range}
+    """
+    history = price_history.get_store()
+    if history is None:
+        return {"error": "Price history is not recorded (set HISTORY=on)"}
+    symbol = symbol.strip().upper()
+    try:
+        start_ts = _epoch(start) if start else None
+        end_ts = _epoch(end) if end else None
+        at_ts = [_epoch(t) for t in at or []]
+    except ValueError as e:
+        return {"error": f"Invalid date/time: {str(e)}"}
+
+    result = {
+        "symbol": symbol,
+        "summary": _summary(history.quotes(symbol).range(start_ts, end_ts)),
+        "profile": _latest_profile(history, symbol, end_ts),
+    }
+    if at:
+        prices = history.prices_at(symbol, at_ts)
+        result["prices_at"] = {t: _finite(float(p)) for t, p in zip(at, prices)}
+    return result
+
+
+if __name__ == "__main__":
+    print(get_price_history("AAPL"))
@@ -1,62 +1,97 @@
+import logging
 import os
 import requests
+from helpers import fmp_profile, http_client, tool_cache, tool_payload
+from typing import List, Optional
 
-def get_stock_fundamentals(symbol: str) -> dict:
+logger = logging.getLogger("get_stock_fundamentals")
+
+def _history():
+    """The price history store, or None unless HISTORY=on; only then is price_history (numpy) imported."""
+    if os.environ.get("HISTORY", "off").lower() != "on":
+        return None
+    from helpers import price_history
+    return price_history.get_store()
+
+
+def _record(symbol: str, fundamentals: dict) -> dict:
+    """Append the numeric profile fields to the price history."""
+    history = _history()
+    if history is not None:
+        history.record_profile(symbol, fundamentals)
+    return fundamentals
+
+
+@tool_cache.cached("profile", name="get_stock_fundamentals")
+def _fetch_fundamentals(symbol: str) -> dict:
+    logger.debug(f"Getting fundamentals for symbol: {symbol}")
+    # FMP API endpoint and parameters
+    base_url = os.environ.get("FMP_BASE_URL", "https://financialmodelingprep.com")
+    url = f"{base_url}/api/v3/profile/{symbol}"
+    params = {
+        "apikey": os.environ.get("FMP_API_KEY")
+    }
+
+    try:
+        response = http_client.get(url, params=params)
+        response.raise_for_status()
+        data = response.json()
+        if not data:
+            raise Exception(f"No fundamental data found for symbol: {symbol}")
+
+        return _record(symbol, fmp_profile.extract_fundamentals(data))
+
+    except requests.exceptions.RequestException as e:
+        raise Exception(f"Error fetching stock fundamentals: {str(e)}")
+    except (KeyError, ValueError, IndexError) as e:
+        raise Exception(f"Error parsing fundamentals data: {str(e)}")
+
+
+def get_stock_fundamentals(symbol: str, fields: Optional[List[str]] = None) -> dict:
     """
     Get fundamental financial data for a given stock symbol using Financial Modeling Prep API.
     
     Args:
         symbol (str): The stock symbol to look up (e.g. 'AAPL', 'GOOGL')
+        fields (list[str]): Optional fields to return, e.g. ["marketCap", "beta", "sector"];
+            all fields when omitted
         
     Returns:
         dict: Dictionary containing fundamental data including:
-            - Market Cap
-            - P/E Ratio
-            - EPS
-            - Revenue
-            - Profit Margin
-            - And other key metrics
+            - marketCap, price, beta, volAvg, lastDiv, range, changes
+            - companyName, currency, sector, industry, website, description, ceo, country
         
     Raises:
         Exception: If there is an error fetching the fundamentals data
     """
-    print (f"Getting fundamentals for symbol: {symbol}")
-    # FMP API endpoint and parameters
-    url = f"https://financialmodelingprep.com/api/v3/profile/{symbol}"
+    return tool_payload.project(_fetch_fundamentals(symbol), fields)
+
+
+@tool_cache.cached("profile", name="get_stock_fundamentals")
+async def _fetch_fundamentals_async(symbol: str) -> dict:
+    import httpx
+
+    logger.debug(f"Getting fundamentals for symbol: {symbol}")
+    base_url = os.environ.get("FMP_BASE_URL", "https://financialmodelingprep.com")
+    url = f"{base_url}/api/v3/profile/{symbol}"
     params = {
         "apikey": os.environ.get("FMP_API_KEY")
     }
 
     try:
-        response = requests.get(url, params=params)
+        response = await http_client.aget(url, params=params)
         response.raise_for_status()
         data = response.json()
-        print (f"Fundamental data: {data}")
         if not data:
             raise Exception(f"No fundamental data found for symbol: {symbol}")
+        return _record(symbol, fmp_profile.extract_fundamentals(data))
 
-        # Extract relevant fundamental metrics
-        fundamentals = {
-            "marketCap": data[0].get("mktCap"),
-            "price": data[0].get("price"),
-            "beta": data[0].get("beta"),
-            "volAvg": data[0].get("volAvg"),
-            "lastDiv": data[0].get("lastDiv"),
-            "range": data[0].get("range"),
-            "changes": data[0].get("changes"),
-            "companyName": data[0].get("companyName"),
-            "currency": data[0].get("currency"),
-            "sector": data[0].get("sector"),
-            "industry": data[0].get("industry"),
-            "website": data[0].get("website"),
-            "description": data[0].get("description"),
-            "ceo": data[0].get("ceo"),
-            "country": data[0].get("country")
-        }
-        
-        return fundamentals
-
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         raise Exception(f"Error fetching stock fundamentals: {str(e)}")
     except (KeyError, ValueError, IndexError) as e:
         raise Exception(f"Error parsing fundamentals data: {str(e)}")
+
+
+async def get_stock_fundamentals_async(symbol: str, fields: Optional[List[str]] = None) -> dict:
+    """Async variant of get_stock_fundamentals; the agent loader registers it in its place."""
+    return tool_payload.project(await _fetch_fundamentals_async(symbol), fields)
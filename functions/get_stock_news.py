@@ -1,53 +1,26 @@
-import os
-import requests
-from datetime import datetime, timedelta
+from helpers import stock_news, tool_payload
+from typing import List, Optional
 
-def get_stock_news(symbol: str) -> list:
+
+def get_stock_news(symbol: str, fields: Optional[List[str]] = None) -> list:
     """
     Get latest news articles for a given stock ticker using FMP API.
     
     Args:
         symbol (str): Stock ticker symbol
+        fields (list[str]): Optional article fields to return, e.g. ["title", "url", "published_date"];
+            all fields when omitted
         
     Returns:
-        list: List of news articles with title, description, date, etc.
+        list: List of news articles with symbol, title, text, published_date, source, url and image_url
     """
+    return tool_payload.project(stock_news.latest(symbol), fields)
 
-    print (f"Getting news for {symbol}")
-    base_url = "https://financialmodelingprep.com/api/v3/stock_news"
-    
-    params = {
-        "tickers": symbol,
-        "limit": 10,
-        "apikey": os.environ.get("FMP_API_KEY")
-    }
-    
-    try:
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()
-        
-        news_data = response.json()
-        
-        # Format the response data
-        formatted_news = []
-        for article in news_data:
-            formatted_article = {
-                "title": article.get("title"),
-                "text": article.get("text"),
-                "published_date": article.get("publishedDate"),
-                "source": article.get("site"),
-                "url": article.get("url"),
-                "image_url": article.get("image")
-            }
-            formatted_news.append(formatted_article)
-            
-        return formatted_news
-        
-    except requests.exceptions.RequestException as e:
-        raise Exception(f"Error fetching news data: {str(e)}")
-    except ValueError as e:
-        raise Exception(f"Error parsing news data: {str(e)}")
+
+async def get_stock_news_async(symbol: str, fields: Optional[List[str]] = None) -> list:
+    """Async variant of get_stock_news; the agent loader registers it in its place."""
+    return tool_payload.project(await stock_news.latest_async(symbol), fields)
 
 
 if __name__ == "__main__":
-    print (get_stock_news("AAPL"))
\ No newline at end of file
+    print (get_stock_news("AAPL"))
@@ -1,38 +1,252 @@
+import asyncio
+import json
 import os
 import requests
+from helpers import http_client, tool_cache
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+# FMP's quote endpoint accepts comma separated symbols; keep the URL well
+# under common length limits and fan the chunks out concurrently.
+QUOTE_BATCH_SIZE = 50
+QUOTE_MAX_WORKERS = 8
+
+
+def _quote_url(symbols: List[str]) -> str:
+    base_url = os.environ.get("FMP_BASE_URL", "https://financialmodelingprep.com")
+    return f"{base_url}/api/v3/quote/{','.join(symbols)}"
+
+
+def _chunk_error(symbols: List[str], message: str) -> Dict[str, Dict[str, Any]]:
+    return {"prices": {}, "errors": {s: message for s in symbols}}
+
+
+def _parse_quote_chunk(symbols: List[str], data) -> Dict[str, Dict[str, Any]]:
+    """Split one quote response into per-symbol prices and errors."""
+    if isinstance(data, dict):
+        # FMP answers an invalid key, a plan limit or a bad request with
+        # {"Error Message": "..."} and status 200.
+        message = data.get("Error Message") or data.get("message") or json.dumps(data)[:200]
+        return _chunk_error(symbols, f"Error fetching stock price: {message}")
+    if data is not None and not isinstance(data, list):
+        return _chunk_error(symbols, f"Error parsing stock price data: unexpected response {str(data)[:200]}")
+    prices = {}
+    errors = {}
+    for quote in data or []:
+        if not isinstance(quote, dict):
+            continue
+        symbol = str(quote.get("symbol", "")).upper()
+        if symbol not in symbols:
+            continue
+        try:
+            prices[symbol] = float(quote["price"])
+        except (KeyError, TypeError, ValueError) as e:
+            errors[symbol] = f"Error parsing stock price data: {str(e)}"
+
+    for symbol in symbols:
+        if symbol not in prices and symbol not in errors:
+            errors[symbol] = f"No price data found for symbol: {symbol}"
+    return {"prices": prices, "errors": errors}
+
+
+def _fetch_quote_chunk(symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch quotes for one chunk of symbols in a single request.
+
+    Returns:
+        dict: {"prices": {symbol: price}, "errors": {symbol: message}}
+    """
+    params = {
+        "apikey": os.environ.get("FMP_API_KEY")
+    }
+    try:
+        response = http_client.get(_quote_url(symbols), params=params)
+        response.raise_for_status()
+        data = response.json()
+    except requests.exceptions.RequestException as e:
+        return _chunk_error(symbols, f"Error fetching stock price: {str(e)}")
+    except ValueError as e:
+        return _chunk_error(symbols, f"Error parsing stock price data: {str(e)}")
+    return _parse_quote_chunk(symbols, data)
+
+
+async def _fetch_quote_chunk_async(symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Async variant of _fetch_quote_chunk using the shared httpx client."""
+    import httpx
+
+    params = {
+        "apikey": os.environ.get("FMP_API_KEY")
+    }
+    try:
+        response = await http_client.aget(_quote_url(symbols), params=params)
+        response.raise_for_status()
+        data = response.json()
+    except httpx.HTTPError as e:
+        return _chunk_error(symbols, f"Error fetching stock price: {str(e)}")
+    except ValueError as e:
+        return _chunk_error(symbols, f"Error parsing stock price data: {str(e)}")
+    return _parse_quote_chunk(symbols, data)
+
+
+def _chunks(symbols: List[str]) -> List[List[str]]:
+    return [
+        symbols[i:i + QUOTE_BATCH_SIZE]
+        for i in range(0, len(symbols), QUOTE_BATCH_SIZE)
+    ]
+
+
+def _merge(results) -> Dict[str, Dict[str, Any]]:
+    merged = {"prices": {}, "errors": {}}
+    for chunk_result in results:
+        merged["prices"].update(chunk_result["prices"])
+        merged["errors"].update(chunk_result["errors"])
+    return merged
+
+
+def _fetch_quotes(symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Fetch quotes for any number of symbols as concurrent chunked requests."""
+    chunks = _chunks(symbols)
+    if not chunks:
+        return _merge([])
+    with ThreadPoolExecutor(max_workers=min(QUOTE_MAX_WORKERS, len(chunks))) as executor:
+        return _merge(executor.map(_fetch_quote_chunk, chunks))
+
+
+async def _fetch_quotes_async(symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Async variant of _fetch_quotes; chunks are gathered on the event loop."""
+    return _merge(await asyncio.gather(*(_fetch_quote_chunk_async(c) for c in _chunks(symbols))))
+
+
+def _split_cached(cache, symbols: List[str]):
+    """Return (result with cached prices, missing symbols, stale symbols)."""
+    result = {"prices": {}, "errors": {}}
+    missing = []
+    stale = []
+    for symbol in symbols:
+        price, state = cache.lookup("quote", symbol)
+        if state == tool_cache.MISS:
+            missing.append(symbol)
+            continue
+        result["prices"][symbol] = price
+        if state == tool_cache.STALE:
+            stale.append(symbol)
+    return result, missing, stale
+
+
+def _history():
+    """The price history store, or None unless HISTORY=on; only then is price_history (numpy) imported."""
+    if os.environ.get("HISTORY", "off").lower() != "on":
+        return None
+    from helpers import price_history
+    return price_history.get_store()
+
+
+def _from_history(cache, result: Dict[str, Dict[str, Any]], missing: List[str]) -> List[str]:
+    """Fill in prices another worker recorded within the quote TTL; return what is still missing."""
+    history = _history()
+    if history is None or not missing:
+        return missing
+    # Not copied into the cache: that would restart the TTL of an already aged price.
+    recent = history.latest_quotes(missing, cache.ttls.get("quote", tool_cache.DEFAULT_TTL))
+    result["prices"].update(recent)
+    return [s for s in missing if s not in recent]
+
+
+def _record(fetched: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    history = _history()
+    if history is not None and fetched["prices"]:
+        history.record_quotes(fetched["prices"])
+    return fetched
+
+
+def _store(cache, fetched: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    for symbol, price in fetched["prices"].items():
+        cache.store("quote", symbol, price)
+    return _record(fetched)
+
+
+def _normalize(symbols: List[str]) -> List[str]:
+    return list(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+
+
+def get_stock_prices(symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Get current stock prices for many symbols using batched Financial Modeling Prep quote requests.
+
+    Symbols are packed into comma separated chunks of QUOTE_BATCH_SIZE and the
+    chunks are fetched concurrently. A failing chunk or symbol does not fail
+    the whole batch; it is reported under "errors" instead. Prices are served
+    from the "quote" tool cache when fresh; stale ones are returned right away
+    and refreshed in the background. With HISTORY=on, fetched prices are
+    appended to the price history, and a price recorded there within the
+    quote TTL (e.g. by another worker) is used instead of a request.
+
+    Args:
+        symbols (list[str]): The stock symbols to look up (e.g. ['AAPL', 'GOOGL'])
+
+    Returns:
+        dict: {"prices": {symbol: price}, "errors": {symbol: error message}}
+    """
+    unique_symbols = _normalize(symbols)
+    cache = tool_cache.get_cache()
+    if cache is None:
+        return _record(_fetch_quotes(unique_symbols))
+
+    result, missing, stale = _split_cached(cache, unique_symbols)
+    missing = _from_history(cache, result, missing)
+    if stale:
+        cache.refresh_in_background(f"quote:{','.join(stale)}", lambda: _store(cache, _fetch_quotes(stale)))
+    if missing:
+        fetched = _store(cache, _fetch_quotes(missing))
+        result["prices"].update(fetched["prices"])
+        result["errors"].update(fetched["errors"])
+    return result
+
+
+async def get_stock_prices_async(symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Async variant of get_stock_prices: chunks are fetched with the shared httpx
+    client so the event loop stays free while waiting on FMP.
+    """
+    unique_symbols = _normalize(symbols)
+    cache = tool_cache.get_cache()
+    if cache is None:
+        return _record(await _fetch_quotes_async(unique_symbols))
+
+    result, missing, stale = _split_cached(cache, unique_symbols)
+    missing = _from_history(cache, result, missing)
+    if stale:
+        cache.refresh_in_background(f"quote:{','.join(stale)}", lambda: _store(cache, _fetch_quotes(stale)))
+    if missing:
+        fetched = _store(cache, await _fetch_quotes_async(missing))
+        result["prices"].update(fetched["prices"])
+        result["errors"].update(fetched["errors"])
+    return result
+
+
+def _price_or_raise(result: Dict[str, Dict[str, Any]], symbol: str) -> float:
+    key = symbol.strip().upper()
+    if key in result["prices"]:
+        return result["prices"][key]
+    raise Exception(result["errors"].get(key, f"No price data found for symbol: {symbol}"))
+
 
 def get_stock_price(symbol: str) -> float:
     """
     Get the current stock price for a given symbol using Financial Modeling Prep API.
-    
+
     Args:
         symbol (str): The stock symbol to look up (e.g. 'AAPL', 'GOOGL')
-        
+
     Returns:
         float: The current stock price
-        
+
     Raises:
         Exception: If there is an error fetching the stock price
     """
-    # FMP API endpoint and parameters
-    url = f"https://financialmodelingprep.com/api/v3/quote/{symbol}"
-    params = {
-        "apikey": os.environ.get("FMP_API_KEY")
-    }
+    return _price_or_raise(get_stock_prices([symbol]), symbol)
 
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
 
-        if not data:
-            raise Exception(f"No price data found for symbol: {symbol}")
-            
-        # Extract the current price from response
-        price = float(data[0]["price"])
-        return price
-        
-    except requests.exceptions.RequestException as e:
-        raise Exception(f"Error fetching stock price: {str(e)}")
-    except (KeyError, ValueError, IndexError) as e:
-        raise Exception(f"Error parsing stock price data: {str(e)}")
+async def get_stock_price_async(symbol: str) -> float:
+    """Async variant of get_stock_price; the agent loader registers it in its place."""
+    return _price_or_raise(await get_stock_prices_async([symbol]), symbol)
@@ -1,10 +1,9 @@
 import os
 import requests
+from helpers import env, http_client, x_api
 from typing import List, Dict, Any, Optional
-from dotenv import load_dotenv
-
-load_dotenv()
 
+env.load_env()
 
 
 def get_stock_twitter_feed(ticker: str, max_results: int = 10) -> List[Dict[str, Any]]:
@@ -33,15 +32,13 @@ def get_stock_twitter_feed(ticker: str, max_results: int = 10) -> List[Dict[str,
     query = f"${ticker} OR #{ticker}"
     
     # Twitter API v2 endpoint
-    url = "https://api.twitter.com/2/tweets/search/recent"
+    url = x_api.search_url()
     
     # Parameters for the request
     params = {
         'query': query,
         'max_results': max(10, min(max_results, 100)),  # API requires 10-100
-        'tweet.fields': 'created_at,author_id,public_metrics,text',
-        'expansions': 'author_id',
-        'user.fields': 'username,name,verified_type'
+        **x_api.SEARCH_FIELDS
     }
     
     # Headers with bearer token
@@ -50,43 +47,12 @@ def get_stock_twitter_feed(ticker: str, max_results: int = 10) -> List[Dict[str,
     }
     
     try:
-        response = requests.get(url, headers=headers, params=params)
+        response = http_client.get(url, headers=headers, params=params)
         response.raise_for_status()
         
         data = response.json()
         
-        # Parse and format the response
-        tweets = []
-        users = {}
-        
-        # Create a user lookup dictionary
-        if 'includes' in data and 'users' in data['includes']:
-            for user in data['includes']['users']:
-                users[user['id']] = user
-        
-        # Format tweets
-        if 'data' in data:
-            for tweet in data['data']:
-                author = users.get(tweet.get('author_id'), {})
-                
-                tweets.append({
-                    'id': tweet.get('id'),
-                    'text': tweet.get('text'),
-                    'created_at': tweet.get('created_at'),
-                    'author': {
-                        'username': author.get('username'),
-                        'name': author.get('name'),
-                        'verified_type': author.get('verified_type')
-                    },
-                    'metrics': tweet.get('public_metrics', {}),
-                    'url': f"https://twitter.com/{author.get('username', 'i')}/status/{tweet.get('id')}"
-                })
-        
-        return {
-            'ticker': ticker,
-            'tweet_count': len(tweets),
-            'tweets': tweets
-        }
+        return x_api.format_tweets(ticker, data)
     
     except requests.exceptions.RequestException as e:
         return {
@@ -96,5 +62,40 @@ def get_stock_twitter_feed(ticker: str, max_results: int = 10) -> List[Dict[str,
         }
 
 
+async def get_stock_twitter_feed_async(ticker: str, max_results: int = 10) -> Dict[str, Any]:
+    """Async variant of get_stock_twitter_feed; the agent loader registers it in its place."""
+    import httpx
+
+    bearer_token = os.environ.get('X_BEARER_TOKEN')
+
+    if not bearer_token:
+        return {
+            'error': 'Twitter API credentials not configured',
+            'message': 'Please set TWITTER_BEARER_TOKEN environment variable'
+        }
+
+    url = x_api.search_url()
+    params = {
+        'query': f"${ticker} OR #{ticker}",
+        'max_results': max(10, min(max_results, 100)),
+        **x_api.SEARCH_FIELDS
+    }
+    headers = {
+        'Authorization': f'Bearer {bearer_token}'
+    }
+
+    try:
+        response = await http_client.aget(url, headers=headers, params=params)
+        response.raise_for_status()
+        return x_api.format_tweets(ticker, response.json())
+
+    except httpx.HTTPError as e:
+        return {
+            'error': 'Failed to fetch Twitter feed',
+            'message': str(e),
+            'ticker': ticker
+        }
+
+
 if __name__ == "__main__":
     print (get_stock_twitter_feed("AAPL"))
\ No newline at end of file
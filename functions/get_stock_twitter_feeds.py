@@ -0,0 +1,301 @@
+import asyncio
+import os
+import re
+import threading
+import time
+import requests
+from helpers import env, http_client, x_api
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
+
+env.load_env()
+
+# search/recent accepts queries of up to 512 characters and 100 results per page.
+QUERY_MAX_CHARS = 512
+PAGE_SIZE = 100
+MAX_PAGES = int(os.environ.get("X_FEED_MAX_PAGES", "5"))
+# On a rate limit that resets within this many seconds, wait instead of giving up.
+RATE_LIMIT_WAIT = float(os.environ.get("X_RATE_LIMIT_WAIT", "10"))
+# 429s are handled here from x-rate-limit-reset, so the shared client must not
+# also retry them with its own backoff.
+TRANSPORT_RETRY_STATUSES = tuple(s for s in http_client.RETRY_STATUSES if s != 429)
+
+# Newest tweet id returned per ticker, for since_last polls. Kept per ticker
+# rather than per query so it survives the watchlist being packed differently.
+_since_ids = {}
+_rate_limited_until = 0.0
+_state_lock = threading.Lock()
+
+
+def _ticker_query(ticker: str) -> str:
+    return f"${ticker} OR #{ticker}"
+
+
+def _pack_queries(tickers: List[str]) -> List[List[str]]:
+    """Group tickers into as few OR-queries as fit in QUERY_MAX_CHARS."""
+    groups = []
+    current = []
+    length = 0
+    for ticker in tickers:
+        term = len(_ticker_query(ticker))
+        if current and length + len(" OR ") + term > QUERY_MAX_CHARS:
+            groups.append(current)
+            current, length = [], 0
+        length += term + (len(" OR ") if current else 0)
+        current.append(ticker)
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _mentions(ticker: str):
+    return re.compile(rf"(?<![\w$#])[$#]{re.escape(ticker)}(?![\w])", re.IGNORECASE)
+
+
+def _demux(tickers: List[str], tweets: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Assign each tweet to every ticker whose cashtag or hashtag it mentions."""
+    patterns = {ticker: _mentions(ticker) for ticker in tickers}
+    feeds = {ticker: [] for ticker in tickers}
+    for tweet in tweets:
+        for ticker, pattern in patterns.items():
+            if pattern.search(tweet.get("text") or ""):
+                feeds[ticker].append(tweet)
+    return feeds
+
+
+def _since_id(tickers: List[str]) -> Optional[str]:
+    """The oldest since_id of a query's tickers; None if any of them was never polled."""
+    with _state_lock:
+        ids = [_since_ids.get(ticker) for ticker in tickers]
+    if not ids or None in ids:
+        return None
+    return str(min(ids))
+
+
+def _drop_seen(feeds: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    A packed query starts after the oldest since_id of its tickers, so drop
+    the tweets each ticker already got from an earlier since_last call.
+    """
+    with _state_lock:
+        since = {ticker: _since_ids.get(ticker) for ticker in feeds}
+    return {
+        ticker: [t for t in tweets if since[ticker] is None or not str(t.get("id", "")).isdigit()
+                 or int(t["id"]) > since[ticker]]
+        for ticker, tweets in feeds.items()
+    }
+
+
+def _advance_since_ids(tickers: List[str], tweets: List[Dict[str, Any]]):
+    newest = max((int(t["id"]) for t in tweets if str(t.get("id", "")).isdigit()), default=None)
+    if newest is None:
+        return
+    with _state_lock:
+        for ticker in tickers:
+            _since_ids[ticker] = max(newest, _since_ids.get(ticker, 0))
+
+
+def _note_rate_limit(response):
+    """Remember when the window resets once X says no requests are left in it."""
+    global _rate_limited_until
+    remaining = response.headers.get("x-rate-limit-remaining")
+    reset = response.headers.get("x-rate-limit-reset")
+    if reset and reset.isdigit() and (response.status_code == 429 or remaining == "0"):
+        with _state_lock:
+            _rate_limited_until = max(_rate_limited_until, float(reset))
+
+
+def _rate_limit_wait() -> float:
+    """Seconds until the X rate limit window resets, 0 when requests are allowed."""
+    with _state_lock:
+        return max(0.0, _rate_limited_until - time.time())
+
+
+def _page(data: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    return x_api.format_tweets("", data)["tweets"], data.get("meta", {}).get("next_token")
+
+
+class _RateLimited(Exception):
+    pass
+
+
+class _Query:
+    """
+    The pages of one packed query, apart from the requests: wait `wait()`
+    seconds, send `params()`, pass the response to `add()` until `done`.
+    """
+
+    def __init__(self, tickers: List[str], since_last: bool, max_pages: int):
+        self.url = x_api.search_url()
+        self.headers = {'Authorization': f"Bearer {os.environ.get('X_BEARER_TOKEN')}"}
+        self.query = " OR ".join(_ticker_query(ticker) for ticker in tickers)
+        self.since_id = _since_id(tickers) if since_last else None
+        self.pages_left = max_pages
+        self.tweets = []
+        self.next_token = None
+        self.more = True
+        self.done = max_pages <= 0
+
+    def wait(self) -> float:
+        """Seconds to wait for the rate limit window; raises _RateLimited if that is too long."""
+        wait = _rate_limit_wait()
+        if wait > RATE_LIMIT_WAIT:
+            raise _RateLimited()
+        return wait
+
+    def params(self) -> Dict[str, Any]:
+        params = {
+            'query': self.query,
+            'max_results': PAGE_SIZE,
+            **x_api.SEARCH_FIELDS
+        }
+        if self.since_id:
+            params['since_id'] = self.since_id
+        if self.next_token:
+            params['next_token'] = self.next_token
+        return params
+
+    def add(self, response):
+        """Take a page; after a 429 the same page is requested again."""
+        _note_rate_limit(response)
+        if response.status_code == 429:
+            if not _rate_limit_wait():
+                # No usable x-rate-limit-reset; do not hammer the endpoint.
+                raise _RateLimited()
+            return
+        response.raise_for_status()
+        page, self.next_token = _page(response.json())
+        self.tweets.extend(page)
+        self.pages_left -= 1
+        self.more = bool(self.next_token)
+        self.done = not self.more or self.pages_left <= 0
+
+    def result(self) -> Tuple[List[Dict[str, Any]], bool]:
+        """(tweets, more pages left)"""
+        return self.tweets, self.more
+
+
+def _fetch_query(tickers: List[str], since_last: bool, max_pages: int) -> Tuple[List[Dict[str, Any]], bool]:
+    """All pages of one packed query, up to max_pages; returns (tweets, more pages left)."""
+    query = _Query(tickers, since_last, max_pages)
+    while not query.done:
+        wait = query.wait()
+        if wait:
+            time.sleep(wait)
+        query.add(http_client.get(query.url, headers=query.headers, params=query.params(),
+                                  retry_statuses=TRANSPORT_RETRY_STATUSES))
+    return query.result()
+
+
+async def _fetch_query_async(tickers: List[str], since_last: bool, max_pages: int) -> Tuple[List[Dict[str, Any]], bool]:
+    """Async variant of _fetch_query using the shared httpx client."""
+    query = _Query(tickers, since_last, max_pages)
+    while not query.done:
+        wait = query.wait()
+        if wait:
+            await asyncio.sleep(wait)
+        query.add(await http_client.aget(query.url, headers=query.headers, params=query.params(),
+                                         retry_statuses=TRANSPORT_RETRY_STATUSES))
+    return query.result()
+
+
+def _normalize(tickers: List[str]) -> List[str]:
+    return list(dict.fromkeys(t.strip().upper().lstrip("$#") for t in tickers if t and t.strip()))
+
+
+def _empty_result(tickers: List[str]) -> Dict[str, Any]:
+    return {
+        'feeds': {t: {'ticker': t, 'tweet_count': 0, 'tweets': []} for t in tickers},
+        'errors': {},
+        'truncated': [],
+        'rate_limited_until': None,
+    }
+
+
+def _add_query_result(result: Dict[str, Any], group: List[str], outcome, since_last: bool):
+    if isinstance(outcome, _RateLimited):
+        until = None
+        if _rate_limit_wait():
+            until = datetime.fromtimestamp(_rate_limited_until, timezone.utc).isoformat()
+        result['rate_limited_until'] = until
+        for ticker in group:
+            result['errors'][ticker] = f"X rate limit reached{f' until {until}' if until else ''}"
+        return
+    if isinstance(outcome, Exception):
+        for ticker in group:
+            result['errors'][ticker] = f"Failed to fetch Twitter feed: {str(outcome)}"
+        return
+    tweets, more = outcome
+    feeds = _demux(group, tweets)
+    if since_last:
+        feeds = _drop_seen(feeds)
+    for ticker, ticker_tweets in feeds.items():
+        result['feeds'][ticker] = {'ticker': ticker, 'tweet_count': len(ticker_tweets), 'tweets': ticker_tweets}
+    if more:
+        result['truncated'].extend(group)
+    if since_last:
+        _advance_since_ids(group, tweets)
+
+
+def get_stock_twitter_feeds(tickers: List[str], since_last: bool = False, max_pages: int = MAX_PAGES) -> Dict[str, Any]:
+    """
+    Get the X (Twitter) feed for many stock tickers with as few search requests as possible.
+
+    Cashtag/hashtag terms of several tickers are OR-combined into queries of
+    up to 512 characters, result pages are followed up to `max_pages` per
+    query, and tweets are assigned back to the tickers they mention. When X
+    reports the rate limit is used up, requests stop until it resets (waiting
+    if that is only a few seconds away) and the affected tickers are reported
+    under "errors".
+
+    Args:
+        tickers (list[str]): Stock ticker symbols, e.g. ["AAPL", "TSLA"]
+        since_last (bool): Only return tweets newer than those returned by the previous
+            since_last call for each ticker
+        max_pages (int): Result pages (100 tweets each) to follow per query
+
+    Returns:
+        dict: {"feeds": {ticker: {"ticker", "tweet_count", "tweets"}}, "errors": {ticker: message},
+            "truncated": [tickers with more pages left], "rate_limited_until": ISO time or None}
+    """
+    if not os.environ.get('X_BEARER_TOKEN'):
+        return {
+            'error': 'Twitter API credentials not configured',
+            'message': 'Please set X_BEARER_TOKEN environment variable'
+        }
+    tickers = _normalize(tickers)
+    result = _empty_result(tickers)
+    for group in _pack_queries(tickers):
+        try:
+            outcome = _fetch_query(group, since_last, max_pages)
+        except (_RateLimited, requests.exceptions.RequestException, ValueError) as e:
+            outcome = e
+        _add_query_result(result, group, outcome, since_last)
+    return result
+
+
+async def get_stock_twitter_feeds_async(tickers: List[str], since_last: bool = False,
+                                        max_pages: int = MAX_PAGES) -> Dict[str, Any]:
+    """Async variant of get_stock_twitter_feeds; the agent loader registers it in its place."""
+    import httpx
+
+    if not os.environ.get('X_BEARER_TOKEN'):
+        return {
+            'error': 'Twitter API credentials not configured',
+            'message': 'Please set X_BEARER_TOKEN environment variable'
+        }
+    tickers = _normalize(tickers)
+    result = _empty_result(tickers)
+    groups = _pack_queries(tickers)
+    outcomes = await asyncio.gather(
+        *(_fetch_query_async(group, since_last, max_pages) for group in groups), return_exceptions=True
+    )
+    for group, outcome in zip(groups, outcomes):
+        if isinstance(outcome, BaseException) and not isinstance(outcome, (_RateLimited, httpx.HTTPError, ValueError)):
+            raise outcome
+        _add_query_result(result, group, outcome, since_last)
+    return result
+
+
+if __name__ == "__main__":
+    print(get_stock_twitter_feeds(["AAPL", "TSLA", "NVDA"]))
@@ -0,0 +1,9 @@
+"""
+Modules shared by the tools in functions/ (HTTP client, caches, tracing, ...).
+
+They live in a package rather than next to the tools because `wowbits create
+functions` registers every functions/*.py as a python_functions row, and the
+CLI's workspace sync deletes functions/*.py files that have no row. Tools
+import them as `from helpers import http_client`; functions/ is put on
+sys.path by agent_runner/wowbits_runtime.py.
+"""
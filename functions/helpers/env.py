@@ -0,0 +1,23 @@
+"""
+Load the workspace .env file once per process.
+
+Tools that need API keys call `load_env()` at import instead of
+`load_dotenv()`, so the file is searched for and parsed once however many
+tools the runner loads.
+"""
+import threading
+
+_loaded = False
+_lock = threading.Lock()
+
+
+def load_env():
+    """Load .env into os.environ (existing variables win) on the first call; later calls do nothing."""
+    global _loaded
+    if _loaded:
+        return
+    with _lock:
+        if not _loaded:
+            from dotenv import load_dotenv
+            load_dotenv()
+            _loaded = True
@@ -0,0 +1,26 @@
+"""
+FMP company profile fields shared by the fundamentals tools, kept free of the
+numpy-backed helpers so get_stock_fundamentals stays light to load.
+"""
+
+
+def extract_fundamentals(data: list) -> dict:
+    """Extract relevant fundamental metrics from an FMP profile response."""
+    fundamentals = {
+        "marketCap": data[0].get("mktCap"),
+        "price": data[0].get("price"),
+        "beta": data[0].get("beta"),
+        "volAvg": data[0].get("volAvg"),
+        "lastDiv": data[0].get("lastDiv"),
+        "range": data[0].get("range"),
+        "changes": data[0].get("changes"),
+        "companyName": data[0].get("companyName"),
+        "currency": data[0].get("currency"),
+        "sector": data[0].get("sector"),
+        "industry": data[0].get("industry"),
+        "website": data[0].get("website"),
+        "description": data[0].get("description"),
+        "ceo": data[0].get("ceo"),
+        "country": data[0].get("country")
+    }
+    return fundamentals
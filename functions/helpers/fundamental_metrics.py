@@ -0,0 +1,265 @@
+"""
+Standard valuation and profitability ratios with sector/industry percentiles.
+
+A MetricsUniverse holds the raw FMP profile and TTM ratio inputs of every
+symbol loaded so far. `build(symbols)` computes all ratios for a peer set as
+one NumPy matrix, then the percentile of every symbol within its sector and
+industry and the per-group medians. The result is an immutable Snapshot,
+reused until an input changes, so looking up a symbol afterwards is a couple
+of row reads rather than a pass over its peers. Rankings depend only on the
+peer set passed in, not on what else the process has loaded.
+
+Percentiles count peers with a lower value plus half of the ties, so the
+lowest of ten is the 5th and the highest the 95th. Missing or meaningless
+inputs (a zero price, a negative P/E) are NaN and left out of their group. A
+group with fewer than MIN_GROUP_SIZE values gets no percentiles (None).
+"""
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Raw inputs kept per symbol: FMP profile fields, then ratios-ttm fields.
+PROFILE_INPUTS = ("mktCap", "price", "beta", "lastDiv", "rangeLow", "rangeHigh")
+RATIO_INPUTS = (
+    "peRatioTTM", "priceToBookRatioTTM", "priceToSalesRatioTTM", "grossProfitMarginTTM",
+    "operatingProfitMarginTTM", "netProfitMarginTTM", "returnOnEquityTTM", "debtEquityRatioTTM",
+    "currentRatioTTM",
+)
+INPUTS = PROFILE_INPUTS + RATIO_INPUTS
+METRICS = (
+    "marketCap", "beta", "dividendYield", "rangePosition", "pe", "earningsYield", "priceToBook",
+    "priceToSales", "grossMargin", "operatingMargin", "netMargin", "returnOnEquity", "debtToEquity",
+    "currentRatio",
+)
+# Each metric in a summary is one row of these, instead of a dict repeating the keys.
+COLUMNS = ("value", "sector_pct", "sector_median", "industry_pct", "industry_median")
+# Below this many values in a sector/industry a percentile says little; it is left out.
+MIN_GROUP_SIZE = int(os.environ.get("FUNDAMENTALS_MIN_GROUP_SIZE", "5"))
+# Snapshots kept per MetricsUniverse, one per distinct peer set.
+MAX_SNAPSHOTS = 8
+
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def _range(value) -> Tuple[float, float]:
+    """FMP's 52-week "range" string, e.g. "124.17-199.62", as (low, high)."""
+    low, _, high = str(value or "").partition("-")
+    return _number(low), _number(high)
+
+
+def input_vector(profile: Dict[str, Any], ratios: Dict[str, Any]) -> np.ndarray:
+    """The INPUTS of one symbol from its raw profile and ratios-ttm responses."""
+    low, high = _range(profile.get("range"))
+    values = dict(profile, rangeLow=low, rangeHigh=high)
+    return np.array(
+        [_number(values.get(name)) for name in PROFILE_INPUTS] + [_number(ratios.get(name)) for name in RATIO_INPUTS]
+    )
+
+
+def compute_metrics(inputs: np.ndarray) -> np.ndarray:
+    """METRICS for a (symbols x INPUTS) matrix, one column per metric."""
+    col = {name: inputs[:, i] for i, name in enumerate(INPUTS)}
+    price = np.where(col["price"] > 0, col["price"], np.nan)
+    width = col["rangeHigh"] - col["rangeLow"]
+    pe = col["peRatioTTM"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        columns = [
+            col["mktCap"],
+            col["beta"],
+            col["lastDiv"] / price,
+            np.where(width > 0, (price - col["rangeLow"]) / width, np.nan),
+            # A P/E is only comparable for profitable companies; the yield works for all.
+            np.where(pe > 0, pe, np.nan),
+            np.where(pe != 0, 1 / pe, np.nan),
+            col["priceToBookRatioTTM"],
+            col["priceToSalesRatioTTM"],
+            col["grossProfitMarginTTM"],
+            col["operatingProfitMarginTTM"],
+            col["netProfitMarginTTM"],
+            col["returnOnEquityTTM"],
+            col["debtEquityRatioTTM"],
+            col["currentRatioTTM"],
+        ]
+    return np.column_stack(columns) if len(inputs) else np.empty((0, len(METRICS)))
+
+
+def group_percentiles(values: np.ndarray, groups: np.ndarray, n_groups: int):
+    """
+    Percentile of every value within its group, per column, plus group medians and counts.
+
+    Args:
+        values: (n x m) matrix, NaN for missing
+        groups: (n,) group code of each row, 0..n_groups-1
+
+    Returns:
+        (percentiles (n x m), medians (n_groups x m), counts (n_groups x m))
+    """
+    n, m = values.shape
+    percentiles = np.full((n, m), np.nan)
+    medians = np.full((n_groups, m), np.nan)
+    counts = np.zeros((n_groups, m), dtype=np.int64)
+    for j in range(m):
+        valid = ~np.isnan(values[:, j])
+        if not valid.any():
+            continue
+        g = groups[valid]
+        distinct, dense = np.unique(values[valid, j], return_inverse=True)
+        # One sortable integer per row: its group, then its value's rank.
+        keys = g.astype(np.int64) * len(distinct) + dense
+        ordered = np.sort(keys)
+        count = np.bincount(g, minlength=n_groups)
+        start = np.concatenate(([0], np.cumsum(count)[:-1]))
+        below = np.searchsorted(ordered, keys, side="left") - start[g]
+        ties = np.searchsorted(ordered, keys, side="right") - np.searchsorted(ordered, keys, side="left")
+        percentiles[valid, j] = (below + 0.5 * ties) / count[g] * 100
+
+        present = count > 0
+        sorted_values = distinct[ordered % len(distinct)]
+        lo = start + (count - 1) // 2
+        hi = start + count // 2
+        medians[present, j] = (sorted_values[lo[present]] + sorted_values[hi[present]]) / 2
+        counts[:, j] = count
+    return percentiles, medians, counts
+
+
+class Snapshot:
+    """Ratios, percentiles and group medians of a universe at one point in time."""
+
+    def __init__(self, symbols: List[str], info: List[Dict[str, str]], inputs: np.ndarray,
+                 min_group_size: int = MIN_GROUP_SIZE):
+        self.symbols = symbols
+        self.min_group_size = min_group_size
+        self.index = {symbol: i for i, symbol in enumerate(symbols)}
+        self.info = info
+        self.values = compute_metrics(inputs)
+        self.sectors, sector_codes = np.unique([i["sector"] for i in info] or [""], return_inverse=True)
+        self.industries, industry_codes = np.unique([i["industry"] for i in info] or [""], return_inverse=True)
+        self.sector_codes = sector_codes[:len(symbols)]
+        self.industry_codes = industry_codes[:len(symbols)]
+        self.sector_size = np.bincount(self.sector_codes, minlength=len(self.sectors))
+        self.industry_size = np.bincount(self.industry_codes, minlength=len(self.industries))
+        self.sector_pct, self.sector_median, self.sector_count = group_percentiles(
+            self.values, self.sector_codes, len(self.sectors)
+        )
+        self.industry_pct, self.industry_median, self.industry_count = group_percentiles(
+            self.values, self.industry_codes, len(self.industries)
+        )
+
+    def lookup(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Compact numeric summary of one symbol; None if it is not in the universe."""
+        i = self.index.get(symbol)
+        if i is None:
+            return None
+        s, ind = self.sector_codes[i], self.industry_codes[i]
+        metrics = {}
+        for j, name in enumerate(METRICS):
+            value = self.values[i, j]
+            if np.isnan(value):
+                continue
+            sector_pct = self.sector_pct[i, j] if self.sector_count[s, j] >= self.min_group_size else np.nan
+            industry_pct = self.industry_pct[i, j] if self.industry_count[ind, j] >= self.min_group_size else np.nan
+            metrics[name] = [
+                _round(value),
+                _round(sector_pct, 0),
+                _round(self.sector_median[s, j]),
+                _round(industry_pct, 0),
+                _round(self.industry_median[ind, j]),
+            ]
+        return {
+            "symbol": symbol,
+            "companyName": self.info[i].get("companyName"),
+            "sector": self.info[i]["sector"],
+            "industry": self.info[i]["industry"],
+            "peers": {
+                "sector": int(self.sector_size[s]),
+                "industry": int(self.industry_size[ind]),
+            },
+            "columns": list(COLUMNS),
+            "metrics": metrics,
+        }
+
+
+def _round(value: float, digits: int = None):
+    """Four significant digits (or `digits` decimals) keeps the summary short for the LLM."""
+    if np.isnan(value):
+        return None
+    if digits is not None:
+        return int(round(value)) if digits == 0 else round(float(value), digits)
+    return float(f"{value:.4g}")
+
+
+class MetricsUniverse:
+    """Raw inputs of all loaded symbols; built Snapshots are reused until an input changes."""
+
+    def __init__(self):
+        self._inputs = {}
+        self._info = {}
+        self._lock = threading.Lock()
+        self._snapshots = {}
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._inputs
+
+    def __len__(self) -> int:
+        return len(self._inputs)
+
+    def add(self, symbol: str, profile: Dict[str, Any], ratios: Dict[str, Any]):
+        vector = input_vector(profile, ratios)
+        info = {
+            "companyName": profile.get("companyName"),
+            "sector": profile.get("sector") or "Unknown",
+            "industry": profile.get("industry") or "Unknown",
+        }
+        with self._lock:
+            old = self._inputs.get(symbol)
+            if old is not None and self._info[symbol] == info and np.array_equal(old, vector, equal_nan=True):
+                return
+            self._inputs[symbol] = vector
+            self._info[symbol] = info
+            self._snapshots.clear()
+
+    def build(self, symbols: Optional[List[str]] = None) -> Snapshot:
+        """
+        The Snapshot of a peer set: the loaded ones of `symbols`, or every
+        loaded symbol when None. Recomputed only if an input changed since it
+        was last built.
+        """
+        with self._lock:
+            key = None if symbols is None else tuple(sorted({s for s in symbols if s in self._inputs}))
+            snapshot = self._snapshots.get(key)
+            if snapshot is None:
+                members = list(self._inputs) if key is None else list(key)
+                inputs = np.array([self._inputs[s] for s in members]).reshape(len(members), len(INPUTS))
+                snapshot = Snapshot(members, [self._info[s] for s in members], inputs)
+                if len(self._snapshots) >= MAX_SNAPSHOTS:
+                    self._snapshots.pop(next(iter(self._snapshots)))
+                self._snapshots[key] = snapshot
+            return snapshot
+
+
+_universe = None
+_universe_lock = threading.Lock()
+
+
+def get_universe() -> MetricsUniverse:
+    """Return the process-wide universe."""
+    global _universe
+    if _universe is None:
+        with _universe_lock:
+            if _universe is None:
+                _universe = MetricsUniverse()
+    return _universe
+
+
+def set_universe(universe: MetricsUniverse):
+    """Replace the process-wide universe (e.g. to start an empty one)."""
+    global _universe
+    with _universe_lock:
+        _universe = universe
@@ -0,0 +1,301 @@
+"""
+Shared HTTP clients for the FMP / X tools.
+
+The tools used to call module-level `requests.get`, paying a fresh TCP+TLS
+handshake on every call. This module keeps one pooled keep-alive
+`requests.Session` per process and one `httpx.AsyncClient` per event loop,
+both with per-host connection limits, default timeouts and retry with
+exponential backoff on 429/5xx.
+
+Tunables (environment variables):
+    HTTP_POOL_MAXSIZE    max connections kept per host (default 10)
+    HTTP_TIMEOUT         request timeout in seconds (default 15)
+    HTTP_MAX_RETRIES     retries on 429/5xx and connection errors (default 3)
+    HTTP_BACKOFF_FACTOR  backoff base in seconds (default 0.5)
+    HTTP_RETRY_AFTER_MAX longest Retry-After honored, in seconds (default 30);
+                         a response asking for longer is returned, not waited on
+"""
+import asyncio
+import contextlib
+import contextvars
+import os
+import random
+import threading
+import time
+import weakref
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import InvalidHeader, MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+
+from helpers import tracing
+
+POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", "10"))
+DEFAULT_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", "15"))
+MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", "3"))
+BACKOFF_FACTOR = float(os.environ.get("HTTP_BACKOFF_FACTOR", "0.5"))
+RETRY_AFTER_MAX = float(os.environ.get("HTTP_RETRY_AFTER_MAX", "30"))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_sessions = {}
+_session_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()
+# RequestCounts of the count_requests() blocks the current context is in.
+_counts = contextvars.ContextVar("http_request_counts", default=())
+
+
+class RequestCount:
+    """Requests sent inside a count_requests() block, every retry included."""
+
+    def __init__(self):
+        self.sent = 0
+
+
+@contextlib.contextmanager
+def count_requests():
+    """
+    Count the requests sent by get/head/aget/ahead in this block (e.g. to
+    charge a rate limit for every page and retry a tool call made).
+
+        with http_client.count_requests() as count:
+            ...
+        count.sent
+    """
+    count = RequestCount()
+    token = _counts.set(_counts.get() + (count,))
+    try:
+        yield count
+    finally:
+        _counts.reset(token)
+
+
+def _count_sent():
+    for count in _counts.get():
+        count.sent += 1
+
+
+class _CountingRetry(Retry):
+    """
+    urllib3 Retry that counts each retried request in the active
+    count_requests() blocks and gives up on a Retry-After past RETRY_AFTER_MAX.
+    """
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if response is not None and (_retry_after(response) or 0) > RETRY_AFTER_MAX:
+            # With raise_on_status=False urllib3 hands this response back to the caller.
+            raise MaxRetryError(_pool, url, ResponseError("Retry-After exceeds RETRY_AFTER_MAX"))
+        retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        _count_sent()
+        return retry
+
+
+def get_session(retry_statuses=RETRY_STATUSES) -> requests.Session:
+    """
+    Return the process-wide pooled session, creating it on first use.
+
+    Args:
+        retry_statuses (tuple): Statuses retried with backoff. A caller that
+            handles some of them itself (e.g. 429 with the provider's reset
+            time) gets a separate session that leaves those to it.
+
+    Returns:
+        requests.Session: Keep-alive session with retry/backoff mounted for http and https
+    """
+    retry_statuses = tuple(retry_statuses)
+    session = _sessions.get(retry_statuses)
+    if session is None:
+        with _session_lock:
+            session = _sessions.get(retry_statuses)
+            if session is None:
+                retry = _CountingRetry(
+                    total=MAX_RETRIES,
+                    backoff_factor=BACKOFF_FACTOR,
+                    backoff_max=RETRY_AFTER_MAX,
+                    status_forcelist=retry_statuses,
+                    allowed_methods=frozenset(["GET", "HEAD"]),
+                    respect_retry_after_header=True,
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=POOL_MAXSIZE,
+                    pool_maxsize=POOL_MAXSIZE,
+                    pool_block=True,
+                    max_retries=retry,
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _sessions[retry_statuses] = session
+    return session
+
+
+def get(url: str, params: dict = None, headers: dict = None, timeout: float = None,
+        retry_statuses=RETRY_STATUSES) -> requests.Response:
+    """
+    GET through the shared session with the default timeout.
+
+    Args:
+        url (str): Absolute URL to fetch
+        params (dict): Query string parameters
+        headers (dict): Extra request headers
+        timeout (float): Override for DEFAULT_TIMEOUT
+        retry_statuses (tuple): Statuses retried with backoff (see get_session)
+
+    Returns:
+        requests.Response: The final response after any retries
+    """
+    started = time.perf_counter()
+    _count_sent()
+    try:
+        return get_session(retry_statuses).get(
+            url, params=params, headers=headers, timeout=timeout or DEFAULT_TIMEOUT
+        )
+    finally:
+        _traced(started)
+
+
+def head(url: str, headers: dict = None, timeout: float = None) -> requests.Response:
+    """HEAD through the shared session (e.g. conditional revalidation); see get."""
+    started = time.perf_counter()
+    _count_sent()
+    try:
+        return get_session().head(url, headers=headers, timeout=timeout or DEFAULT_TIMEOUT)
+    finally:
+        _traced(started)
+
+
+def _traced(started: float):
+    # Counted on the tool span the request is made from (see tracing.annotate).
+    tracing.annotate(**{"http.requests": 1, "http.ms": (time.perf_counter() - started) * 1000})
+
+
+def close_session():
+    """Close the shared sessions and drop their pooled connections."""
+    with _session_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+class _AsyncClientState:
+    """httpx client plus per-host semaphores bound to one event loop."""
+
+    def __init__(self):
+        import httpx
+
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(DEFAULT_TIMEOUT),
+            limits=httpx.Limits(max_keepalive_connections=POOL_MAXSIZE),
+        )
+        self.host_limits = {}
+
+    def host_limit(self, url):
+        host = urlparse(url).netloc
+        if host not in self.host_limits:
+            self.host_limits[host] = asyncio.Semaphore(POOL_MAXSIZE)
+        return self.host_limits[host]
+
+
+def _async_state() -> _AsyncClientState:
+    loop = asyncio.get_running_loop()
+    state = _async_clients.get(loop)
+    if state is None:
+        state = _AsyncClientState()
+        _async_clients[loop] = state
+    return state
+
+
+def get_async_client():
+    """
+    Return the httpx.AsyncClient for the running event loop, creating it on first use.
+
+    httpx clients cannot be shared across event loops, so one is kept per loop.
+    """
+    return _async_state().client
+
+
+async def aget(url: str, params: dict = None, headers: dict = None, timeout: float = None,
+               retry_statuses=RETRY_STATUSES):
+    """
+    Async GET through the pooled httpx client with per-host limits and retry/backoff.
+
+    Args:
+        url (str): Absolute URL to fetch
+        params (dict): Query string parameters
+        headers (dict): Extra request headers
+        timeout (float): Override for DEFAULT_TIMEOUT
+        retry_statuses (tuple): Statuses retried with backoff (see get_session)
+
+    Returns:
+        httpx.Response: The final response after any retries
+    """
+    started = time.perf_counter()
+    try:
+        return await _arequest("GET", url, params=params, headers=headers, timeout=timeout,
+                               retry_statuses=retry_statuses)
+    finally:
+        _traced(started)
+
+
+async def ahead(url: str, headers: dict = None, timeout: float = None):
+    """Async HEAD with the same limits and retries as aget."""
+    started = time.perf_counter()
+    try:
+        return await _arequest("HEAD", url, headers=headers, timeout=timeout)
+    finally:
+        _traced(started)
+
+
+async def _arequest(method: str, url: str, params: dict = None, headers: dict = None, timeout: float = None,
+                    retry_statuses=RETRY_STATUSES):
+    import httpx
+
+    state = _async_state()
+    attempt = 0
+    while True:
+        response = None
+        try:
+            async with state.host_limit(url):
+                _count_sent()
+                response = await state.client.request(
+                    method, url, params=params, headers=headers, timeout=timeout or DEFAULT_TIMEOUT
+                )
+        except httpx.TransportError:
+            if attempt >= MAX_RETRIES:
+                raise
+        else:
+            if response.status_code not in retry_statuses or attempt >= MAX_RETRIES:
+                return response
+            if (_retry_after(response) or 0) > RETRY_AFTER_MAX:
+                return response
+        await asyncio.sleep(_retry_delay(attempt, response))
+        attempt += 1
+
+
+def _retry_after(response):
+    """Seconds the response's Retry-After header asks for, or None without a valid one."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return Retry().parse_retry_after(value)
+    except InvalidHeader:
+        return None
+
+
+def _retry_delay(attempt, response=None) -> float:
+    """Seconds to wait before retry `attempt`, honoring Retry-After (at most RETRY_AFTER_MAX)."""
+    retry_after = _retry_after(response) if response is not None else None
+    if retry_after is not None:
+        return min(retry_after, RETRY_AFTER_MAX)
+    return min(BACKOFF_FACTOR * (2 ** attempt), RETRY_AFTER_MAX) * (0.5 + random.random() / 2)
+
+
+async def close_async_client():
+    """Close the httpx client bound to the running event loop."""
+    loop = asyncio.get_running_loop()
+    state = _async_clients.pop(loop, None)
+    if state is not None:
+        await state.client.aclose()
@@ -0,0 +1,241 @@
+"""
+Model calls through litellm, shared by run_llm and the tools that summarize
+with a model (summarize_stock_news).
+
+`complete()` / `complete_async()` bring the prompt within the token budget,
+answer identical prompts from the "llm" tool cache (coalescing identical calls
+in flight) and raise LLMError on failure. Per-call token counts and latency
+are kept for llm_metrics().
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Optional
+from helpers import env, tool_cache, tracing
+
+env.load_env()
+
+logger = logging.getLogger("run_llm")
+
+# Prompts above this many tokens (e.g. whole Firecrawl pages) are compressed
+# and then truncated before they are sent.
+MAX_PROMPT_TOKENS = int(os.environ.get("RUN_LLM_MAX_PROMPT_TOKENS", "24000"))
+# Per-call metrics kept for llm_metrics().
+METRICS_HISTORY = int(os.environ.get("RUN_LLM_METRICS_HISTORY", "1000"))
+
+_metrics = deque(maxlen=METRICS_HISTORY)
+_metrics_lock = threading.Lock()
+
+_IMAGE_LINK = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_LINK = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+_SPACES = re.compile(r"[ \t]+")
+_BLANK_LINES = re.compile(r"\n\s*\n\s*\n+")
+
+
+class _NoResponse(Exception):
+    """The model returned no choices; reported as an error and never cached."""
+
+
+class LLMError(Exception):
+    """A model call failed or gave no response; the run_llm tools return its message instead of raising."""
+
+
+def _litellm():
+    """litellm takes seconds to import, so it is loaded on the first call rather than with the tool."""
+    import litellm
+    return litellm
+
+
+def _count_tokens(model: str, text: str) -> int:
+    try:
+        return _litellm().token_counter(model=model, text=text)
+    except Exception:
+        # Unknown tokenizer: ~4 characters per token is close for English text.
+        return len(text) // 4
+
+
+def _compress(text: str) -> str:
+    """Drop markdown images and link targets and squeeze whitespace, keeping the readable text."""
+    text = _IMAGE_LINK.sub("", text)
+    text = _LINK.sub(r"\1", text)
+    text = _SPACES.sub(" ", text)
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+def fit_prompt(model: str, message: str, max_tokens: int = None):
+    """
+    Bring a prompt within the token budget.
+
+    Oversized prompts are compressed first. If that is not enough, the middle
+    is cut out, keeping the head (instructions and lead) and the tail.
+
+    Args:
+        model (str): Model whose tokenizer counts the tokens
+        message (str): The prompt
+        max_tokens (int): Budget, MAX_PROMPT_TOKENS by default
+
+    Returns:
+        tuple: (prompt to send, its token count, tokens removed)
+    """
+    budget = max_tokens or MAX_PROMPT_TOKENS
+    original = _count_tokens(model, message)
+    if original <= budget:
+        return message, original, 0
+
+    text = _compress(message)
+    tokens = _count_tokens(model, text)
+    while tokens > budget:
+        keep_chars = int(len(text) * budget / tokens * 0.95) - 40
+        if keep_chars <= 0:
+            text = text[:budget]
+            tokens = _count_tokens(model, text)
+            break
+        head = keep_chars * 2 // 3
+        tail = keep_chars - head
+        text = f"{text[:head]}\n\n[... truncated ...]\n\n{text[-tail:] if tail > 0 else ''}"
+        tokens = _count_tokens(model, text)
+    return text, tokens, original - tokens
+
+
+def _record(model: str, prompt_tokens: int, completion_tokens: int, started: float, truncated_tokens: int = 0):
+    entry = {
+        "model": model,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "latency_s": round(time.perf_counter() - started, 4),
+        "truncated_tokens": truncated_tokens,
+    }
+    with _metrics_lock:
+        _metrics.append(entry)
+    tracing.annotate(**{
+        "run_llm.calls": 1, "run_llm.ms": entry["latency_s"] * 1000,
+        "run_llm.prompt_tokens": prompt_tokens or 0, "run_llm.completion_tokens": completion_tokens or 0,
+    })
+    logger.info(
+        "run_llm model=%s prompt_tokens=%s completion_tokens=%s latency=%.3fs truncated_tokens=%s",
+        model, prompt_tokens, completion_tokens, entry["latency_s"], truncated_tokens,
+    )
+
+
+def llm_metrics():
+    """
+    Token counts and latency of recent upstream calls (cache hits are counted in tool_cache).
+
+    Returns:
+        dict: Totals over the last METRICS_HISTORY calls plus the calls themselves under "recent"
+    """
+    with _metrics_lock:
+        recent = list(_metrics)
+    calls = len(recent)
+    return {
+        "calls": calls,
+        "prompt_tokens": sum(m["prompt_tokens"] or 0 for m in recent),
+        "completion_tokens": sum(m["completion_tokens"] or 0 for m in recent),
+        "avg_latency_s": sum(m["latency_s"] for m in recent) / calls if calls else 0.0,
+        "truncated_calls": sum(1 for m in recent if m["truncated_tokens"]),
+        "recent": recent,
+    }
+
+
+def _messages(message: str):
+    return [{
+        "role": "user",
+        "content": message
+    }]
+
+
+def _cache_key(model: str, messages, temperature) -> str:
+    """
+    Key identical prompts to the same entry: (model, messages, temperature).
+    Keyed on the prompt as given, so a hit needs no tokenizing or compressing.
+    """
+    payload = json.dumps([model, messages, temperature], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _completion_kwargs(model: str, messages, temperature):
+    kwargs = {"model": model, "messages": messages}
+    if temperature is not None:
+        kwargs["temperature"] = temperature
+    return kwargs
+
+
+def _response_text(response) -> str:
+    # Extract the response text from the completion
+    if response and hasattr(response, 'choices') and len(response.choices) > 0:
+        return response.choices[0].message.content
+    raise _NoResponse()
+
+
+def _usage(response, model: str, prompt_tokens: int, text: str):
+    """(prompt, completion) token counts from the provider's usage, counted locally when missing."""
+    usage = getattr(response, "usage", None)
+    if usage and getattr(usage, "prompt_tokens", None) is not None:
+        return usage.prompt_tokens, usage.completion_tokens
+    return prompt_tokens, _count_tokens(model, text or "")
+
+
+def complete(model: str, message: str, temperature: Optional[float] = None, use_cache: bool = True) -> str:
+    """
+    The model's answer to a prompt, for code rather than the model: raises
+    LLMError on failure instead of returning an "Error ..." string, which could
+    also be a genuine answer.
+
+    Args:
+        model (str): The model identifier (e.g. "gpt-3.5-turbo", "claude-2", etc.)
+        message (str): The prompt, compressed/truncated above MAX_PROMPT_TOKENS
+        temperature (float): Sampling temperature; the model default when omitted
+        use_cache (bool): Set to False to always call the model
+
+    Returns:
+        str: The response text
+    """
+    try:
+        def call():
+            prompt, prompt_tokens, truncated = fit_prompt(model, message)
+            started = time.perf_counter()
+            response = _litellm().completion(**_completion_kwargs(model, _messages(prompt), temperature))
+            text = _response_text(response)
+            _record(model, *_usage(response, model, prompt_tokens, text), started,
+                    truncated_tokens=truncated)
+            return text
+
+        cache = tool_cache.get_cache() if use_cache else None
+        if cache is None:
+            return call()
+        return cache.get_or_load("llm", _cache_key(model, _messages(message), temperature), call)
+
+    except _NoResponse:
+        raise LLMError("Error: No response generated") from None
+    except Exception as e:
+        raise LLMError(f"Error running model {model}: {str(e)}") from e
+
+
+async def complete_async(model: str, message: str, temperature: Optional[float] = None,
+                         use_cache: bool = True) -> str:
+    """Async variant of complete using litellm.acompletion."""
+    try:
+        async def call():
+            prompt, prompt_tokens, truncated = fit_prompt(model, message)
+            started = time.perf_counter()
+            response = await _litellm().acompletion(**_completion_kwargs(model, _messages(prompt), temperature))
+            text = _response_text(response)
+            _record(model, *_usage(response, model, prompt_tokens, text), started,
+                    truncated_tokens=truncated)
+            return text
+
+        cache = tool_cache.get_cache() if use_cache else None
+        if cache is None:
+            return await call()
+        return await cache.get_or_load_async("llm", _cache_key(model, _messages(message), temperature), call)
+
+    except _NoResponse:
+        raise LLMError("Error: No response generated") from None
+    except Exception as e:
+        raise LLMError(f"Error running model {model}: {str(e)}") from e
+
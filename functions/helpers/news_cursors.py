@@ -0,0 +1,248 @@
+"""
+Per-ticker high-water marks for incremental news polling.
+
+A cursor is the newest published date seen for a ticker plus the hashes of
+the article URLs seen at or after that date, so articles sharing the boundary
+timestamp are neither repeated nor skipped. Cursors live in a small SQLite
+table (NEWS_CURSOR_PATH, default data/news_cursors.db) shared by the worker
+processes.
+
+Reading and moving the marks are separate steps: `select_new()` returns the
+articles past the stored cursors together with the cursors that cover them,
+and `commit()` stores those once the caller has handled the articles, so an
+article is returned again if the caller fails first. `commit()` only ever
+moves a mark forward, in one write transaction. A caller that only got
+through some of the articles commits `hold_back()` of the cursor instead, which
+keeps the rest new.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+def url_hash(url: Optional[str]) -> str:
+    return hashlib.sha256((url or "").encode("utf-8")).hexdigest()[:16]
+
+
+def is_new(cursor: Optional[Tuple[str, List[str]]], article: Dict[str, Any]) -> bool:
+    """Whether an article is past a (published_date, seen url hashes) cursor."""
+    if cursor is None:
+        return True
+    published, hashes = cursor
+    if (article.get("published_date") or "") < published:
+        return False
+    return url_hash(article.get("url")) not in hashes
+
+
+def merge(a: Optional[Tuple[str, List[str]]], b: Optional[Tuple[str, List[str]]]) -> Optional[Tuple[str, List[str]]]:
+    """The cursor past both `a` and `b`."""
+    if a is None or b is None:
+        return a if b is None else b
+    if a[0] != b[0]:
+        return a if a[0] > b[0] else b
+    return a[0], sorted(set(a[1]) | set(b[1]))
+
+
+def hold_back(cursor: Optional[Tuple[str, List[str]]], stored: Optional[Tuple[str, List[str]]],
+              handled: List[Dict[str, Any]], pending: List[Dict[str, Any]]) -> Optional[Tuple[str, List[str]]]:
+    """
+    The cursor covering only part of what select_new() returned.
+
+    Args:
+        cursor (tuple): The ticker's cursor from select_new()
+        stored (tuple): The ticker's stored cursor, whose seen hashes are kept
+        handled (list): Returned articles the caller is done with
+        pending (list): Returned articles it did not get to, which stay new
+
+    Returns:
+        tuple: `cursor` when nothing is pending, otherwise a cursor dated no later
+            than the oldest pending article that lists every handled article as seen
+    """
+    if not pending:
+        return cursor
+    floor = min(a.get("published_date") or "" for a in pending)
+    published = floor if cursor is None else min(cursor[0], floor)
+    seen = set(cursor[1] if cursor else []) | set(stored[1] if stored else [])
+    seen |= {url_hash(a.get("url")) for a in handled if (a.get("published_date") or "") >= published}
+    seen -= {url_hash(a.get("url")) for a in pending}
+    return published, sorted(seen)
+
+
+class CursorStore:
+    """SQLite table of ticker -> (published_date, boundary url hashes)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS news_cursors ("
+            " ticker TEXT PRIMARY KEY, published_date TEXT NOT NULL,"
+            " url_hashes TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            # Autocommit mode: commit() and advance() open their own BEGIN IMMEDIATE transaction.
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _read(self, conn, tickers: Iterable[str]) -> Dict[str, Tuple[str, List[str]]]:
+        tickers = list(tickers)
+        if not tickers:
+            return {}
+        rows = conn.execute(
+            "SELECT ticker, published_date, url_hashes FROM news_cursors"
+            f" WHERE ticker IN ({','.join('?' * len(tickers))})",
+            tickers,
+        ).fetchall()
+        return {ticker: (published, json.loads(hashes)) for ticker, published, hashes in rows}
+
+    def get(self, tickers: Iterable[str]) -> Dict[str, Tuple[str, List[str]]]:
+        """Current cursors of the given tickers; tickers never polled are absent."""
+        return self._read(self._conn(), tickers)
+
+    @staticmethod
+    def _select(cursors, articles_by_ticker, first_poll_limit, floor):
+        fresh, moved = {}, {}
+        for ticker, articles in articles_by_ticker.items():
+            cursor = cursors.get(ticker)
+            new = [a for a in articles if is_new(cursor, a)]
+            if cursor is None:
+                new = new[:first_poll_limit]
+            fresh[ticker] = new
+            if not new:
+                continue
+            if cursor is not None and floor is not None and floor >= cursor[0]:
+                # Articles between the cursor and the floor were not fetched yet.
+                moved[ticker] = merge(cursor, (cursor[0], [url_hash(a.get("url")) for a in new]))
+                continue
+            # Everything from the cursor up was fetched, including articles an
+            # earlier poll that ran out of pages already returned.
+            reached = new if cursor is None else [a for a in articles if is_new((cursor[0], []), a)]
+            newest = max(a.get("published_date") or "" for a in reached)
+            hashes = [url_hash(a.get("url")) for a in reached if (a.get("published_date") or "") == newest]
+            moved[ticker] = merge(cursor, (newest, sorted(set(hashes))))
+        return fresh, moved
+
+    @staticmethod
+    def _write(conn, stored, cursors):
+        for ticker, cursor in cursors.items():
+            published, hashes = merge(stored.get(ticker), cursor)
+            conn.execute(
+                "INSERT OR REPLACE INTO news_cursors (ticker, published_date, url_hashes, updated_at)"
+                " VALUES (?, ?, ?, ?)",
+                (ticker, published, json.dumps(sorted(hashes)), time.time()),
+            )
+
+    def select_new(self, articles_by_ticker: Dict[str, List[Dict[str, Any]]], first_poll_limit: int,
+                   floor: Optional[str] = None, known: Optional[Dict[str, Tuple[str, List[str]]]] = None,
+                   ) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, Tuple[str, List[str]]]]:
+        """
+        Keep the articles past each ticker's cursor, without moving the cursors.
+
+        Args:
+            articles_by_ticker (dict): ticker -> fetched articles, newest first
+            first_poll_limit (int): Articles returned for a ticker with no cursor yet
+            floor (str): Published date of the oldest fetched article when paging
+                stopped before reaching every cursor. A ticker whose cursor is not
+                older than it keeps its date and only adds the returned articles to
+                its seen hashes, so the older articles are still returned later.
+            known (dict): ticker -> cursor the caller has already handed off but not
+                committed yet, merged with the stored cursors
+
+        Returns:
+            tuple: (ticker -> new articles, newest first; ticker -> cursor to pass to
+                commit() once they are handled, for tickers with new articles)
+        """
+        return self._select(self.with_known(articles_by_ticker, known), articles_by_ticker, first_poll_limit, floor)
+
+    def with_known(self, tickers: Iterable[str], known: Optional[Dict[str, Tuple[str, List[str]]]] = None,
+                   ) -> Dict[str, Tuple[str, List[str]]]:
+        """The stored cursors of `tickers`, each merged with the caller's `known` cursor."""
+        tickers = list(tickers)
+        cursors = self.get(tickers)
+        for ticker in tickers:
+            cursor = merge(cursors.get(ticker), (known or {}).get(ticker))
+            if cursor is not None:
+                cursors[ticker] = cursor
+        return cursors
+
+    def commit(self, cursors: Dict[str, Tuple[str, List[str]]]):
+        """Move the given tickers' cursors forward to (at least) `cursors`, as returned by select_new()."""
+        if not cursors:
+            return
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._write(conn, self._read(conn, cursors), cursors)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def advance(self, articles_by_ticker: Dict[str, List[Dict[str, Any]]], first_poll_limit: int,
+                floor: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        select_new() and commit() in one write transaction, for callers that are
+        done with the articles once they have them: two polls racing on a
+        ticker then never both return an article.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            stored = self._read(conn, articles_by_ticker)
+            fresh, moved = self._select(stored, articles_by_ticker, first_poll_limit, floor)
+            self._write(conn, stored, moved)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return fresh
+
+    def reset(self, tickers: Iterable[str] = None):
+        """Forget the cursors of some tickers (all when omitted) so they are polled from scratch."""
+        conn = self._conn()
+        if tickers is None:
+            conn.execute("DELETE FROM news_cursors")
+            return
+        tickers = list(tickers)
+        if tickers:
+            conn.execute(
+                f"DELETE FROM news_cursors WHERE ticker IN ({','.join('?' * len(tickers))})", tickers
+            )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> CursorStore:
+    """Return the process-wide cursor store at NEWS_CURSOR_PATH."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                path = os.environ.get(
+                    "NEWS_CURSOR_PATH",
+                    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "news_cursors.db"),
+                )
+                _store = CursorStore(path)
+    return _store
+
+
+def set_store(store: Optional[CursorStore]):
+    """Replace the process-wide cursor store (e.g. with another path)."""
+    global _store
+    with _store_lock:
+        _store = store
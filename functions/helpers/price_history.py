@@ -0,0 +1,261 @@
+"""
+Append-only columnar history of quotes and profile snapshots.
+
+Every price or fundamentals lookup the tools make is appended here, so later
+questions ("what was the price when this article came out?", "how volatile
+has it been this week?") are answered locally instead of refetched.
+
+Layout (HISTORY_DIR, default data/history):
+    quotes/<SYMBOL>.f8    records of (timestamp, price)
+    profiles/<SYMBOL>.f8  records of (timestamp, marketCap, price, beta, volAvg, lastDiv, changes)
+
+Recording is opt-in: set HISTORY=on. Records are fixed-width float64 rows
+appended with O_APPEND, and readers memory-map the file and binary-search the
+timestamp column. Timestamps are epoch seconds and only ever increase per
+file: a writer locks the file (flock) and re-reads its last record before
+appending, so writers in several processes keep it ordered. A record older
+than the last one is dropped, as is a quote repeating the last price within
+QUOTE_MIN_INTERVAL.
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Sequence
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only ordered within one process
+    fcntl = None
+
+HISTORY_DIR = os.environ.get(
+    "HISTORY_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "history")
+)
+# Quotes are cached for 15s anyway; keep at most one unchanged quote a minute.
+QUOTE_MIN_INTERVAL = 60.0
+SECONDS_PER_YEAR = 365.25 * 24 * 60 * 60
+
+QUOTE_DTYPE = np.dtype([("ts", "<f8"), ("price", "<f8")])
+PROFILE_FIELDS = ("marketCap", "price", "beta", "volAvg", "lastDiv", "changes")
+PROFILE_DTYPE = np.dtype([("ts", "<f8")] + [(name, "<f8") for name in PROFILE_FIELDS])
+
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+class Series:
+    """One append-only record file of a symbol, memory-mapped for reads."""
+
+    def __init__(self, path: str, dtype: np.dtype):
+        self.path = path
+        self.dtype = dtype
+        self._lock = threading.Lock()
+        self._map = None
+        self._map_rows = 0
+
+    def read(self) -> np.ndarray:
+        """All complete records (read-only memmap; empty array when there are none)."""
+        try:
+            rows = os.path.getsize(self.path) // self.dtype.itemsize
+        except OSError:
+            rows = 0
+        if rows == 0:
+            return np.empty(0, dtype=self.dtype)
+        with self._lock:
+            if self._map is None or rows != self._map_rows:
+                self._map = np.memmap(self.path, dtype=self.dtype, mode="r", shape=(rows,))
+                self._map_rows = rows
+            return self._map
+
+    def _tail(self, fd: int) -> Optional[np.void]:
+        """The last complete record of the open file."""
+        rows = os.fstat(fd).st_size // self.dtype.itemsize
+        if rows == 0:
+            return None
+        data = os.pread(fd, self.dtype.itemsize, (rows - 1) * self.dtype.itemsize)
+        return np.frombuffer(data, dtype=self.dtype)[0].copy()
+
+    def last(self) -> Optional[np.void]:
+        """The newest record on disk, including other processes' appends."""
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except OSError:
+            return None
+        try:
+            return self._tail(fd)
+        finally:
+            os.close(fd)
+
+    def append(self, record: tuple, skip: Callable[[np.void], bool] = None) -> bool:
+        """
+        Append one record; returns False if it is older than the last one or
+        `skip(last record)` is true. The last record is read under an
+        exclusive lock on the file, so concurrent writers cannot reorder it.
+        """
+        row = np.array([record], dtype=self.dtype)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)  # released by close
+                last = self._tail(fd)
+                if last is not None and (row["ts"][0] < last["ts"] or (skip is not None and skip(last))):
+                    return False
+                os.write(fd, row.tobytes())
+            finally:
+                os.close(fd)
+        return True
+
+    def range(self, start: float = None, end: float = None) -> np.ndarray:
+        """Records with start <= ts <= end (either bound optional)."""
+        records = self.read()
+        ts = records["ts"]
+        lo = 0 if start is None else int(np.searchsorted(ts, start, side="left"))
+        hi = len(records) if end is None else int(np.searchsorted(ts, end, side="right"))
+        return records[lo:hi]
+
+
+class HistoryStore:
+    """Per-symbol quote and profile series under one directory."""
+
+    def __init__(self, directory: str = HISTORY_DIR):
+        self.directory = directory
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind: str, symbol: str) -> Series:
+        key = (kind, symbol.upper())
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.get(key)
+                if series is None:
+                    dtype = QUOTE_DTYPE if kind == "quotes" else PROFILE_DTYPE
+                    path = os.path.join(self.directory, kind, f"{symbol.upper()}.f8")
+                    series = self._series[key] = Series(path, dtype)
+        return series
+
+    def quotes(self, symbol: str) -> Series:
+        return self._get("quotes", symbol)
+
+    def profiles(self, symbol: str) -> Series:
+        return self._get("profiles", symbol)
+
+    def record_quotes(self, prices: Dict[str, float], ts: float = None):
+        """Append the latest price of each symbol, skipping unchanged repeats."""
+        ts = time.time() if ts is None else ts
+        for symbol, price in prices.items():
+            self.quotes(symbol).append(
+                (ts, float(price)),
+                skip=lambda last, price=price: last["price"] == price and ts - last["ts"] < QUOTE_MIN_INTERVAL,
+            )
+
+    def record_profile(self, symbol: str, fundamentals: Dict[str, object], ts: float = None):
+        """Append a profile snapshot when any of its numeric fields changed."""
+        ts = time.time() if ts is None else ts
+        values = tuple(_number(fundamentals.get(name)) for name in PROFILE_FIELDS)
+        self.profiles(symbol).append(
+            (ts,) + values,
+            skip=lambda last: np.array_equal(
+                np.array([last[name] for name in PROFILE_FIELDS]), np.array(values), equal_nan=True
+            ),
+        )
+
+    def latest_quotes(self, symbols: Iterable[str], max_age: float, now: float = None) -> Dict[str, float]:
+        """Prices recorded within the last `max_age` seconds, e.g. by another worker."""
+        now = time.time() if now is None else now
+        fresh = {}
+        for symbol in symbols:
+            records = self.quotes(symbol).read()
+            if len(records) and now - records["ts"][-1] <= max_age:
+                fresh[symbol] = float(records["price"][-1])
+        return fresh
+
+    def prices_at(self, symbol: str, timestamps: Sequence[float]) -> np.ndarray:
+        """Last recorded price at or before each timestamp (NaN before the first quote)."""
+        records = self.quotes(symbol).read()
+        idx = np.searchsorted(records["ts"], np.asarray(timestamps, dtype="f8"), side="right") - 1
+        prices = np.full(len(idx), np.nan)
+        ok = idx >= 0
+        prices[ok] = records["price"][idx[ok]]
+        return prices
+
+
+def resample(records: np.ndarray, step: float) -> np.ndarray:
+    """Prices on a regular grid of `step` seconds (last observation carried forward)."""
+    if len(records) == 0:
+        return np.empty(0)
+    grid = np.arange(records["ts"][0], records["ts"][-1] + step / 2, step)
+    idx = np.searchsorted(records["ts"], grid, side="right") - 1
+    return np.asarray(records["price"])[idx]
+
+
+def log_returns(prices: np.ndarray) -> np.ndarray:
+    prices = np.asarray(prices, dtype="f8")
+    return np.diff(np.log(prices)) if len(prices) > 1 else np.empty(0)
+
+
+def volatility(prices: np.ndarray, step: float) -> float:
+    """Annualized volatility of log returns of prices sampled every `step` seconds."""
+    returns = log_returns(prices)
+    if len(returns) < 2:
+        return float("nan")
+    return float(np.std(returns, ddof=1) * np.sqrt(SECONDS_PER_YEAR / step))
+
+
+def summarize(records: np.ndarray, step: float = None) -> Dict[str, object]:
+    """Count, first/last/high/low, total return and annualized volatility of a quote range."""
+    if len(records) == 0:
+        return {"count": 0}
+    prices = np.asarray(records["price"])
+    ts = np.asarray(records["ts"])
+    span = float(ts[-1] - ts[0])
+    if step is None:
+        # About a hundred bars across the range, never finer than a minute.
+        step = max(QUOTE_MIN_INTERVAL, span / 100) if span else QUOTE_MIN_INTERVAL
+    return {
+        "count": int(len(prices)),
+        "start": float(ts[0]),
+        "end": float(ts[-1]),
+        "first": float(prices[0]),
+        "last": float(prices[-1]),
+        "high": float(prices.max()),
+        "low": float(prices.min()),
+        "return": float(prices[-1] / prices[0] - 1) if prices[0] else None,
+        "volatility": volatility(resample(records, step), step) if span else None,
+        "bar_seconds": step,
+    }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    """Whether prices are recorded (HISTORY=on); off by default."""
+    return os.environ.get("HISTORY", "off").lower() == "on"
+
+
+def get_store() -> Optional[HistoryStore]:
+    """Return the process-wide history store, or None unless HISTORY=on."""
+    global _store
+    if _store is None:
+        if not enabled():
+            return None
+        with _store_lock:
+            if _store is None:
+                _store = HistoryStore(os.environ.get("HISTORY_DIR", HISTORY_DIR))
+    return _store
+
+
+def set_store(store: Optional[HistoryStore]):
+    """Replace the process-wide history store (e.g. with another directory)."""
+    global _store
+    with _store_lock:
+        _store = store
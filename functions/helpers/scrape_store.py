@@ -0,0 +1,268 @@
+"""
+Content-addressed on-disk store for scraped pages.
+
+Pages are keyed by normalized URL (lower-cased host, no fragment, default
+port or tracking parameters, sorted query). Each page body is stored once as
+a zlib-compressed blob named by the hash of its content, so the same article
+reached through several URLs, or re-scraped unchanged, costs one blob. A
+SQLite index maps URLs to blobs and keeps the small per-URL fields (the
+origin's ETag / Last-Modified) used to revalidate. When the blobs exceed
+SCRAPE_CACHE_MAX_BYTES the least recently used URLs are evicted.
+
+The store is a backend for tool_cache.TTLCache, which adds the TTL,
+stale-while-revalidate and coalescing of concurrent scrapes of a URL.
+
+Tunables (environment variables):
+    SCRAPE_CACHE          "off" disables the store (default on)
+    SCRAPE_CACHE_DIR      directory for the index and blobs (default data/scrape_cache)
+    SCRAPE_CACHE_MAX_BYTES  total compressed bytes kept (default 256 MiB)
+    SCRAPE_REVALIDATE     "off" re-scrapes expired pages without asking the origin
+                          first, and skips fetching validators after a scrape
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from typing import Any, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from helpers import tool_cache
+
+MAX_BYTES = int(os.environ.get("SCRAPE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+REVALIDATE = os.environ.get("SCRAPE_REVALIDATE", "on").lower() != "off"
+# Keys deleted per statement when evicting, under SQLite's variable limit.
+_DELETE_CHUNK = 500
+# Pages are fresh for a day; for a week after that they are served while a
+# conditional request checks the origin in the background.
+TTL_SECONDS = 24 * 60 * 60
+STALE_SECONDS = 7 * 24 * 60 * 60
+
+_TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid", "ref_src")
+_DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a URL so trivially different links share one entry."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and str(parts.port) != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(_TRACKING_PARAMS)
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+class ScrapeStoreBackend:
+    """
+    TTLCache backend keeping page bodies as compressed, content-addressed blobs.
+
+    Values are JSON-serializable dicts. Their "body" goes to a blob; the other
+    fields are kept inline in the index. Eviction is by total blob bytes,
+    least recently accessed keys first, deleted together; then the blobs those
+    keys referred to are deleted if no other key still refers to them. As in
+    tool_cache.SQLiteBackend, hits do not write: their access times are
+    buffered and written in one statement (tool_cache.TouchBuffer).
+    """
+
+    def __init__(self, directory: str, max_bytes: int = MAX_BYTES):
+        self.directory = directory
+        self.blob_dir = os.path.join(directory, "blobs")
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._touched = tool_cache.TouchBuffer()
+        os.makedirs(self.blob_dir, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " key TEXT PRIMARY KEY, content_hash TEXT NOT NULL, meta TEXT NOT NULL,"
+            " stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            " content_hash TEXT PRIMARY KEY, size INTEGER NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_pages_accessed_at ON pages (accessed_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_pages_content_hash ON pages (content_hash)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.directory, "index.db"), timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _blob_path(self, content_hash: str) -> str:
+        return os.path.join(self.blob_dir, content_hash[:2], f"{content_hash}.zlib")
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT content_hash, meta, stored_at FROM pages WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        content_hash, meta, stored_at = row
+        try:
+            with open(self._blob_path(content_hash), "rb") as f:
+                body = json.loads(zlib.decompress(f.read()))
+        except (OSError, zlib.error, ValueError):
+            self.delete(key)
+            return None
+        if self._touched.touch(key):
+            self.flush()
+        value = json.loads(meta)
+        value["body"] = body
+        return value, stored_at
+
+    def _write_touched(self, conn: sqlite3.Connection):
+        conn.executemany(
+            "UPDATE pages SET accessed_at = MAX(accessed_at, ?) WHERE key = ?", self._touched.take()
+        )
+
+    def flush(self):
+        """Write the access times of the hits since the last flush."""
+        conn = self._conn()
+        with self._write_lock:
+            self._write_touched(conn)
+            conn.commit()
+
+    def set(self, key: str, value: Any, stored_at: float) -> int:
+        """Store an entry and return the number of keys evicted to stay under max_bytes."""
+        meta = dict(value)
+        raw = json.dumps(meta.pop("body", None), sort_keys=True).encode("utf-8")
+        content_hash = hashlib.sha256(raw).hexdigest()
+        path = self._blob_path(content_hash)
+        conn = self._conn()
+        with self._write_lock:
+            # Eviction below picks victims by accessed_at, so bring it up to date first.
+            self._write_touched(conn)
+            replaced = conn.execute("SELECT content_hash FROM pages WHERE key = ?", (key,)).fetchone()
+            row = conn.execute(
+                "SELECT size FROM blobs WHERE content_hash = ?", (content_hash,)
+            ).fetchone()
+            if row is None or not os.path.exists(path):
+                data = zlib.compress(raw, 6)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+                conn.execute(
+                    "INSERT OR REPLACE INTO blobs (content_hash, size) VALUES (?, ?)",
+                    (content_hash, len(data)),
+                )
+            conn.execute(
+                "INSERT OR REPLACE INTO pages (key, content_hash, meta, stored_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, content_hash, json.dumps(meta, sort_keys=True), stored_at, stored_at),
+            )
+            if replaced and replaced[0] != content_hash:
+                self._drop_orphans(conn, [replaced[0]])
+            conn.commit()
+            return self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> int:
+        evicted = 0
+        (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        while total > self.max_bytes:
+            # Least recently used keys until their blobs cover the excess. A blob
+            # shared with a key that stays is not freed; the next round takes more.
+            victims, hashes, freed = [], set(), 0
+            rows = conn.execute(
+                "SELECT pages.key, pages.content_hash, blobs.size FROM pages"
+                " JOIN blobs ON blobs.content_hash = pages.content_hash ORDER BY pages.accessed_at"
+            )
+            for key, content_hash, size in rows:
+                if total - freed <= self.max_bytes:
+                    break
+                victims.append(key)
+                if content_hash not in hashes:
+                    hashes.add(content_hash)
+                    freed += size
+            rows.close()
+            if not victims:
+                break
+            for start in range(0, len(victims), _DELETE_CHUNK):
+                chunk = victims[start:start + _DELETE_CHUNK]
+                conn.execute(f"DELETE FROM pages WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+            self._drop_orphans(conn, hashes)
+            conn.commit()
+            evicted += len(victims)
+            (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        return evicted
+
+    def _drop_orphans(self, conn: sqlite3.Connection, hashes=None):
+        """Delete the blobs among `hashes` (all blobs when None) that no key refers to; the caller commits."""
+        if hashes is None:
+            hashes = [h for (h,) in conn.execute("SELECT content_hash FROM blobs")]
+        orphans = [
+            h for h in hashes
+            if conn.execute("SELECT 1 FROM pages WHERE content_hash = ? LIMIT 1", (h,)).fetchone() is None
+        ]
+        for content_hash in orphans:
+            try:
+                os.remove(self._blob_path(content_hash))
+            except OSError:
+                pass
+        conn.executemany("DELETE FROM blobs WHERE content_hash = ?", [(h,) for h in orphans])
+
+    def total_bytes(self) -> int:
+        (total,) = self._conn().execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        return total
+
+    def delete(self, key: str):
+        conn = self._conn()
+        with self._write_lock:
+            row = conn.execute("SELECT content_hash FROM pages WHERE key = ?", (key,)).fetchone()
+            conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+            if row:
+                self._drop_orphans(conn, [row[0]])
+            conn.commit()
+
+    def clear(self):
+        conn = self._conn()
+        with self._write_lock:
+            conn.execute("DELETE FROM pages")
+            self._drop_orphans(conn)
+            conn.commit()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> Optional[tool_cache.TTLCache]:
+    """Return the process-wide scrape store, or None when SCRAPE_CACHE=off."""
+    global _store
+    if _store is None:
+        if os.environ.get("SCRAPE_CACHE", "on").lower() == "off":
+            return None
+        with _store_lock:
+            if _store is None:
+                directory = os.environ.get(
+                    "SCRAPE_CACHE_DIR",
+                    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "scrape_cache"),
+                )
+                _store = tool_cache.TTLCache(
+                    ScrapeStoreBackend(directory),
+                    ttls={"scrape": TTL_SECONDS},
+                    stale={"scrape": STALE_SECONDS},
+                )
+    return _store
+
+
+def set_store(store: Optional[tool_cache.TTLCache]):
+    """Replace the process-wide scrape store (e.g. with another directory)."""
+    global _store
+    with _store_lock:
+        _store = store
@@ -0,0 +1,223 @@
+"""
+Firecrawl scraping behind the scrape_store cache, shared by scrape_web_page
+and the tools that read articles (summarize_stock_news).
+
+`scrape(url)` returns the page from the store while it is fresh, revalidates
+an expired one with a conditional HEAD (ETag / Last-Modified) and only calls
+Firecrawl again when the page changed. Concurrent scrapes of a URL share one
+request. With the store off (SCRAPE_CACHE_BACKEND=off) every call scrapes.
+"""
+import asyncio
+import os
+import threading
+import time
+import weakref
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from helpers import http_client, scrape_store, tracing
+
+if TYPE_CHECKING:
+    from firecrawl import AsyncFirecrawl, Firecrawl
+
+_clients = {}
+_async_clients = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+_stats = {"scrapes": 0, "revalidations": 0, "not_modified": 0}
+_stats_lock = threading.Lock()
+
+
+def _api_url() -> str:
+    return os.environ.get("FIRECRAWL_API_URL", "https://api.firecrawl.dev")
+
+
+def _client_key():
+    return os.environ.get("FIRECRAWL_API_KEY"), _api_url()
+
+
+def _client() -> "Firecrawl":
+    """Process-wide Firecrawl client so its HTTP session and connections are reused."""
+    key = _client_key()
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            # Imported on first use: the SDK is not needed to load the tool.
+            from firecrawl import Firecrawl
+            client = _clients[key] = Firecrawl(api_key=key[0], api_url=key[1])
+    return client
+
+
+def _async_client() -> "AsyncFirecrawl":
+    """AsyncFirecrawl client per event loop; its connection pool is bound to the loop."""
+    key = _client_key()
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            from firecrawl import AsyncFirecrawl
+            client = clients[key] = AsyncFirecrawl(api_key=key[0], api_url=key[1])
+    return client
+
+
+def _count(name: str):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def scrape_stats() -> Dict[str, Any]:
+    """
+    Firecrawl scrapes made by this process, conditional revalidations sent and
+    how many of those found the page unchanged, plus the "scrape" cache counters.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    store = scrape_store.get_store()
+    if store is not None:
+        with store._stats_lock:
+            cache = dict(store.type_stats.get("scrape", {}))
+        stats["cache"] = cache
+    return stats
+
+
+def _scrape(url: str):
+    """One Firecrawl scrape, counted in scrape_stats() and on the current trace span."""
+    _count("scrapes")
+    started = time.perf_counter()
+    try:
+        return _client().scrape(url=url)
+    finally:
+        tracing.annotate(**{"firecrawl.requests": 1, "firecrawl.ms": (time.perf_counter() - started) * 1000})
+
+
+async def _scrape_async(url: str):
+    _count("scrapes")
+    started = time.perf_counter()
+    try:
+        return await _async_client().scrape(url=url)
+    finally:
+        tracing.annotate(**{"firecrawl.requests": 1, "firecrawl.ms": (time.perf_counter() - started) * 1000})
+
+
+def _document(result) -> Dict[str, Any]:
+    if hasattr(result, "model_dump"):
+        return result.model_dump(mode="json", exclude_none=True)
+    return result
+
+
+def _validators(response) -> Dict[str, Optional[str]]:
+    if response is None or response.status_code >= 400:
+        return {"etag": None, "last_modified": None}
+    return {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+
+
+def _conditional_headers(previous: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    headers = {}
+    if previous.get("etag"):
+        headers["If-None-Match"] = previous["etag"]
+    if previous.get("last_modified"):
+        headers["If-Modified-Since"] = previous["last_modified"]
+    return headers or None
+
+
+def _unchanged(previous: Dict[str, Any], response) -> bool:
+    """True when a conditional HEAD shows the page has not changed since it was stored."""
+    if response is None:
+        return False
+    if response.status_code == 304:
+        return True
+    if response.status_code >= 400:
+        return False
+    current = _validators(response)
+    if previous.get("etag") and current["etag"]:
+        return current["etag"] == previous["etag"]
+    return bool(previous.get("last_modified")) and current["last_modified"] == previous["last_modified"]
+
+
+def _previous(store, key: str) -> Optional[Dict[str, Any]]:
+    """The stored entry for a URL even past its stale window, to revalidate instead of re-scrape."""
+    entry = store.backend.get(f"scrape:{key}")
+    return entry[0] if entry else None
+
+
+def _wants_validators(previous: Optional[Dict[str, Any]]) -> bool:
+    """
+    Whether to ask the origin for ETag / Last-Modified after a scrape: only
+    when expired pages are revalidated at all, and not for a page whose
+    origin sent neither the last time.
+    """
+    if not scrape_store.REVALIDATE:
+        return False
+    return previous is None or bool(_conditional_headers(previous))
+
+
+def _head(url: str, headers: Optional[Dict[str, str]] = None):
+    # Best effort: origins that reject HEAD just mean the page is scraped again.
+    try:
+        return http_client.head(url, headers=headers)
+    except Exception:
+        return None
+
+
+async def _ahead(url: str, headers: Optional[Dict[str, str]] = None):
+    try:
+        return await http_client.ahead(url, headers=headers)
+    except Exception:
+        return None
+
+
+def _load(store, key: str, url: str) -> Dict[str, Any]:
+    previous = _previous(store, key)
+    if previous and scrape_store.REVALIDATE and _conditional_headers(previous):
+        _count("revalidations")
+        response = _head(url, _conditional_headers(previous))
+        if _unchanged(previous, response):
+            _count("not_modified")
+            return previous
+    document = _document(_scrape(url))
+    return dict(_validators(_head(url) if _wants_validators(previous) else None), body=document)
+
+
+async def _load_async(store, key: str, url: str) -> Dict[str, Any]:
+    previous = _previous(store, key)
+    if previous and scrape_store.REVALIDATE and _conditional_headers(previous):
+        _count("revalidations")
+        response = await _ahead(url, _conditional_headers(previous))
+        if _unchanged(previous, response):
+            _count("not_modified")
+            return previous
+    if not _wants_validators(previous):
+        return dict(_validators(None), body=_document(await _scrape_async(url)))
+    # Validators are fetched alongside the scrape rather than after it.
+    result, head = await asyncio.gather(_scrape_async(url), _ahead(url))
+    return dict(_validators(head), body=_document(result))
+
+
+def scrape(url: str) -> Dict[str, Any]:
+    """
+    The scraped document (markdown and metadata) for a URL, from the store when possible.
+
+    Args:
+        url (str): The URL to scrape (must include http:// or https://)
+
+    Returns:
+        dict: The document as Firecrawl returns it
+    """
+    store = scrape_store.get_store()
+    if store is None:
+        return _document(_scrape(url))
+    key = scrape_store.normalize_url(url)
+    return store.get_or_load("scrape", key, lambda: _load(store, key, url))["body"]
+
+
+async def scrape_async(url: str) -> Dict[str, Any]:
+    """Async variant of scrape."""
+    store = scrape_store.get_store()
+    if store is None:
+        return _document(await _scrape_async(url))
+    key = scrape_store.normalize_url(url)
+    entry = await store.get_or_load_async("scrape", key, lambda: _load_async(store, key, url))
+    return entry["body"]
@@ -0,0 +1,232 @@
+"""
+FMP stock_news shared by the news tools: the article format, the cached latest
+articles of a ticker (`latest()`) and incremental polling of many tickers at
+once against the news_cursors marks.
+
+`poll()` fetches every ticker of a batch with one stock_news request, paging
+only while a ticker may still have unseen articles, and returns the articles
+past each ticker's cursor. With `commit` the cursors move right away; without
+it the caller gets the cursors covering the articles and commits them itself
+once they are handled (news_cursors.CursorStore.commit), so a caller that
+fails in between gets the articles again on its next poll.
+"""
+import contextlib
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from helpers import http_client, news_cursors, tool_cache
+
+# One stock_news request covers many tickers; FMP sorts the combined feed
+# newest first and pages through it.
+NEWS_BATCH_SIZE = 50
+PAGE_SIZE = int(os.environ.get("NEWS_POLL_PAGE_SIZE", "50"))
+MAX_PAGES = int(os.environ.get("NEWS_POLL_MAX_PAGES", "5"))
+LATEST_LIMIT = 10
+# A ticker polled for the first time gets the same latest articles as get_stock_news.
+FIRST_POLL_LIMIT = LATEST_LIMIT
+
+
+def news_url() -> str:
+    return os.environ.get("FMP_BASE_URL", "https://financialmodelingprep.com") + "/api/v3/stock_news"
+
+
+def format_news(news_data: list) -> list:
+    """Format FMP stock_news items into the article dicts returned by the news tools."""
+    formatted_news = []
+    for article in news_data:
+        formatted_article = {
+            "symbol": article.get("symbol"),
+            "title": article.get("title"),
+            "text": article.get("text"),
+            "published_date": article.get("publishedDate"),
+            "source": article.get("site"),
+            "url": article.get("url"),
+            "image_url": article.get("image")
+        }
+        formatted_news.append(formatted_article)
+    return formatted_news
+
+
+def _latest_params(symbol: str) -> Dict[str, Any]:
+    return {"tickers": symbol, "limit": LATEST_LIMIT, "apikey": os.environ.get("FMP_API_KEY")}
+
+
+@contextlib.contextmanager
+def _fmp_errors(http_error):
+    """Re-raise request (`http_error`) and parse failures with the messages the news tools report."""
+    try:
+        yield
+    except http_error as e:
+        raise Exception(f"Error fetching news data: {str(e)}")
+    except ValueError as e:
+        raise Exception(f"Error parsing news data: {str(e)}")
+
+
+def _articles(response) -> List[Dict[str, Any]]:
+    response.raise_for_status()
+    return format_news(response.json())
+
+
+# Cached under get_stock_news, the tool these are the latest articles of.
+@tool_cache.cached("news", name="get_stock_news")
+def latest(symbol: str) -> List[Dict[str, Any]]:
+    """The LATEST_LIMIT newest articles of a ticker, formatted as format_news."""
+    with _fmp_errors(requests.exceptions.RequestException):
+        return _articles(http_client.get(news_url(), params=_latest_params(symbol)))
+
+
+@tool_cache.cached("news", name="get_stock_news")
+async def latest_async(symbol: str) -> List[Dict[str, Any]]:
+    """Async variant of latest."""
+    import httpx
+
+    with _fmp_errors(httpx.HTTPError):
+        return _articles(await http_client.aget(news_url(), params=_latest_params(symbol)))
+
+
+def _group(symbols: List[str], articles: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    grouped = {symbol: [] for symbol in symbols}
+    for article in articles:
+        symbol = (article.get("symbol") or "").upper()
+        if symbol in grouped:
+            grouped[symbol].append(article)
+    return grouped
+
+
+class _Pages:
+    """
+    Paging through one batch's stock_news feed, apart from the requests:
+    `params()` gives the next request, `add()` takes its articles, and
+    `result()` the batch once `done`.
+    """
+
+    def __init__(self, symbols: List[str], cursors):
+        self.symbols = symbols
+        self.cursors = cursors
+        self.articles = []
+        self.page = 0
+        self.budget = MAX_PAGES
+        self.floor = None
+        self.done = False
+
+    def params(self) -> Dict[str, Any]:
+        params = {
+            "tickers": ",".join(self.symbols),
+            "limit": PAGE_SIZE,
+            "page": self.page,
+            "apikey": os.environ.get("FMP_API_KEY")
+        }
+        if len(self.cursors) == len(self.symbols):
+            # Every ticker has been polled before: nothing older than the oldest mark is needed.
+            params["from"] = min(published for published, _ in self.cursors.values())[:10]
+        return params
+
+    def add(self, page_articles: List[Dict[str, Any]]):
+        self.articles.extend(page_articles)
+        if not self._needs_more(page_articles):
+            self.done = True
+            return
+        self.budget -= self._costs_page(page_articles)
+        if self.budget <= 0:
+            # Paging stopped at this date; cursors not older than it stay where they are.
+            self.floor = min(a.get("published_date") or "" for a in self.articles)
+            self.done = True
+            return
+        self.page += 1
+
+    def _needs_more(self, page_articles: List[Dict[str, Any]]) -> bool:
+        """Whether the next page can still hold articles a ticker has not seen."""
+        if len(page_articles) < PAGE_SIZE:
+            return False
+        grouped = _group(self.symbols, self.articles)
+        oldest = min(a.get("published_date") or "" for a in page_articles)
+        for symbol in self.symbols:
+            cursor = self.cursors.get(symbol)
+            if cursor is None:
+                if len(grouped[symbol]) < FIRST_POLL_LIMIT:
+                    return True
+            elif oldest >= cursor[0]:
+                return True
+        return False
+
+    def _costs_page(self, page_articles: List[Dict[str, Any]]) -> bool:
+        """
+        Whether a page counts against MAX_PAGES: pages holding only articles
+        returned by earlier polls are free, so a ticker left behind by an earlier
+        poll that ran out of pages is caught up instead of stalling.
+        """
+        return any(news_cursors.is_new(self.cursors.get((a.get("symbol") or "").upper()), a)
+                   for a in page_articles)
+
+    def result(self) -> Tuple[Dict[str, List[Dict[str, Any]]], Optional[str]]:
+        """(ticker -> fetched articles, the floor paging stopped at or None)"""
+        return _group(self.symbols, self.articles), self.floor
+
+
+class _Poll:
+    """What poll() collects over its batches, apart from the requests."""
+
+    def __init__(self, symbols: List[str], commit: bool, known: Optional[Dict[str, Any]]):
+        self.store = news_cursors.get_store()
+        self.batches = [symbols[i:i + NEWS_BATCH_SIZE] for i in range(0, len(symbols), NEWS_BATCH_SIZE)]
+        self.commit = commit
+        self.known = known
+        self.fresh, self.moved = {}, {}
+
+    def pages(self, batch: List[str]) -> _Pages:
+        return _Pages(batch, self.store.with_known(batch, self.known))
+
+    def add(self, pages: _Pages):
+        articles, floor = pages.result()
+        if self.commit:
+            self.fresh.update(self.store.advance(articles, FIRST_POLL_LIMIT, floor))
+            return
+        fresh, moved = self.store.select_new(articles, FIRST_POLL_LIMIT, floor, self.known)
+        self.fresh.update(fresh)
+        self.moved.update(moved)
+
+
+def _normalize(symbols: List[str]) -> List[str]:
+    return list(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+
+
+def poll(symbols: List[str], commit: bool = True, known: Dict[str, Any] = None,
+         ) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, Any]]:
+    """
+    The articles of `symbols` not returned by an earlier poll.
+
+    Args:
+        symbols (list[str]): Stock ticker symbols
+        commit (bool): Move the cursors past the returned articles right away
+        known (dict): ticker -> cursor the caller has handed off but not committed
+            yet; the poll starts from it instead of from the stored cursor
+
+    Returns:
+        tuple: (ticker -> new articles, newest first; ticker -> cursor covering them,
+            to commit once they are handled, empty when `commit` is set)
+    """
+    state = _Poll(_normalize(symbols), commit, known)
+    with _fmp_errors(requests.exceptions.RequestException):
+        for batch in state.batches:
+            pages = state.pages(batch)
+            while not pages.done:
+                pages.add(_articles(http_client.get(news_url(), params=pages.params())))
+            state.add(pages)
+    return state.fresh, state.moved
+
+
+async def poll_async(symbols: List[str], commit: bool = True, known: Dict[str, Any] = None,
+                     ) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, Any]]:
+    """Async variant of poll."""
+    import httpx
+
+    state = _Poll(_normalize(symbols), commit, known)
+    with _fmp_errors(httpx.HTTPError):
+        for batch in state.batches:
+            pages = state.pages(batch)
+            while not pages.done:
+                pages.add(_articles(await http_client.aget(news_url(), params=pages.params())))
+            state.add(pages)
+    return state.fresh, state.moved
@@ -0,0 +1,495 @@
+"""
+TTL cache with stale-while-revalidate for the market data tools.
+
+Each cached value has a data type that picks its TTL (quotes live seconds,
+company profiles a day, news minutes). Within the TTL a value is fresh.
+For STALE_SECONDS after that it is still served, but a background refresh
+is started, so callers never block on a refresh. After that it is a miss
+and is loaded inline. Concurrent misses for the same key are coalesced:
+one caller runs the loader and the others wait for its result.
+
+Backends:
+    memory  in-process LRU bounded by TOOL_CACHE_MAX_ENTRIES (default)
+    sqlite  on-disk table at TOOL_CACHE_PATH, shared by worker processes
+
+Select the backend with TOOL_CACHE_BACKEND=memory|sqlite; set it to "off"
+to disable caching. Counters, overall or per data type, are available from
+`cache_stats()`.
+"""
+import asyncio
+import concurrent.futures
+import functools
+import inspect
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Ticker arguments of cached tools, normalized so "aapl" and "AAPL" share an entry.
+SYMBOL_PARAMS = ("symbol", "symbols", "ticker", "tickers")
+
+TTL_SECONDS = {
+    "quote": 15,
+    "profile": 24 * 60 * 60,
+    "news": 5 * 60,
+    "llm": 15 * 60,
+}
+STALE_SECONDS = {
+    "quote": 60,
+    "profile": 7 * 24 * 60 * 60,
+    "news": 30 * 60,
+    # A stale completion is no better than a new one; never serve it.
+    "llm": 0,
+}
+DEFAULT_TTL = 60
+MAX_ENTRIES = int(os.environ.get("TOOL_CACHE_MAX_ENTRIES", "10000"))
+# The SQLite backend records hits in memory and writes their access times
+# (used only to pick LRU victims) this often, instead of once per hit.
+TOUCH_FLUSH_SECONDS = 30
+TOUCH_FLUSH_ENTRIES = 512
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+
+class MemoryBackend:
+    """
+    Thread-safe in-process LRU of key -> (value, stored_at).
+
+    Values are kept pickled, so every get() returns a copy: a caller that
+    edits a cached result (e.g. trims a tool payload) cannot change what the
+    next caller gets, and neither can the caller that stored it.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            self._data.move_to_end(key)
+        return pickle.loads(entry[0]), entry[1]
+
+    def set(self, key: str, value: Any, stored_at: float) -> int:
+        """Store an entry and return the number of entries evicted to make room."""
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._data[key] = (data, stored_at)
+            self._data.move_to_end(key)
+            evicted = 0
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class TouchBuffer:
+    """
+    Access times of cache hits kept in memory until they are written, so a
+    hit on an on-disk backend does not cost a write of its own.
+    """
+
+    def __init__(self):
+        self._touched = {}
+        self._lock = threading.Lock()
+        self._since = time.time()
+
+    def touch(self, key: str) -> bool:
+        """Record a hit; True once TOUCH_FLUSH_SECONDS or TOUCH_FLUSH_ENTRIES say it is time to write."""
+        now = time.time()
+        with self._lock:
+            self._touched[key] = now
+            return len(self._touched) >= TOUCH_FLUSH_ENTRIES or now - self._since >= TOUCH_FLUSH_SECONDS
+
+    def take(self) -> List[Tuple[float, str]]:
+        """The (accessed_at, key) pairs recorded since the last take."""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+            self._since = time.time()
+        return [(accessed_at, key) for key, accessed_at in touched.items()]
+
+
+class SQLiteBackend:
+    """
+    On-disk cache table shared across processes.
+
+    Values are stored as JSON. Eviction drops the least recently accessed rows
+    once the table grows past max_entries. Hits do not write: their access
+    times are kept in memory and written in one statement every
+    TOUCH_FLUSH_SECONDS or TOUCH_FLUSH_ENTRIES hits, and before each set().
+    """
+
+    def __init__(self, path: str, max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._touched = TouchBuffer()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS tool_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_tool_cache_accessed_at ON tool_cache (accessed_at)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT value, stored_at FROM tool_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if self._touched.touch(key):
+            self.flush()
+        return json.loads(row[0]), row[1]
+
+    def _write_touched(self, conn: sqlite3.Connection):
+        conn.executemany(
+            "UPDATE tool_cache SET accessed_at = MAX(accessed_at, ?) WHERE key = ?", self._touched.take()
+        )
+
+    def flush(self):
+        """Write the access times of the hits since the last flush."""
+        conn = self._conn()
+        self._write_touched(conn)
+        conn.commit()
+
+    def set(self, key: str, value: Any, stored_at: float) -> int:
+        conn = self._conn()
+        # Eviction below picks victims by accessed_at, so bring it up to date first.
+        self._write_touched(conn)
+        conn.execute(
+            "INSERT OR REPLACE INTO tool_cache (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), stored_at, stored_at),
+        )
+        (count,) = conn.execute("SELECT COUNT(*) FROM tool_cache").fetchone()
+        evicted = max(0, count - self.max_entries)
+        if evicted:
+            conn.execute(
+                "DELETE FROM tool_cache WHERE key IN ("
+                " SELECT key FROM tool_cache ORDER BY accessed_at LIMIT ?)",
+                (evicted,),
+            )
+        conn.commit()
+        return evicted
+
+    def delete(self, key: str):
+        conn = self._conn()
+        conn.execute("DELETE FROM tool_cache WHERE key = ?", (key,))
+        conn.commit()
+
+    def clear(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM tool_cache")
+        conn.commit()
+
+
+class TTLCache:
+    """Per-data-type TTL cache with stale-while-revalidate on top of a backend."""
+
+    def __init__(self, backend, ttls: Dict[str, float] = None, stale: Dict[str, float] = None):
+        self.backend = backend
+        self.ttls = dict(TTL_SECONDS, **(ttls or {}))
+        self.stale = dict(STALE_SECONDS, **(stale or {}))
+        self.stats = _empty_stats()
+        self.type_stats = {}
+        self._stats_lock = threading.Lock()
+        self._refreshing = set()
+        self._refreshing_lock = threading.Lock()
+        self._refresh_tasks = set()
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+    def _count(self, name: str, data_type: str = None, n: int = 1):
+        with self._stats_lock:
+            self.stats[name] += n
+            if data_type is not None:
+                self.type_stats.setdefault(data_type, _empty_stats())[name] += n
+
+    def lookup(self, data_type: str, key: str) -> Tuple[Any, str]:
+        """
+        Look up a key without loading it.
+
+        Returns:
+            tuple: (value, state) where state is FRESH, STALE or MISS (value None)
+        """
+        entry = self.backend.get(f"{data_type}:{key}")
+        if entry is None:
+            self._count("misses", data_type)
+            return None, MISS
+        value, stored_at = entry
+        age = time.time() - stored_at
+        ttl = self.ttls.get(data_type, DEFAULT_TTL)
+        if age < ttl:
+            self._count("hits", data_type)
+            return value, FRESH
+        if age < ttl + self.stale.get(data_type, 0):
+            self._count("stale_hits", data_type)
+            return value, STALE
+        self._count("misses", data_type)
+        return None, MISS
+
+    def store(self, data_type: str, key: str, value: Any):
+        evicted = self.backend.set(f"{data_type}:{key}", value, time.time())
+        if evicted:
+            self._count("evictions", data_type, evicted)
+
+    def refresh_in_background(self, refresh_id: str, refresh: Callable[[], None]):
+        """Run `refresh` on a daemon thread unless one with the same id is already running."""
+        with self._refreshing_lock:
+            if refresh_id in self._refreshing:
+                return
+            self._refreshing.add(refresh_id)
+
+        def run():
+            try:
+                refresh()
+                self._count("refreshes")
+            except Exception:
+                self._count("refresh_errors")
+            finally:
+                with self._refreshing_lock:
+                    self._refreshing.discard(refresh_id)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def get_or_load(self, data_type: str, key: str, loader: Callable[[], Any]) -> Any:
+        """Return the cached value for key, loading it inline on a miss and in the background when stale."""
+        value, state = self.lookup(data_type, key)
+        if state == FRESH:
+            return value
+        if state == STALE:
+            self.refresh_in_background(
+                f"{data_type}:{key}", lambda: self.store(data_type, key, loader())
+            )
+            return value
+        return self._load_coalesced(data_type, key, loader)
+
+    def _load_coalesced(self, data_type: str, key: str, loader: Callable[[], Any]) -> Any:
+        """Run `loader` once for concurrent misses on the same key and share its result."""
+        inflight_key = f"{data_type}:{key}"
+        with self._inflight_lock:
+            pending = self._inflight.get(inflight_key)
+            owner = pending is None
+            if owner:
+                pending = concurrent.futures.Future()
+                self._inflight[inflight_key] = pending
+        if not owner:
+            self._count("coalesced", data_type)
+            return pending.result()
+        try:
+            value = loader()
+            self.store(data_type, key, value)
+            pending.set_result(value)
+            return value
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(inflight_key, None)
+
+    async def get_or_load_async(self, data_type: str, key: str, loader: Callable[[], Any]) -> Any:
+        """Async get_or_load: `loader` returns an awaitable and stale refreshes run as event loop tasks."""
+        value, state = self.lookup(data_type, key)
+        if state == FRESH:
+            return value
+        if state == STALE:
+            refresh_id = f"{data_type}:{key}"
+            with self._refreshing_lock:
+                if refresh_id in self._refreshing:
+                    return value
+                self._refreshing.add(refresh_id)
+
+            async def refresh():
+                try:
+                    self.store(data_type, key, await loader())
+                    self._count("refreshes")
+                except Exception:
+                    self._count("refresh_errors")
+                finally:
+                    with self._refreshing_lock:
+                        self._refreshing.discard(refresh_id)
+
+            task = asyncio.get_running_loop().create_task(refresh())
+            self._refresh_tasks.add(task)
+            task.add_done_callback(self._refresh_tasks.discard)
+            return value
+        return await self._load_coalesced_async(data_type, key, loader)
+
+    async def _load_coalesced_async(self, data_type: str, key: str, loader: Callable[[], Any]) -> Any:
+        """Async _load_coalesced; waiters on the same event loop share the loading task."""
+        loop = asyncio.get_running_loop()
+        inflight_key = (id(loop), f"{data_type}:{key}")
+        with self._inflight_lock:
+            task = self._inflight.get(inflight_key)
+            owner = task is None
+            if owner:
+                async def load():
+                    try:
+                        value = await loader()
+                        self.store(data_type, key, value)
+                        return value
+                    finally:
+                        with self._inflight_lock:
+                            self._inflight.pop(inflight_key, None)
+
+                task = loop.create_task(load())
+                self._inflight[inflight_key] = task
+        if not owner:
+            self._count("coalesced", data_type)
+        # shield: a cancelled waiter must not cancel the load other waiters share
+        return await asyncio.shield(task)
+
+    def clear(self):
+        self.backend.clear()
+
+
+def _empty_stats() -> Dict[str, int]:
+    return {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "evictions": 0,
+            "refreshes": 0, "refresh_errors": 0}
+
+
+def hit_rate(stats: Dict[str, int]) -> float:
+    """Share of lookups answered from the cache (fresh or stale), 0.0 when there were none."""
+    hits = stats.get("hits", 0) + stats.get("stale_hits", 0)
+    total = hits + stats.get("misses", 0)
+    return hits / total if total else 0.0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[TTLCache]:
+    """Return the process-wide cache configured from the environment, or None when disabled."""
+    global _cache
+    if _cache is None:
+        backend_name = os.environ.get("TOOL_CACHE_BACKEND", "memory").lower()
+        if backend_name == "off":
+            return None
+        with _cache_lock:
+            if _cache is None:
+                if backend_name == "sqlite":
+                    path = os.environ.get(
+                        "TOOL_CACHE_PATH",
+                        os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "tool_cache.db"),
+                    )
+                    backend = SQLiteBackend(path)
+                else:
+                    backend = MemoryBackend()
+                _cache = TTLCache(backend)
+    return _cache
+
+
+def set_cache(cache: Optional[TTLCache]):
+    """Replace the process-wide cache (e.g. with a custom backend or TTLs)."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+
+def cache_stats(data_type: str = None) -> Dict[str, Any]:
+    """
+    Return hit/miss/eviction counters of the process-wide cache plus "hit_rate".
+
+    Args:
+        data_type (str): Only count lookups of this data type, e.g. "llm"
+    """
+    cache = get_cache()
+    if cache is None:
+        return {}
+    with cache._stats_lock:
+        if data_type is None:
+            stats = dict(cache.stats)
+        else:
+            stats = dict(cache.type_stats.get(data_type, _empty_stats()))
+    stats["hit_rate"] = hit_rate(stats)
+    return stats
+
+
+def _normalize_symbols(value):
+    if isinstance(value, str):
+        return value.strip().upper()
+    if isinstance(value, (list, tuple)):
+        return type(value)(_normalize_symbols(item) for item in value)
+    return value
+
+
+def cached(data_type: str, name: str = None):
+    """
+    Decorator caching a tool's result under `data_type`, keyed on its arguments.
+
+    Works on both plain and `async def` tools. functools.wraps keeps the name,
+    docstring and signature ADK builds the tool declaration from. Arguments are
+    bound to the signature with defaults applied, so `f("AAPL")` and
+    `f(symbol="AAPL")` share an entry, and SYMBOL_PARAMS are upper-cased
+    ("aapl" and "AAPL" share one too) before the call and the key.
+
+    Args:
+        data_type (str): Selects the TTL, e.g. "quote", "profile", "news"
+        name (str): Key namespace, defaults to the function name. Async
+            variants pass their sync tool's name so both share entries.
+    """
+    def decorator(fn):
+        namespace = name or fn.__name__
+        signature = inspect.signature(fn)
+
+        def bind(args, kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            for param in SYMBOL_PARAMS:
+                if param in bound.arguments:
+                    bound.arguments[param] = _normalize_symbols(bound.arguments[param])
+            key = f"{namespace}:{json.dumps(bound.arguments, sort_keys=True, default=str)}"
+            return key, bound
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                cache = get_cache()
+                if cache is None:
+                    return await fn(*args, **kwargs)
+                key, bound = bind(args, kwargs)
+                return await cache.get_or_load_async(
+                    data_type, key, lambda: fn(*bound.args, **bound.kwargs)
+                )
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            cache = get_cache()
+            if cache is None:
+                return fn(*args, **kwargs)
+            key, bound = bind(args, kwargs)
+            return cache.get_or_load(data_type, key, lambda: fn(*bound.args, **bound.kwargs))
+        return wrapper
+    return decorator
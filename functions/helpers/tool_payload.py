@@ -0,0 +1,125 @@
+"""
+Field projection and size caps for tool results before they reach the LLM.
+
+Everything a tool returns is added to the agent's context and resent on
+every later turn, so results are trimmed to what the model needs:
+
+    fields     dotted paths to keep, e.g. ["title", "url"] or
+               ["*.title"]; lists are transparent and "*" matches any key.
+               Everything else is dropped.
+    max_chars  strings longer than this are cut and marked as truncated
+    max_items  lists longer than this keep their first items
+
+DEFAULT_LIMITS holds the spec of each tool. A skill overrides it per tool
+with `tool_payloads` in its config; a tool mapped to null is passed through
+untouched. TOOL_PAYLOAD_LIMITS=off disables trimming everywhere.
+`shape()` also logs the estimated token size of every result, before and
+after; totals per tool are available from `payload_stats()`.
+"""
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("tool_payload")
+
+ENABLED = os.environ.get("TOOL_PAYLOAD_LIMITS", "on").lower() != "off"
+NEWS_FIELDS = ["symbol", "title", "text", "published_date", "source", "url"]
+DEFAULT_LIMITS = {
+    "get_stock_fundamentals": {"max_chars": 300},
+    "get_stock_news": {"fields": NEWS_FIELDS, "max_chars": 300},
+    "get_new_stock_news": {"fields": [f"*.{name}" for name in NEWS_FIELDS], "max_chars": 300},
+    "get_stock_twitter_feed": {"max_items": 20, "max_chars": 500},
+    # Not max_items here: it would also cut the "truncated" ticker list.
+    "get_stock_twitter_feeds": {"max_chars": 500},
+    "scrape_web_page": {
+        "fields": ["markdown", "metadata.title", "metadata.sourceURL", "metadata.publishedTime"],
+        "max_chars": 20000,
+    },
+}
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def estimate_tokens(value: Any) -> int:
+    """Rough token count of a result as the model sees it (JSON, ~4 characters per token)."""
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    return len(text) // 4
+
+
+def _select(value: Any, paths: List[List[str]]) -> Any:
+    if isinstance(value, list):
+        return [_select(item, paths) for item in value]
+    if not isinstance(value, dict):
+        return value
+    selected = {}
+    for key, item in value.items():
+        rest = [path[1:] for path in paths if path[0] in (key, "*")]
+        if not rest:
+            continue
+        selected[key] = item if any(not path for path in rest) else _select(item, rest)
+    return selected
+
+
+def _cap(value: Any, max_chars: Optional[int], max_items: Optional[int]) -> Any:
+    if isinstance(value, str):
+        if max_chars and len(value) > max_chars:
+            return f"{value[:max_chars]}... [truncated {len(value) - max_chars} chars]"
+        return value
+    if isinstance(value, list):
+        items = value[:max_items] if max_items else value
+        return [_cap(item, max_chars, max_items) for item in items]
+    if isinstance(value, dict):
+        return {key: _cap(item, max_chars, max_items) for key, item in value.items()}
+    return value
+
+
+def project(value: Any, fields: Optional[List[str]] = None, max_chars: int = None, max_items: int = None) -> Any:
+    """
+    Keep only `fields` of a result and cap its strings and lists.
+
+    Args:
+        value: A tool result (dicts, lists and scalars)
+        fields (list[str]): Dotted paths to keep; None keeps everything
+        max_chars (int): Longest string kept whole
+        max_items (int): Longest list kept whole
+
+    Returns:
+        The trimmed copy; `value` itself is not modified.
+    """
+    if fields:
+        value = _select(value, [field.split(".") for field in fields])
+    if max_chars or max_items:
+        value = _cap(value, max_chars, max_items)
+    return value
+
+
+def limits_for(tool_name: str, overrides: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """The spec applied to a tool: the skill's override if it has one, else DEFAULT_LIMITS."""
+    if overrides and tool_name in overrides:
+        return overrides[tool_name]
+    return DEFAULT_LIMITS.get(tool_name)
+
+
+def shape(tool_name: str, value: Any, overrides: Optional[Dict[str, Any]] = None) -> Any:
+    """Apply the tool's limits to a result and log its token size before and after."""
+    spec = limits_for(tool_name, overrides) if ENABLED else None
+    before = estimate_tokens(value)
+    if spec:
+        value = project(value, spec.get("fields"), spec.get("max_chars"), spec.get("max_items"))
+    after = estimate_tokens(value) if spec else before
+    with _stats_lock:
+        stats = _stats.setdefault(tool_name, {"calls": 0, "tokens_in": 0, "tokens_out": 0})
+        stats["calls"] += 1
+        stats["tokens_in"] += before
+        stats["tokens_out"] += after
+    logger.info(f"Tool {tool_name} result: ~{after} tokens" + (f" (trimmed from ~{before})" if after != before else ""))
+    return value
+
+
+def payload_stats() -> Dict[str, Dict[str, int]]:
+    """Calls and estimated tokens returned / passed on per tool since start."""
+    with _stats_lock:
+        return {name: dict(stats) for name, stats in _stats.items()}
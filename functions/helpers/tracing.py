@@ -0,0 +1,540 @@
+"""
+Spans for agent runs: one per agent/skill invocation, model call and tool call.
+
+    agent   opened by before_agent_callback, closed by after_agent_callback;
+            its parent is the agent that invoked it
+    model   one LLM request of an LlmAgent: model name, latency, prompt and
+            completion tokens from the response's usage metadata
+    tool    one tool call: argument and result sizes (before and after
+            tool_payload trimming), time inside the tool and errors
+
+Code running inside a tool adds to the current tool span with `annotate()`:
+http_client adds its requests and their time, run_llm its inner model calls
+and tokens. A traced run therefore splits into the outer agent's reasoning
+(model spans), the tools, the HTTP calls they made and nested run_llm calls.
+
+Finished spans are handed to an exporter by a background thread:
+
+    TRACE_EXPORTER   off (default; nothing is installed), jsonl or otlp
+    TRACE_PATH       JSONL file for the jsonl exporter (data/traces.jsonl)
+    OTEL_EXPORTER_OTLP_ENDPOINT
+                     collector for the otlp exporter (OTLP/HTTP JSON to
+                     <endpoint>/v1/traces; http://localhost:4318)
+
+agent_runner/trace_report.py prints the per-skill breakdown of a traced run.
+"""
+import asyncio
+import atexit
+import contextvars
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("tracing")
+
+EXPORTER = os.environ.get("TRACE_EXPORTER", "off").lower()
+TRACE_PATH = os.environ.get(
+    "TRACE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "traces.jsonl")
+)
+OTLP_ENDPOINT = os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318")
+SERVICE_NAME = os.environ.get("OTEL_SERVICE_NAME", "wowbits-agents")
+BATCH_SIZE = 256
+FLUSH_INTERVAL = 1.0
+# Spans of an invocation that ended in an exception are closed as unfinished after this long.
+MAX_OPEN_SECONDS = 600
+
+_current_span = contextvars.ContextVar("tracing_current_span", default=None)
+
+
+def _new_id() -> str:
+    return os.urandom(8).hex()
+
+
+def _trace_id(invocation_id: str) -> str:
+    """OTLP-sized (32 hex) trace id, stable for an ADK invocation id."""
+    return hashlib.md5(str(invocation_id).encode("utf-8")).hexdigest()
+
+
+def _size(value: Any) -> int:
+    """Characters of a value as the model gets it (JSON)."""
+    if value is None:
+        return 0
+    return len(value if isinstance(value, str) else json.dumps(value, default=str))
+
+
+class Span:
+    """One timed operation; attributes are set while it runs and exported when it finishes."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start", "end",
+                 "attributes", "error", "_t0", "_duration")
+
+    def __init__(self, name: str, kind: str, trace_id: str = None, parent: "Span" = None, **attributes):
+        self.trace_id = trace_id or (parent.trace_id if parent else os.urandom(16).hex())
+        self.span_id = _new_id()
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.kind = kind
+        self.start = time.time()
+        self.end = None
+        self.attributes = attributes
+        self.error = None
+        self._t0 = time.perf_counter()
+        self._duration = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def add(self, **counters):
+        """Add to numeric attributes, e.g. add(**{"http.requests": 1, "http.ms": 12.5})."""
+        for key, value in counters.items():
+            self.attributes[key] = self.attributes.get(key, 0) + value
+
+    @property
+    def finished(self) -> bool:
+        return self.end is not None
+
+    def finish(self, error: Optional[str] = None):
+        if self.end is not None:
+            return
+        if error and not self.error:
+            self.error = error
+        self._duration = time.perf_counter() - self._t0
+        self.end = self.start + self._duration
+        _export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+            "name": self.name, "kind": self.kind, "start": self.start, "end": self.end,
+            "duration_ms": round(self._duration * 1000, 3) if self._duration is not None else None,
+            "attributes": self.attributes, "error": self.error,
+        }
+
+
+def current_span() -> Optional[Span]:
+    """The tool span the calling code runs in, if any."""
+    return _current_span.get()
+
+
+def annotate(**counters):
+    """Add counters to the current tool span; a no-op outside a traced tool call."""
+    span = _current_span.get()
+    if span is not None:
+        span.add(**counters)
+
+
+# --- exporters -------------------------------------------------------------
+
+class JsonlExporter:
+    """Appends one JSON object per span to a local file."""
+
+    def __init__(self, path: str = TRACE_PATH):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans: List[Dict[str, Any]]):
+        lines = "".join(json.dumps(span, default=str) + "\n" for span in spans)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+def _otlp_value(value) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpExporter:
+    """Posts spans to an OpenTelemetry collector as OTLP/HTTP JSON."""
+
+    KINDS = {"agent": 1, "model": 3, "tool": 1}  # INTERNAL, CLIENT
+
+    def __init__(self, endpoint: str = OTLP_ENDPOINT, service_name: str = SERVICE_NAME):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+
+    def _span(self, span: Dict[str, Any]) -> Dict[str, Any]:
+        out = {
+            "traceId": span["trace_id"], "spanId": span["span_id"], "name": span["name"],
+            "kind": self.KINDS.get(span["kind"], 1),
+            "startTimeUnixNano": str(int(span["start"] * 1e9)),
+            "endTimeUnixNano": str(int(span["end"] * 1e9)),
+            "attributes": [{"key": "wowbits.kind", "value": {"stringValue": span["kind"]}}] + [
+                {"key": key, "value": _otlp_value(value)} for key, value in span["attributes"].items()
+                if value is not None
+            ],
+            "status": {"code": 2, "message": span["error"]} if span["error"] else {"code": 1},
+        }
+        if span["parent_id"]:
+            out["parentSpanId"] = span["parent_id"]
+        return out
+
+    def export(self, spans: List[Dict[str, Any]]):
+        from helpers import http_client
+
+        body = {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+            "scopeSpans": [{"scope": {"name": "wowbits.tracing"}, "spans": [self._span(s) for s in spans]}],
+        }]}
+        response = http_client.get_session().post(self.url, json=body, timeout=http_client.DEFAULT_TIMEOUT)
+        response.raise_for_status()
+
+
+class BatchProcessor:
+    """Queues finished spans and exports them in batches from a background thread."""
+
+    def __init__(self, exporter, batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL):
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = []
+        self._cond = threading.Condition()
+        self._exporting = 0
+        self._closed = False
+        self.stats = {"spans": 0, "batches": 0, "failed_batches": 0}
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, span: Dict[str, Any]):
+        with self._cond:
+            self._queue.append(span)
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait until every queued span is exported; False if `timeout` ran out first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify_all()
+            while self._queue or self._exporting:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining if remaining is not None else self.flush_interval)
+        return True
+
+    def close(self, timeout: float = 5.0):
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._queue and not self._closed:
+                    self._cond.wait(self.flush_interval)
+                if not self._queue:
+                    if self._closed:
+                        return
+                    continue
+                batch = self._queue[:self.batch_size]
+                del self._queue[:self.batch_size]
+                self._exporting += 1
+            try:
+                self.exporter.export(batch)
+                self.stats["spans"] += len(batch)
+                self.stats["batches"] += 1
+            except Exception:
+                self.stats["failed_batches"] += 1
+                logger.exception(f"Dropping {len(batch)} spans after a failed export")
+            finally:
+                with self._cond:
+                    self._exporting -= 1
+                    self._cond.notify_all()
+
+
+_processor = None
+_processor_lock = threading.Lock()
+
+
+def _default_exporter():
+    if EXPORTER == "jsonl":
+        return JsonlExporter(TRACE_PATH)
+    if EXPORTER == "otlp":
+        return OtlpExporter(OTLP_ENDPOINT)
+    if EXPORTER not in ("off", ""):
+        logger.warning(f"Unknown TRACE_EXPORTER {EXPORTER!r}; tracing is off")
+    return None
+
+
+def get_processor() -> Optional[BatchProcessor]:
+    """Return the process-wide span processor, or None when tracing is off."""
+    global _processor
+    if _processor is None and EXPORTER not in ("off", ""):
+        with _processor_lock:
+            if _processor is None:
+                exporter = _default_exporter()
+                if exporter is not None:
+                    _processor = BatchProcessor(exporter)
+                    atexit.register(_processor.close)
+    return _processor
+
+
+def set_exporter(exporter) -> Optional[BatchProcessor]:
+    """Send spans to `exporter` (anything with export(list_of_span_dicts)); None turns tracing off."""
+    global _processor
+    with _processor_lock:
+        if _processor is not None:
+            _processor.close()
+        _processor = BatchProcessor(exporter) if exporter is not None else None
+    return _processor
+
+
+def enabled() -> bool:
+    return get_processor() is not None
+
+
+def flush(timeout: float = None) -> bool:
+    processor = get_processor()
+    return processor.flush(timeout) if processor is not None else True
+
+
+def _export(span: Span):
+    processor = get_processor()
+    if processor is not None:
+        processor.submit(span.to_dict())
+
+
+# --- tools -----------------------------------------------------------------
+
+def _tool_started(name: str):
+    """The span a tool call runs in: the one before_tool_callback opened, else a new one."""
+    span = _current_span.get()
+    if span is not None and span.finished:
+        span = None
+    if span is not None and span.kind == "tool" and span.name == name:
+        return span, None
+    span = Span(name, "tool", parent=span)
+    return span, _current_span.set(span)
+
+
+def _tool_done(span: Span, token, started: float, result=None, error: BaseException = None):
+    span.add(**{"tool.exec_ms": (time.perf_counter() - started) * 1000})
+    if error is not None:
+        # after_tool_callback does not run when the tool raises, so close the span here.
+        span.finish(f"{type(error).__name__}: {error}")
+    elif token is not None:
+        span.set(**{"tool.result_chars": _size(result)})
+        span.finish()
+    if token is not None:
+        _current_span.reset(token)
+
+
+def wrap_tool(fn):
+    """
+    Wrap a tool function so its run time and errors are recorded.
+
+    Inside an ADK run the call annotates the span of the tool callbacks;
+    called directly it gets a span of its own. The wrapper keeps the
+    function's name, docs and signature, which is what ADK builds the tool
+    declaration from.
+    """
+    if getattr(fn, "__traced__", False):
+        return fn
+    name = fn.__name__
+
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def traced(*args, **kwargs):
+            span, token = _tool_started(name)
+            started = time.perf_counter()
+            try:
+                result = await fn(*args, **kwargs)
+            except BaseException as e:
+                _tool_done(span, token, started, error=e)
+                raise
+            _tool_done(span, token, started, result)
+            return result
+    else:
+        @functools.wraps(fn)
+        def traced(*args, **kwargs):
+            span, token = _tool_started(name)
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                _tool_done(span, token, started, error=e)
+                raise
+            _tool_done(span, token, started, result)
+            return result
+
+    traced.__traced__ = True
+    return traced
+
+
+# --- ADK callbacks ---------------------------------------------------------
+
+class _Invocation:
+    """Open spans of one ADK invocation."""
+
+    def __init__(self, invocation_id: str):
+        self.trace_id = _trace_id(invocation_id)
+        self.started = time.monotonic()
+        self.agents = {}  # agent name -> open agent span
+        self.stack = []  # agent spans, innermost last
+        self.models = {}  # agent name -> open model span
+        self.tools = {}  # function call id -> open tool span
+
+
+class AgentTracer:
+    """
+    ADK callbacks that turn an invocation into spans. One tracer serves every
+    agent of the process; state is keyed by invocation id and agent name.
+    """
+
+    def __init__(self):
+        self._invocations = {}
+        self._lock = threading.Lock()
+
+    def _invocation(self, callback_context, create: bool = False) -> Optional[_Invocation]:
+        invocation_id = callback_context.invocation_id
+        with self._lock:
+            invocation = self._invocations.get(invocation_id)
+            if invocation is None and create:
+                self._sweep()
+                invocation = self._invocations[invocation_id] = _Invocation(invocation_id)
+            return invocation
+
+    def _sweep(self):
+        """Close what is left of invocations that raised instead of finishing."""
+        now = time.monotonic()
+        for invocation_id, invocation in list(self._invocations.items()):
+            if now - invocation.started > MAX_OPEN_SECONDS:
+                del self._invocations[invocation_id]
+                for span in (*invocation.tools.values(), *invocation.models.values(), *reversed(invocation.stack)):
+                    span.finish("unfinished")
+
+    def before_agent(self, callback_context):
+        invocation = self._invocation(callback_context, create=True)
+        name = callback_context.agent_name
+        parent = self._agent_parent(invocation, callback_context)
+        span = Span(name, "agent", trace_id=invocation.trace_id, parent=parent,
+                    skill=name, invocation_id=callback_context.invocation_id)
+        with self._lock:
+            invocation.agents[name] = span
+            invocation.stack.append(span)
+        return None
+
+    def _agent_parent(self, invocation: _Invocation, callback_context) -> Optional[Span]:
+        # Parallel branches share the invocation, so the innermost open agent is
+        # not necessarily the caller; walk up the agent tree instead.
+        context = getattr(callback_context, "_invocation_context", None)
+        agent = getattr(getattr(context, "agent", None), "parent_agent", None)
+        while agent is not None:
+            span = invocation.agents.get(agent.name)
+            if span is not None:
+                return span
+            agent = agent.parent_agent
+        return invocation.stack[-1] if invocation.stack else None
+
+    def after_agent(self, callback_context):
+        invocation = self._invocation(callback_context)
+        if invocation is None:
+            return None
+        name = callback_context.agent_name
+        with self._lock:
+            span = invocation.agents.pop(name, None)
+            if span in invocation.stack:
+                invocation.stack.remove(span)
+            model = invocation.models.pop(name, None)
+            tools = [call_id for call_id, tool in invocation.tools.items()
+                     if span is not None and tool.parent_id == span.span_id]
+            tools = [invocation.tools.pop(call_id) for call_id in tools]
+            if not invocation.stack:
+                self._invocations.pop(callback_context.invocation_id, None)
+        for leftover in (model, *tools):
+            if leftover is not None:
+                leftover.finish("unfinished")
+        if span is not None:
+            span.finish()
+        return None
+
+    def _parent(self, invocation: Optional[_Invocation], agent_name: str) -> Optional[Span]:
+        return invocation.agents.get(agent_name) if invocation else None
+
+    def before_model(self, callback_context, llm_request):
+        invocation = self._invocation(callback_context)
+        if invocation is None:
+            return None
+        name = callback_context.agent_name
+        span = Span("model", "model", trace_id=invocation.trace_id, parent=self._parent(invocation, name),
+                    skill=name, **{"llm.model": getattr(llm_request, "model", None),
+                                   "llm.messages": len(getattr(llm_request, "contents", None) or [])})
+        with self._lock:
+            previous = invocation.models.get(name)
+            invocation.models[name] = span
+        if previous is not None:
+            previous.finish("unfinished")
+        return None
+
+    def after_model(self, callback_context, llm_response):
+        # Streaming yields partial responses first; the call ends with the final one.
+        if getattr(llm_response, "partial", False):
+            return None
+        invocation = self._invocation(callback_context)
+        if invocation is None:
+            return None
+        with self._lock:
+            span = invocation.models.pop(callback_context.agent_name, None)
+        if span is None:
+            return None
+        usage = getattr(llm_response, "usage_metadata", None)
+        if usage is not None:
+            span.set(**{
+                "llm.prompt_tokens": getattr(usage, "prompt_token_count", None),
+                "llm.completion_tokens": getattr(usage, "candidates_token_count", None),
+            })
+        error_code = getattr(llm_response, "error_code", None)
+        span.finish(f"{error_code}: {getattr(llm_response, 'error_message', '')}" if error_code else None)
+        return None
+
+    def before_tool(self, tool, args, tool_context):
+        invocation = self._invocation(tool_context)
+        name = tool_context.agent_name
+        span = Span(tool.name, "tool", trace_id=invocation.trace_id if invocation else None,
+                    parent=self._parent(invocation, name), skill=name,
+                    **{"tool.name": tool.name, "tool.args_chars": _size(args)})
+        if invocation is not None:
+            with self._lock:
+                invocation.tools[tool_context.function_call_id] = span
+        # Each function call runs in its own task, so this reaches the tool and
+        # everything it calls without leaking into sibling calls.
+        _current_span.set(span)
+        return None
+
+    def after_tool(self, tool, args, tool_context, tool_response, shaped=None):
+        """Close the tool span; `shaped` is the result after trimming, when it was trimmed."""
+        invocation = self._invocation(tool_context)
+        span = None
+        if invocation is not None:
+            with self._lock:
+                span = invocation.tools.pop(tool_context.function_call_id, None)
+        span = span or _current_span.get()
+        if span is None or span.finished:
+            return None
+        raw = _size(tool_response)
+        span.set(**{"tool.result_chars": raw, "tool.result_chars_trimmed": _size(shaped) if shaped is not None else raw})
+        if isinstance(tool_response, dict) and tool_response.get("error"):
+            span.finish(str(tool_response["error"])[:500])
+        else:
+            span.finish()
+        return None
+
+
+_tracer = AgentTracer()
+
+
+def get_tracer() -> AgentTracer:
+    return _tracer
@@ -0,0 +1,52 @@
+"""
+X (Twitter) recent search shared by the tweet tools: the endpoint, the fields
+requested with every search and the result format.
+"""
+import os
+from typing import Any, Dict
+
+# Tweet and author fields requested with every search.
+SEARCH_FIELDS = {
+    'tweet.fields': 'created_at,author_id,public_metrics,text',
+    'expansions': 'author_id',
+    'user.fields': 'username,name,verified_type'
+}
+
+
+def search_url() -> str:
+    return os.environ.get("X_API_BASE_URL", "https://api.twitter.com") + "/2/tweets/search/recent"
+
+
+def format_tweets(ticker: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Join the tweets of a search response with their authors, in the format the tweet tools return."""
+    tweets = []
+    users = {}
+    
+    # Create a user lookup dictionary
+    if 'includes' in data and 'users' in data['includes']:
+        for user in data['includes']['users']:
+            users[user['id']] = user
+    
+    # Format tweets
+    if 'data' in data:
+        for tweet in data['data']:
+            author = users.get(tweet.get('author_id'), {})
+            
+            tweets.append({
+                'id': tweet.get('id'),
+                'text': tweet.get('text'),
+                'created_at': tweet.get('created_at'),
+                'author': {
+                    'username': author.get('username'),
+                    'name': author.get('name'),
+                    'verified_type': author.get('verified_type')
+                },
+                'metrics': tweet.get('public_metrics', {}),
+                'url': f"https://twitter.com/{author.get('username', 'i')}/status/{tweet.get('id')}"
+            })
+    
+    return {
+        'ticker': ticker,
+        'tweet_count': len(tweets),
+        'tweets': tweets
+    }
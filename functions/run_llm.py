@@ -1,39 +1,37 @@
-import os
-from dotenv import load_dotenv
-from litellm import completion
+from typing import Optional
+from helpers import llm
 
-# Load environment variables from .env file
-load_dotenv()
 
-def run_llm(model: str, message: str) -> str:
+def run_llm(model: str, message: str, temperature: Optional[float] = None, use_cache: bool = True) -> str:
     """
     Run any LLM model using litellm and return the response.
-    
+
+    Identical prompts (same model, message and temperature) are answered from
+    the "llm" tool cache for a few minutes, and identical calls in flight at
+    the same time share one upstream request. Prompts over
+    RUN_LLM_MAX_PROMPT_TOKENS are compressed/truncated before sending.
+
     Args:
         model (str): The model identifier (e.g. "gpt-3.5-turbo", "claude-2", etc.)
         message (str): The input message/prompt to send to the model
-        
+        temperature (float): Sampling temperature; the model default when omitted
+        use_cache (bool): Set to False to always call the model
+
     Returns:
-        str: The model's response text
+        str: The model's response text, or a message starting with "Error" on failure
     """
     try:
-        print(f"Running model {model} with message {message}")
-        response = completion(
-            model=model,
-            messages=[{
-                "role": "user",
-                "content": message
-            }]
-        )
-        
-        # Extract the response text from the completion
-        if response and hasattr(response, 'choices') and len(response.choices) > 0:
-            return response.choices[0].message.content
-        else:
-            return "Error: No response generated"
-            
-    except Exception as e:
-        return f"Error running model {model}: {str(e)}"
+        return llm.complete(model, message, temperature, use_cache)
+    except llm.LLMError as e:
+        return str(e)
+
+
+async def run_llm_async(model: str, message: str, temperature: Optional[float] = None, use_cache: bool = True) -> str:
+    """Async variant of run_llm using litellm.acompletion; the agent loader registers it in its place."""
+    try:
+        return await llm.complete_async(model, message, temperature, use_cache)
+    except llm.LLMError as e:
+        return str(e)
 
 
 if __name__ == "__main__":
@@ -41,4 +39,4 @@ if __name__ == "__main__":
     stock_ticker = "AAPL"
     date = "2024-01-15"
     prompt = f"Analyze the market sentiment for {stock_ticker} stock on {date}. Provide a sentiment score (positive, negative, or neutral) and brief reasoning."
-    print(run_llm("xai/grok-3", prompt))
\ No newline at end of file
+    print(run_llm("xai/grok-3", prompt))
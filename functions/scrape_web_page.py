@@ -1,17 +1,31 @@
-import os
-from firecrawl import Firecrawl
+from helpers import scraper
+
 
 def scrape_webpage(url: str):
     """
     Scrapes a webpage and returns its content in whatever format Firecrawl provides.
-    
+
+    Pages are kept in an on-disk store keyed by normalized URL: a page scraped
+    in the last day is returned without calling Firecrawl, an older one is
+    revalidated with a conditional request (ETag / Last-Modified) and only
+    scraped again if it changed. Concurrent calls for the same URL share one
+    scrape.
+
     Args:
         url (str): The URL to scrape (must include http:// or https://)
-        
+
     Returns:
-        dict | str: The scraped content (JSON/dict if multiple formats are available, or string if only one format).
+        dict: The scraped document (markdown and metadata).
     """
-    api_key = os.environ.get("FIRECRAWL_API_KEY")
-    firecrawl = Firecrawl(api_key=api_key)
-    result = firecrawl.scrape(url=url)
-    return result
+    return scraper.scrape(url)
+
+
+async def scrape_webpage_async(url: str):
+    """Async variant of scrape_webpage; the agent loader registers it in its place."""
+    return await scraper.scrape_async(url)
+
+
+# The python_functions row (and tool) is named after this file, which is the
+# name the agent loader looks up in the executed namespace.
+scrape_web_page = scrape_webpage
+scrape_web_page_async = scrape_webpage_async
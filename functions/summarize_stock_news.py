@@ -0,0 +1,192 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from helpers import llm, news_cursors, scraper, stock_news
+
+# Bounded concurrency per stage: Firecrawl and the LLM provider both rate
+# limit, and a ticker rarely has more than a handful of fresh articles.
+SCRAPE_CONCURRENCY = int(os.environ.get("NEWS_SCRAPE_CONCURRENCY", "4"))
+SUMMARY_CONCURRENCY = int(os.environ.get("NEWS_SUMMARY_CONCURRENCY", "4"))
+SCRAPE_TIMEOUT = float(os.environ.get("NEWS_SCRAPE_TIMEOUT", "20"))
+SUMMARY_TIMEOUT = float(os.environ.get("NEWS_SUMMARY_TIMEOUT", "60"))
+# Whole-pipeline deadline; articles still running are reported as timed out.
+PIPELINE_TIMEOUT = float(os.environ.get("NEWS_PIPELINE_TIMEOUT", "120"))
+SUMMARY_MODEL = os.environ.get("NEWS_SUMMARY_MODEL", "openai/gpt-4.1")
+MAX_ARTICLES = 10
+
+_loop = None
+_loop_lock = threading.Lock()
+
+SUMMARY_PROMPT = (
+    "Summarize the following news article about {ticker}. Focus on key points "
+    "relevant to stock performance and market impact.\n\n"
+    "Title: {title}\n\n{content}"
+)
+
+
+def _page_text(page) -> str:
+    """Markdown of a Firecrawl result (Document, dict or plain string)."""
+    if page is None:
+        return ""
+    if isinstance(page, str):
+        return page
+    if isinstance(page, dict):
+        return page.get("markdown") or ""
+    return getattr(page, "markdown", None) or ""
+
+
+def _article_result(article: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "title": article.get("title"),
+        "url": article.get("url"),
+        "published_date": article.get("published_date"),
+        "source": article.get("source"),
+        "summary": None,
+        "content_source": None,
+        "status": "pending",
+        "errors": [],
+    }
+
+
+async def _process_article(ticker: str, article: Dict[str, Any], result: Dict[str, Any],
+                           scrape_slots: asyncio.Semaphore, summary_slots: asyncio.Semaphore, model: str):
+    """Scrape then summarize one article, filling `result` in place as stages finish."""
+    content = ""
+    url = article.get("url")
+    if url:
+        try:
+            async with scrape_slots:
+                page = await asyncio.wait_for(scraper.scrape_async(url), SCRAPE_TIMEOUT)
+            content = _page_text(page)
+            result["content_source"] = "scraped"
+        except asyncio.TimeoutError:
+            result["errors"].append(f"scrape timed out after {SCRAPE_TIMEOUT:g}s")
+        except Exception as e:
+            result["errors"].append(f"scrape failed: {str(e)}")
+    if not content and article.get("text"):
+        # FMP already returns the lead of the article; better than nothing.
+        content = article["text"]
+        result["content_source"] = "snippet"
+    if not content:
+        result["status"] = "failed"
+        return
+
+    prompt = SUMMARY_PROMPT.format(ticker=ticker, title=article.get("title") or "", content=content)
+    try:
+        async with summary_slots:
+            summary = await asyncio.wait_for(llm.complete_async(model, prompt), SUMMARY_TIMEOUT)
+    except asyncio.TimeoutError:
+        result["errors"].append(f"summary timed out after {SUMMARY_TIMEOUT:g}s")
+        result["status"] = "timeout"
+        return
+    except llm.LLMError as e:
+        result["errors"].append(str(e))
+        result["status"] = "failed"
+        return
+    result["summary"] = summary
+    result["status"] = "ok"
+
+
+async def summarize_stock_news_async(ticker: str, articles: Optional[List[Dict[str, Any]]] = None,
+                                     new_only: bool = False) -> Dict[str, Any]:
+    """Async variant of summarize_stock_news; the agent loader registers it in its place."""
+    started = time.perf_counter()
+    symbol = ticker.strip().upper()
+    cursors = {}
+    if articles is None and new_only:
+        fresh, cursors = await stock_news.poll_async([symbol], commit=False)
+        articles = fresh.get(symbol, [])
+    elif articles is None:
+        articles = await stock_news.latest_async(symbol)
+    articles = list(articles or [])
+    skipped = articles[MAX_ARTICLES:]
+    articles = articles[:MAX_ARTICLES]
+
+    results = [_article_result(article) for article in articles]
+    scrape_slots = asyncio.Semaphore(SCRAPE_CONCURRENCY)
+    summary_slots = asyncio.Semaphore(SUMMARY_CONCURRENCY)
+    tasks = [
+        asyncio.ensure_future(
+            _process_article(symbol, article, result, scrape_slots, summary_slots, SUMMARY_MODEL)
+        )
+        for article, result in zip(articles, results)
+    ]
+    if tasks:
+        _, pending = await asyncio.wait(tasks, timeout=PIPELINE_TIMEOUT)
+        for task in pending:
+            task.cancel()
+        for task, result in zip(tasks, results):
+            if task in pending:
+                result["status"] = "timeout"
+                result["errors"].append(f"pipeline deadline of {PIPELINE_TIMEOUT:g}s reached")
+            elif task.exception() is not None:
+                result["status"] = "failed"
+                result["errors"].append(str(task.exception()))
+    if symbol in cursors:
+        # Only summarized articles count as seen; failed, timed out and
+        # skipped ones are returned again by the next new_only call.
+        store = news_cursors.get_store()
+        handled = [a for a, r in zip(articles, results) if r["status"] == "ok"]
+        pending = [a for a, r in zip(articles, results) if r["status"] != "ok"] + skipped
+        cursor = news_cursors.hold_back(cursors[symbol], store.get([symbol]).get(symbol), handled, pending)
+        store.commit({symbol: cursor})
+
+    return {
+        "ticker": symbol,
+        "articles": results,
+        "stats": {
+            "articles": len(results),
+            "summarized": sum(1 for r in results if r["status"] == "ok"),
+            "failed": sum(1 for r in results if r["status"] != "ok"),
+            "elapsed_s": round(time.perf_counter() - started, 3),
+        },
+    }
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """
+    Event loop thread the sync tool runs the pipeline on. It lives for the
+    whole process: the httpx pool and litellm's logging worker bind to the
+    loop they first run on, so a fresh loop per call would break them.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="news-pipeline", daemon=True).start()
+            _loop = loop
+    return _loop
+
+
+def summarize_stock_news(ticker: str, articles: Optional[List[Dict[str, Any]]] = None,
+                         new_only: bool = False) -> Dict[str, Any]:
+    """
+    Fetch, scrape and summarize the latest news for a ticker in one call.
+
+    Articles are scraped (Firecrawl) and summarized (LLM) concurrently with a
+    bounded number of requests in flight per stage. Each article has its own
+    timeouts; an article whose page cannot be scraped is summarized from the
+    news snippet instead, and failures are reported per article rather than
+    failing the whole call. Results keep the order of the input articles.
+
+    Args:
+        ticker (str): Stock ticker symbol (e.g. 'AAPL')
+        articles (list[dict]): Articles as returned by get_stock_news; fetched when omitted
+        new_only (bool): When fetching, only take articles not returned by an earlier
+            new_only call (see get_new_stock_news), e.g. on each tick of a monitor. Only
+            articles summarized successfully are marked as seen; the next call gets the
+            others again
+
+    Returns:
+        dict: {"ticker", "articles": [{title, url, published_date, source, summary,
+            content_source, status, errors}], "stats": {articles, summarized, failed, elapsed_s}}
+    """
+    # Runs on a background loop, so it also works when the caller already
+    # has a running event loop.
+    future = asyncio.run_coroutine_threadsafe(
+        summarize_stock_news_async(ticker, articles, new_only), _background_loop()
+    )
+    return future.result()
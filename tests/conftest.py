@@ -0,0 +1,55 @@
+"""
+Shared setup for the tests: agent_runner/, functions/ and benchmarks/ are
+importable, the runner works on a scratch copy of data/wowbits.db, and
+caches, history, tracing and snapshots stay out of data/.
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+
+from runner_env import use_scratch_db
+
+use_scratch_db()
+SCRATCH_DIR = tempfile.mkdtemp(prefix="wowbits-tests-")
+os.environ.update({
+    "TOOL_CACHE_BACKEND": "off",
+    "HISTORY": "off",
+    "TRACE_EXPORTER": "off",
+    "WOWBITS_AGENT_SNAPSHOT": "0",
+    "WOWBITS_BYTECODE_CACHE": "0",
+    "NEWS_CURSOR_PATH": os.path.join(SCRATCH_DIR, "news_cursors.db"),
+    "HTTP_BACKOFF_FACTOR": "0.01",
+})
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(SCRATCH_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def stub_server():
+    """The benchmarks' stub FMP/X/Firecrawl/LLM server, with the tools pointed at it."""
+    from stub_server import start_stub_server
+
+    server = start_stub_server()
+    os.environ.update({
+        "FMP_BASE_URL": server.base_url,
+        "X_API_BASE_URL": server.base_url,
+        "X_BEARER_TOKEN": "stub",
+    })
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def stub(stub_server):
+    """stub_server with its counters reset."""
+    stub_server.request_count = stub_server.connection_count = stub_server.fail_next = 0
+    stub_server.retry_after = None
+    return stub_server
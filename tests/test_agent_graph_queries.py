@@ -0,0 +1,68 @@
+import uuid
+
+import pytest
+from sqlalchemy import event
+
+from bench_agent_graph_queries import add_skill_chain
+
+
+def count_agents(node):
+    return 1 + sum(count_agents(child) for child in node.sub_agents)
+
+
+@pytest.fixture
+def statements():
+    from pylibs.database_manager import get_db_manager
+
+    engine = get_db_manager().engine
+    executed = []
+
+    def record(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_query_count_does_not_grow_with_the_skill_tree(statements):
+    from db import schema
+    from pylibs.database_manager import get_db_manager
+    import wowbits_runtime as runtime
+    from stock_fundamentals import agent_id
+
+    agent_uuid = uuid.UUID(agent_id)
+    counts, sizes = [], []
+    for depth in (0, 5, 20):
+        session = get_db_manager().get_session()
+        add_skill_chain(session, schema, agent_uuid, depth)
+        session.close()
+        statements.clear()
+        root = runtime.create_agent(agent_uuid)
+        counts.append(len(statements))
+        sizes.append(count_agents(root))
+
+    assert sizes[1] == sizes[0] + 5 and sizes[2] == sizes[1] + 20
+    assert counts == [counts[0]] * 3
+
+
+def test_db_fingerprint_follows_the_config_tables_only():
+    from db import schema
+    from pylibs.database_manager import get_db_manager
+    import wowbits_runtime as runtime
+
+    session = get_db_manager().get_session()
+    agent = session.query(schema.Agent).first()
+    before = runtime._db_fingerprint()
+    chat = schema.ChatSession(agent_id=agent.id, user_id=uuid.uuid4(), title="chat")
+    session.add(chat)
+    session.flush()
+    session.add(schema.ChatMessage(session_id=chat.id, agent_id=agent.id, content="hello"))
+    session.commit()
+    assert runtime._db_fingerprint() == before
+
+    skill = session.query(schema.Skill).first()
+    skill.description = f"{skill.description or ''} (edited)"
+    session.commit()
+    session.close()
+    assert runtime._db_fingerprint() not in (None, before)
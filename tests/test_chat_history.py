@@ -0,0 +1,123 @@
+import asyncio
+import uuid
+from datetime import timezone
+
+import pytest
+from sqlalchemy import create_engine, inspect
+
+import chat_history
+from db.schema import ChatMessage, ChatSession
+
+AGENT_ID = uuid.uuid4()
+USER_ID = uuid.uuid4()
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'chat.db'}")
+    ChatSession.metadata.create_all(engine, tables=[ChatSession.__table__, ChatMessage.__table__])
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def store(engine):
+    store = chat_history.ChatHistoryStore(engine, batch_size=50, flush_interval=0.01, window=10)
+    yield store
+    store.close()
+
+
+def fill(store, count):
+    session_id = store.create_session(AGENT_ID, USER_ID, title="test")
+    for i in range(count):
+        store.append(session_id, f"message {i}", user_id=USER_ID)
+    return session_id
+
+
+def test_prepare_engine_adds_indexes_and_wal(store, engine):
+    indexes = {ix["name"] for table in ("chat_messages", "chat_sessions") for ix in inspect(engine).get_indexes(table)}
+    assert {ix.name for ix in chat_history.INDEXES} <= indexes
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+
+
+def test_queued_messages_are_read_back_before_the_write(store):
+    session_id = fill(store, 3)
+    assert [m["content"] for m in store.load(session_id)["messages"]] == ["message 0", "message 1", "message 2"]
+    assert store.flush(timeout=10)
+    assert [m["content"] for m in store.load(session_id)["messages"]] == ["message 0", "message 1", "message 2"]
+    assert store.stats["messages"] == 3 and store.stats["dropped"] == 0
+
+
+def test_load_returns_the_window_and_summary(store):
+    session_id = fill(store, 25)
+    store.flush()
+    store.set_summary(session_id, "earlier messages")
+    loaded = store.load(session_id)
+    assert [m["content"] for m in loaded["messages"]] == [f"message {i}" for i in range(15, 25)]
+    assert loaded["summary"] == "earlier messages" and loaded["title"] == "test" and loaded["has_more"]
+
+
+def test_paging_back_returns_every_message_once(store):
+    session_id = fill(store, 95)
+    store.flush()
+    seen, before = [], None
+    while True:
+        page = store.load(session_id, last_n=20, before=before)
+        seen = page["messages"] + seen
+        if not page["has_more"]:
+            break
+        before = page["messages"][0]["created_at"]
+    assert [m["content"] for m in seen] == [f"message {i}" for i in range(95)]
+
+
+def test_aware_before_is_taken_as_utc(store):
+    session_id = fill(store, 5)
+    store.flush()
+    before = store.load(session_id)["messages"][3]["created_at"]
+    aware = before.replace(tzinfo=timezone.utc)
+    assert store.load(session_id, before=aware)["messages"] == store.load(session_id, before=before)["messages"]
+
+
+def test_ensure_session_keeps_an_existing_session(store):
+    session_id = store.create_session(AGENT_ID, USER_ID, title="kept")
+    assert store.ensure_session(session_id, AGENT_ID, USER_ID) == session_id
+    assert store.load(session_id)["title"] == "kept"
+    assert [s["id"] for s in store.list_sessions(USER_ID, AGENT_ID)] == [session_id]
+
+
+def test_closed_store_rejects_messages(store):
+    store.close()
+    with pytest.raises(RuntimeError):
+        store.append(uuid.uuid4(), "late")
+
+
+def test_session_service_records_user_messages_and_final_responses(store):
+    from google.adk.events import Event
+    from google.adk.sessions import InMemorySessionService
+    from google.genai import types
+
+    import wowbits_runtime as runtime
+
+    service = runtime.ChatHistorySessionService(InMemorySessionService(), store, {"agent": AGENT_ID}.get)
+
+    def event(author, text, partial=False):
+        role = "user" if author == "user" else "model"
+        return Event(author=author, partial=partial, content=types.Content(role=role, parts=[types.Part(text=text)]))
+
+    async def chat():
+        session = await service.create_session(app_name="agent", user_id=str(USER_ID))
+        await service.append_event(session, event("user", "price of AAPL?"))
+        await service.append_event(session, event("agent", "AAPL", partial=True))
+        await service.append_event(session, event("agent", "AAPL is at 100."))
+        anonymous = await service.create_session(app_name="agent", user_id="user", session_id="web")
+        await service.append_event(anonymous, event("user", "not recorded"))
+        return session
+
+    session = asyncio.run(chat())
+    store.flush()
+    messages = store.load(session.id)["messages"]
+    assert [(m["content"], m["user_id"], m["agent_id"]) for m in messages] == [
+        ("price of AAPL?", USER_ID, None), ("AAPL is at 100.", None, AGENT_ID),
+    ]
+    assert [s["id"] for s in store.list_sessions(USER_ID)] == [uuid.UUID(session.id)]
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from helpers import http_client
+
+
+@pytest.fixture
+def tools(stub):
+    from get_stock_fundamentals import get_stock_fundamentals
+    from get_stock_news import get_stock_news
+    from get_stock_price import get_stock_price
+    from get_stock_twitter_feed import get_stock_twitter_feed
+
+    return [get_stock_price, get_stock_fundamentals, get_stock_news, get_stock_twitter_feed]
+
+
+@pytest.mark.parametrize("index", range(4))
+def test_tool_calls_reuse_one_connection(tools, stub, index):
+    for i in range(20):
+        tools[index](f"SYM{i}")
+    assert stub.request_count == 20
+    assert stub.connection_count <= 1
+
+
+def test_503_is_retried(tools, stub):
+    stub.fail_next = 2
+    assert tools[0]("AAPL") == 100.0
+    assert stub.request_count == 3
+
+
+def test_retry_statuses_can_be_narrowed(stub):
+    stub.fail_next = 1
+    response = http_client.get(f"{stub.base_url}/api/v3/quote/AAPL", retry_statuses=())
+    assert response.status_code == 503
+    assert stub.request_count == 1
+
+
+def test_async_requests_share_the_pool(stub):
+    async def calls():
+        url = f"{stub.base_url}/api/v3/quote/AAPL"
+        responses = await asyncio.gather(*(http_client.aget(url) for _ in range(50)))
+        await http_client.close_async_client()
+        return responses
+
+    assert all(r.status_code == 200 for r in asyncio.run(calls()))
+    assert stub.request_count == 50
+    assert stub.connection_count <= http_client.POOL_MAXSIZE
+
+
+def test_count_requests_includes_retries(stub):
+    url = f"{stub.base_url}/api/v3/quote/AAPL"
+    stub.fail_next = 2
+    with http_client.count_requests() as outer:
+        http_client.get(url)
+        with http_client.count_requests() as inner:
+            asyncio.run(http_client.aget(url))
+    assert (outer.sent, inner.sent) == (4, 1)
+
+
+def test_long_retry_after_is_returned_not_waited_on(stub, monkeypatch):
+    monkeypatch.setattr(http_client, "RETRY_AFTER_MAX", 1.0)
+    stub.fail_next, stub.retry_after = 2, 120
+    url = f"{stub.base_url}/api/v3/quote/AAPL"
+    assert http_client.get(url).status_code == 503
+    assert asyncio.run(http_client.aget(url)).status_code == 503
+    assert stub.request_count == 2
+
+    stub.fail_next, stub.retry_after = 1, 0
+    assert http_client.get(url).status_code == 200
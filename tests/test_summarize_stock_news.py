@@ -0,0 +1,36 @@
+import asyncio
+
+import summarize_stock_news as pipeline
+from helpers import llm, scraper
+
+
+def test_only_summarized_articles_are_marked_seen(stub, monkeypatch):
+    failing = set()
+
+    async def no_page(url):
+        raise RuntimeError("unavailable")
+
+    async def complete_async(model, prompt):
+        if any(title in prompt for title in failing):
+            raise llm.LLMError("Error running model: provider unavailable")
+        return "summary"
+
+    monkeypatch.setattr(scraper, "scrape_async", no_page)
+    monkeypatch.setattr(llm, "complete_async", complete_async)
+    monkeypatch.setattr(pipeline, "MAX_ARTICLES", 3)
+    stub.news_published["SUMM"] = 5
+
+    def run():
+        result = asyncio.run(pipeline.summarize_stock_news_async("SUMM", new_only=True))
+        return [(a["title"].split()[1], a["status"]) for a in result["articles"]]
+
+    # Articles past MAX_ARTICLES are left for the next call.
+    assert run() == [("4", "ok"), ("3", "ok"), ("2", "ok")]
+    assert run() == [("1", "ok"), ("0", "ok")]
+
+    stub.news_published["SUMM"] = 7
+    failing.add("Headline 5 ")
+    assert run() == [("6", "ok"), ("5", "failed")]
+    failing.clear()
+    assert run() == [("5", "ok")]
+    assert run() == []
@@ -0,0 +1,129 @@
+import pytest
+
+import watchlist_monitor as wm
+from helpers.news_cursors import url_hash
+from sim_watchlist_monitor import article_latency, max_in_window, simulate
+
+
+@pytest.fixture(scope="module")
+def run():
+    return simulate(n_tickers=300, hours=1, n_hot=10)
+
+
+def test_providers_stay_within_their_rate_limits(run):
+    monitor, market, agent, hot = run
+    for provider, calls in market.calls.items():
+        rate, per = wm.DEFAULT_RATES[provider]
+        assert max_in_window(calls, per) <= rate, provider
+    llm_rate, llm_per = wm.DEFAULT_RATES["llm"]
+    assert max_in_window([at for at, _, _ in agent.runs], llm_per) <= llm_rate
+
+
+def test_agent_runs_only_on_changes_within_its_concurrency(run):
+    monitor, market, agent, hot = run
+    assert agent.runs
+    assert all(changes for _, _, changes in agent.runs)
+    assert agent.max_running <= agent.concurrency
+
+
+def test_every_article_reaches_the_agent(run):
+    monitor, market, agent, hot = run
+    delivered = {a["url"] for _, _, changes in agent.runs for c in changes for a in c.get("articles", [])}
+    pending = {a["url"] for changes in monitor.pending.values() for c in changes for a in c.get("articles", [])}
+    unfetched = {a["url"] for articles in market.unseen.values() for a in articles}
+    assert set(market.published) == delivered | pending | unfetched
+
+
+def test_hot_tickers_are_picked_up_faster(run):
+    monitor, market, agent, hot = run
+    latency = article_latency(agent, market, hot)
+    assert latency["hot"] and latency["quiet"]
+    assert sum(latency["hot"]) / len(latency["hot"]) < sum(latency["quiet"]) / len(latency["quiet"])
+
+
+def article(minute, url):
+    return {"published_date": f"2026-01-02 10:{minute:02d}:00", "url": url, "title": url}
+
+
+def observation(articles, stored=None):
+    newest = max(a["published_date"] for a in articles)
+    cursor = newest, [url_hash(a["url"]) for a in articles if a["published_date"] == newest]
+    return {"articles": articles, "cursor": cursor, "stored": stored}
+
+
+def test_news_without_a_stored_cursor_starts_from_a_baseline():
+    change, state = wm.news_change(None, observation([article(1, "a")]))
+    assert change is None
+    change, state = wm.news_change(state, observation([article(1, "a"), article(2, "b")]))
+    assert [a["url"] for a in change["articles"]] == ["b"]
+    change, _ = wm.news_change(state, observation([article(1, "a"), article(2, "b")]))
+    assert change is None
+
+
+def test_news_resumes_from_the_stored_cursor():
+    stored = ("2026-01-02 10:01:00", [url_hash("a")])
+    change, _ = wm.news_change(None, observation([article(1, "a"), article(2, "b")], stored))
+    assert [a["url"] for a in change["articles"]] == ["b"]
+
+
+def test_articles_published_while_stopped_are_reported(stub):
+    news = next(source for source in wm.default_sources() if source.name == "news")
+    stub.news_published.update({"MON1": 5, "MON2": 5})
+
+    change, state = news.detect(None, news.fetch(["MON1"], {})["MON1"])
+    assert change is None
+    stub.news_published["MON1"] += 2
+    change, state = news.detect(state, news.fetch(["MON1"], {})["MON1"])
+    assert len(change["articles"]) == 2
+    wm.AgentInvoker._commit("MON1", [change])
+
+    # Restart: articles published since the agent's last run are a change, a
+    # ticker the agent never handled is still a baseline.
+    stub.news_published["MON1"] += 3
+    observed = news.fetch(["MON1", "MON2"], {})
+    change, _ = news.detect(None, observed["MON1"])
+    assert len(change["articles"]) == 3
+    assert news.detect(None, observed["MON2"])[0] is None
+
+
+def test_quiet_tickers_poll_from_the_monitor_cursor(stub):
+    clock = wm.SimulatedClock()
+    buckets = wm.rate_limits(clock)
+    news = next(source for source in wm.default_sources() if source.name == "news")
+    tickers = [f"QUIET{i}" for i in range(50)]
+    monitor = wm.WatchlistMonitor(tickers, [news], buckets, lambda ticker, changes: True, clock)
+
+    sent = []
+    for _ in range(3):
+        before = stub.news_count
+        monitor.step()
+        sent.append(stub.news_count - before)
+        clock.sleep(news.interval)
+    assert sent[0] > 2 and sent[1] <= 2 and sent[2] <= 2
+    assert monitor.stats["changes"]["news"] == 0
+    assert buckets["fmp"].spent == sum(sent) == monitor.stats["requests"]["news"]
+
+
+def test_agent_runs_do_not_keep_their_sessions():
+    import time
+
+    from google.adk.agents import BaseAgent
+    from google.adk.events import Event
+    from google.adk.runners import InMemoryRunner
+    from google.genai import types
+
+    class Echo(BaseAgent):
+        async def _run_async_impl(self, ctx):
+            yield Event(author=self.name, invocation_id=ctx.invocation_id,
+                        content=types.Content(role="model", parts=[types.Part(text="noted")]))
+
+    invoker = wm.AgentInvoker("echo", concurrency=2)
+    invoker._runner = InMemoryRunner(Echo(name="echo"), app_name="echo")
+    for ticker in ("AAA", "BBB"):
+        assert invoker(ticker, [{"kind": "price", "price": 1.0, "previous": 2.0, "move": -0.5}])
+    deadline = time.monotonic() + 10
+    while invoker.running and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert invoker.running == 0
+    sessions = invoker._runner.session_service.sessions
+    assert not sessions.get("echo", {}).get("watchlist_monitor")